@@ -2,3 +2,15 @@ from sunix_ledstrip_controller_client.client import LEDStripControllerClient
 from sunix_ledstrip_controller_client.controller import Controller
 from sunix_ledstrip_controller_client.functions import FunctionId
 from sunix_ledstrip_controller_client.packets import TransitionType
+from sunix_ledstrip_controller_client.ratelimit import RateLimiter, RateLimitPolicy
+from sunix_ledstrip_controller_client.retry import RetryPolicy, CircuitBreaker
+from sunix_ledstrip_controller_client.health import HealthMonitor, DeviceHealth
+from sunix_ledstrip_controller_client.scene import Scene
+from sunix_ledstrip_controller_client.fleet import FleetStore
+from sunix_ledstrip_controller_client.connection import ConnectionPool
+from sunix_ledstrip_controller_client.multiplex import SelectorEngine
+from sunix_ledstrip_controller_client.registry import ControllerRegistry
+from sunix_ledstrip_controller_client.exceptions import LEDStripControllerError, DeviceConnectionError, \
+    DeviceConnectionRefusedError, DeviceTimeoutError, ProtocolError, ChecksumError
+from sunix_ledstrip_controller_client.results import BulkResult, DeviceResult
+from sunix_ledstrip_controller_client.colors import WhiteMixing, set_white_mixing, get_white_mixing
@@ -0,0 +1,346 @@
+"""
+Music reactive lighting driven by PCM audio samples (from a WAV file, a raw PCM stream or a callback).
+
+This module requires NumPy which is not installed as a dependency of this library: :code:`pip install numpy`
+"""
+import threading
+import time
+import wave
+from typing import TYPE_CHECKING
+
+try:
+    import numpy as np
+except ImportError as ex:  # pragma: no cover
+    raise ImportError("The audio module requires numpy, install it using: pip install numpy") from ex
+
+from .controller import Controller
+from .packets.requests import encode_rgbww
+
+# workaround for cyclic dependencies introduced by typing
+if TYPE_CHECKING:
+    from .client import LEDStripControllerClient
+
+# (low frequency, high frequency) in Hz of the default bands: bass, mids, highs
+DEFAULT_BANDS = ((20, 250), (250, 2000), (2000, 8000))
+
+# color of each default band: bass is red, mids are green, highs are blue
+DEFAULT_BAND_COLORS = ((255, 0, 0, 0, 0), (0, 255, 0, 0, 0), (0, 0, 255, 0, 0))
+
+_SAMPLE_FORMATS = {
+    1: (np.uint8, 128, 128),
+    2: (np.int16, 0, 32768),
+    4: (np.int32, 0, 2147483648),
+}
+
+
+def _to_float(data: bytes, sample_width: int, channels: int) -> 'np.ndarray':
+    """
+    Converts interleaved PCM data to mono float samples in the range -1..1
+    """
+    dtype, offset, scale = _SAMPLE_FORMATS[sample_width]
+    samples = (np.frombuffer(data, dtype=dtype).astype(np.float32) - offset) / scale
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def wav_source(path: str, block_size: int = 1024):
+    """
+    Reads a WAV file block by block
+
+    :param path: path of a PCM WAV file
+    :param block_size: amount of samples per block
+    :return: generator yielding (mono float samples, sample rate) tuples
+    """
+    with wave.open(path, "rb") as wav:
+        sample_rate = wav.getframerate()
+        sample_width = wav.getsampwidth()
+        channels = wav.getnchannels()
+        if sample_width not in _SAMPLE_FORMATS:
+            raise ValueError("Unsupported sample width: %d bytes" % sample_width)
+
+        while True:
+            data = wav.readframes(block_size)
+            if not data:
+                return
+            yield _to_float(data, sample_width, channels), sample_rate
+
+
+def pcm_source(stream, sample_rate: int, channels: int = 1, sample_width: int = 2, block_size: int = 1024):
+    """
+    Reads raw interleaved little endian PCM data from a binary stream (f.ex. sys.stdin.buffer)
+
+    :param stream: binary stream
+    :param sample_rate: sample rate in Hz
+    :param channels: amount of interleaved channels
+    :param sample_width: bytes per sample (1, 2 or 4)
+    :param block_size: amount of samples (per channel) per block
+    :return: generator yielding (mono float samples, sample rate) tuples
+    """
+    if sample_width not in _SAMPLE_FORMATS:
+        raise ValueError("Unsupported sample width: %d bytes" % sample_width)
+
+    frame_bytes = channels * sample_width
+    block_bytes = block_size * frame_bytes
+    remainder = b''
+    while True:
+        data = stream.read(block_bytes)
+        if not data:
+            return
+
+        # pipes and sockets may return partial frames, those bytes are prepended to the next read
+        data = remainder + data
+        complete = len(data) - len(data) % frame_bytes
+        data, remainder = data[:complete], data[complete:]
+        if data:
+            yield _to_float(data, sample_width, channels), sample_rate
+
+
+class SpectrumAnalyzer:
+    """
+    Streaming FFT analysis that turns blocks of samples into normalized band levels
+    """
+
+    def __init__(self, sample_rate: int, block_size: int = 1024, bands: tuple = DEFAULT_BANDS,
+                 attack: float = 0.8, decay: float = 0.3, peak_decay: float = 0.995):
+        """
+        :param sample_rate: sample rate in Hz
+        :param block_size: amount of samples per FFT
+        :param bands: (low frequency, high frequency) tuple of each band in Hz
+        :param attack: smoothing factor [0..1] for rising levels (1 means no smoothing)
+        :param decay: smoothing factor [0..1] for falling levels (1 means no smoothing)
+        :param peak_decay: how fast the automatic gain forgets loud peaks (per block)
+        """
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self._attack = attack
+        self._decay = decay
+        self._peak_decay = peak_decay
+
+        self._window = np.hanning(block_size).astype(np.float32)
+        frequencies = np.fft.rfftfreq(block_size, 1 / sample_rate)
+
+        # precomputed fft bin ranges of all bands
+        self._bins = []
+        for low, high in bands:
+            start = int(np.searchsorted(frequencies, low))
+            end = max(start + 1, int(np.searchsorted(frequencies, high)))
+            self._bins.append((start, end))
+
+        self._buffer = np.zeros(block_size, dtype=np.float32)
+        self._levels = np.zeros(len(bands), dtype=np.float32)
+        self._peak = 1e-6
+
+    def process(self, samples: 'np.ndarray') -> 'np.ndarray':
+        """
+        Analyzes the next block of samples
+
+        :param samples: mono float samples, blocks shorter than the FFT size are combined with previous samples
+        :return: level of each band [0..1]
+        """
+        samples = np.asarray(samples, dtype=np.float32)[-self.block_size:]
+        if not len(samples):
+            return self._levels.copy()
+
+        self._buffer = np.roll(self._buffer, -len(samples))
+        self._buffer[-len(samples):] = samples
+
+        spectrum = np.abs(np.fft.rfft(self._buffer * self._window))
+        energies = np.array([spectrum[start:end].mean() for start, end in self._bins], dtype=np.float32)
+
+        # automatic gain: normalize by a slowly decaying peak over all bands
+        self._peak = max(self._peak * self._peak_decay, float(energies.max()))
+        targets = energies / self._peak
+
+        factors = np.where(targets > self._levels, self._attack, self._decay)
+        self._levels += (targets - self._levels) * factors
+        return self._levels.copy()
+
+
+class BandColorMapper:
+    """
+    Maps band levels to a color by mixing one color per band
+    """
+
+    def __init__(self, band_colors: tuple = DEFAULT_BAND_COLORS):
+        """
+        :param band_colors: (red, green, blue, warm_white, cold_white) color of each band
+        """
+        self._colors = np.array(band_colors, dtype=np.float32)
+
+    def map(self, levels: 'np.ndarray') -> (int, int, int, int, int):
+        """
+        :param levels: level of each band [0..1]
+        :return: (red, green, blue, warm_white, cold_white)
+        """
+        color = np.clip(levels @ self._colors, 0, 255)
+        return tuple(int(channel) for channel in color.round())
+
+
+class AudioReactive:
+    """
+    Drives controllers from audio samples.
+
+    Samples are analyzed as soon as they are fed, the resulting color replaces any color that has not
+    been sent yet (latest wins). A background thread sends the most recent color to all controllers
+    at most ``max_fps`` times per second.
+    """
+
+    def __init__(self, api: 'LEDStripControllerClient', controllers: [Controller or (str, int)],
+                 sample_rate: int, block_size: int = 1024, max_fps: float = 30,
+                 analyzer: SpectrumAnalyzer = None, mapper: BandColorMapper = None):
+        """
+        :param api: the client used to communicate with the controllers (use a ConnectionPool)
+        :param controllers: list of Controller objects or (host, port) tuples
+        :param sample_rate: sample rate of the fed samples in Hz
+        :param block_size: amount of samples per FFT
+        :param max_fps: maximum amount of colors sent per second
+        :param analyzer: custom spectrum analyzer
+        :param mapper: custom mapping from band levels to colors
+        """
+        self._api = api
+        self._addresses = [(controller.get_host(), controller.get_port()) if isinstance(controller, Controller)
+                           else tuple(controller) for controller in controllers]
+        self._analyzer = analyzer if analyzer is not None else SpectrumAnalyzer(sample_rate, block_size)
+        self._mapper = mapper if mapper is not None else BandColorMapper()
+        self._interval = 1 / max_fps
+
+        # latest (color, sample arrival time) that has not been sent yet
+        self._pending = None
+        self._last_color = None
+        self._condition = threading.Condition()
+        self._running = False
+        self._sender = None
+
+        self._latencies = []
+        self.analyzed_count = 0
+        self.sent_count = 0
+        self.dropped_count = 0
+        self.error_count = 0
+
+    def start(self) -> None:
+        """
+        Starts the background sender
+        """
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._sender = threading.Thread(target=self._send_loop, name="AudioReactive", daemon=True)
+            self._sender.start()
+
+    def stop(self) -> None:
+        """
+        Stops the background sender after sending the pending color
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+            sender = self._sender
+        if sender is not None:
+            sender.join()
+
+    def feed(self, samples, timestamp: float = None) -> (int, int, int, int, int):
+        """
+        Analyzes a block of samples (callback interface)
+
+        :param samples: mono float samples in the range -1..1
+        :param timestamp: monotonic time at which the samples were captured, defaults to now
+        :return: the resulting color
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        color = self._mapper.map(self._analyzer.process(samples))
+
+        with self._condition:
+            self.analyzed_count += 1
+            if self._pending is not None:
+                self.dropped_count += 1
+            self._pending = (color, timestamp)
+            self._condition.notify_all()
+
+        return color
+
+    def run(self, source, realtime: bool = True) -> None:
+        """
+        Feeds all blocks of a source (see wav_source() and pcm_source()) and stops afterwards
+
+        :param source: generator yielding (samples, sample rate) tuples
+        :param realtime: True to feed blocks at the speed they would be played back (for files),
+                         False to feed them as fast as possible (for live streams that are already paced)
+        """
+        self.start()
+        start = time.monotonic()
+        played = 0.0
+        try:
+            for samples, sample_rate in source:
+                if realtime:
+                    delay = start + played - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    played += len(samples) / sample_rate
+                self.feed(samples)
+        finally:
+            self.stop()
+
+    def get_stats(self) -> dict:
+        """
+        :return: statistics including the latency from sample arrival until the color was sent (in seconds)
+        """
+        with self._condition:
+            latencies = sorted(self._latencies)
+
+        stats = dict(analyzed=self.analyzed_count,
+                     sent=self.sent_count,
+                     dropped=self.dropped_count,
+                     errors=self.error_count,
+                     latency_avg=None,
+                     latency_p95=None,
+                     latency_max=None)
+        if latencies:
+            stats.update(latency_avg=sum(latencies) / len(latencies),
+                         latency_p95=latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                         latency_max=latencies[-1])
+        return stats
+
+    def _send_loop(self) -> None:
+        next_send = time.monotonic()
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending is not None or not self._running)
+                if self._pending is None:
+                    return
+                # pace the frames, newer colors replace the pending one in the meantime
+                delay = next_send - time.monotonic()
+                while delay > 0 and self._running:
+                    self._condition.wait(delay)
+                    delay = next_send - time.monotonic()
+                color, timestamp = self._pending
+                self._pending = None
+
+            next_send = time.monotonic() + self._interval
+            if color == self._last_color:
+                continue
+            self._send(color, timestamp)
+
+    def _send(self, color: (int, int, int, int, int), timestamp: float) -> None:
+        data = encode_rgbww(*color)
+        errors = 0
+        for host, port in self._addresses:
+            try:
+                self._api._send_data(host, port, data)
+            except Exception:
+                errors += 1
+
+        if errors < len(self._addresses):
+            # a color that reached no controller is sent again even if it doesn't change
+            self._last_color = color
+        latency = time.monotonic() - timestamp
+        with self._condition:
+            self.error_count += errors
+            self.sent_count += 1
+            # keep a bounded window of recent latencies
+            self._latencies.append(latency)
+            if len(self._latencies) > 1000:
+                del self._latencies[:500]
@@ -3,25 +3,112 @@ Example usage of the LEDStripControllerClient can be found in the example.py fil
 """
 import datetime
 import socket
+import threading
+import time
 from socket import AF_INET, SOCK_DGRAM, SOL_SOCKET, SO_REUSEADDR, SO_BROADCAST
 
+from . import profiling
+from .colors import WhiteMixing, get_white_mixing
+from .connection import ConnectionPool
 from .controller import Controller
+from .exceptions import LEDStripControllerError, wrap_os_error
 from .functions import FunctionId
 from .packets import TransitionType
+from .packets.constants import STATUS_REQUEST, GET_TIME_REQUEST, GET_TIMER_REQUEST, TURN_ON_REQUEST, \
+    TURN_OFF_REQUEST
+from .packets.buffers import is_color_buffer, to_color_bytes, to_program_bytes
+from .packets.cache import PacketCache, custom_function_cache, custom_function_key
+from .ratelimit import RateLimiter
+from .recorder import TrafficRecorder, DIRECTION_SENT, DIRECTION_RECEIVED
+from .results import BulkResult, DeviceResult
+from .retry import RetryPolicy, CircuitBreaker
+
+
+def _log_discovery_error(message: str, error: Exception) -> None:
+    # logging is imported on demand, it is not needed otherwise and would slow down importing the library
+    import logging
+    logging.getLogger(__name__).warning("Error handling discovery message %s: %s", message, error)
 
 
 class LEDStripControllerClient:
     """
-    This class is the main interface for controlling devices
+    This class is the main interface for controlling devices.
+
+    A single client can be shared by multiple threads. Requests to the same device are serialized
+    (one connection at a time per device) while requests to different devices run concurrently.
     """
 
     _discovery_port = 48899
     _discovery_message = b'HF-A11ASSISTHREAD'
 
-    def __init__(self):
+    def __init__(self, rate_limiter: RateLimiter = None,
+                 read_policy: RetryPolicy = None, write_policy: RetryPolicy = None,
+                 discovery_policy: RetryPolicy = None, circuit_breaker: CircuitBreaker = None,
+                 custom_function_cache: PacketCache = custom_function_cache,
+                 connection_pool: ConnectionPool = None, recorder: TrafficRecorder = None):
         """
         Creates a new client object
+
+        :param rate_limiter: optional rate limiter that protects devices from too many packets
+        :param read_policy: retry policy for requests that expect a response (default: one attempt, 1s timeout)
+        :param write_policy: retry policy for requests without a response (default: one attempt, 1s timeout)
+        :param discovery_policy: amount of discovery broadcasts and time to wait for responses to each of them
+                                 (default: three attempts, 1s timeout)
+        :param circuit_breaker: optional circuit breaker that fails commands to offline devices immediately
+        :param custom_function_cache: cache for encoded custom function packets, shared by all clients by default
+        :param connection_pool: optional pool of persistent connections, if omitted a new connection is opened
+                                for every request
+        :param recorder: optional recorder that logs all sent and received packets
+        """
+        self._rate_limiter = rate_limiter
+        self._read_policy = read_policy if read_policy is not None else RetryPolicy()
+        self._write_policy = write_policy if write_policy is not None else RetryPolicy()
+        self._discovery_policy = discovery_policy if discovery_policy is not None else RetryPolicy(attempts=3)
+        self._circuit_breaker = circuit_breaker
+        self._custom_function_cache = custom_function_cache
+        self._connection_pool = connection_pool
+        self._recorder = recorder
+
+        # one lock per (host, port) for requests that don't use the connection pool
+        self._device_locks = {}
+        self._device_locks_lock = threading.Lock()
+
+    def close(self) -> None:
+        """
+        Closes all persistent connections (if a connection pool is used)
+        """
+        if self._connection_pool is not None:
+            self._connection_pool.close()
+
+    def move_controller(self, old_host: str, old_port: int, new_host: str, new_port: int) -> None:
+        """
+        Informs the client that a device got a new address.
+        Its persistent connection (if a connection pool is used) is moved to the new address.
+
+        :param old_host: previous host address of the device
+        :param old_port: previous port of the device
+        :param new_host: new host address of the device
+        :param new_port: new port of the device
+        """
+        if self._connection_pool is not None:
+            self._connection_pool.move(old_host, old_port, new_host, new_port)
+
+        if self._circuit_breaker is not None:
+            # nobody is listening on the old address anymore, stop probing it
+            self._circuit_breaker.move(old_host, old_port, new_host, new_port)
+
+    def get_rate_limit_metrics(self, host: str = None, port: int = None) -> dict or None:
+        """
+        Returns throttling metrics of the rate limiter (if any).
+
+        :param host: controller host address, if omitted metrics of all controllers are returned
+        :param port: controller port
+        :return: metrics dictionary or None if no rate limiter is used
         """
+        if self._rate_limiter is None:
+            return None
+
+        return self._rate_limiter.get_metrics(host, port)
 
     def discover_controllers(self) -> [Controller]:
         """
@@ -31,11 +118,19 @@ class LEDStripControllerClient:
         :return: a list of devices
         """
         discovered_controllers = []
+        policy = self._discovery_policy
+        start = time.monotonic()
 
         # use discovery multiple times as controllers sometimes just don't respond
-        for i in range(3):
+        for i in range(policy.attempts):
+            timeout = policy.timeout
+            if policy.deadline is not None:
+                timeout = min(timeout, policy.deadline - (time.monotonic() - start))
+                if timeout <= 0:
+                    break
+
             discovered_controllers = self.__merge_controllers(
-                self._discover_controllers(),
+                self._discover_controllers(timeout),
                 discovered_controllers)
 
         return discovered_controllers
@@ -47,13 +142,13 @@ class LEDStripControllerClient:
 
         return list(merged)
 
-    def _discover_controllers(self) -> [Controller]:
+    def _discover_controllers(self, timeout: float = 1) -> [Controller]:
         """
         Internally used discovery method
+        :param timeout: time to wait for responses in seconds
         :return: list of discovered devices
         """
 
-        discovered_controllers = []
         with socket.socket(AF_INET, SOCK_DGRAM) as cs:
             cs.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
             cs.setsockopt(SOL_SOCKET, SO_BROADCAST, 1)
@@ -62,41 +157,118 @@ class LEDStripControllerClient:
             cs.sendto(self._discovery_message, ('255.255.255.255', self._discovery_port))
 
             cs.setblocking(True)
-            cs.settimeout(1)
+            cs.settimeout(timeout)
             received_messages = []
             try:
                 while True:
                     data, address = cs.recvfrom(4096)
-                    received_messages.append(data.decode())
+                    received_messages.append(data.decode(errors="replace"))
 
             except socket.timeout:
                 if len(received_messages) <= 0:
                     return []
 
-        for message in received_messages:
-            try:
-                controller = self._parse_discovery_response(message)
-                discovered_controllers.append(controller)
-            except:
-                print("Error parsing discovery message: %s" % message)
-                return None
+        return self._create_discovered_controllers(received_messages)
+
+    def sweep_controllers(self, networks: str or [str], rate: float = 1000, timeout: float = 1) -> [Controller]:
+        """
+        Discovers controllers in networks that don't forward broadcasts by sending the discovery message
+        to every single address of one or more networks. All messages are sent from a single socket
+        while replies are collected in the meantime.
+
+        :param networks: a network in CIDR notation (f.ex. '192.168.4.0/22') or a list of them
+        :param rate: maximum amount of discovery messages sent per second
+        :param timeout: time to wait for replies after the last message was sent in seconds
+        :return: a list of devices
+        """
+        import ipaddress
+        import select
+
+        if rate <= 0:
+            raise ValueError("Invalid rate! Expected a value > 0, got: %s" % rate)
+
+        if isinstance(networks, str):
+            networks = [networks]
+        addresses = list(dict.fromkeys(str(address) for network in networks
+                                       for address in ipaddress.ip_network(network, strict=False).hosts()))
+        if not addresses:
+            return []
+
+        received_messages = {}
+        with socket.socket(AF_INET, SOCK_DGRAM) as cs:
+            cs.setblocking(False)
+
+            start = time.monotonic()
+            sent = 0
+            while True:
+                now = time.monotonic()
+
+                # send all messages that are due according to the rate
+                due = min(len(addresses), int((now - start) * rate) + 1)
+                blocked = False
+                while sent < due:
+                    try:
+                        cs.sendto(self._discovery_message, (addresses[sent], self._discovery_port))
+                    except BlockingIOError:
+                        # the send buffer is full, wait until the socket is writable again
+                        blocked = True
+                        break
+                    except OSError:
+                        # f.ex. no route to this host, there is nothing to discover
+                        pass
+                    sent += 1
+
+                if sent < len(addresses):
+                    wait = max(0.0, start + sent / rate - now)
+                else:
+                    end = start + len(addresses) / rate + timeout
+                    wait = end - now
+                    if wait <= 0:
+                        break
+
+                readable, _, _ = select.select([cs], [cs] if blocked else [], [], wait)
+                while readable:
+                    try:
+                        data, address = cs.recvfrom(4096)
+                    except (BlockingIOError, ConnectionRefusedError):
+                        break
+                    received_messages.setdefault(address[0], data.decode(errors="replace"))
+
+        return self._create_discovered_controllers(list(received_messages.values()))
+
+    def _create_discovered_controllers(self, messages: [str]) -> [Controller]:
+        # the states of all devices are queried in parallel instead of one by one by every new Controller
+        responses = [(message, self._parse_discovery_response(message)) for message in messages]
+        addresses = [(response[0], Controller.DEFAULT_PORT) for _, response in responses if response is not None]
+        states = self.execute_bulk(addresses, self.get_state)
+
+        discovered_controllers = []
+        for message, response in responses:
+            if response is None:
+                continue
+
+            ip, hw_id, model = response
+            result = states[(ip, Controller.DEFAULT_PORT)]
+            if not result.is_ok():
+                # the device answered the discovery but is not reachable (anymore), skip it
+                _log_discovery_error(message, result.error)
+                continue
+
+            # create a Controller object representation
+            discovered_controllers.append(Controller(self, ip, Controller.DEFAULT_PORT, hw_id, model, result.value))
 
         return discovered_controllers
 
-    def _parse_discovery_response(self, message: str) -> Controller or None:
+    def _parse_discovery_response(self, message: str) -> (str, str, str) or None:
         # parse received message
         data = str.split(message, ",")
 
         # check validity
         if len(data) == 3:
-            # extract data
-            ip = data[0]
-            hw_id = data[1]
-            model = data[2]
-
-            # create a Controller object representation
-            return Controller(self, ip, Controller.DEFAULT_PORT, hw_id, model)
+            # extract data: ip, hardware id, model
+            return data[0], data[1], data[2]
 
+    @profiling.profiled("get_time")
     def get_time(self, host: str, port: int) -> datetime:
         """
         Receives the current time of the specified controller
@@ -106,19 +278,16 @@ class LEDStripControllerClient:
         :return: the current time of the controller
         """
 
-        from .packets.requests import GetTimeRequest
         from .packets.responses import GetTimeResponse
 
-        request = GetTimeRequest()
-        data = request.get_data()
-
-        response_data = self._send_data(host, port, data, True)
+        response_data = self._send_data(host, port, GET_TIME_REQUEST, True)
 
         # parse and check validity of response data
         response = GetTimeResponse(response_data).get_response()
 
         return response
 
+    @profiling.profiled("set_time")
     def set_time(self, host: str, port: int, date_time: datetime) -> None:
         """
         Sets the internal time of the controller
@@ -135,6 +304,7 @@ class LEDStripControllerClient:
 
         self._send_data(host, port, data)
 
+    @profiling.profiled("get_state")
     def get_state(self, host: str, port: int) -> dict:
         """
         Updates the state of the passed in controller
@@ -143,34 +313,80 @@ class LEDStripControllerClient:
         :param port: controller port
         """
 
-        from .packets.requests import StatusRequest
         from .packets.responses import StatusResponse
 
-        request = StatusRequest()
-        data = request.get_data()
-
-        response_data = self._send_data(host, port, data, True)
+        response_data = self._send_data(host, port, STATUS_REQUEST, True)
 
         # parse and check validity of response data
         response = StatusResponse(response_data).get_response()
 
         return response
 
-    def turn_on(self, host: str, port: int) -> None:
+    def get_states(self, addresses: [(str, int)], max_workers: int = 32) -> dict:
         """
-        Turns on a controller
+        Receives the state of multiple controllers in parallel
+
+        :param addresses: list of (host, port) tuples
+        :param max_workers: maximum amount of concurrent requests
+        :return: dictionary of state dictionaries (or the exception raised for that controller) keyed by (host, port)
+        """
+
+        results = self.execute_bulk(addresses, self.get_state, max_workers)
+        return {result.get_address(): result.value if result.is_ok() else result.error for result in results}
+
+    def execute_bulk(self, addresses: [(str, int)], operation, max_workers: int = 32) -> BulkResult:
+        """
+        Executes an operation on multiple controllers in parallel.
+        Errors of single controllers are reported in the result instead of being raised.
+
+        :param addresses: list of (host, port) tuples
+        :param operation: function (host, port) -> value, f.ex. api.turn_on or api.get_state
+        :param max_workers: maximum amount of concurrent operations
+        :return: the outcome and duration of the operation on each controller
+        """
+
+        def execute(address: (str, int)) -> DeviceResult:
+            host, port = address
+            start = time.monotonic()
+            try:
+                value = operation(host, port)
+            except Exception as ex:
+                return DeviceResult(host, port, error=ex, duration=time.monotonic() - start)
+            return DeviceResult(host, port, value=value, duration=time.monotonic() - start)
+
+        addresses = list(dict.fromkeys(addresses))
+        if not addresses:
+            return BulkResult([])
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(addresses))) as executor:
+            return BulkResult(executor.map(execute, addresses))
+
+    @profiling.profiled("send_packets")
+    def send_packets(self, host: str, port: int, packets: [bytes]) -> None:
+        """
+        Sends pre-encoded data packets (f.ex. of a Scene) to a controller in order
 
         :param host: controller host address
         :param port: controller port
+        :param packets: binary(!) data packets
         """
 
-        from .packets.requests import SetPowerRequest
+        for data in packets:
+            self._send_data(host, port, data)
 
-        request = SetPowerRequest()
-        data = request.get_data(True)
+    @profiling.profiled("turn_on")
+    def turn_on(self, host: str, port: int) -> None:
+        """
+        Turns on a controller
 
-        self._send_data(host, port, data)
+        :param host: controller host address
+        :param port: controller port
+        """
+
+        self._send_data(host, port, TURN_ON_REQUEST)
 
+    @profiling.profiled("turn_off")
     def turn_off(self, host: str, port: int) -> None:
         """
         Turns on a controller
@@ -179,13 +395,9 @@ class LEDStripControllerClient:
         :param port: controller port
         """
 
-        from .packets.requests import SetPowerRequest
-
-        request = SetPowerRequest()
-        data = request.get_data(False)
-
-        self._send_data(host, port, data)
+        self._send_data(host, port, TURN_OFF_REQUEST)
 
+    @profiling.profiled("set_rgbww")
     def set_rgbww(self, host: str, port: int, red: int, green: int, blue: int,
                   warm_white: int, cold_white: int) -> None:
         """
@@ -209,6 +421,7 @@ class LEDStripControllerClient:
 
         self._send_data(host, port, data)
 
+    @profiling.profiled("set_rgb")
     def set_rgb(self, host: str, port: int, red: int, green: int, blue: int) -> None:
         """
         Sets rgbw values for the specified controller.
@@ -229,6 +442,7 @@ class LEDStripControllerClient:
 
         self._send_data(host, port, data)
 
+    @profiling.profiled("set_ww")
     def set_ww(self, host: str, port: int, warm_white: int, cold_white: int) -> None:
         """
         Sets warm white and cold white values for the specified controller.
@@ -248,12 +462,86 @@ class LEDStripControllerClient:
 
         self._send_data(host, port, data)
 
+    @profiling.profiled("set_kelvin")
+    def set_kelvin(self, host: str, port: int, kelvin: float, brightness: int = 255,
+                   mixing: WhiteMixing = None) -> None:
+        """
+        Sets a color temperature for the specified controller.
+
+        :param host: controller host address
+        :param port: controller port
+        :param kelvin: color temperature (1000..12000)
+        :param brightness: (0..255)
+        :param mixing: how the LEDs of the controller mix white light, defaults to get_white_mixing()
+        """
+
+        mixing = mixing or get_white_mixing()
+        self.set_rgbww(host, port, *mixing.kelvin_to_rgbww(kelvin, brightness))
+
+    @profiling.profiled("set_hsv")
+    def set_hsv(self, host: str, port: int, hue: float, saturation: int, value: int,
+                mixing: WhiteMixing = None) -> None:
+        """
+        Sets an HSV color for the specified controller.
+
+        :param host: controller host address
+        :param port: controller port
+        :param hue: hue in degrees (0..360)
+        :param saturation: saturation (0..255)
+        :param value: value (0..255)
+        :param mixing: how the LEDs of the controller mix white light, defaults to get_white_mixing()
+        """
+
+        mixing = mixing or get_white_mixing()
+        self.set_rgbww(host, port, *mixing.hsv_to_rgbww(hue, saturation, value))
+
+    def set_kelvin_group(self, addresses: [(str, int)], kelvin: float, brightness: int = 255,
+                         mixing: WhiteMixing = None, max_workers: int = 32) -> BulkResult:
+        """
+        Sets the same color temperature for multiple controllers in parallel, the packet is only encoded once.
+
+        :param addresses: list of (host, port) tuples
+        :param kelvin: color temperature (1000..12000)
+        :param brightness: (0..255)
+        :param mixing: how the LEDs of the controllers mix white light, defaults to get_white_mixing()
+        :param max_workers: maximum amount of concurrent operations
+        :return: the outcome on each controller
+        """
+
+        mixing = mixing or get_white_mixing()
+        return self._set_rgbww_group(addresses, mixing.kelvin_to_rgbww(kelvin, brightness), max_workers)
+
+    def set_hsv_group(self, addresses: [(str, int)], hue: float, saturation: int, value: int,
+                      mixing: WhiteMixing = None, max_workers: int = 32) -> BulkResult:
+        """
+        Sets the same HSV color for multiple controllers in parallel, the packet is only encoded once.
+
+        :param addresses: list of (host, port) tuples
+        :param hue: hue in degrees (0..360)
+        :param saturation: saturation (0..255)
+        :param value: value (0..255)
+        :param mixing: how the LEDs of the controllers mix white light, defaults to get_white_mixing()
+        :param max_workers: maximum amount of concurrent operations
+        :return: the outcome on each controller
+        """
+
+        mixing = mixing or get_white_mixing()
+        return self._set_rgbww_group(addresses, mixing.hsv_to_rgbww(hue, saturation, value), max_workers)
+
+    def _set_rgbww_group(self, addresses: [(str, int)], rgbww: (int, int, int, int, int),
+                         max_workers: int) -> BulkResult:
+        from .packets.requests import UpdateColorRequest
+
+        data = UpdateColorRequest().get_rgbww_data(*rgbww)
+        return self.execute_bulk(addresses, lambda host, port: self._send_data(host, port, data), max_workers)
+
     def get_function_list(self) -> [FunctionId]:
         """
         :return: a list of all supported functions
         """
         return list(FunctionId)
 
+    @profiling.profiled("set_function")
     def set_function(self, host: str, port: int, function_id: FunctionId, speed: int):
         """
         Sets a function on the specified controller
@@ -271,6 +559,7 @@ class LEDStripControllerClient:
 
         self._send_data(host, port, data)
 
+    @profiling.profiled("set_custom_function")
     def set_custom_function(self, host: str, port: int, color_values: [(int, int, int, int)],
                             speed: int, transition_type: TransitionType = TransitionType.Gradual):
 
@@ -281,20 +570,45 @@ class LEDStripControllerClient:
         :param port: controller port
         :param color_values: a list of up to 16 color tuples of the form (red, green, blue) or (red, green, blue, unknown).
                              I couldn't figure out what the last parameter is used for so the rgb is a shortcut.
+                             Alternatively a buffer (bytes, bytearray, array('B')) with 4 bytes per color
+                             or a NumPy integer array of shape (n, 3) or (n, 4).
         :param transition_type: the transition type between colors
         :param speed: function speed [0..255] 0 is slow, 255 is fast
         """
 
-        for color in color_values:
-            self._validate_color(color, len(color))
+        if is_color_buffer(color_values):
+            # buffers are validated in a single pass and copied into the packet as a whole
+            program = to_program_bytes(color_values)
+
+            def encode() -> bytes:
+                from .packets.requests import encode_custom_function
+                return encode_custom_function(program, speed, transition_type)
+
+            key = (program, speed, transition_type)
+        else:
+            def encode() -> bytes:
+                for color in color_values:
+                    self._validate_color(color, len(color))
 
-        from .packets.requests import SetCustomFunctionRequest
+                from .packets.requests import SetCustomFunctionRequest
 
-        request = SetCustomFunctionRequest()
-        data = request.get_data(color_values, speed, transition_type)
+                request = SetCustomFunctionRequest()
+                return request.get_data(color_values, speed, transition_type)
+
+            key = custom_function_key(color_values, speed, transition_type)
+
+        # validated and encoded packets are cached as the same programs are usually sent over and over again
+        data = self._custom_function_cache.get_or_create(key, encode)
 
         self._send_data(host, port, data)
 
+    def get_custom_function_cache_stats(self) -> dict:
+        """
+        :return: hit/miss statistics of the custom function packet cache
+        """
+        return self._custom_function_cache.get_stats()
+
+    @profiling.profiled("get_timers")
     def get_timers(self, host: str, port: int) -> dict:
         """
         Receives the current timer configurations of the specified controller
@@ -304,38 +618,108 @@ class LEDStripControllerClient:
         :return: the current timer configuration of the controller
         """
 
-        from .packets.requests import GetTimerRequest
         from .packets.responses import GetTimerResponse
 
-        request = GetTimerRequest()
-        data = request.get_data()
-
-        response_data = self._send_data(host, port, data, True)
+        response_data = self._send_data(host, port, GET_TIMER_REQUEST, True)
 
         # parse and check validity of response data
         response = GetTimerResponse(response_data).get_response()
 
         return response
 
-    @staticmethod
-    def _send_data(host: str, port: int, data, wait_for_response: bool = False) -> bytearray or None:
+    def _send_data(self, host: str, port: int, data, wait_for_response: bool = False) -> bytearray or None:
         """
         Sends a binary data request to the specified host and port.
-        
+        If a rate limiter is used the request might be delayed, queued or rejected.
+        Failed attempts are retried according to the read or write policy.
+
         :param host: destination host
         :param port: destination port
         :param data: the binary(!) data to send
+        :param wait_for_response: True to wait for and return the response of the controller
+        """
+
+        profiling.mark("encode")
+
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.check(host, port)
+
+        if self._rate_limiter is None:
+            return self._transmit_with_policy(host, port, data, wait_for_response)
+
+        return self._rate_limiter.submit(
+            host, port, data,
+            lambda packet: self._transmit_with_policy(host, port, packet, wait_for_response),
+            wait_for_response)
+
+    def _transmit_with_policy(self, host: str, port: int, data, wait_for_response: bool) -> bytearray or None:
+        """
+        Sends binary data according to the retry policy of the operation type
+        and reports the outcome to the circuit breaker.
+        """
+
+        policy = self._read_policy if wait_for_response else self._write_policy
+        # the connection pool serializes the requests per device itself
+        transmit = self._transmit_locked if self._connection_pool is None else self._connection_pool.request
+
+        sent_at = time.time() if self._recorder is not None else None
+        try:
+            result = policy.execute(lambda timeout: transmit(host, port, data, wait_for_response, timeout))
+        except OSError as ex:
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.record_failure(host, port, ex)
+            if isinstance(ex, LEDStripControllerError):
+                raise
+            raise wrap_os_error(ex, host, port) from ex
+
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_success(host, port)
+        if self._recorder is not None:
+            # only packets that were actually sent are recorded, so a replay does not repeat failed requests
+            self._recorder.record(host, port, DIRECTION_SENT, data, sent_at)
+            if result is not None:
+                self._recorder.record(host, port, DIRECTION_RECEIVED, result)
+        return result
+
+    def _transmit_locked(self, host: str, port: int, data, wait_for_response: bool = False,
+                         timeout: float = 1) -> bytearray or None:
+        """
+        Sends binary data using a new connection while holding the lock of the device,
+        so a response can't be mixed up with the response to a concurrent request.
+        """
+        lock = self._device_locks.get((host, port))
+        if lock is None:
+            with self._device_locks_lock:
+                lock = self._device_locks.setdefault((host, port), threading.Lock())
+
+        with lock:
+            profiling.mark("queue")
+            return self._transmit(host, port, data, wait_for_response, timeout)
+
+    @staticmethod
+    def _transmit(host: str, port: int, data, wait_for_response: bool = False,
+                  timeout: float = 1) -> bytearray or None:
+        """
+        Sends binary data to the specified host and port using a new connection.
+
+        :param host: destination host
+        :param port: destination port
+        :param data: the binary(!) data to send
+        :param wait_for_response: True to wait for and return the response of the controller
+        :param timeout: socket timeout in seconds
         """
 
         with socket.socket() as s:
-            s.settimeout(1)
+            s.settimeout(timeout)
 
             s.connect((host, port))
+            profiling.mark("connect")
             s.send(data)
+            profiling.mark("send")
 
             if wait_for_response:
-                s.setblocking(True)
                 data = s.recv(2048)
+                profiling.mark("wait")
                 return data
             else:
                 return None
@@ -347,9 +731,12 @@ class LEDStripControllerClient:
         If the color is valid this method will not do anything.
         There is no return value to check, the method will raise an Exception if necessary.
 
-        :param color: the color tuple to validate
+        :param color: the color tuple (or a buffer / NumPy array with a single color) to validate
         :param color_channels: the expected amount of color channels in this color
         """
+        if is_color_buffer(color):
+            color = to_color_bytes(color, color_channels)
+
         if len(color) != color_channels:
             raise ValueError(
                 "Invalid amount of colors in color tuple. Expected " + str(color_channels) + ", got: " + str(
@@ -0,0 +1,314 @@
+"""
+Integer color math based on precomputed lookup tables.
+
+Colors given as color temperature (Kelvin) or HSV are converted to the five channels of a controller
+(red, green, blue, warm white, cold white) by table lookups instead of float math, the tables are
+created on first use. How white light is mixed depends on the LEDs of a strip, see WhiteMixing.
+Batch conversions of NumPy arrays use the same tables and return the same values as single conversions.
+"""
+import math
+from numbers import Integral
+
+KELVIN_MIN = 1000
+KELVIN_MAX = 12000
+# resolution of the color temperature tables
+KELVIN_STEP = 10
+
+# _SCALE_TABLES[level][value] == round(value * level / 255), rows are created on first use
+_SCALE_TABLES = [None] * 256
+
+
+def _get_scale_table(level: int) -> bytes:
+    table = _SCALE_TABLES[level]
+    if table is None:
+        table = bytes((value * level + 127) // 255 for value in range(256))
+        _SCALE_TABLES[level] = table
+    return table
+
+
+def scale_color(color: tuple, level: int) -> tuple:
+    """
+    Scales all channels of a color to a brightness level
+
+    :param color: color values (0..255)
+    :param level: brightness level (0..255), 255 returns the color unchanged
+    :return: the scaled color values
+    """
+    table = _get_scale_table(level)
+    return tuple(table[value] for value in color)
+
+
+def split_brightness(color: tuple) -> (tuple, int):
+    """
+    Splits a color into a base color with full brightness and its brightness level,
+    so that scale_color(base, level) == color
+
+    :param color: color values (0..255)
+    :return: (base color, level) the brightest channel of the base color is 255 and the level is the
+             value of the brightest channel of the passed in color, a black color returns (color, 0)
+    """
+    level = max(color)
+    if level == 0:
+        return tuple(color), 0
+
+    return tuple((value * 255 + level // 2) // level for value in color), level
+
+
+# _HUE_TABLE[hue] == (red, green, blue) of the hue at full saturation and value
+_HUE_TABLE = None
+
+
+def _get_hue_table() -> [(int, int, int)]:
+    global _HUE_TABLE
+    if _HUE_TABLE is None:
+        table = []
+        for hue in range(360):
+            rising = (255 * (hue % 60) + 30) // 60
+            falling = 255 - rising
+            table.append([(255, rising, 0), (falling, 255, 0), (0, 255, rising),
+                          (0, falling, 255), (rising, 0, 255), (255, 0, falling)][hue // 60])
+        _HUE_TABLE = table
+    return _HUE_TABLE
+
+
+def _validate_hsv(hue: float, saturation: int, value: int) -> None:
+    if not 0 <= hue <= 360:
+        raise ValueError("Invalid hue value! Expected 0-360, got: %s" % hue)
+    for name, channel in (("saturation", saturation), ("value", value)):
+        # Integral includes NumPy integers
+        if not isinstance(channel, Integral) or channel < 0 or channel > 255:
+            raise ValueError("Invalid %s value! Expected 0-255, got: %s" % (name, channel))
+
+
+def _validate_kelvin(kelvin: float) -> None:
+    if not KELVIN_MIN <= kelvin <= KELVIN_MAX:
+        raise ValueError("Invalid color temperature! Expected %d-%d, got: %s" % (KELVIN_MIN, KELVIN_MAX, kelvin))
+
+
+def hsv_to_rgb(hue: float, saturation: int, value: int) -> (int, int, int):
+    """
+    :param hue: hue in degrees (0..360)
+    :param saturation: saturation (0..255)
+    :param value: value (0..255)
+    :return: the (red, green, blue) color
+    """
+    _validate_hsv(hue, saturation, value)
+
+    saturation_table = _get_scale_table(saturation)
+    value_table = _get_scale_table(value)
+    return tuple(value_table[255 - saturation_table[255 - channel]]
+                 for channel in _get_hue_table()[int(round(hue)) % 360])
+
+
+def kelvin_to_rgb(kelvin: float) -> (int, int, int):
+    """
+    Approximates the color of a black body (the color of white light) with RGB LEDs.
+    This uses float math, use WhiteMixing for repeated conversions.
+
+    :param kelvin: color temperature
+    :return: the (red, green, blue) color
+    """
+    temperature = kelvin / 100
+    if temperature <= 66:
+        red = 255
+        green = 99.4708025861 * math.log(temperature) - 161.1195681661
+    else:
+        red = 329.698727446 * (temperature - 60) ** -0.1332047592
+        green = 288.1221695283 * (temperature - 60) ** -0.0755148492
+
+    if temperature >= 66:
+        blue = 255
+    elif temperature <= 19:
+        blue = 0
+    else:
+        blue = 138.5177312231 * math.log(temperature - 10) - 305.0447927307
+
+    return tuple(min(255, max(0, int(round(channel)))) for channel in (red, green, blue))
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as ex:
+        raise ImportError("Batch conversions require numpy, install it using: pip install numpy") from ex
+    return numpy
+
+
+class WhiteMixing:
+    """
+    Converts color temperatures and HSV colors to the channels of a controller depending on its LEDs
+    """
+
+    # white light is mixed from the warm and cold white LEDs, the white part of HSV colors as well
+    DUAL_WHITE = "dual_white"
+    # a single (warm) white LED is used for the white part of colors
+    SINGLE_WHITE = "single_white"
+    # no white LEDs, white light is mixed from red, green and blue
+    RGB = "rgb"
+
+    def __init__(self, strategy: str = DUAL_WHITE, warm_kelvin: int = 2700, cold_kelvin: int = 6500,
+                 white_kelvin: int = 4000):
+        """
+        :param strategy: DUAL_WHITE, SINGLE_WHITE or RGB
+        :param warm_kelvin: color temperature of the warm white LEDs
+        :param cold_kelvin: color temperature of the cold white LEDs
+        :param white_kelvin: color temperature used for the white part of HSV colors (DUAL_WHITE only)
+        """
+        if strategy not in (self.DUAL_WHITE, self.SINGLE_WHITE, self.RGB):
+            raise ValueError("Invalid white mixing strategy! Expected one of %s, got: %s" % (
+                ", ".join((self.DUAL_WHITE, self.SINGLE_WHITE, self.RGB)), strategy))
+        if warm_kelvin >= cold_kelvin:
+            raise ValueError("Invalid white LEDs! Expected warm_kelvin < cold_kelvin, got: %s, %s" % (
+                warm_kelvin, cold_kelvin))
+
+        self.strategy = strategy
+        self.warm_kelvin = warm_kelvin
+        self.cold_kelvin = cold_kelvin
+        self.white_kelvin = white_kelvin
+
+        # levels the white part of an HSV color is split into
+        self._white_levels = self._mix_whites(white_kelvin) if strategy == self.DUAL_WHITE \
+            else (255, 0) if strategy == self.SINGLE_WHITE else None
+        self._kelvin_table = None
+        self._kelvin_array = None
+        self._hue_array = None
+
+    def __repr__(self):
+        return "WhiteMixing(%s, warm_kelvin=%d, cold_kelvin=%d, white_kelvin=%d)" % (
+            self.strategy, self.warm_kelvin, self.cold_kelvin, self.white_kelvin)
+
+    def kelvin_to_rgbww(self, kelvin: float, brightness: int = 255) -> (int, int, int, int, int):
+        """
+        :param kelvin: color temperature (KELVIN_MIN..KELVIN_MAX)
+        :param brightness: (0..255)
+        :return: the (red, green, blue, warm white, cold white) color
+        """
+        _validate_kelvin(kelvin)
+        if not isinstance(brightness, Integral) or brightness < 0 or brightness > 255:
+            raise ValueError("Invalid brightness value! Expected 0-255, got: %s" % brightness)
+
+        # the nearest table entry, f.ex. 2999K uses the entry of 3000K
+        index = int(round((kelvin - KELVIN_MIN) / KELVIN_STEP)) * 5
+        return scale_color(self._get_kelvin_table()[index:index + 5], int(brightness))
+
+    def hsv_to_rgbww(self, hue: float, saturation: int, value: int) -> (int, int, int, int, int):
+        """
+        :param hue: hue in degrees (0..360)
+        :param saturation: saturation (0..255)
+        :param value: value (0..255)
+        :return: the (red, green, blue, warm white, cold white) color
+        """
+        red, green, blue = hsv_to_rgb(hue, saturation, value)
+        if self._white_levels is None:
+            return red, green, blue, 0, 0
+
+        white = min(red, green, blue)
+        warm_level, cold_level = self._white_levels
+        return (red - white, green - white, blue - white,
+                _get_scale_table(warm_level)[white], _get_scale_table(cold_level)[white])
+
+    def kelvin_to_rgbww_batch(self, kelvins, brightness=255) -> 'numpy.ndarray':
+        """
+        Converts many color temperatures at once (requires NumPy)
+
+        :param kelvins: array of color temperatures
+        :param brightness: a single brightness or an array with a brightness per color temperature (0..255)
+        :return: uint8 array of shape (amount of colors, 5)
+        """
+        numpy = _import_numpy()
+        kelvins = numpy.asarray(kelvins)
+        brightness = numpy.asarray(brightness)
+        if kelvins.size and (kelvins.min() < KELVIN_MIN or kelvins.max() > KELVIN_MAX):
+            raise ValueError("Invalid color temperature! Expected %d-%d" % (KELVIN_MIN, KELVIN_MAX))
+        if brightness.size and (brightness.min() < 0 or brightness.max() > 255):
+            raise ValueError("Invalid brightness value! Expected 0-255")
+
+        if self._kelvin_array is None:
+            self._kelvin_array = numpy.frombuffer(self._get_kelvin_table(), dtype=numpy.uint8) \
+                .reshape(-1, 5).astype(numpy.uint32)
+
+        indices = numpy.rint((kelvins - KELVIN_MIN) / KELVIN_STEP).astype(numpy.int64)
+        colors = self._kelvin_array[indices.reshape(-1)]
+        levels = numpy.broadcast_to(brightness.astype(numpy.uint32), kelvins.shape).reshape(-1, 1)
+        return ((colors * levels + 127) // 255).astype(numpy.uint8)
+
+    def hsv_to_rgbww_batch(self, hsv) -> 'numpy.ndarray':
+        """
+        Converts many HSV colors at once (requires NumPy)
+
+        :param hsv: array of shape (amount of colors, 3) with hue (0..360), saturation (0..255) and value (0..255)
+        :return: uint8 array of shape (amount of colors, 5)
+        """
+        numpy = _import_numpy()
+        hsv = numpy.asarray(hsv).reshape(-1, 3)
+        if len(hsv) and ((hsv.min(axis=0) < 0).any() or (hsv.max(axis=0) > (360, 255, 255)).any()):
+            raise ValueError("Invalid HSV color! Expected hue 0-360, saturation and value 0-255")
+
+        if self._hue_array is None:
+            self._hue_array = numpy.array(_get_hue_table(), dtype=numpy.uint32)
+
+        hues = numpy.rint(hsv[:, 0]).astype(numpy.int64) % 360
+        saturation = hsv[:, 1:2].astype(numpy.uint32)
+        value = hsv[:, 2:3].astype(numpy.uint32)
+
+        rgb = 255 - ((255 - self._hue_array[hues]) * saturation + 127) // 255
+        rgb = (rgb * value + 127) // 255
+
+        result = numpy.zeros((len(hsv), 5), dtype=numpy.uint8)
+        if self._white_levels is None:
+            result[:, :3] = rgb
+            return result
+
+        white = rgb.min(axis=1)
+        warm_level, cold_level = self._white_levels
+        result[:, :3] = rgb - white[:, None]
+        result[:, 3] = (white * warm_level + 127) // 255
+        result[:, 4] = (white * cold_level + 127) // 255
+        return result
+
+    def _mix_whites(self, kelvin: float) -> (int, int):
+        # splits full brightness between the white LEDs, the total stays constant
+        ratio = (kelvin - self.warm_kelvin) / (self.cold_kelvin - self.warm_kelvin)
+        cold_white = int(round(255 * min(1.0, max(0.0, ratio))))
+        return 255 - cold_white, cold_white
+
+    def _get_kelvin_table(self) -> bytes:
+        # five channels per KELVIN_STEP at full brightness
+        if self._kelvin_table is None:
+            table = bytearray()
+            for kelvin in range(KELVIN_MIN, KELVIN_MAX + 1, KELVIN_STEP):
+                if self.strategy == self.DUAL_WHITE:
+                    table += bytes((0, 0, 0) + self._mix_whites(kelvin))
+                else:
+                    red, green, blue = kelvin_to_rgb(kelvin)
+                    if self.strategy == self.SINGLE_WHITE:
+                        white = min(red, green, blue)
+                        table += bytes((red - white, green - white, blue - white, white, 0))
+                    else:
+                        table += bytes((red, green, blue, 0, 0))
+            self._kelvin_table = bytes(table)
+        return self._kelvin_table
+
+
+DEFAULT_WHITE_MIXING = WhiteMixing()
+
+# model name reported by the discovery -> WhiteMixing
+_WHITE_MIXING_BY_MODEL = {}
+
+
+def set_white_mixing(model: str, mixing: WhiteMixing) -> None:
+    """
+    Configures how colors are mixed for all controllers of a model
+
+    :param model: the model reported by the controllers (see Controller.get_model())
+    :param mixing: the mixing of the model
+    """
+    _WHITE_MIXING_BY_MODEL[model] = mixing
+
+
+def get_white_mixing(model: str = None) -> WhiteMixing:
+    """
+    :param model: the model reported by a controller
+    :return: the mixing configured for the model or DEFAULT_WHITE_MIXING
+    """
+    return _WHITE_MIXING_BY_MODEL.get(model, DEFAULT_WHITE_MIXING)
@@ -0,0 +1,196 @@
+"""
+JSON commands that describe the desired state of a controller, used by the HTTP gateway, the MQTT bridge
+and the CommandScheduler.
+
+A command is a dictionary with any of the fields:
+
+- ``on``: true or false
+- ``rgbww``, ``rgb``, ``ww``: list of 5, 3 or 2 color values (0..255)
+- ``function``: ``{"id": <FunctionId name or value>, "speed": 0..255}``
+"""
+import json
+from typing import TYPE_CHECKING
+
+from .controller import Controller
+from .functions import FunctionId
+from .scene import DeviceSnapshot
+
+# workaround for cyclic dependencies introduced by typing
+if TYPE_CHECKING:
+    from .client import LEDStripControllerClient
+
+# command fields -> expected amount of color channels
+COLOR_FIELDS = {"rgbww": 5, "rgb": 3, "ww": 2}
+
+COMMAND_FIELDS = ("on", "function") + tuple(COLOR_FIELDS)
+
+
+def validate_command(command: dict) -> dict:
+    """
+    Validates a command
+
+    :param command: the command as decoded from JSON
+    :return: the validated command, colors are converted to tuples and functions to (FunctionId, speed) tuples
+    """
+    from .client import LEDStripControllerClient
+
+    if not isinstance(command, dict):
+        raise ValueError("Invalid command! Expected an object, got: %s" % json.dumps(command))
+
+    unknown = set(command) - set(COMMAND_FIELDS)
+    if unknown:
+        raise ValueError("Unknown command fields: %s" % ", ".join(sorted(unknown)))
+
+    command = dict(command)
+    if "on" in command and not isinstance(command["on"], bool):
+        raise ValueError("Invalid value of \"on\"! Expected true or false, got: %s" % json.dumps(command["on"]))
+
+    for field, channels in COLOR_FIELDS.items():
+        if field in command:
+            color = command[field]
+            # bool is a subclass of int but true or false are no channel values
+            if not isinstance(color, (list, tuple)) or \
+                    not all(isinstance(value, int) and not isinstance(value, bool) for value in color):
+                raise ValueError("Invalid value of \"%s\"! Expected a list of integers" % field)
+            LEDStripControllerClient._validate_color(tuple(color), channels)
+            command[field] = tuple(color)
+
+    if "function" in command:
+        function = command["function"]
+        if not isinstance(function, dict) or "id" not in function:
+            raise ValueError("Invalid value of \"function\"! Expected {\"id\": <name>, \"speed\": 0..255}")
+        try:
+            function_id = FunctionId[function["id"]] if isinstance(function["id"], str) \
+                else FunctionId(function["id"])
+        except (KeyError, ValueError):
+            raise ValueError("Unknown function: %s" % json.dumps(function["id"]))
+        speed = function.get("speed", 128)
+        if not isinstance(speed, int) or isinstance(speed, bool) or speed < 0 or speed > 255:
+            raise ValueError("Invalid speed value! Expected 0-255, got: %s" % json.dumps(speed))
+        command["function"] = (function_id, speed)
+
+    return command
+
+
+def merge_commands(pending: dict, command: dict) -> dict:
+    """
+    Combines two validated commands into one that has the same effect as sending both of them in order
+
+    :param pending: the older command
+    :param command: the newer command
+    :return: the combined command
+    """
+    merged = dict(pending)
+
+    if "function" in command or "rgbww" in command:
+        # replaces the whole color or function
+        for field in ("function",) + tuple(COLOR_FIELDS):
+            merged.pop(field, None)
+    elif any(field in command for field in COLOR_FIELDS):
+        merged.pop("function", None)
+        if "rgbww" in merged:
+            # update the older rgbww color with the newer partial color
+            rgbww = merged["rgbww"]
+            if "rgb" in command:
+                rgbww = command["rgb"] + rgbww[3:]
+            if "ww" in command:
+                rgbww = rgbww[:3] + command["ww"]
+            merged["rgbww"] = rgbww
+            command = {field: value for field, value in command.items() if field not in ("rgb", "ww")}
+
+    merged.update(command)
+    if "rgb" in merged and "ww" in merged:
+        # a single packet sets both
+        merged["rgbww"] = merged.pop("rgb") + merged.pop("ww")
+    return merged
+
+
+def execute_command(api: 'LEDStripControllerClient', host: str, port: int, command: dict) -> None:
+    """
+    Sends a validated command to a controller
+
+    :param api: the client used to communicate with the controller
+    :param host: controller host address
+    :param port: controller port
+    :param command: the validated command
+    """
+    if "rgbww" in command:
+        api.set_rgbww(host, port, *command["rgbww"])
+    if "rgb" in command:
+        api.set_rgb(host, port, *command["rgb"])
+    if "ww" in command:
+        api.set_ww(host, port, *command["ww"])
+    if "function" in command:
+        api.set_function(host, port, *command["function"])
+    if "on" in command:
+        if command["on"]:
+            api.turn_on(host, port)
+        else:
+            api.turn_off(host, port)
+
+
+def encode_command(command: dict) -> (bytes, ...):
+    """
+    Encodes a validated command into the packets execute_command() would send
+
+    :param command: the validated command
+    :return: tuple of binary data packets in the order they have to be sent
+    """
+    from .packets.constants import TURN_ON_REQUEST, TURN_OFF_REQUEST
+    from .packets.requests import UpdateColorRequest, SetFunctionRequest, encode_rgbww
+
+    packets = []
+    if "rgbww" in command:
+        packets.append(encode_rgbww(*command["rgbww"]))
+    if "rgb" in command:
+        packets.append(UpdateColorRequest().get_rgb_data(*command["rgb"]))
+    if "ww" in command:
+        packets.append(UpdateColorRequest().get_ww_data(*command["ww"]))
+    if "function" in command:
+        packets.append(SetFunctionRequest().get_data(*command["function"]))
+    if "on" in command:
+        packets.append(TURN_ON_REQUEST if command["on"] else TURN_OFF_REQUEST)
+    return tuple(packets)
+
+
+def apply_command(snapshot: DeviceSnapshot or None, command: dict) -> DeviceSnapshot or None:
+    """
+    Derives the new state of a controller from a successfully executed command (without querying the controller)
+
+    :param snapshot: the state of the controller before the command
+    :param command: the validated command
+    :return: the new state or None if the previous state is unknown
+    """
+    if snapshot is None:
+        return None
+
+    power_state, mode, speed, rgbww = snapshot.power_state, snapshot.mode, snapshot.speed, snapshot.rgbww
+
+    if "rgbww" in command:
+        rgbww = command["rgbww"]
+    if "rgb" in command:
+        rgbww = command["rgb"] + rgbww[3:]
+    if "ww" in command:
+        rgbww = rgbww[:3] + command["ww"]
+    if any(field in command for field in COLOR_FIELDS):
+        mode = FunctionId.NO_FUNCTION.value
+    if "function" in command:
+        function_id, speed = command["function"]
+        mode = function_id.value
+    if "on" in command:
+        power_state = Controller.POWER_STATE_ON if command["on"] else Controller.POWER_STATE_OFF
+
+    return DeviceSnapshot(power_state, mode, speed, rgbww)
+
+
+def snapshot_to_json(snapshot: DeviceSnapshot) -> dict:
+    """
+    :param snapshot: the state of a controller
+    :return: JSON compatible representation of the state
+    """
+    function = snapshot.get_function()
+    return dict(on=snapshot.is_on(),
+                mode=snapshot.mode,
+                function=function.name if function is not None else None,
+                speed=snapshot.speed,
+                rgbww=list(snapshot.rgbww))
@@ -0,0 +1,195 @@
+import socket
+import threading
+import time
+
+from . import profiling
+
+
+def drain_socket(sock: socket.socket) -> int:
+    """
+    Discards data that arrived on a connection without being read (f.ex. a late reply to a command
+    that did not wait for a response), so it is not mistaken for the response of the next request.
+    The socket is left in non-blocking mode.
+
+    :param sock: a connected socket
+    :return: the amount of discarded bytes
+    :raises ConnectionResetError: if the device closed the connection
+    """
+    sock.setblocking(False)
+    discarded = 0
+    while True:
+        try:
+            data = sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return discarded
+        if not data:
+            raise ConnectionResetError("Connection closed by the device")
+        discarded += len(data)
+
+
+class _PooledConnection:
+    """
+    A persistent connection to a single device
+    """
+
+    def __init__(self):
+        self.socket = None
+        self.last_used = 0.0
+        # only one request per device at a time
+        self.lock = threading.Lock()
+
+    def close(self) -> None:
+        if self.socket is not None:
+            try:
+                self.socket.close()
+            except OSError:
+                pass
+            self.socket = None
+
+
+class ConnectionPool:
+    """
+    Keeps one persistent TCP connection per device (host, port) open and reuses it for all requests,
+    which saves the connection setup for every single packet.
+
+    Broken or idle connections are transparently replaced by a new one.
+    """
+
+    def __init__(self, max_idle_time: float = 60):
+        """
+        :param max_idle_time: time in seconds after which an unused connection is reopened before it is used again
+        """
+        self._max_idle_time = max_idle_time
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(1 for connection in list(self._connections.values()) if connection.socket is not None)
+
+    def request(self, host: str, port: int, data, wait_for_response: bool = False,
+                timeout: float = 1) -> bytes or None:
+        """
+        Sends binary data over the persistent connection to the device
+
+        :param host: destination host
+        :param port: destination port
+        :param data: the binary(!) data to send
+        :param wait_for_response: True to wait for and return the response of the controller
+        :param timeout: socket timeout in seconds
+        :return: the response data or None
+        """
+        connection = self._get_connection(host, port)
+
+        with connection.lock:
+            profiling.mark("queue")
+            reused = connection.socket is not None
+            if reused and time.monotonic() - connection.last_used > self._max_idle_time:
+                connection.close()
+                reused = False
+
+            try:
+                return self._request(connection, host, port, data, wait_for_response, timeout)
+            except (ConnectionError, BrokenPipeError):
+                connection.close()
+                if not reused:
+                    raise
+
+            # the device probably closed the reused connection in the meantime, try again using a new one
+            try:
+                return self._request(connection, host, port, data, wait_for_response, timeout)
+            except OSError:
+                connection.close()
+                raise
+
+    def connect(self, host: str, port: int, timeout: float = 1) -> None:
+        """
+        Opens the connection to a device in advance (unless it is open already),
+        so the next request only has to write its packet
+
+        :param host: destination host
+        :param port: destination port
+        :param timeout: connection timeout in seconds
+        """
+        connection = self._get_connection(host, port)
+
+        with connection.lock:
+            if connection.socket is not None:
+                if time.monotonic() - connection.last_used <= self._max_idle_time:
+                    return
+                connection.close()
+
+            connection.socket = socket.create_connection((host, port), timeout=timeout)
+            connection.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection.last_used = time.monotonic()
+
+    def move(self, old_host: str, old_port: int, new_host: str, new_port: int) -> None:
+        """
+        Moves the connection of a device to a new address (f.ex. after its IP changed).
+        The old connection is closed, the next request will connect to the new address.
+        """
+        with self._lock:
+            connection = self._connections.pop((old_host, old_port), None)
+            if connection is None:
+                return
+
+            self._connections[(new_host, new_port)] = connection
+
+        with connection.lock:
+            connection.close()
+
+    def close(self, host: str = None, port: int = None) -> None:
+        """
+        Closes the connection of a single device or all connections
+
+        :param host: device host address, if omitted all connections are closed
+        :param port: device port
+        """
+        with self._lock:
+            if host is None:
+                connections = list(self._connections.values())
+                self._connections.clear()
+            else:
+                connection = self._connections.pop((host, port), None)
+                connections = [connection] if connection is not None else []
+
+        for connection in connections:
+            with connection.lock:
+                connection.close()
+
+    def _get_connection(self, host: str, port: int) -> _PooledConnection:
+        key = (host, port)
+        connection = self._connections.get(key)
+        if connection is None:
+            with self._lock:
+                connection = self._connections.setdefault(key, _PooledConnection())
+        return connection
+
+    @staticmethod
+    def _request(connection: _PooledConnection, host: str, port: int, data, wait_for_response: bool,
+                 timeout: float) -> bytes or None:
+        try:
+            if connection.socket is None:
+                connection.socket = socket.create_connection((host, port), timeout=timeout)
+                connection.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                profiling.mark("connect")
+            else:
+                if wait_for_response:
+                    drain_socket(connection.socket)
+                connection.socket.settimeout(timeout)
+
+            connection.socket.sendall(data)
+            profiling.mark("send")
+
+            response = None
+            if wait_for_response:
+                response = connection.socket.recv(2048)
+                profiling.mark("wait")
+                if not response:
+                    raise ConnectionResetError("Connection closed by %s:%d" % (host, port))
+        except socket.timeout:
+            # the state of the connection is unknown, don't reuse it
+            connection.close()
+            raise
+
+        connection.last_used = time.monotonic()
+        return response
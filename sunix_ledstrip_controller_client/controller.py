@@ -1,11 +1,18 @@
 import datetime
+import threading
+from numbers import Integral
 
+from sunix_ledstrip_controller_client import profiling
+from sunix_ledstrip_controller_client.colors import scale_color, split_brightness, get_white_mixing
 from sunix_ledstrip_controller_client.timer import Timer
 
 
 class Controller:
     """
-    Device class that represents a single controller
+    Device class that represents a single controller.
+
+    A controller can be shared by multiple threads, commands and state updates of a single
+    controller are serialized by a per-device lock while other controllers are not blocked.
     """
 
     import datetime
@@ -24,15 +31,19 @@ class Controller:
     DEFAULT_PORT = 5577
 
     def __init__(self, api: 'LEDStripControllerClient', host: str, port: int = DEFAULT_PORT,
-                 hardware_id: str = None, model: str = None):
+                 hardware_id: str = None, model: str = None, state: dict = None):
         """
         Creates a new controller device object
         
         :param host: host address of the controller device
         :param port: the port on which the controller device is listening
+        :param state: the current state as returned by LEDStripControllerClient.get_state(),
+                      it is queried from the device if omitted
         """
 
         self._api = api
+        # reentrant as commands update the state while holding the lock
+        self._lock = threading.RLock()
         self._host = host
         if not port:
             self._port = self.DEFAULT_PORT
@@ -45,10 +56,16 @@ class Controller:
 
         self._power_state = None
         self._rgbww = None
+        # the color at full brightness and the brightness level it is shown with (see set_brightness())
+        self._base_rgbww = None
+        self._brightness = None
         self._function = None
         self._function_speed = 255
 
-        self.update_state()
+        if state is None:
+            self.update_state()
+        else:
+            self._apply_state(state)
 
     def __hash__(self):
         return hash((self._host, self._port, self._device_name, self._hardware_id))
@@ -75,6 +92,18 @@ class Controller:
         """
         return self._port
 
+    def set_address(self, host: str, port: int = DEFAULT_PORT) -> None:
+        """
+        Changes the address of this device (f.ex. after it got a new IP address) while keeping its state.
+        Note: the hash of this object changes as well, remove it from sets and dict keys before.
+
+        :param host: the new host address
+        :param port: the new port
+        """
+        with self._lock:
+            self._host = host
+            self._port = port if port else self.DEFAULT_PORT
+
     def get_device_name(self) -> str or None:
         """
         :return: The device name of this controller
@@ -135,15 +164,17 @@ class Controller:
         """
         Turn on this controller
         """
-        self._api.turn_on(self._host, self._port)
-        self.update_state()
+        with self._lock:
+            self._api.turn_on(self._host, self._port)
+            self.update_state()
 
     def turn_off(self) -> None:
         """
         Turn on this controller
         """
-        self._api.turn_off(self._host, self._port)
-        self.update_state()
+        with self._lock:
+            self._api.turn_off(self._host, self._port)
+            self.update_state()
 
     def get_rgbww(self) -> (int, int, int, int, int) or None:
         """
@@ -162,8 +193,9 @@ class Controller:
         :param warm_white: warm_white: warm white intensity (0..255)
         :param cold_white: cold white intensity (0..255)
         """
-        self._api.set_rgbww(self._host, self._port, red, green, blue, warm_white, cold_white)
-        self.update_state()
+        with self._lock:
+            self._api.set_rgbww(self._host, self._port, red, green, blue, warm_white, cold_white)
+            self.update_state()
 
     def set_rgb(self, red: int, green: int, blue: int) -> None:
         """
@@ -173,8 +205,9 @@ class Controller:
         :param green: green intensity (0..255)
         :param blue: blue intensity (0..255)
         """
-        self._api.set_rgb(self._host, self._port, red, green, blue)
-        self.update_state()
+        with self._lock:
+            self._api.set_rgb(self._host, self._port, red, green, blue)
+            self.update_state()
 
     def set_ww(self, warm_white: int, cold_white: int) -> None:
         """
@@ -183,35 +216,63 @@ class Controller:
         :param warm_white: warm white intensity (0..255)
         :param cold_white: cold white intensity (0..255)
         """
-        self._api.set_ww(self._host, self._port, cold_white, warm_white)
-        self.update_state()
+        with self._lock:
+            self._api.set_ww(self._host, self._port, cold_white, warm_white)
+            self.update_state()
 
-    def get_brightness(self) -> int or None:
+    def set_kelvin(self, kelvin: float, brightness: int = 255) -> None:
         """
-        Note: this value is calculated in the library and not on the device
-        :return: the brightness of the controller [0..255] or None if no value is set
+        Sets a color temperature for this controller, white light is mixed according to the model
+        (see colors.set_white_mixing()).
+
+        :param kelvin: color temperature (1000..12000)
+        :param brightness: (0..255)
         """
-        if not self._rgbww:
-            return None
+        self.set_rgbww(*get_white_mixing(self._model).kelvin_to_rgbww(kelvin, brightness))
 
-        brightness = 0
-        for color in self._rgbww:
-            brightness += color
+    def set_hsv(self, hue: float, saturation: int, value: int) -> None:
+        """
+        Sets an HSV color for this controller, white light is mixed according to the model
+        (see colors.set_white_mixing()).
+
+        :param hue: hue in degrees (0..360)
+        :param saturation: saturation (0..255)
+        :param value: value (0..255)
+        """
+        self.set_rgbww(*get_white_mixing(self._model).hsv_to_rgbww(hue, saturation, value))
 
-        return int(brightness / len(self._rgbww))
+    def get_brightness(self) -> int or None:
+        """
+        Note: this value is calculated in the library and not on the device
+        :return: the brightness of the controller [0..255] (the value of the brightest channel)
+                 or None if no value is set
+        """
+        return self._brightness
 
     def set_brightness(self, brightness: int) -> None:
         """
         Sets a specific brightness without changing the color.
 
+        The color is kept at full brightness in the library, so dimming doesn't accumulate rounding errors
+        and the color is restored after dimming to 0. Only a single packet is sent and the state is not
+        queried afterwards, so this can be called at the rate of a slider.
+
         :param brightness: (0..255)
         """
+        # Integral includes NumPy integers
+        if not isinstance(brightness, Integral) or brightness < 0 or brightness > 255:
+            raise ValueError("Invalid brightness value! Expected 0-255, got: %s" % brightness)
+        brightness = int(brightness)
 
-        new_rgbww = []
-        for color in self._rgbww:
-            new_rgbww.append(color * (brightness / 255))
+        with self._lock:
+            if self._base_rgbww is None:
+                self.update_state()
 
-        self.set_rgbww(new_rgbww[0], new_rgbww[1], new_rgbww[2], new_rgbww[3], new_rgbww[4])
+            rgbww = scale_color(self._base_rgbww, brightness)
+            if rgbww != self._rgbww:
+                self._api.set_rgbww(self._host, self._port, *rgbww)
+                self._rgbww = rgbww
+            self._brightness = brightness
 
     def set_function(self, function_id: FunctionId, speed: int):
         """
@@ -220,8 +281,9 @@ class Controller:
         :param function_id: Function ID
         :param speed: function speed [0..255] 0 is slow, 255 is fast
         """
-        self._api.set_function(self._host, self._port, function_id, speed)
-        self.update_state()
+        with self._lock:
+            self._api.set_function(self._host, self._port, function_id, speed)
+            self.update_state()
 
     def set_custom_function(self, color_values: [(int, int, int, int)],
                             speed: int, transition_type: TransitionType = TransitionType.Gradual):
@@ -236,8 +298,9 @@ class Controller:
         :param transition_type: the transition type between colors
         :param speed: function speed [0..255] 0 is slow, 255 is fast
         """
-        self._api.set_custom_function(self._host, self._port, color_values, speed, transition_type)
-        self.update_state()
+        with self._lock:
+            self._api.set_custom_function(self._host, self._port, color_values, speed, transition_type)
+            self.update_state()
 
     def get_timers(self) -> [Timer]:
         """
@@ -299,21 +362,31 @@ class Controller:
 
         return timers
 
+    @profiling.profiled("Controller.update_state")
     def update_state(self):
         """
         Updates the state of this controller
         """
-        state = self._api.get_state(self._host, self._port)
-
-        # update the controller values from the response
-        self._device_name = state["device_name"]
-        self._power_state = state["power_status"]
-        self._function = state["mode"]
-        self._function_speed = state["speed"]
-        self._rgbww = (
-            state["red"],
-            state["green"],
-            state["blue"],
-            state["warm_white"],
-            state["cold_white"]
-        )
+        with self._lock:
+            self._apply_state(self._api.get_state(self._host, self._port))
+
+    def _apply_state(self, state: dict) -> None:
+        with self._lock:
+            # update the controller values from the response
+            self._device_name = state["device_name"]
+            self._power_state = state["power_status"]
+            self._function = state["mode"]
+            self._function_speed = state["speed"]
+            rgbww = (
+                state["red"],
+                state["green"],
+                state["blue"],
+                state["warm_white"],
+                state["cold_white"]
+            )
+
+            # keep the base color if the device still shows the color set by set_brightness()
+            if rgbww != self._rgbww or self._base_rgbww is None:
+                self._base_rgbww, self._brightness = split_brightness(rgbww)
+            self._rgbww = rgbww
+            profiling.mark("apply")
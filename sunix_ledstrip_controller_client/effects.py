@@ -0,0 +1,438 @@
+"""
+Client side effects that are rendered in the library and streamed to the controllers.
+
+This allows effects that are not possible with the built-in functions (FunctionId)
+or the 16 colors of a custom function. To write your own effect subclass Effect
+and implement its render() method.
+"""
+import random
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from .controller import Controller
+from .packets.requests import encode_rgbww
+
+# workaround for cyclic dependencies introduced by typing
+if TYPE_CHECKING:
+    from .client import LEDStripControllerClient
+
+
+def _clamp(value: float) -> int:
+    if value <= 0:
+        return 0
+    if value >= 255:
+        return 255
+    return int(value + 0.5)
+
+
+def _to_rgbww(color: tuple) -> (int, int, int, int, int):
+    if len(color) == 3:
+        return tuple(color) + (0, 0)
+    if len(color) == 5:
+        return tuple(color)
+    raise ValueError("Unexpected tuple size %d in color %s! Expected: 3 or 5" % (len(color), str(color)))
+
+
+class Effect:
+    """
+    Base class (and plugin interface) for client side effects.
+
+    An effect renders the colors of a whole group of controllers at once, every controller
+    of the group has its own phase offset so effects can f.ex. travel across a group.
+    """
+
+    def render(self, t: float, phases: [float]) -> [(int, int, int, int, int)]:
+        """
+        Renders a single frame for a group of controllers
+
+        :param t: time since the start of the effect in seconds
+        :param phases: phase offset [0..1) of each controller in the group
+        :return: a (red, green, blue, warm_white, cold_white) tuple for each controller with values in 0..255
+        """
+        raise NotImplementedError()
+
+    def frames(self, phases: [float], fps: float):
+        """
+        Lazily generates the frames of this effect
+
+        :param phases: phase offset of each controller in the group
+        :param fps: frames per second, used to advance the time if the caller does not send() it
+        :return: a generator yielding one list of colors (one per controller) per frame,
+                 send() the time since the start of the effect to render the next frame at that time
+        """
+        t = 0.0
+        while True:
+            elapsed = yield self.render(t, phases)
+            t = t + 1 / fps if elapsed is None else elapsed
+
+    def get_name(self) -> str:
+        """
+        :return: the name of this effect used in statistics
+        """
+        return type(self).__name__
+
+
+class SolidEffect(Effect):
+    """
+    Shows the same static color on all controllers
+    """
+
+    def __init__(self, color: tuple):
+        """
+        :param color: (red, green, blue) or (red, green, blue, warm_white, cold_white)
+        """
+        self._color = _to_rgbww(color)
+
+    def render(self, t: float, phases: [float]) -> [(int, int, int, int, int)]:
+        return [self._color] * len(phases)
+
+
+class PaletteEffect(Effect):
+    """
+    Smoothly cycles through a palette of colors
+    """
+
+    def __init__(self, palette: [tuple], period: float = 10):
+        """
+        :param palette: list of (red, green, blue) or (red, green, blue, warm_white, cold_white) colors
+        :param period: time in seconds for one cycle through the whole palette
+        """
+        if not palette:
+            raise ValueError("The palette must contain at least one color")
+        if period <= 0:
+            raise ValueError("Invalid period! Expected a value > 0, got: %s" % period)
+
+        self._palette = [_to_rgbww(color) for color in palette]
+        self._period = period
+
+    def render(self, t: float, phases: [float]) -> [(int, int, int, int, int)]:
+        palette = self._palette
+        size = len(palette)
+        base = t / self._period
+
+        colors = []
+        for phase in phases:
+            position = ((base + phase) % 1.0) * size
+            idx = int(position)
+            fraction = position - idx
+            start = palette[idx % size]
+            end = palette[(idx + 1) % size]
+            colors.append(tuple(_clamp(a + (b - a) * fraction) for a, b in zip(start, end)))
+
+        return colors
+
+
+class NoiseEffect(Effect):
+    """
+    Flickers around a base color using smooth value noise (f.ex. fire or candle light)
+    """
+
+    _TABLE_SIZE = 256
+
+    def __init__(self, color: tuple, amplitude: float = 0.5, speed: float = 1, seed: int = None):
+        """
+        :param color: (red, green, blue) or (red, green, blue, warm_white, cold_white) base color
+        :param amplitude: maximum relative change of the brightness [0..1]
+        :param speed: noise frequency in changes per second
+        :param seed: random seed for reproducible noise
+        """
+        self._color = _to_rgbww(color)
+        self._amplitude = amplitude
+        self._speed = speed
+
+        rng = random.Random(seed)
+        self._values = [rng.random() * 2 - 1 for i in range(self._TABLE_SIZE)]
+
+    def _noise(self, x: float) -> float:
+        idx = int(x)
+        fraction = x - idx
+        # smoothstep interpolation between two random values
+        fraction = fraction * fraction * (3 - 2 * fraction)
+        a = self._values[idx % self._TABLE_SIZE]
+        b = self._values[(idx + 1) % self._TABLE_SIZE]
+        return a + (b - a) * fraction
+
+    def render(self, t: float, phases: [float]) -> [(int, int, int, int, int)]:
+        x = t * self._speed
+        colors = []
+        for phase in phases:
+            factor = 1 + self._amplitude * self._noise(x + phase * self._TABLE_SIZE)
+            colors.append(tuple(_clamp(channel * factor) for channel in self._color))
+        return colors
+
+
+class EffectHandle:
+    """
+    A running effect on a group of controllers
+    """
+
+    def __init__(self, engine: 'EffectEngine', effect: Effect, addresses: [(str, int)], frames,
+                 duration: float or None):
+        self._engine = engine
+        self.effect = effect
+        self.addresses = addresses
+        self._frames = frames
+        self._start_time = time.monotonic()
+        self._end_time = None if duration is None else self._start_time + duration
+
+        # the last color sent to each controller
+        self._last_colors = [None] * len(addresses)
+        # indices of the controllers a color is being sent to
+        self._sending = set()
+        self._running = True
+
+        self.frame_count = 0
+        self.packet_count = 0
+        self.error_count = 0
+        self.cpu_time = 0.0
+
+    def is_running(self) -> bool:
+        """
+        :return: True if this effect is still running
+        """
+        return self._running
+
+    def stop(self) -> None:
+        """
+        Stops this effect, the controllers keep showing their last color
+        """
+        self._engine._remove(self)
+
+    def get_stats(self) -> dict:
+        """
+        :return: statistics of this effect, cpu times are in seconds
+        """
+        return dict(effect=self.effect.get_name(),
+                    controllers=len(self.addresses),
+                    frames=self.frame_count,
+                    packets=self.packet_count,
+                    errors=self.error_count,
+                    cpu_time=self.cpu_time,
+                    cpu_time_per_frame=self.cpu_time / self.frame_count if self.frame_count else 0.0)
+
+
+class EffectEngine:
+    """
+    Runs any amount of effects on groups of controllers from a single background thread.
+
+    All effects are rendered in lockstep at a fixed frame rate, every effect renders all of its
+    controllers in a single call. Only colors that actually changed are sent. Colors are sent
+    by a pool of threads, while a controller has not received its last color yet newer frames skip it,
+    so a slow or unreachable controller does not hold up the others. Use a client with
+    a ConnectionPool so frames are sent over persistent connections.
+
+    An effect whose render() method fails is stopped, the other effects keep running.
+    """
+
+    def __init__(self, api: 'LEDStripControllerClient', fps: float = 20, max_workers: int = 16):
+        """
+        :param api: the client used to communicate with the controllers
+        :param fps: frames per second
+        :param max_workers: maximum amount of controllers colors are sent to at the same time
+        """
+        if fps <= 0:
+            raise ValueError("Invalid fps! Expected a value > 0, got: %s" % fps)
+
+        self._api = api
+        self._fps = fps
+        self._handles = []
+        self._condition = threading.Condition()
+        self._worker = None
+
+        from concurrent.futures import ThreadPoolExecutor
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="EffectEngine")
+        self._in_flight = 0
+
+        self.tick_count = 0
+        self.late_tick_count = 0
+
+    def start(self, effect: Effect, controllers: [Controller or (str, int)], phase_spread: float = 0,
+              duration: float = None, phases: [float] = None) -> EffectHandle:
+        """
+        Starts an effect on a group of controllers
+
+        :param effect: the effect to run
+        :param controllers: list of Controller objects or (host, port) tuples
+        :param phase_spread: total phase offset distributed evenly over the group (0 means all controllers in sync,
+                             1 means the effect is spread over one full cycle across the group)
+        :param duration: time in seconds after which the effect stops automatically, None to run until stopped
+        :param phases: explicit phase offset of each controller, overrides phase_spread
+        :return: handle to control the running effect
+        """
+        addresses = [(controller.get_host(), controller.get_port()) if isinstance(controller, Controller)
+                     else tuple(controller) for controller in controllers]
+        if not addresses:
+            raise ValueError("At least one controller is required")
+
+        if phases is None:
+            phases = [idx * phase_spread / len(addresses) for idx in range(len(addresses))]
+        elif len(phases) != len(addresses):
+            raise ValueError("Invalid phases! Expected one phase per controller (%d), got: %d" % (
+                len(addresses), len(phases)))
+        handle = EffectHandle(self, effect, addresses, effect.frames(phases, self._fps), duration)
+
+        with self._condition:
+            self._handles.append(handle)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="EffectEngine", daemon=True)
+                self._worker.start()
+            self._condition.notify_all()
+
+        return handle
+
+    def stop(self) -> None:
+        """
+        Stops all running effects
+        """
+        with self._condition:
+            for handle in self._handles:
+                handle._running = False
+            self._handles.clear()
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        """
+        Stops all running effects and the threads that send their colors
+        """
+        self.stop()
+        with self._condition:
+            worker = self._worker
+        if worker is not None:
+            worker.join()
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def get_running(self) -> [EffectHandle]:
+        """
+        :return: handles of all running effects
+        """
+        with self._condition:
+            return list(self._handles)
+
+    def get_stats(self) -> [dict]:
+        """
+        :return: statistics of all running effects
+        """
+        return [handle.get_stats() for handle in self.get_running()]
+
+    def join(self, timeout: float = None) -> bool:
+        """
+        Waits until all effects have stopped and their last colors were sent
+
+        :param timeout: maximum time to wait in seconds
+        :return: True if no effect is running anymore
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._handles and not self._in_flight, timeout)
+
+    def _remove(self, handle: EffectHandle) -> None:
+        with self._condition:
+            handle._running = False
+            if handle in self._handles:
+                self._handles.remove(handle)
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        try:
+            self._loop()
+        finally:
+            with self._condition:
+                if self._worker is threading.current_thread():
+                    # only reached with running effects if the loop itself failed, stop them so join() returns
+                    for handle in self._handles:
+                        handle._running = False
+                    self._handles.clear()
+                    self._worker = None
+                self._condition.notify_all()
+
+    def _loop(self) -> None:
+        interval = 1 / self._fps
+        next_tick = time.monotonic()
+
+        while True:
+            with self._condition:
+                if not self._handles:
+                    self._worker = None
+                    return
+                handles = list(self._handles)
+
+            now = time.monotonic()
+            if now - next_tick > interval:
+                # we are more than a frame late, skip the missed frames instead of catching up
+                self.late_tick_count += 1
+                next_tick = now
+
+            for handle in handles:
+                if handle._end_time is not None and now >= handle._end_time:
+                    self._remove(handle)
+                    continue
+                try:
+                    self._render(handle, now)
+                except Exception:
+                    # a broken effect must not stop the others
+                    with self._condition:
+                        handle.error_count += 1
+                    self._remove(handle)
+            self.tick_count += 1
+
+            next_tick += interval
+            with self._condition:
+                # finished sends notify as well, keep waiting until the next tick
+                timeout = next_tick - time.monotonic()
+                while timeout > 0 and self._handles:
+                    self._condition.wait(timeout)
+                    timeout = next_tick - time.monotonic()
+
+    def _render(self, handle: EffectHandle, now: float) -> None:
+        start = time.thread_time()
+        try:
+            if handle.frame_count == 0:
+                colors = next(handle._frames)
+            else:
+                # render by elapsed time so effects keep their speed when ticks are skipped
+                colors = handle._frames.send(now - handle._start_time)
+        except StopIteration:
+            self._remove(handle)
+            return
+
+        if len(colors) != len(handle.addresses):
+            raise ValueError("Invalid frame of %s! Expected %d colors, got: %d" % (
+                handle.effect.get_name(), len(handle.addresses), len(colors)))
+
+        last_colors = handle._last_colors
+        for idx, color in enumerate(colors):
+            if color == last_colors[idx] or idx in handle._sending:
+                continue
+
+            data = encode_rgbww(*color)
+            handle._sending.add(idx)
+            with self._condition:
+                self._in_flight += 1
+            self._executor.submit(self._send, handle, idx, color, data)
+
+        handle.frame_count += 1
+        handle.cpu_time += time.thread_time() - start
+
+    def _send(self, handle: EffectHandle, idx: int, color: tuple, data: bytes) -> None:
+        host, port = handle.addresses[idx]
+        error = None
+        try:
+            self._api._send_data(host, port, data)
+        except Exception as ex:
+            error = ex
+
+        with self._condition:
+            if error is None:
+                handle._last_colors[idx] = color
+                handle.packet_count += 1
+            else:
+                handle.error_count += 1
+            handle._sending.discard(idx)
+            self._in_flight -= 1
+            self._condition.notify_all()
@@ -0,0 +1,73 @@
+"""
+Exceptions raised by this library.
+
+All of them derive from LEDStripControllerError. To stay compatible with code that catches the builtin
+exception types, every exception also derives from the builtin type it replaces
+(f.ex. DeviceTimeoutError is a TimeoutError and ChecksumError is a ValueError).
+"""
+
+
+class LEDStripControllerError(Exception):
+    """
+    Base class of all errors raised by this library
+    """
+
+    def __init__(self, message: str, host: str = None, port: int = None):
+        """
+        :param message: error description
+        :param host: host address of the device that caused the error (if any)
+        :param port: port of the device that caused the error (if any)
+        """
+        super().__init__(message)
+        self.host = host
+        self.port = port
+
+
+class DeviceConnectionError(LEDStripControllerError, ConnectionError):
+    """
+    Raised when a device could not be reached or the connection broke
+    """
+
+
+class DeviceConnectionRefusedError(DeviceConnectionError, ConnectionRefusedError):
+    """
+    Raised when a device refused the connection
+    """
+
+
+class DeviceTimeoutError(LEDStripControllerError, TimeoutError):
+    """
+    Raised when a device did not answer in time
+    """
+
+
+class ProtocolError(LEDStripControllerError, ValueError):
+    """
+    Raised when a device sent data that does not match the protocol
+    """
+
+
+class ChecksumError(ProtocolError):
+    """
+    Raised when the checksum of a response is invalid
+    """
+
+
+def wrap_os_error(error: OSError, host: str, port: int) -> LEDStripControllerError:
+    """
+    Converts a socket error into the matching error of this library
+
+    :param error: the original error
+    :param host: host address of the device
+    :param port: port of the device
+    :return: the converted error, errors of this library are returned unchanged
+    """
+    if isinstance(error, LEDStripControllerError):
+        return error
+
+    message = "%s:%d: %s" % (host, port, error or type(error).__name__)
+    if isinstance(error, TimeoutError):
+        return DeviceTimeoutError(message, host, port)
+    if isinstance(error, ConnectionRefusedError):
+        return DeviceConnectionRefusedError(message, host, port)
+    return DeviceConnectionError(message, host, port)
@@ -0,0 +1,433 @@
+from array import array
+from typing import TYPE_CHECKING
+
+from . import profiling
+from .controller import Controller
+from .exceptions import ChecksumError, DeviceConnectionError, LEDStripControllerError, ProtocolError
+from .packets.constants import STATUS_REQUEST
+from .packets.responses import StatusResponse
+
+# workaround for cyclic dependencies introduced by typing
+if TYPE_CHECKING:
+    from .client import LEDStripControllerClient
+
+# amount of color channels per device
+_CHANNELS = 5
+
+# offsets of the status response fields that are stored per device
+_STATUS_LAYOUT = StatusResponse._layout
+_OFFSET_DEVICE_NAME = _STATUS_LAYOUT.index("device_name")
+_OFFSET_POWER = _STATUS_LAYOUT.index("power_status")
+_OFFSET_MODE = _STATUS_LAYOUT.index("mode")
+_OFFSET_SPEED = _STATUS_LAYOUT.index("speed")
+_OFFSETS_RGBWW = tuple(_STATUS_LAYOUT.index(field) for field in ("red", "green", "blue", "warm_white", "cold_white"))
+
+
+def _find_all(buffer: array, value: int) -> [int]:
+    """
+    Finds all indices of a byte value in a byte array.
+    The search itself runs in C using bytes.find().
+    """
+    data = buffer.tobytes()
+    needle = bytes([value])
+    indices = []
+    idx = data.find(needle)
+    while idx >= 0:
+        indices.append(idx)
+        idx = data.find(needle, idx + 1)
+    return indices
+
+
+class FleetStore:
+    """
+    Memory efficient state store for a large amount of controllers.
+
+    The state of all controllers is kept in contiguous typed arrays indexed by a device id,
+    so there is no per-device object (besides the host string) and no per-refresh allocation.
+    Use get_view() to get a Controller like object for a single device.
+    """
+
+    def __init__(self, api: 'LEDStripControllerClient'):
+        """
+        :param api: the client used to communicate with the controllers
+        """
+        self._api = api
+
+        self._hosts = []
+        self._ports = array('H')
+        self._hardware_ids = []
+        self._models = []
+
+        # 0 if the state of a device has never been received
+        self._valid = array('B')
+        self._device_names = array('B')
+        self._power = array('B')
+        self._mode = array('B')
+        # the speed as sent by the controller (0 is fast, 255 is slow)
+        self._speed = array('B')
+        # flat (red, green, blue, warm_white, cold_white) values of all devices
+        self._rgbww = array('B')
+
+        self._ids_by_address = {}
+        self._ids_by_hardware_id = {}
+
+    def __len__(self):
+        return len(self._hosts)
+
+    def add(self, host: str, port: int = Controller.DEFAULT_PORT, hardware_id: str = None,
+            model: str = None) -> int:
+        """
+        Adds a controller to this store. Adding a known controller again returns its existing id.
+        No network request is made.
+
+        :param host: host address of the controller device
+        :param port: the port on which the controller device is listening
+        :param hardware_id: the hardware ID of the device
+        :param model: the model of the device
+        :return: the device id
+        """
+        address = (host, port)
+        device_id = self._ids_by_address.get(address)
+        if device_id is not None:
+            return device_id
+
+        device_id = len(self._hosts)
+        self._hosts.append(host)
+        self._ports.append(port)
+        self._hardware_ids.append(hardware_id)
+        self._models.append(model)
+
+        self._valid.append(0)
+        self._device_names.append(0)
+        self._power.append(0)
+        self._mode.append(0)
+        self._speed.append(0)
+        self._rgbww.extend(bytes(_CHANNELS))
+
+        self._ids_by_address[address] = device_id
+        if hardware_id is not None:
+            self._ids_by_hardware_id[hardware_id] = device_id
+
+        return device_id
+
+    def add_controller(self, controller: Controller) -> int:
+        """
+        Adds an existing Controller object (and its current state) to this store
+
+        :param controller: the controller to add
+        :return: the device id
+        """
+        device_id = self.add(controller.get_host(), controller.get_port(),
+                             controller.get_hardware_id(), controller.get_model())
+
+        rgbww = controller.get_rgbww()
+        if rgbww is not None:
+            self._device_names[device_id] = controller.get_device_name() or 0
+            self._power[device_id] = controller._power_state or 0
+            self._mode[device_id] = controller._function or 0
+            self._speed[device_id] = controller._function_speed or 0
+            self._set_rgbww(device_id, rgbww)
+            self._valid[device_id] = 1
+
+        return device_id
+
+    def get_id(self, host: str, port: int = Controller.DEFAULT_PORT) -> int or None:
+        """
+        :return: the device id of the controller with the given address or None
+        """
+        return self._ids_by_address.get((host, port))
+
+    def get_id_by_hardware_id(self, hardware_id: str) -> int or None:
+        """
+        :return: the device id of the controller with the given hardware id or None
+        """
+        return self._ids_by_hardware_id.get(hardware_id)
+
+    def get_view(self, device_id: int) -> 'ControllerView':
+        """
+        :param device_id: the device id
+        :return: a lightweight Controller like view of a single device
+        """
+        if device_id < 0 or device_id >= len(self._hosts):
+            raise IndexError("Unknown device id: %d" % device_id)
+
+        return ControllerView(self, device_id)
+
+    def get_views(self, device_ids: [int] = None) -> ['ControllerView']:
+        """
+        :param device_ids: the device ids, all devices if omitted
+        :return: list of views
+        """
+        if device_ids is None:
+            device_ids = range(len(self._hosts))
+
+        return [ControllerView(self, device_id) for device_id in device_ids]
+
+    def apply_status(self, device_id: int, data: bytes) -> None:
+        """
+        Stores the state of a device directly from a binary status response
+
+        :param device_id: the device id
+        :param data: binary StatusResponse data
+        """
+        if data is None or len(data) < len(_STATUS_LAYOUT):
+            raise ProtocolError("Packet too short! Expected %d bytes, got: %d" % (
+                len(_STATUS_LAYOUT), 0 if data is None else len(data)))
+        if sum(data[:len(_STATUS_LAYOUT) - 1]) % 0x100 != data[len(_STATUS_LAYOUT) - 1]:
+            raise ChecksumError("invalid or missing checksum")
+        profiling.mark("decode")
+
+        self._device_names[device_id] = data[_OFFSET_DEVICE_NAME]
+        self._power[device_id] = data[_OFFSET_POWER]
+        self._mode[device_id] = data[_OFFSET_MODE]
+        self._speed[device_id] = data[_OFFSET_SPEED]
+        self._set_rgbww(device_id, [data[offset] for offset in _OFFSETS_RGBWW])
+        self._valid[device_id] = 1
+        profiling.mark("apply")
+
+    def refresh(self, device_ids: [int] = None, max_workers: int = 32) -> [int]:
+        """
+        Updates the state of multiple devices in parallel
+
+        :param device_ids: the device ids to update, all devices if omitted
+        :param max_workers: maximum amount of concurrent requests
+        :return: list of device ids that could not be updated
+        """
+        if device_ids is None:
+            device_ids = range(len(self._hosts))
+        device_ids = list(device_ids)
+        if not device_ids:
+            return []
+
+        def refresh(device_id: int) -> bool:
+            try:
+                self._refresh(device_id)
+                return True
+            except (OSError, LEDStripControllerError):
+                return False
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(device_ids))) as executor:
+            results = executor.map(refresh, device_ids)
+            return [device_id for device_id, success in zip(device_ids, results) if not success]
+
+    @profiling.profiled("FleetStore.refresh")
+    def _refresh(self, device_id: int) -> None:
+        data = self._api._send_data(self._hosts[device_id], self._ports[device_id], STATUS_REQUEST, True)
+        self.apply_status(device_id, data)
+
+    def get_ids_on(self) -> [int]:
+        """
+        :return: ids of all devices that are turned on
+        """
+        return _find_all(self._power, Controller.POWER_STATE_ON)
+
+    def get_ids_off(self) -> [int]:
+        """
+        :return: ids of all devices that are turned off
+        """
+        return _find_all(self._power, Controller.POWER_STATE_OFF)
+
+    def get_ids_with_mode(self, mode: int) -> [int]:
+        """
+        :param mode: raw function id (f.ex. FunctionId.NO_FUNCTION.value for a static color)
+        :return: ids of all devices that run the given function
+        """
+        return [device_id for device_id in _find_all(self._mode, mode) if self._valid[device_id]]
+
+    def get_ids_unknown(self) -> [int]:
+        """
+        :return: ids of all devices whose state has never been received
+        """
+        return _find_all(self._valid, 0)
+
+    def get_memory_usage(self) -> int:
+        """
+        :return: the amount of bytes used by the state arrays
+        """
+        return sum(buffer.buffer_info()[1] * buffer.itemsize for buffer in (
+            self._ports, self._valid, self._device_names, self._power, self._mode, self._speed, self._rgbww))
+
+    def _get_rgbww(self, device_id: int) -> (int, int, int, int, int):
+        start = device_id * _CHANNELS
+        return tuple(self._rgbww[start:start + _CHANNELS])
+
+    def _set_rgbww(self, device_id: int, rgbww: [int]) -> None:
+        start = device_id * _CHANNELS
+        self._rgbww[start:start + _CHANNELS] = array('B', rgbww)
+
+
+class ControllerView:
+    """
+    Lightweight view of a single device in a FleetStore that offers the interface of a Controller.
+
+    Unlike a Controller, commands do not read back the state of the device,
+    the stored state is updated from the sent values instead.
+    """
+
+    __slots__ = ("_store", "_id")
+
+    def __init__(self, store: FleetStore, device_id: int):
+        self._store = store
+        self._id = device_id
+
+    def __eq__(self, other):
+        return isinstance(other, ControllerView) and self._store is other._store and self._id == other._id
+
+    def __hash__(self):
+        return hash((id(self._store), self._id))
+
+    def __str__(self):
+        return ("Host: %s\n" % (self.get_host()) +
+                "Port: %s\n" % (self.get_port()) +
+                "Device name: %s\n" % (self.get_device_name()) +
+                "Hardware ID: %s\n" % (self.get_hardware_id()) +
+                "Model: %s" % (self.get_model()))
+
+    def get_id(self) -> int:
+        """
+        :return: the device id of this device in the store
+        """
+        return self._id
+
+    def get_host(self) -> str:
+        """
+        :return: The IP/Host address of this device
+        """
+        return self._store._hosts[self._id]
+
+    def get_port(self) -> int:
+        """
+        :return: The port of this device
+        """
+        return self._store._ports[self._id]
+
+    def get_device_name(self) -> int or None:
+        """
+        :return: The device name of this controller
+        """
+        return self._store._device_names[self._id] if self._store._valid[self._id] else None
+
+    def get_hardware_id(self) -> str or None:
+        """
+        :return: The hardware ID of this device (f.ex. 'F0FE6B2333C6')
+        """
+        return self._store._hardware_ids[self._id]
+
+    def get_model(self) -> str or None:
+        """
+        :return: The model of this device
+        """
+        return self._store._models[self._id]
+
+    def is_on(self) -> bool or None:
+        """
+        :return: True if the controller is turned on, false otherwise or None if the state is unknown
+        """
+        if not self._store._valid[self._id]:
+            return None
+
+        return self._store._power[self._id] == Controller.POWER_STATE_ON
+
+    def get_mode(self) -> int or None:
+        """
+        :return: the raw function id reported by the controller
+        """
+        return self._store._mode[self._id] if self._store._valid[self._id] else None
+
+    def get_function_speed(self) -> int or None:
+        """
+        :return: function speed [0..255] 0 is slow, 255 is fast
+        """
+        return 255 - self._store._speed[self._id] if self._store._valid[self._id] else None
+
+    def get_rgbww(self) -> (int, int, int, int, int) or None:
+        """
+        :return: the RGB color values
+        """
+        if not self._store._valid[self._id]:
+            return None
+
+        return self._store._get_rgbww(self._id)
+
+    def get_brightness(self) -> int or None:
+        """
+        Note: this value is calculated in the library and not on the device
+        :return: the brightness of the controller [0..255] (the value of the brightest channel)
+                 or None if no value is set
+        """
+        rgbww = self.get_rgbww()
+        if not rgbww:
+            return None
+
+        return max(rgbww)
+
+    def turn_on(self) -> None:
+        """
+        Turn on this controller
+        """
+        self._store._api.turn_on(self.get_host(), self.get_port())
+        self._store._power[self._id] = Controller.POWER_STATE_ON
+
+    def turn_off(self) -> None:
+        """
+        Turn off this controller
+        """
+        self._store._api.turn_off(self.get_host(), self.get_port())
+        self._store._power[self._id] = Controller.POWER_STATE_OFF
+
+    def set_rgbww(self, red: int, green: int, blue: int, warm_white: int, cold_white: int) -> None:
+        """
+        Sets rgbww values for this controller.
+
+        :param red: red intensity (0..255)
+        :param green: green intensity (0..255)
+        :param blue: blue intensity (0..255)
+        :param warm_white: warm_white: warm white intensity (0..255)
+        :param cold_white: cold white intensity (0..255)
+        """
+        self._store._api.set_rgbww(self.get_host(), self.get_port(), red, green, blue, warm_white, cold_white)
+        self._apply_color((red, green, blue, warm_white, cold_white))
+
+    def set_rgb(self, red: int, green: int, blue: int) -> None:
+        """
+        Sets rgb values for this controller.
+
+        :param red: red intensity (0..255)
+        :param green: green intensity (0..255)
+        :param blue: blue intensity (0..255)
+        """
+        self._store._api.set_rgb(self.get_host(), self.get_port(), red, green, blue)
+        rgbww = self.get_rgbww() or (0, 0, 0, 0, 0)
+        self._apply_color((red, green, blue) + rgbww[3:])
+
+    def set_ww(self, warm_white: int, cold_white: int) -> None:
+        """
+        Sets warm white and cold white values for this controller.
+
+        :param warm_white: warm white intensity (0..255)
+        :param cold_white: cold white intensity (0..255)
+        """
+        self._store._api.set_ww(self.get_host(), self.get_port(), warm_white, cold_white)
+        rgbww = self.get_rgbww() or (0, 0, 0, 0, 0)
+        self._apply_color(rgbww[:3] + (warm_white, cold_white))
+
+    def update_state(self) -> None:
+        """
+        Updates the state of this controller
+        """
+        try:
+            self._store._refresh(self._id)
+        except LEDStripControllerError:
+            # already describes the device, f.ex. an invalid response
+            raise
+        except OSError as ex:
+            raise DeviceConnectionError("Could not update the state of %s:%d" % (self.get_host(), self.get_port()),
+                                        self.get_host(), self.get_port()) from ex
+
+    def _apply_color(self, rgbww: (int, int, int, int, int)) -> None:
+        from .functions import FunctionId
+
+        # the rest of the state of a device that was never refreshed is still unknown, so it stays invalid
+        self._store._set_rgbww(self._id, rgbww)
+        self._store._mode[self._id] = FunctionId.NO_FUNCTION.value
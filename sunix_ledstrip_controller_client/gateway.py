@@ -0,0 +1,560 @@
+"""
+HTTP/JSON gateway that makes controllers accessible to other languages and tools.
+
+The gateway keeps a single long-lived client (with a connection pool) and a cache of the last known
+state of every device, so reading states doesn't require a round trip to the devices.
+Start it from the command line using:
+
+    python -m sunix_ledstrip_controller_client.gateway --device 192.168.2.53 --device 192.168.2.54 --port 8080
+
+Endpoints:
+
+- ``GET /devices`` cached state of all devices, ``?max_age=<seconds>`` refreshes older states first
+- ``GET /devices/<id>`` cached state of a single device (also supports ``max_age``)
+- ``POST /devices/state`` sets the state of many devices at once, the body is a JSON object like
+  ``{"commands": [{"ids": ["192.168.2.53:5577"], "on": true, "rgb": [255, 0, 0]}]}``
+- ``POST /refresh`` queries the state of all devices
+- ``GET /events`` Server-Sent Events stream, a ``snapshot`` event with the state of all devices
+  followed by ``changes`` events that only contain the fields that changed since the previous event
+
+Pass ``--poll-interval`` to query all devices periodically by a single shared poller, so the load on the
+devices doesn't depend on the amount of viewers.
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from .commands import validate_command, execute_command, apply_command, merge_commands, snapshot_to_json
+from .controller import Controller
+from .scene import DeviceSnapshot
+
+# workaround for cyclic dependencies introduced by typing
+if TYPE_CHECKING:
+    from .client import LEDStripControllerClient
+
+# fields of CachedState.to_json() that are published to subscribers when they change
+_PUBLISHED_FIELDS = ("state", "source", "error")
+
+
+class CachedState:
+    """
+    The last known state of a device including freshness metadata
+    """
+
+    __slots__ = ("snapshot", "updated_at", "updated", "source", "error")
+
+    def __init__(self, snapshot: DeviceSnapshot or None, source: str, error: str = None,
+                 previous: 'CachedState' = None):
+        """
+        :param snapshot: the state of the device or None if it is unknown
+        :param source: "device" if the state was received from the device, "command" if it was derived from
+                       a command that was sent to the device
+        :param error: the error of the last failed status request
+        :param previous: the previous state (keeps the last known state if the device could not be reached)
+        """
+        if snapshot is None and previous is not None:
+            snapshot = previous.snapshot
+            self.updated_at = previous.updated_at
+            self.updated = previous.updated
+            self.source = previous.source
+        else:
+            self.updated_at = time.time()
+            self.updated = time.monotonic()
+            self.source = source
+        self.snapshot = snapshot
+        self.error = error
+
+    def get_age(self) -> float:
+        """
+        :return: time since the state was updated in seconds
+        """
+        return time.monotonic() - self.updated
+
+    def to_json(self) -> dict:
+        """
+        :return: JSON compatible representation
+        """
+        snapshot = self.snapshot
+        return dict(state=snapshot_to_json(snapshot) if snapshot is not None else None,
+                    updated_at=self.updated_at if snapshot is not None else None,
+                    age=round(self.get_age(), 3) if snapshot is not None else None,
+                    source=self.source if snapshot is not None else None,
+                    error=self.error)
+
+
+class Subscription:
+    """
+    A stream of state events of a gateway
+    """
+
+    def __init__(self, gateway: 'Gateway', max_pending: int):
+        self._gateway = gateway
+        self._queue = queue.Queue(max_pending)
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def get(self, timeout: float = None) -> (str, str) or None:
+        """
+        Waits for the next event
+
+        :param timeout: maximum time to wait in seconds
+        :return: (event name, JSON data) or None if the timeout expired or the subscription was closed
+        """
+        if self.closed and self._queue.empty():
+            return None
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        """
+        Stops receiving events
+        """
+        self._gateway._unsubscribe(self)
+
+    def _put(self, event: (str, str) or None) -> bool:
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+
+class Gateway:
+    """
+    Serves the cached state of a set of controllers over HTTP and applies batched commands
+    """
+
+    def __init__(self, api: 'LEDStripControllerClient', devices, max_age: float = None,
+                 max_workers: int = 32, poll_interval: float = None):
+        """
+        :param api: the client used to communicate with the controllers (use a ConnectionPool)
+        :param devices: list of Controller objects or (host, port) tuples (the id of a device is "host:port")
+                        or a dictionary of (host, port) tuples keyed by custom ids
+        :param max_age: maximum age of a cached state in seconds before it is refreshed on a read,
+                        None to only refresh states on explicit request
+        :param max_workers: maximum amount of concurrent device requests
+        :param poll_interval: time in seconds between two status sweeps of the shared poller,
+                              None to disable polling
+        """
+        self._api = api
+        self._max_age = max_age
+        self._max_workers = max_workers
+
+        if not isinstance(devices, dict):
+            addresses = [(device.get_host(), device.get_port()) if isinstance(device, Controller)
+                         else tuple(device) for device in devices]
+            devices = {"%s:%d" % address: address for address in addresses}
+        self._addresses = {device_id: tuple(address) for device_id, address in devices.items()}
+
+        self._states = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+        self._poll_interval = poll_interval
+        self._poller = None
+        self._stopped = threading.Event()
+
+        # the last published fields of every device and the subscribers they were published to
+        self._published = {}
+        self._subscribers = []
+        self._publish_lock = threading.Lock()
+
+    def get_device_ids(self) -> [str]:
+        """
+        :return: the ids of all devices
+        """
+        return list(self._addresses)
+
+    def get_state(self, device_id: str) -> CachedState or None:
+        """
+        :param device_id: the id of the device
+        :return: the cached state of a device or None if it was never queried
+        """
+        with self._lock:
+            return self._states.get(device_id)
+
+    def get_states(self, device_ids: [str] = None, max_age: float = None) -> dict:
+        """
+        Returns the cached states, states that are unknown or older than max_age are refreshed first
+        (all of them in a single parallel sweep)
+
+        :param device_ids: the ids of the devices, all devices if omitted
+        :param max_age: maximum age of a cached state in seconds, defaults to the max_age of the gateway
+        :return: dictionary of CachedState objects keyed by device id
+        """
+        device_ids = self._check_ids(device_ids)
+        if max_age is None:
+            max_age = self._max_age
+
+        with self._lock:
+            outdated = [device_id for device_id in device_ids
+                        if device_id not in self._states
+                        or (max_age is not None and self._states[device_id].get_age() > max_age)]
+
+        if outdated:
+            self.refresh(outdated)
+
+        with self._lock:
+            return {device_id: self._states[device_id] for device_id in device_ids}
+
+    def refresh(self, device_ids: [str] = None) -> dict:
+        """
+        Queries the state of devices in parallel
+
+        :param device_ids: the ids of the devices, all devices if omitted
+        :return: dictionary of the updated CachedState objects keyed by device id
+        """
+        device_ids = self._check_ids(device_ids)
+        ids_by_address = {}
+        for device_id in device_ids:
+            ids_by_address.setdefault(self._addresses[device_id], []).append(device_id)
+
+        results = self._api.execute_bulk(list(ids_by_address), self._api.get_state, self._max_workers)
+
+        updated = {}
+        with self._lock:
+            for result in results:
+                for device_id in ids_by_address[result.get_address()]:
+                    if result.is_ok():
+                        state = CachedState(DeviceSnapshot.from_state(result.value), "device")
+                    else:
+                        state = CachedState(None, "device", str(result.error) or type(result.error).__name__,
+                                            self._states.get(device_id))
+                    self._states[device_id] = state
+                    updated[device_id] = state
+        self._on_states_updated(updated)
+        return updated
+
+    def apply(self, commands: [dict]) -> dict:
+        """
+        Applies commands to many devices in parallel.
+        A command is a dictionary with the target "ids" (or a single "id") and any of the fields
+        "on" (bool), "rgbww", "rgb", "ww" (lists of color values) or "function" ({"id": name, "speed": 0..255}).
+
+        :param commands: list of commands, all commands are validated before anything is sent
+        :return: dictionary of {"ok": bool, "duration": seconds, "error": message} objects keyed by device id
+        """
+        by_address = {}
+        for command in commands:
+            command = self._validate_command(command)
+            device_ids = command.pop("ids")
+            for device_id in device_ids:
+                address = self._addresses[device_id]
+                device_ids_of_address, merged_command = by_address.get(address, ([], {}))
+                if device_id not in device_ids_of_address:
+                    device_ids_of_address.append(device_id)
+                # later commands win, f.ex. a color replaces an earlier function
+                by_address[address] = device_ids_of_address, merge_commands(merged_command, command)
+
+        def execute(host: str, port: int) -> None:
+            execute_command(self._api, host, port, by_address[(host, port)][1])
+
+        results = self._api.execute_bulk(list(by_address), execute, self._max_workers)
+
+        outcome = {}
+        updated = {}
+        with self._lock:
+            for result in results:
+                device_ids, command = by_address[result.get_address()]
+                for device_id in device_ids:
+                    outcome[device_id] = dict(ok=result.is_ok(), duration=round(result.duration, 4),
+                                              error=None if result.is_ok() else str(result.error))
+                    if result.is_ok():
+                        previous = self._states.get(device_id)
+                        snapshot = apply_command(previous.snapshot if previous is not None else None, command)
+                        if snapshot is not None:
+                            updated[device_id] = self._states[device_id] = CachedState(snapshot, "command")
+        self._on_states_updated(updated)
+        return outcome
+
+    def start(self, bind: str = "127.0.0.1", port: int = 8080) -> (str, int):
+        """
+        Starts serving HTTP requests in a background thread
+
+        :param bind: the address to listen on
+        :param port: the port to listen on, 0 to pick a free port
+        :return: the (address, port) the gateway is listening on
+        """
+        self._server = ThreadingHTTPServer((bind, port), self._create_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs=dict(poll_interval=0.1),
+                                        name="Gateway", daemon=True)
+        self._thread.start()
+
+        self._stopped.clear()
+        if self._poll_interval is not None:
+            self._poller = threading.Thread(target=self._poll, name="GatewayPoller", daemon=True)
+            self._poller.start()
+
+        return self._server.server_address[:2]
+
+    def stop(self) -> None:
+        """
+        Stops serving HTTP requests, polling and closes all subscriptions
+        """
+        self._stopped.set()
+        if self._poller is not None:
+            self._poller.join()
+            self._poller = None
+
+        with self._publish_lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscriber in subscribers:
+            subscriber.closed = True
+            subscriber._put(None)
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def serve_forever(self, bind: str = "127.0.0.1", port: int = 8080) -> None:
+        """
+        Serves HTTP requests in the current thread until interrupted
+        """
+        self.start(bind, port)
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def subscribe(self, max_pending: int = 64) -> Subscription:
+        """
+        Subscribes to state changes. The first event is a "snapshot" with the state of all devices,
+        every following "changes" event only contains the changed fields of the changed devices.
+
+        :param max_pending: maximum amount of events that were not received yet, subscribers that fall
+                            further behind are closed
+        :return: the subscription
+        """
+        subscription = Subscription(self, max_pending)
+        with self._publish_lock:
+            snapshot = {device_id: dict(fields) for device_id, fields in self._published.items()}
+            subscription._put(("snapshot", json.dumps(dict(devices=snapshot), separators=(",", ":"))))
+            self._subscribers.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._publish_lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+        subscription.closed = True
+        subscription._put(None)
+
+    def _poll(self) -> None:
+        while not self._stopped.wait(self._poll_interval):
+            try:
+                self.refresh()
+            except Exception as ex:
+                # logging is imported on demand, it is not needed otherwise and would slow down importing the library
+                import logging
+                logging.getLogger(__name__).warning("Error polling the device states: %s", ex)
+
+    def _on_states_updated(self, states: dict) -> None:
+        """
+        Publishes the changed fields of updated states to all subscribers
+
+        :param states: dictionary of the updated CachedState objects keyed by device id
+        """
+        with self._publish_lock:
+            changes = {}
+            for device_id, state in states.items():
+                fields = state.to_json()
+                published = self._published.setdefault(device_id, {})
+                changed = {field: fields[field] for field in _PUBLISHED_FIELDS
+                           if field not in published or published[field] != fields[field]}
+                if changed:
+                    published.update(changed)
+                    changes[device_id] = changed
+
+            if not changes or not self._subscribers:
+                return
+
+            # the message is encoded once for all subscribers
+            event = ("changes", json.dumps(dict(devices=changes), separators=(",", ":")))
+            for subscriber in list(self._subscribers):
+                if not subscriber._put(event):
+                    # the subscriber doesn't keep up, it has to reconnect and start over with a snapshot
+                    self._subscribers.remove(subscriber)
+                    subscriber.closed = True
+
+    def _check_ids(self, device_ids: [str] or None) -> [str]:
+        if device_ids is None:
+            return list(self._addresses)
+
+        for device_id in device_ids:
+            if device_id not in self._addresses:
+                raise KeyError(device_id)
+        return list(device_ids)
+
+    def _validate_command(self, command: dict) -> dict:
+        if not isinstance(command, dict):
+            raise ValueError("Invalid command! Expected an object, got: %s" % json.dumps(command))
+
+        command = dict(command)
+        device_ids = command.pop("ids", None)
+        if "id" in command:
+            device_ids = (device_ids or []) + [command.pop("id")]
+        if not device_ids or not isinstance(device_ids, list) or \
+                not all(isinstance(device_id, str) for device_id in device_ids):
+            raise ValueError("Invalid command! Expected a list of device ids in \"ids\"")
+        self._check_ids(device_ids)
+
+        command = validate_command(command)
+        command["ids"] = device_ids
+        return command
+
+    def _create_handler(self):
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                # don't log every single request to stderr
+                pass
+
+            def do_GET(self):
+                if urlsplit(self.path).path == "/events":
+                    self._stream_events()
+                else:
+                    self._handle(gateway._handle_get)
+
+            def do_POST(self):
+                self._handle(gateway._handle_post)
+
+            def _stream_events(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                with gateway.subscribe() as subscription:
+                    while True:
+                        event = subscription.get(timeout=15)
+                        try:
+                            if event is None:
+                                if subscription.closed:
+                                    return
+                                # keep the connection alive
+                                self.wfile.write(b": keep-alive\n\n")
+                            else:
+                                self.wfile.write(("event: %s\ndata: %s\n\n" % event).encode())
+                            self.wfile.flush()
+                        except OSError:
+                            # the client disconnected
+                            return
+
+            def _handle(self, handler):
+                url = urlsplit(self.path)
+
+                query = parse_qs(url.query)
+                try:
+                    body = None
+                    length = int(self.headers.get("Content-Length") or 0)
+                    if length:
+                        body = json.loads(self.rfile.read(length))
+                    status, response = handler(url.path, query, body)
+                except KeyError as ex:
+                    status, response = 404, dict(error="Unknown device: %s" % ex.args[0])
+                except ValueError as ex:
+                    status, response = 400, dict(error=str(ex))
+                except Exception as ex:
+                    status, response = 500, dict(error=str(ex) or type(ex).__name__)
+
+                data = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def _handle_get(self, path: str, query: dict, body) -> (int, dict):
+        max_age = float(query["max_age"][0]) if "max_age" in query else None
+
+        if path == "/devices":
+            states = self.get_states(max_age=max_age)
+            return 200, dict(devices=[self._device_to_json(device_id, state) for device_id, state in states.items()])
+
+        if path.startswith("/devices/"):
+            device_id = unquote(path[len("/devices/"):])
+            states = self.get_states([device_id], max_age=max_age)
+            return 200, self._device_to_json(device_id, states[device_id])
+
+        return 404, dict(error="Not found: %s" % path)
+
+    def _handle_post(self, path: str, query: dict, body) -> (int, dict):
+        if path == "/devices/state":
+            if not isinstance(body, dict) or not isinstance(body.get("commands"), list):
+                raise ValueError("Invalid request! Expected {\"commands\": [...]}")
+            return 200, dict(results=self.apply(body["commands"]))
+
+        if path == "/refresh":
+            states = self.refresh()
+            return 200, dict(devices=[self._device_to_json(device_id, state) for device_id, state in states.items()])
+
+        return 404, dict(error="Not found: %s" % path)
+
+    def _device_to_json(self, device_id: str, state: CachedState) -> dict:
+        host, port = self._addresses[device_id]
+        result = dict(id=device_id, host=host, port=port)
+        result.update(state.to_json())
+        return result
+
+
+def main(args: [str] = None) -> None:
+    """
+    Command line interface of the gateway
+    """
+    parser = argparse.ArgumentParser(description="HTTP/JSON gateway for LED strip controllers")
+    parser.add_argument("--device", action="append", default=[], help="controller host[:port], can be repeated")
+    parser.add_argument("--discover", action="store_true", help="add all controllers found by a discovery broadcast")
+    parser.add_argument("--bind", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on (default: 8080)")
+    parser.add_argument("--max-age", type=float, default=None,
+                        help="refresh cached states older than this amount of seconds on read")
+    parser.add_argument("--poll-interval", type=float, default=None,
+                        help="query all devices every this amount of seconds and push changes to subscribers")
+    parsed = parser.parse_args(args)
+
+    from .client import LEDStripControllerClient
+    from .connection import ConnectionPool
+
+    api = LEDStripControllerClient(connection_pool=ConnectionPool())
+
+    devices = []
+    for device in parsed.device:
+        host, _, port = device.partition(":")
+        devices.append((host, int(port) if port else Controller.DEFAULT_PORT))
+    if parsed.discover:
+        devices.extend((controller.get_host(), controller.get_port()) for controller in api.discover_controllers())
+
+    gateway = Gateway(api, devices, max_age=parsed.max_age, poll_interval=parsed.poll_interval)
+    print("Serving %d devices on http://%s:%d" % (len(gateway.get_device_ids()), parsed.bind, parsed.port))
+    try:
+        gateway.serve_forever(parsed.bind, parsed.port)
+    finally:
+        api.close()
+
+
+if __name__ == '__main__':
+    main()
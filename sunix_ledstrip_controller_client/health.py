@@ -0,0 +1,291 @@
+import errno
+import heapq
+import socket
+import threading
+import time
+
+from .retry import CircuitBreaker
+
+
+class DeviceHealth:
+    """
+    Reachability of a single device as tracked by a HealthMonitor
+    """
+
+    # the last operation succeeded
+    HEALTHY = "healthy"
+    # an operation failed recently, the device is probed soon but commands are still sent
+    SUSPECT = "suspect"
+    # the device failed repeatedly, commands fail immediately until a probe succeeds
+    DEAD = "dead"
+
+    __slots__ = ("host", "port", "state", "failures", "last_success", "last_failure", "last_error",
+                 "probe_interval", "next_probe")
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.state = self.HEALTHY
+        # consecutive failed operations and probes
+        self.failures = 0
+        self.last_success = None
+        self.last_failure = None
+        self.last_error = None
+        self.probe_interval = None
+        self.next_probe = None
+
+    def __repr__(self):
+        return "DeviceHealth(%s:%d, %s, failures=%d)" % (self.host, self.port, self.state, self.failures)
+
+    def copy(self) -> 'DeviceHealth':
+        """
+        :return: a snapshot of this object
+        """
+        health = DeviceHealth(self.host, self.port)
+        for name in self.__slots__:
+            setattr(health, name, getattr(self, name))
+        return health
+
+
+class HealthMonitor(CircuitBreaker):
+    """
+    Tracks the reachability of every device the client talks to and fails commands to dead devices at once.
+
+    Passive signals are the outcomes of all client operations: a success marks a device healthy, a timeout
+    or reset makes it suspect and ``failure_threshold`` consecutive failures mark it dead. Errors that can only
+    mean the device is unreachable (f.ex. "host unreachable") mark it dead immediately.
+    Suspect and dead devices are probed in the background by cheap TCP connects. The probe interval of a dead
+    device doubles after every failed probe (up to ``max_probe_interval``), a successful probe re-admits it.
+    Optionally healthy devices that were not used for ``idle_probe_interval`` seconds are probed as well,
+    so a device that lost power is known to be dead before the next command is sent to it.
+
+    Use it as the circuit breaker of a client:
+
+        monitor = HealthMonitor()
+        api = LEDStripControllerClient(circuit_breaker=monitor)
+    """
+
+    # errno values that mean the device can't be reached at all
+    _UNREACHABLE_ERRNOS = frozenset(getattr(errno, name) for name in ("EHOSTUNREACH", "ENETUNREACH", "EHOSTDOWN")
+                                    if hasattr(errno, name))
+
+    def __init__(self, failure_threshold: int = 2, min_probe_interval: float = 0.5, max_probe_interval: float = 30,
+                 probe_timeout: float = 0.5, idle_probe_interval: float = None, probe=None, listener=None,
+                 max_concurrent_probes: int = 16):
+        """
+        :param failure_threshold: amount of consecutive failures that marks a device dead
+        :param min_probe_interval: time in seconds until a suspect or newly dead device is probed
+        :param max_probe_interval: upper limit of the probe interval of a dead device in seconds
+        :param probe_timeout: connection timeout of a probe in seconds
+        :param idle_probe_interval: time in seconds after which an unused healthy device is probed,
+                                    None to only probe devices that failed
+        :param probe: optional function (host, port, timeout) -> bool that checks if a device is reachable
+        :param listener: optional function (host, port, state) that is called when the state of a device changes,
+                         it is called while holding the lock of the monitor and must not block
+        :param max_concurrent_probes: maximum amount of probes that run at the same time
+        """
+        super().__init__(failure_threshold, min_probe_interval, probe_timeout, probe)
+        if min_probe_interval <= 0 or max_probe_interval < min_probe_interval:
+            raise ValueError("Invalid probe intervals! Expected 0 < min_probe_interval <= max_probe_interval, "
+                             "got: %s, %s" % (min_probe_interval, max_probe_interval))
+
+        self._min_probe_interval = min_probe_interval
+        self._max_probe_interval = max_probe_interval
+        self._idle_probe_interval = idle_probe_interval
+        self._listener = listener
+        self._max_concurrent_probes = max_concurrent_probes
+
+        self._devices = {}
+        # (time, (host, port)) of the scheduled probes, outdated entries are skipped
+        self._schedule = []
+        self._closed = False
+
+    def close(self) -> None:
+        """
+        Stops probing devices
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._prober is not None:
+            self._prober.join()
+
+    def get_health(self, host: str, port: int) -> DeviceHealth or None:
+        """
+        :return: a snapshot of the health of a device or None if the device was never used
+        """
+        with self._condition:
+            health = self._devices.get((host, port))
+            return health.copy() if health is not None else None
+
+    def get_states(self) -> dict:
+        """
+        :return: dictionary of the states (HEALTHY, SUSPECT or DEAD) of all known devices keyed by (host, port)
+        """
+        with self._condition:
+            return {key: health.state for key, health in self._devices.items()}
+
+    def get_dead_devices(self) -> [(str, int)]:
+        """
+        :return: list of (host, port) tuples of all dead devices
+        """
+        return self.get_open_circuits()
+
+    def watch(self, host: str, port: int) -> None:
+        """
+        Starts tracking a device before it is used (only useful with an idle_probe_interval)
+        """
+        with self._condition:
+            health = self._get_or_create(host, port)
+            if self._idle_probe_interval is not None and health.next_probe is None:
+                self._schedule_probe(health, self._idle_probe_interval)
+
+    def record_success(self, host: str, port: int) -> None:
+        """
+        Records a successful operation or probe, a dead device is re-admitted
+        """
+        with self._condition:
+            health = self._get_or_create(host, port)
+            health.failures = 0
+            health.last_success = time.monotonic()
+            health.probe_interval = None
+            if health.state != DeviceHealth.HEALTHY:
+                # cancel the probe of the suspect or dead device
+                health.next_probe = None
+            if self._idle_probe_interval is not None and health.next_probe is None:
+                self._schedule_probe(health, self._idle_probe_interval)
+            self._set_state(health, DeviceHealth.HEALTHY)
+
+    def record_failure(self, host: str, port: int, error: Exception = None) -> None:
+        """
+        Records a failed operation or probe
+
+        :param error: the error of the operation (if any), used to tell how severe the failure is
+        """
+        with self._condition:
+            health = self._get_or_create(host, port)
+            health.failures += 1
+            health.last_failure = time.monotonic()
+            if error is not None:
+                health.last_error = error
+
+            if health.state == DeviceHealth.DEAD:
+                # failed probe, back off
+                health.probe_interval = min(self._max_probe_interval, health.probe_interval * 2)
+                self._schedule_probe(health, health.probe_interval)
+                return
+
+            if health.failures >= self._failure_threshold or self._is_unreachable(error):
+                health.probe_interval = self._min_probe_interval
+                self._set_state(health, DeviceHealth.DEAD)
+            else:
+                self._set_state(health, DeviceHealth.SUSPECT)
+            self._schedule_probe(health, self._min_probe_interval)
+
+    def move(self, old_host: str, old_port: int, new_host: str, new_port: int) -> None:
+        """
+        Moves the health of a device to its new address (f.ex. after its IP changed),
+        the old address is forgotten and not probed anymore
+        """
+        with self._condition:
+            super().move(old_host, old_port, new_host, new_port)
+            health = self._devices.pop((old_host, old_port), None)
+            if health is None:
+                return
+
+            health.host, health.port = new_host, new_port
+            self._devices[(new_host, new_port)] = health
+            if health.next_probe is not None:
+                # the scheduled probe of the old address is skipped as it does not match a device anymore
+                self._schedule_probe(health, health.next_probe - time.monotonic())
+            elif health.state != DeviceHealth.HEALTHY:
+                # the result of a running probe of the old address is discarded, probe the new one instead
+                self._schedule_probe(health, 0)
+
+    def _is_unreachable(self, error: Exception or None) -> bool:
+        while error is not None:
+            if getattr(error, "errno", None) in self._UNREACHABLE_ERRNOS:
+                return True
+            error = error.__cause__
+        return False
+
+    def _get_or_create(self, host: str, port: int) -> DeviceHealth:
+        health = self._devices.get((host, port))
+        if health is None:
+            health = self._devices[(host, port)] = DeviceHealth(host, port)
+        return health
+
+    def _set_state(self, health: DeviceHealth, state: str) -> None:
+        key = (health.host, health.port)
+        if state == DeviceHealth.DEAD:
+            self._open.add(key)
+        else:
+            self._open.discard(key)
+
+        if health.state != state:
+            health.state = state
+            if self._listener is not None:
+                self._listener(health.host, health.port, state)
+
+    def _schedule_probe(self, health: DeviceHealth, delay: float) -> None:
+        health.next_probe = time.monotonic() + delay
+        heapq.heappush(self._schedule, (health.next_probe, (health.host, health.port)))
+        self._condition.notify_all()
+        self._start_prober()
+
+    def _start_prober(self) -> None:
+        if not self._closed and (self._prober is None or not self._prober.is_alive()):
+            self._prober = threading.Thread(target=self._probe_loop, name="HealthMonitorProbe", daemon=True)
+            self._prober.start()
+
+    def _get_due_devices(self) -> [(str, int)] or None:
+        # waits until probes are due, returns None when the monitor is closed or nothing is scheduled
+        with self._condition:
+            while not self._closed:
+                if not self._schedule:
+                    self._prober = None
+                    return None
+
+                now = time.monotonic()
+                if self._schedule[0][0] > now:
+                    self._condition.wait(self._schedule[0][0] - now)
+                    continue
+
+                due = []
+                while self._schedule and self._schedule[0][0] <= now and len(due) < self._max_concurrent_probes:
+                    probe_time, key = heapq.heappop(self._schedule)
+                    health = self._devices.get(key)
+                    # skip entries that were replaced by a later schedule
+                    if health is None or health.next_probe != probe_time:
+                        continue
+
+                    health.next_probe = None
+                    if health.state == DeviceHealth.HEALTHY and health.last_success is not None and \
+                            now - health.last_success < self._idle_probe_interval:
+                        # the device was used in the meantime
+                        self._schedule_probe(health, health.last_success + self._idle_probe_interval - now)
+                    else:
+                        due.append(key)
+                if due:
+                    return due
+            return None
+
+    def _probe_loop(self) -> None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self._max_concurrent_probes) as executor:
+            while True:
+                due = self._get_due_devices()
+                if due is None:
+                    return
+
+                results = executor.map(lambda key: self._probe(key[0], key[1], self._probe_timeout), due)
+                for (host, port), reachable in zip(due, results):
+                    with self._condition:
+                        if (host, port) not in self._devices:
+                            # the device was moved to another address while it was probed
+                            continue
+                    if reachable:
+                        self.record_success(host, port)
+                    else:
+                        self.record_failure(host, port, socket.timeout("probe failed"))
@@ -0,0 +1,316 @@
+"""
+MQTT bridge that maps topics to controllers by their hardware id.
+
+Topics (``<prefix>`` defaults to ``ledstrip``):
+
+- ``<prefix>/<hardware id>/set`` JSON command like ``{"on": true, "rgb": [255, 0, 0]}``
+  (see :mod:`sunix_ledstrip_controller_client.commands`)
+- ``<prefix>/<hardware id>/state`` retained JSON state, only published when it changed
+- ``<prefix>/<hardware id>/availability`` retained ``online`` or ``offline``
+
+Set messages are coalesced per device: while a command is sent to a device, all messages for this device
+are merged into a single pending command, so a burst of slider updates results in one packet per device
+and round trip instead of a growing backlog. After a command the state is derived from the command instead
+of querying the device.
+
+The bridge works with any client that has the interface of ``paho.mqtt.client.Client``.
+Start it from the command line using (requires the ``paho-mqtt`` package):
+
+    python -m sunix_ledstrip_controller_client.mqtt --broker localhost --discover
+"""
+import argparse
+import json
+import queue
+import threading
+from typing import TYPE_CHECKING
+
+from .commands import validate_command, merge_commands, execute_command, apply_command, snapshot_to_json
+from .scene import DeviceSnapshot
+
+# workaround for cyclic dependencies introduced by typing
+if TYPE_CHECKING:
+    from .client import LEDStripControllerClient
+    from .registry import ControllerRegistry
+
+
+class MqttBridge:
+    """
+    Applies commands received over MQTT to the controllers of a registry and publishes their state
+    """
+
+    def __init__(self, api: 'LEDStripControllerClient', registry: 'ControllerRegistry', client,
+                 prefix: str = "ledstrip", max_workers: int = 8, poll_interval: float = None):
+        """
+        :param api: the client used to communicate with the controllers (use a ConnectionPool)
+        :param registry: the controllers that are accessible over MQTT
+        :param client: the MQTT client (f.ex. a paho.mqtt.client.Client), connecting it is up to the caller
+        :param prefix: the first level of all topics
+        :param max_workers: maximum amount of devices that commands are sent to concurrently
+        :param poll_interval: time in seconds between two status queries of all devices,
+                              None to only query them on start
+        """
+        self._api = api
+        self._registry = registry
+        self._client = client
+        self._prefix = prefix.rstrip("/")
+        self._max_workers = max_workers
+        self._poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        # hardware id -> command that was received but not sent yet
+        self._pending = {}
+        # hardware ids of the devices a command is currently sent to or queued for
+        self._active = set()
+        self._ready = queue.Queue()
+
+        self._states = {}
+        self._published = {}
+        self._publish_lock = threading.Lock()
+
+        self._workers = []
+        self._poller = None
+        self._stopped = threading.Event()
+
+        self.received_count = 0
+        self.coalesced_count = 0
+        self.sent_count = 0
+        self.invalid_count = 0
+        self.error_count = 0
+
+    def start(self) -> None:
+        """
+        Registers the MQTT callbacks, queries the state of all devices and starts the worker threads.
+        Call this before connecting the MQTT client.
+        """
+        self._client.on_connect = self._on_connect
+        self._client.on_message = self._on_message
+
+        self._stopped.clear()
+        self._workers = [threading.Thread(target=self._work, name="MqttBridge-%d" % index, daemon=True)
+                         for index in range(self._max_workers)]
+        for worker in self._workers:
+            worker.start()
+
+        if self._poll_interval is not None:
+            self._poller = threading.Thread(target=self._poll, name="MqttBridgePoller", daemon=True)
+            self._poller.start()
+        else:
+            self.refresh()
+
+    def stop(self) -> None:
+        """
+        Stops the worker threads, pending commands are discarded
+        """
+        self._stopped.set()
+        for _ in self._workers:
+            self._ready.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+        if self._poller is not None:
+            self._poller.join()
+            self._poller = None
+
+        with self._lock:
+            self._pending.clear()
+            self._active.clear()
+
+    def refresh(self, hardware_ids: [str] = None) -> None:
+        """
+        Queries the state of devices in parallel and publishes the changed ones
+
+        :param hardware_ids: the hardware ids of the devices, all registered devices if omitted
+        """
+        controllers = self._registry.get_controllers() if hardware_ids is None \
+            else [self._registry.get(hardware_id) for hardware_id in hardware_ids]
+        ids_by_address = {(controller.get_host(), controller.get_port()): controller.get_hardware_id()
+                          for controller in controllers if controller is not None}
+
+        results = self._api.execute_bulk(list(ids_by_address), self._api.get_state, self._max_workers)
+        for result in results:
+            hardware_id = ids_by_address[result.get_address()]
+            if result.is_ok():
+                self._update(hardware_id, DeviceSnapshot.from_state(result.value))
+            else:
+                self._set_available(hardware_id, False)
+
+    def get_state(self, hardware_id: str) -> DeviceSnapshot or None:
+        """
+        :param hardware_id: the hardware id of the device
+        :return: the last known state of the device or None if it is unknown
+        """
+        return self._states.get(hardware_id)
+
+    def get_stats(self) -> dict:
+        """
+        :return: amount of received, coalesced (merged into a pending command), sent and invalid messages
+                 and failed commands
+        """
+        return dict(received=self.received_count,
+                    coalesced=self.coalesced_count,
+                    sent=self.sent_count,
+                    invalid=self.invalid_count,
+                    errors=self.error_count)
+
+    def submit(self, hardware_id: str, command: dict) -> None:
+        """
+        Queues a command for a device, it is merged with a command that is still pending for the same device
+
+        :param hardware_id: the hardware id of the device
+        :param command: the command as decoded from JSON
+        """
+        if hardware_id not in self._registry:
+            raise KeyError("Unknown device: %s" % hardware_id)
+        command = validate_command(command)
+
+        with self._lock:
+            self.received_count += 1
+            pending = self._pending.get(hardware_id)
+            if pending is not None:
+                self._pending[hardware_id] = merge_commands(pending, command)
+                self.coalesced_count += 1
+            else:
+                self._pending[hardware_id] = command
+
+            # a device that is already active is queued again by its worker
+            if hardware_id not in self._active:
+                self._active.add(hardware_id)
+                self._ready.put(hardware_id)
+
+    def _on_connect(self, client, userdata, *args) -> None:
+        # compatible with version 1 and 2 of the paho callback API
+        client.subscribe("%s/+/set" % self._prefix)
+
+        # messages published while disconnected were dropped and the broker might have lost the retained ones
+        with self._publish_lock:
+            for topic, payload in self._published.items():
+                self._client.publish(topic, payload, qos=0, retain=True)
+
+    def _on_message(self, client, userdata, message) -> None:
+        # runs in the network thread of the client, so it must not block
+        parts = message.topic.split("/")
+        if len(parts) < 3 or parts[-1] != "set":
+            return
+        hardware_id = parts[-2]
+
+        try:
+            self.submit(hardware_id, json.loads(message.payload))
+        except (KeyError, ValueError):
+            with self._lock:
+                self.invalid_count += 1
+
+    def _work(self) -> None:
+        while True:
+            hardware_id = self._ready.get()
+            if hardware_id is None or self._stopped.is_set():
+                return
+
+            try:
+                with self._lock:
+                    command = self._pending.pop(hardware_id, None)
+                if command is not None:
+                    self._send(hardware_id, command)
+            finally:
+                with self._lock:
+                    if hardware_id in self._pending:
+                        self._ready.put(hardware_id)
+                    else:
+                        self._active.discard(hardware_id)
+
+    def _send(self, hardware_id: str, command: dict) -> None:
+        # the address is looked up on every command in case the device got a new one
+        controller = self._registry.get(hardware_id)
+        if controller is None:
+            return
+
+        host, port = controller.get_host(), controller.get_port()
+        try:
+            execute_command(self._api, host, port, command)
+            snapshot = apply_command(self._states.get(hardware_id), command)
+            if snapshot is None:
+                snapshot = DeviceSnapshot.from_state(self._api.get_state(host, port))
+        except Exception:
+            # device errors as well as f.ex. RateLimitExceeded or CircuitOpenError
+            with self._lock:
+                self.error_count += 1
+            self._set_available(hardware_id, False)
+            return
+
+        with self._lock:
+            self.sent_count += 1
+        self._update(hardware_id, snapshot)
+
+    def _poll(self) -> None:
+        while not self._stopped.is_set():
+            self.refresh()
+            self._stopped.wait(self._poll_interval)
+
+    def _update(self, hardware_id: str, snapshot: DeviceSnapshot) -> None:
+        self._states[hardware_id] = snapshot
+        self._set_available(hardware_id, True)
+        self._publish(hardware_id, "state", json.dumps(snapshot_to_json(snapshot)))
+
+    def _set_available(self, hardware_id: str, available: bool) -> None:
+        self._publish(hardware_id, "availability", "online" if available else "offline")
+
+    def _publish(self, hardware_id: str, name: str, payload: str) -> None:
+        topic = "%s/%s/%s" % (self._prefix, hardware_id, name)
+        with self._publish_lock:
+            if self._published.get(topic) == payload:
+                return
+            self._published[topic] = payload
+            # publish under the lock, otherwise an older state could overtake a newer one of the same topic
+            self._client.publish(topic, payload, qos=0, retain=True)
+
+
+def main(args: [str] = None) -> None:
+    """
+    Command line interface of the bridge
+    """
+    parser = argparse.ArgumentParser(description="MQTT bridge for LED strip controllers")
+    parser.add_argument("--broker", default="localhost", help="MQTT broker host (default: localhost)")
+    parser.add_argument("--broker-port", type=int, default=1883, help="MQTT broker port (default: 1883)")
+    parser.add_argument("--username", default=None, help="MQTT user name")
+    parser.add_argument("--password", default=None, help="MQTT password")
+    parser.add_argument("--prefix", default="ledstrip", help="first level of all topics (default: ledstrip)")
+    parser.add_argument("--discover", action="store_true", help="add all controllers found by a discovery broadcast")
+    parser.add_argument("--sweep", action="append", default=[],
+                        help="add all controllers found by a unicast sweep of a network (f.ex. 192.168.2.0/24)")
+    parser.add_argument("--poll-interval", type=float, default=None,
+                        help="query all devices every this amount of seconds")
+    parsed = parser.parse_args(args)
+
+    import paho.mqtt.client as mqtt
+
+    from .client import LEDStripControllerClient
+    from .connection import ConnectionPool
+    from .registry import ControllerRegistry
+
+    api = LEDStripControllerClient(connection_pool=ConnectionPool())
+    registry = ControllerRegistry(api)
+    if parsed.discover:
+        registry.discover()
+    if parsed.sweep:
+        registry.update(api.sweep_controllers(parsed.sweep))
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    if parsed.username is not None:
+        client.username_pw_set(parsed.username, parsed.password)
+
+    bridge = MqttBridge(api, registry, client, prefix=parsed.prefix, poll_interval=parsed.poll_interval)
+    bridge.start()
+    print("Bridging %d devices to mqtt://%s:%d" % (len(registry), parsed.broker, parsed.broker_port))
+    try:
+        client.connect(parsed.broker, parsed.broker_port)
+        client.loop_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.disconnect()
+        bridge.stop()
+        api.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,457 @@
+"""
+Single-threaded engine that talks to many devices at once using non-blocking sockets
+multiplexed by ``selectors`` (epoll on Linux, kqueue on BSD/macOS).
+"""
+import errno
+import heapq
+import os
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+from . import profiling
+from .connection import drain_socket
+from .exceptions import wrap_os_error
+from .packets.constants import STATUS_REQUEST, GET_TIME_REQUEST, GET_TIMER_REQUEST
+from .packets.responses import StatusResponse, GetTimeResponse, GetTimerResponse
+from .recorder import TrafficRecorder, DIRECTION_SENT, DIRECTION_RECEIVED
+from .results import DeviceResult
+from .retry import CircuitBreaker
+
+DEFAULT_PORT = 5577
+
+# request packet id -> length of the response, responses to other requests end with the first received chunk
+RESPONSE_LENGTHS = {
+    STATUS_REQUEST[0]: len(StatusResponse._layout),
+    GET_TIME_REQUEST[0]: len(GetTimeResponse._layout),
+    GET_TIMER_REQUEST[0]: len(GetTimerResponse._layout),
+}
+
+_CONNECTING = 1
+_SENDING = 2
+_READING = 3
+
+
+class _Channel:
+    """
+    The queued requests of a single device and the state of its connection
+    """
+
+    __slots__ = ("host", "port", "requests", "socket", "state", "reused", "retried", "packet", "sent",
+                 "response", "expected", "start", "deadline")
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        # indices of the requests of this device in the order they are sent
+        self.requests = deque()
+        self.socket = None
+        self.state = None
+        # True if the connection was used successfully before (and might have been closed by the device since)
+        self.reused = False
+        # True if the current request was already retried on a new connection
+        self.retried = False
+        self.packet = None
+        self.sent = 0
+        self.response = None
+        self.expected = None
+        self.start = 0.0
+        self.deadline = None
+
+
+class SelectorEngine:
+    """
+    Sends packets to thousands of devices from a single thread, for users that can't use asyncio
+    but don't want one blocking thread per device either.
+
+    Connects, sends and reads of all devices are multiplexed by a selector. Requests to the same device are sent
+    one after another over a single connection (in the order they were passed), requests to different devices
+    run concurrently. Connections are kept open between batches and reused.
+
+        engine = SelectorEngine(timeout=1)
+        results = engine.run([(("192.168.2.53", 5577), STATUS_REQUEST, True),
+                              ("192.168.2.54", TURN_ON_REQUEST, False)])
+
+    The engine is not thread safe, concurrent batches are serialized.
+    Host names are resolved blocking, use IP addresses for large fleets.
+    """
+
+    def __init__(self, timeout: float = 1, max_connections: int = 512, max_idle_time: float = 60,
+                 circuit_breaker: CircuitBreaker = None, recorder: TrafficRecorder = None):
+        """
+        :param timeout: time in seconds a device may take to accept the connection, the packet
+                        or to send the response, a request that takes longer fails
+        :param max_connections: maximum amount of connections that are used at the same time, the requests
+                                of further devices wait for a free slot (keep it below the file descriptor limit)
+        :param max_idle_time: time in seconds after which an unused connection is reopened before it is used again
+        :param circuit_breaker: optional circuit breaker (f.ex. a HealthMonitor) that is informed about the outcome
+                                of every request, requests to devices it considers offline fail immediately
+        :param recorder: optional recorder that logs all sent and received packets
+        """
+        if timeout <= 0:
+            raise ValueError("Invalid timeout! Expected a value > 0, got: %s" % timeout)
+        if max_connections < 1:
+            raise ValueError("Invalid max_connections! Expected a value >= 1, got: %s" % max_connections)
+
+        self._timeout = timeout
+        self._max_connections = max_connections
+        self._max_idle_time = max_idle_time
+        self._circuit_breaker = circuit_breaker
+        self._recorder = recorder
+
+        # idle connections by (host, port) -> (socket, last used)
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._connections)
+
+    def close(self) -> None:
+        """
+        Closes all idle connections
+        """
+        with self._lock:
+            for connection, _ in self._connections.values():
+                connection.close()
+            self._connections.clear()
+
+    @profiling.profiled("SelectorEngine.run")
+    def run(self, requests: [((str, int) or str, bytes, bool)]) -> [DeviceResult]:
+        """
+        Sends a batch of packets and waits until all of them are answered or failed
+
+        :param requests: list of (address, packet, expect_response) tuples, the address is either
+                         a (host, port) tuple or a host (using port 5577), packet is the binary(!) data to send
+                         and expect_response is True to wait for and return the response of the device
+        :return: one result per request in the order of the requests, the value of a successful
+                 request is the response data (or None), errors of single requests are reported
+                 in the result instead of being raised
+        """
+        packets = []
+        channels = {}
+        for index, (address, packet, expect_response) in enumerate(requests):
+            host, port = (address, DEFAULT_PORT) if isinstance(address, str) else address
+            if not isinstance(packet, (bytes, bytearray, memoryview)) or not packet:
+                raise ValueError("Invalid packet! Expected non-empty binary data, got: %s" % (packet,))
+
+            packets.append((bytes(packet), bool(expect_response)))
+            channel = channels.get((host, port))
+            if channel is None:
+                channel = channels[(host, port)] = _Channel(host, port)
+            channel.requests.append(index)
+
+        with self._lock:
+            batch = _Batch(self, packets)
+            batch.execute(channels.values())
+            return batch.results
+
+    def get_states(self, addresses: [(str, int)]) -> dict:
+        """
+        Receives the state of multiple controllers
+
+        :param addresses: list of (host, port) tuples
+        :return: dictionary of state dictionaries (or the exception raised for that controller) keyed by (host, port)
+        """
+        addresses = list(dict.fromkeys(addresses))
+        states = {}
+        for address, result in zip(addresses, self.run([(address, STATUS_REQUEST, True) for address in addresses])):
+            if result.is_ok():
+                try:
+                    states[address] = StatusResponse(result.value).get_response()
+                except ValueError as ex:
+                    states[address] = ex
+            else:
+                states[address] = result.error
+        return states
+
+    def _take_connection(self, host: str, port: int) -> socket.socket or None:
+        connection = self._connections.pop((host, port), None)
+        if connection is None:
+            return None
+
+        sock, last_used = connection
+        if time.monotonic() - last_used > self._max_idle_time:
+            sock.close()
+            return None
+        return sock
+
+    def _keep_connection(self, host: str, port: int, sock: socket.socket) -> None:
+        self._connections[(host, port)] = (sock, time.monotonic())
+
+
+class _Batch:
+    """
+    The state of a single SelectorEngine.run call
+    """
+
+    def __init__(self, engine: SelectorEngine, packets: [(bytes, bool)]):
+        self._engine = engine
+        self._packets = packets
+        self._timeout = engine._timeout
+        self._circuit_breaker = engine._circuit_breaker
+        self._recorder = engine._recorder
+
+        self.results = [None] * len(packets)
+        self._selector = selectors.DefaultSelector()
+        # (deadline, sequence number, channel), entries of channels whose deadline changed are skipped
+        self._deadlines = []
+        self._sequence = 0
+        self._waiting = deque()
+        self._active = 0
+
+    def execute(self, channels) -> None:
+        self._waiting.extend(channels)
+        try:
+            while True:
+                # channels are started here instead of when a slot is released to keep the stack flat
+                while self._waiting and self._active < self._engine._max_connections:
+                    self._start(self._waiting.popleft())
+
+                timeout = self._expire()
+                if not self._active:
+                    if self._waiting:
+                        continue
+                    break
+
+                for key, events in self._selector.select(timeout):
+                    channel = key.data
+                    if channel.state == _CONNECTING:
+                        self._on_connected(channel)
+                    elif channel.state == _SENDING:
+                        self._on_writable(channel)
+                    elif channel.state == _READING:
+                        self._on_readable(channel)
+        finally:
+            # only reached with open sockets if something unexpected was raised
+            for key in list(self._selector.get_map().values()):
+                key.fileobj.close()
+            self._selector.close()
+
+    def _expire(self) -> float or None:
+        # fails the requests whose deadline passed, returns the time until the next deadline
+        while self._deadlines:
+            deadline, _, channel = self._deadlines[0]
+            if channel.deadline != deadline:
+                heapq.heappop(self._deadlines)
+                continue
+
+            now = time.monotonic()
+            if deadline > now:
+                return deadline - now
+
+            heapq.heappop(self._deadlines)
+            error = socket.timeout("timed out")
+            if channel.state == _CONNECTING:
+                self._fail_connection(channel, error)
+            else:
+                self._fail_request(channel, error)
+        return None
+
+    def _set_deadline(self, channel: _Channel) -> None:
+        channel.deadline = time.monotonic() + self._timeout
+        self._sequence += 1
+        heapq.heappush(self._deadlines, (channel.deadline, self._sequence, channel))
+
+    def _start(self, channel: _Channel) -> None:
+        # the channel got a connection slot
+        self._active += 1
+        sock = self._engine._take_connection(channel.host, channel.port)
+        if sock is None:
+            self._connect(channel)
+            return
+        if not self._check_circuit(channel):
+            self._engine._keep_connection(channel.host, channel.port, sock)
+            return
+
+        channel.socket = sock
+        channel.reused = True
+        self._selector.register(sock, selectors.EVENT_WRITE, channel)
+        self._next_request(channel)
+
+    def _connect(self, channel: _Channel) -> None:
+        if not self._check_circuit(channel):
+            return
+
+        channel.reused = False
+        channel.start = time.monotonic()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            result = sock.connect_ex((channel.host, channel.port))
+        except OSError as ex:
+            sock.close()
+            self._fail_connection(channel, ex)
+            return
+        if result not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+            sock.close()
+            self._fail_connection(channel, OSError(result, os.strerror(result)))
+            return
+
+        channel.socket = sock
+        channel.state = _CONNECTING
+        self._selector.register(sock, selectors.EVENT_WRITE, channel)
+        self._set_deadline(channel)
+
+    def _check_circuit(self, channel: _Channel) -> bool:
+        # fails all requests of the channel if the circuit breaker considers the device offline
+        if self._circuit_breaker is None:
+            return True
+
+        try:
+            self._circuit_breaker.check(channel.host, channel.port)
+        except Exception as ex:
+            self._fail_all(channel, ex)
+            self._release(channel)
+            return False
+        return True
+
+    def _on_connected(self, channel: _Channel) -> None:
+        result = channel.socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if result != 0:
+            self._fail_connection(channel, OSError(result, os.strerror(result)))
+            return
+
+        self._next_request(channel, channel.start)
+
+    def _next_request(self, channel: _Channel, start: float = None) -> None:
+        # starts sending the first queued request of the channel
+        if not channel.requests:
+            self._release(channel)
+            return
+
+        index = channel.requests[0]
+        channel.packet, expect_response = self._packets[index]
+        channel.sent = 0
+        channel.response = bytearray()
+        channel.expected = RESPONSE_LENGTHS.get(channel.packet[0]) if expect_response else None
+        channel.start = start if start is not None else time.monotonic()
+        if expect_response and channel.reused:
+            try:
+                drain_socket(channel.socket)
+            except OSError as ex:
+                self._fail_request(channel, ex)
+                return
+
+        channel.state = _SENDING
+        self._selector.modify(channel.socket, selectors.EVENT_WRITE, channel)
+        self._set_deadline(channel)
+
+    def _on_writable(self, channel: _Channel) -> None:
+        try:
+            channel.sent += channel.socket.send(memoryview(channel.packet)[channel.sent:])
+        except BlockingIOError:
+            return
+        except OSError as ex:
+            self._fail_request(channel, ex)
+            return
+
+        if channel.sent < len(channel.packet):
+            return
+
+        if self._recorder is not None:
+            self._recorder.record(channel.host, channel.port, DIRECTION_SENT, channel.packet)
+
+        if self._packets[channel.requests[0]][1]:
+            channel.state = _READING
+            self._selector.modify(channel.socket, selectors.EVENT_READ, channel)
+        else:
+            self._complete(channel, None)
+
+    def _on_readable(self, channel: _Channel) -> None:
+        try:
+            data = channel.socket.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError as ex:
+            self._fail_request(channel, ex)
+            return
+
+        if not data:
+            self._fail_request(channel, ConnectionResetError(
+                "Connection closed by %s:%d" % (channel.host, channel.port)))
+            return
+
+        channel.response += data
+        if channel.expected is None:
+            self._complete(channel, bytes(channel.response))
+        elif len(channel.response) >= channel.expected:
+            self._complete(channel, bytes(channel.response[:channel.expected]))
+
+    def _complete(self, channel: _Channel, response: bytes or None) -> None:
+        index = channel.requests.popleft()
+        self.results[index] = DeviceResult(channel.host, channel.port, value=response,
+                                           duration=time.monotonic() - channel.start)
+        channel.reused = True
+        channel.retried = False
+        channel.deadline = None
+
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_success(channel.host, channel.port)
+        if self._recorder is not None and response is not None:
+            self._recorder.record(channel.host, channel.port, DIRECTION_RECEIVED, response)
+
+        if not channel.requests or self._check_circuit(channel):
+            self._next_request(channel)
+
+    def _fail_request(self, channel: _Channel, error: OSError) -> None:
+        # the connection broke or timed out while processing the current request, its state is unknown
+        self._close_socket(channel)
+
+        if channel.reused and not channel.retried and isinstance(error, (ConnectionError, BrokenPipeError)):
+            # the device probably closed the idle connection in the meantime, try again using a new one
+            channel.retried = True
+            self._connect(channel)
+            return
+
+        index = channel.requests.popleft()
+        self._set_error(channel, index, error)
+        channel.retried = False
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_failure(channel.host, channel.port, error)
+
+        if channel.requests:
+            self._connect(channel)
+        else:
+            self._release(channel)
+
+    def _fail_connection(self, channel: _Channel, error: OSError) -> None:
+        # the device can't be reached, none of its requests can be sent
+        self._close_socket(channel)
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_failure(channel.host, channel.port, error)
+        self._fail_all(channel, error)
+        self._release(channel)
+
+    def _fail_all(self, channel: _Channel, error: Exception) -> None:
+        while channel.requests:
+            self._set_error(channel, channel.requests.popleft(), error)
+
+    def _set_error(self, channel: _Channel, index: int, error: Exception) -> None:
+        if isinstance(error, OSError):
+            wrapped = wrap_os_error(error, channel.host, channel.port)
+            if wrapped is not error:
+                wrapped.__cause__ = error
+            error = wrapped
+        self.results[index] = DeviceResult(channel.host, channel.port, error=error,
+                                           duration=time.monotonic() - channel.start)
+
+    def _close_socket(self, channel: _Channel) -> None:
+        channel.deadline = None
+        if channel.socket is not None:
+            self._selector.unregister(channel.socket)
+            channel.socket.close()
+            channel.socket = None
+
+    def _release(self, channel: _Channel) -> None:
+        # all requests of the channel are done, keep its connection and free the slot
+        channel.deadline = None
+        channel.state = None
+        if channel.socket is not None:
+            self._selector.unregister(channel.socket)
+            self._engine._keep_connection(channel.host, channel.port, channel.socket)
+            channel.socket = None
+
+        self._active -= 1
@@ -1,13 +1,47 @@
 from enum import Enum
 
-from construct import Struct
+from sunix_ledstrip_controller_client.exceptions import ProtocolError
 
 
-class Packet(Struct):
+class Packet:
     """
     Base class for a network packet
+
+    Every field of the network protocol is a single unsigned byte, so the layout of a packet
+    is described by a precomputed tuple of field names (in wire order) in the ``_layout``
+    attribute of each subclass. Use :mod:`.compat` if you need a construct ``Struct`` of a packet.
     """
 
+    _layout = ()
+
+    def sizeof(self) -> int:
+        """
+        :return: the size of this packet in bytes
+        """
+        return len(self._layout)
+
+    def build(self, params: dict) -> bytes:
+        """
+        Encodes packet parameters into their binary representation
+
+        :param params: a value for every field in the layout of this packet
+        :return: binary data packet
+        """
+        return bytes([params[field] for field in self._layout])
+
+    def parse(self, data: bytes) -> dict:
+        """
+        Decodes binary data into a dictionary of field values
+
+        :param data: binary data packet
+        :return: field values by name
+        """
+        if data is None or len(data) < len(self._layout):
+            raise ProtocolError("Packet too short! Expected %d bytes, got: %d" % (
+                len(self._layout), 0 if data is None else len(data)))
+
+        return dict(zip(self._layout, data))
+
     def _calculate_checksum(self, params: dict) -> int:
         """
         Calculates the checksum for a request
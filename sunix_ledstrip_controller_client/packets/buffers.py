@@ -0,0 +1,89 @@
+"""
+Validation of colors that are passed as binary buffers (bytes, bytearray, array('B'), memoryview)
+or NumPy arrays instead of tuples.
+
+All values of a buffer are validated in a single pass and converted to a flat bytes object
+that can be copied into a packet as a whole. NumPy is never imported by this module,
+arrays are only recognized if NumPy was already imported by the caller.
+"""
+import sys
+from array import array
+
+# flat buffers of unsigned bytes, the values can't be out of range by definition
+_BYTE_BUFFER_TYPES = (bytes, bytearray, memoryview, array)
+
+
+def _get_ndarray_type():
+    numpy = sys.modules.get("numpy")
+    return numpy.ndarray if numpy is not None else None
+
+
+def is_color_buffer(colors) -> bool:
+    """
+    :param colors: a color or a list of colors
+    :return: True if the colors are given as a binary buffer or NumPy array instead of tuples
+    """
+    if isinstance(colors, _BYTE_BUFFER_TYPES):
+        return True
+
+    ndarray = _get_ndarray_type()
+    return ndarray is not None and isinstance(colors, ndarray)
+
+
+def to_color_bytes(colors, channels: int) -> bytes:
+    """
+    Validates colors in one pass and converts them to a flat buffer with ``channels`` bytes per color
+
+    :param colors: a flat byte buffer (bytes, bytearray, array('B') or memoryview) with ``channels`` values per color
+                   or a NumPy integer array of shape (channels,) or (amount of colors, channels)
+    :param channels: the expected amount of color channels per color
+    :return: the color values as bytes
+    """
+    if isinstance(colors, _BYTE_BUFFER_TYPES):
+        if isinstance(colors, array) and colors.typecode != 'B':
+            raise ValueError("Invalid array type! Expected typecode 'B', got: %s" % colors.typecode)
+
+        data = bytes(colors)
+        if len(data) % channels != 0:
+            raise ValueError("Invalid buffer size! Expected a multiple of %d, got: %d" % (channels, len(data)))
+        return data
+
+    ndarray = _get_ndarray_type()
+    if ndarray is None or not isinstance(colors, ndarray):
+        raise ValueError("Invalid color buffer! Expected bytes, bytearray, array('B') or a NumPy array, got: %s"
+                         % type(colors).__name__)
+
+    if colors.shape[-1:] != (channels,) or colors.ndim > 2:
+        raise ValueError("Invalid array shape! Expected (%d,) or (n, %d), got: %s"
+                         % (channels, channels, colors.shape))
+
+    if colors.dtype.kind not in "iu":
+        raise ValueError("Invalid array type! Expected an integer array, got: %s" % colors.dtype)
+
+    if colors.dtype.itemsize != 1 or colors.dtype.kind != "u":
+        if colors.size and (colors.min() < 0 or colors.max() > 255):
+            raise ValueError("Invalid color range! Expected 0-255, got: %d..%d" % (colors.min(), colors.max()))
+        colors = colors.astype("u1")
+
+    return colors.tobytes()
+
+
+def to_program_bytes(colors) -> bytes:
+    """
+    Validates the colors of a custom function in one pass
+
+    :param colors: a flat byte buffer with 4 values (red, green, blue, unknown) per color
+                   or a NumPy integer array of shape (n, 3) or (n, 4)
+    :return: 4 bytes (red, green, blue, unknown) per color
+    """
+    ndarray = _get_ndarray_type()
+    if ndarray is not None and isinstance(colors, ndarray) and colors.ndim == 2 and colors.shape[1] == 3:
+        # append the unknown channel (0) to every rgb color
+        padded = sys.modules["numpy"].zeros((colors.shape[0], 4), dtype=colors.dtype)
+        padded[:, :3] = colors
+        colors = padded
+
+    data = to_color_bytes(colors, 4)
+    if len(data) > 16 * 4:
+        raise ValueError("Only up to 16 color states are supported! You provided %d :(" % (len(data) // 4))
+    return data
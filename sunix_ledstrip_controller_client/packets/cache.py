@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+
+
+class PacketCache:
+    """
+    Bounded LRU cache for encoded packets
+    """
+
+    def __init__(self, maxsize: int = 128):
+        """
+        :param maxsize: maximum amount of cached packets
+        """
+        if maxsize < 1:
+            raise ValueError("Invalid maxsize! Expected a value >= 1, got: %s" % maxsize)
+
+        self._maxsize = maxsize
+        self._packets = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        return len(self._packets)
+
+    def get_or_create(self, key, create) -> bytes:
+        """
+        Returns a cached packet or encodes and caches it
+
+        :param key: hashable key that uniquely identifies the packet content
+        :param create: function without arguments that encodes the packet (only called on a cache miss)
+        :return: binary data packet
+        """
+        with self._lock:
+            data = self._packets.get(key)
+            if data is not None:
+                self._packets.move_to_end(key)
+                self._hits += 1
+                return data
+            self._misses += 1
+
+        # encode outside of the lock, errors are not cached
+        data = bytes(create())
+
+        with self._lock:
+            self._packets[key] = data
+            self._packets.move_to_end(key)
+            while len(self._packets) > self._maxsize:
+                self._packets.popitem(last=False)
+
+        return data
+
+    def clear(self) -> None:
+        """
+        Removes all cached packets and resets the statistics
+        """
+        with self._lock:
+            self._packets.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def get_stats(self) -> dict:
+        """
+        :return: dictionary with hit/miss counts and the current and maximum size of the cache
+        """
+        with self._lock:
+            return dict(hits=self._hits,
+                        misses=self._misses,
+                        size=len(self._packets),
+                        maxsize=self._maxsize)
+
+
+# shared cache for encoded custom function packets
+custom_function_cache = PacketCache(maxsize=128)
+
+
+def custom_function_key(colors: [(int, int, int, int)], speed: int, transition_type) -> tuple:
+    """
+    Creates the cache key of a custom function packet
+
+    :param colors: a list of color tuples of the form (red, green, blue) or (red, green, blue, unknown)
+    :param speed: function speed [0..255] 0 is slow, 255 is fast
+    :param transition_type: the transition type between colors
+    :return: hashable key
+    """
+    return tuple(tuple(color) for color in colors), speed, transition_type
@@ -0,0 +1,40 @@
+"""
+Compatibility layer for the construct library.
+
+The packet classes do not depend on construct at all, this module is only needed
+if you want to inspect or debug packets using construct. It is not imported by
+the library itself so construct is only loaded when this module is used.
+"""
+import functools
+
+from sunix_ledstrip_controller_client.packets import Packet
+
+
+@functools.lru_cache(maxsize=None)
+def _get_struct(packet_type: type):
+    from construct import Int8ub, Struct
+
+    return Struct(*[field / Int8ub for field in packet_type._layout])
+
+
+def get_struct(packet: Packet or type):
+    """
+    Creates a construct Struct that is equivalent to the layout of the given packet.
+    Structs are cached per packet type.
+
+    :param packet: a packet instance or class
+    :return: construct Struct
+    """
+    packet_type = packet if isinstance(packet, type) else type(packet)
+    return _get_struct(packet_type)
+
+
+def parse(packet: Packet or type, data: bytes) -> dict:
+    """
+    Parses binary data using construct
+
+    :param packet: a packet instance or class describing the data
+    :param data: binary data packet
+    :return: the parsed construct Container
+    """
+    return get_struct(packet).parse(data)
@@ -0,0 +1,21 @@
+"""
+Precomputed packets for requests without parameters.
+
+These are byte-for-byte identical to the output of the corresponding request classes
+(see tests/test_packets.py) and can be sent without encoding anything.
+"""
+
+# StatusRequest().get_data()
+STATUS_REQUEST = b'\x81\x8a\x8b\x96'
+
+# GetTimeRequest().get_data()
+GET_TIME_REQUEST = b'\x11\x1a\x1b\x0f\x55'
+
+# GetTimerRequest().get_data()
+GET_TIMER_REQUEST = b'\x22\x2a\x2b\x0f\x86'
+
+# SetPowerRequest().get_data(True)
+TURN_ON_REQUEST = b'\x71\x23\x0f\xa3'
+
+# SetPowerRequest().get_data(False)
+TURN_OFF_REQUEST = b'\x71\x24\x0f\xa4'
@@ -1,9 +1,8 @@
 import datetime as datetime
 
-from construct import Int8ub
-
 from sunix_ledstrip_controller_client.functions import FunctionId
 from sunix_ledstrip_controller_client.packets import TransitionType, Packet
+from sunix_ledstrip_controller_client.packets.buffers import is_color_buffer, to_color_bytes, to_program_bytes
 
 
 class Request(Packet):
@@ -11,15 +10,23 @@ class Request(Packet):
     Base class for a request packet
     """
 
-    _params = {}
+    def __init__(self):
+        # field values of the last generated packet (per instance)
+        self._params = {}
 
-    def _attach_checksum(self):
+    def _build_with_checksum(self, params: dict) -> bytes:
         """
-        Attaches a checksum to the end of this packet
+        Attaches a checksum to the field values and builds the packet.
+        The values are only kept in a local dictionary while building, so a single request object
+        can be used by multiple threads at the same time.
+
+        :param params: field values of the packet
+        :return: binary data packet
         """
 
-        checksum = self._calculate_checksum(self._params)
-        self._params["checksum"] = checksum
+        params["checksum"] = self._calculate_checksum(params)
+        self._params = params
+        return self.build(params)
 
 
 class GetTimeRequest(Request):
@@ -27,35 +34,33 @@ class GetTimeRequest(Request):
     Request for the current time of the controller
     """
 
-    def __init__(self):
-        super().__init__(
-            "packet_id" / Int8ub,
+    _layout = (
+        "packet_id",
 
-            "payload1" / Int8ub,
-            "payload2" / Int8ub,
+        "payload1",
+        "payload2",
 
-            # this value specifies if the gateway is accessible locally or remotely
-            # the remote value is only used by the official app
-            # 0x0F for local
-            # 0xF0 for remote
-            "remote_or_local" / Int8ub,
+        # this value specifies if the gateway is accessible locally or remotely
+        # the remote value is only used by the official app
+        # 0x0F for local
+        # 0xF0 for remote
+        "remote_or_local",
 
-            "checksum" / Int8ub
-        )
+        "checksum",
+    )
 
     def get_data(self) -> dict:
         """
         Generates a binary data packet containing the a request for the current time of the controller
         :return: binary data packet
         """
-        self._params = dict(packet_id=0x11,
-                            payload1=0x1A,
-                            payload2=0x1B,
-                            remote_or_local=0x0F,
-                            checksum=0)
+        params = dict(packet_id=0x11,
+                      payload1=0x1A,
+                      payload2=0x1B,
+                      remote_or_local=0x0F,
+                      checksum=0)
 
-        self._attach_checksum()
-        return self.build(self._params)
+        return self._build_with_checksum(params)
 
 
 class SetTimeRequest(Request):
@@ -63,55 +68,53 @@ class SetTimeRequest(Request):
     Request to set the current time of the controller
     """
 
-    def __init__(self):
-        super().__init__(
-            "packet_id" / Int8ub,
+    _layout = (
+        "packet_id",
 
-            "payload1" / Int8ub,
+        "payload1",
 
-            # the current year - 2000
-            "year" / Int8ub,
-            "month" / Int8ub,
-            "day" / Int8ub,
-            "hour" / Int8ub,
-            "minute" / Int8ub,
-            "second" / Int8ub,
-            # from Monday (1) - Sunday (7)
-            "weekday" / Int8ub,
+        # the current year - 2000
+        "year",
+        "month",
+        "day",
+        "hour",
+        "minute",
+        "second",
+        # from Monday (1) - Sunday (7)
+        "weekday",
 
-            "payload2" / Int8ub,
+        "payload2",
 
-            # this value specifies if the gateway is accessible locally or remotely
-            # the remote value is only used by the official app
-            # 0x0F for local
-            # 0xF0 for remote
-            "remote_or_local" / Int8ub,
+        # this value specifies if the gateway is accessible locally or remotely
+        # the remote value is only used by the official app
+        # 0x0F for local
+        # 0xF0 for remote
+        "remote_or_local",
 
-            "checksum" / Int8ub
-        )
+        "checksum",
+    )
 
     def get_data(self, dt: datetime) -> dict:
         """
         Generates a binary data packet containing the a request for the current time of the controller
         :return: binary data packet
         """
-        self._params = dict(packet_id=0x10,
-                            payload1=0x14,
+        params = dict(packet_id=0x10,
+                      payload1=0x14,
 
-                            year=dt.year - 2000,
-                            month=dt.month,
-                            day=dt.day,
-                            hour=dt.hour,
-                            minute=dt.minute,
-                            second=dt.second,
-                            weekday=dt.isoweekday(),
+                      year=dt.year - 2000,
+                      month=dt.month,
+                      day=dt.day,
+                      hour=dt.hour,
+                      minute=dt.minute,
+                      second=dt.second,
+                      weekday=dt.isoweekday(),
 
-                            payload2=0x00,
-                            remote_or_local=0x0F,
-                            checksum=0)
+                      payload2=0x00,
+                      remote_or_local=0x0F,
+                      checksum=0)
 
-        self._attach_checksum()
-        return self.build(self._params)
+        return self._build_with_checksum(params)
 
 
 class StatusRequest(Request):
@@ -119,28 +122,26 @@ class StatusRequest(Request):
     Request for the current status of the controller
     """
 
-    def __init__(self):
-        super().__init__(
-            "packet_id" / Int8ub,
+    _layout = (
+        "packet_id",
 
-            "payload1" / Int8ub,
-            "payload2" / Int8ub,
+        "payload1",
+        "payload2",
 
-            "checksum" / Int8ub
-        )
+        "checksum",
+    )
 
     def get_data(self) -> dict:
         """
         Generates a binary data packet containing the a request for the current state of the controller
         :return: binary data packet
         """
-        self._params = dict(packet_id=0x81,
-                            payload1=0x8A,
-                            payload2=0x8B,
-                            checksum=0)
+        params = dict(packet_id=0x81,
+                      payload1=0x8A,
+                      payload2=0x8B,
+                      checksum=0)
 
-        self._attach_checksum()
-        return self.build(self._params)
+        return self._build_with_checksum(params)
 
 
 class SetPowerRequest(Request):
@@ -148,25 +149,24 @@ class SetPowerRequest(Request):
     Request for changing the power state
     """
 
-    def __init__(self):
-        super().__init__(
-            # this is the id of the action to perform
-            "packet_id" / Int8ub,
+    _layout = (
+        # this is the id of the action to perform
+        "packet_id",
 
-            # this indicates the new power status (on/off)
-            # 0x23 for on
-            # 0x24 for off
-            "power_status" / Int8ub,
+        # this indicates the new power status (on/off)
+        # 0x23 for on
+        # 0x24 for off
+        "power_status",
 
-            # this value specifies if the gateway is accessible locally or remotely
-            # the remote value is only used by the official app
-            # 0x0F for local
-            # 0xF0 for remote
-            "remote_or_local" / Int8ub,
+        # this value specifies if the gateway is accessible locally or remotely
+        # the remote value is only used by the official app
+        # 0x0F for local
+        # 0xF0 for remote
+        "remote_or_local",
 
-            # this is a checksum of the data packet
-            "checksum" / Int8ub
-        )
+        # this is a checksum of the data packet
+        "checksum",
+    )
 
     def get_data(self, on: bool) -> dict:
         """
@@ -177,13 +177,12 @@ class SetPowerRequest(Request):
         """
 
         from sunix_ledstrip_controller_client.controller import Controller
-        self._params = dict(packet_id=0x71,
-                            power_status=Controller.POWER_STATE_ON if on else Controller.POWER_STATE_OFF,
-                            remote_or_local=0x0F,
-                            checksum=0)
+        params = dict(packet_id=0x71,
+                      power_status=Controller.POWER_STATE_ON if on else Controller.POWER_STATE_OFF,
+                      remote_or_local=0x0F,
+                      checksum=0)
 
-        self._attach_checksum()
-        return self.build(self._params)
+        return self._build_with_checksum(params)
 
 
 class UpdateColorRequest(Request):
@@ -191,34 +190,33 @@ class UpdateColorRequest(Request):
     Request for changing the color state (incl. brightness)
     """
 
-    def __init__(self):
-        super().__init__(
-            # this is the id of the action to perform
-            "packet_id" / Int8ub,
-
-            # these are the color values
-            "red" / Int8ub,
-            "green" / Int8ub,
-            "blue" / Int8ub,
-            "warm_white" / Int8ub,
-            "cold_white" / Int8ub,
-
-            # this value specifies if only rgb, only ww or both values will be used
-            # 0xF0 will only update rgb
-            # 0x0F will only update ww
-            # 0xFF will update both
-            # 0x00 will ignore both (has no use afaik)
-            "rgbww_selection" / Int8ub,
-
-            # this value specifies if the gateway is accessible locally or remotely
-            # the remote value is only used by the official app
-            # 0x0F for local
-            # 0xF0 for remote
-            "remote_or_local" / Int8ub,
-
-            # this is a checksum of the data packet
-            "checksum" / Int8ub
-        )
+    _layout = (
+        # this is the id of the action to perform
+        "packet_id",
+
+        # these are the color values
+        "red",
+        "green",
+        "blue",
+        "warm_white",
+        "cold_white",
+
+        # this value specifies if only rgb, only ww or both values will be used
+        # 0xF0 will only update rgb
+        # 0x0F will only update ww
+        # 0xFF will update both
+        # 0x00 will ignore both (has no use afaik)
+        "rgbww_selection",
+
+        # this value specifies if the gateway is accessible locally or remotely
+        # the remote value is only used by the official app
+        # 0x0F for local
+        # 0xF0 for remote
+        "remote_or_local",
+
+        # this is a checksum of the data packet
+        "checksum",
+    )
 
     def get_rgbww_data(self, red: int, green: int, blue: int, warm_white: int, cold_white: int) -> dict:
         """
@@ -231,18 +229,17 @@ class UpdateColorRequest(Request):
         :param cold_white: cold white amount
         :return: binary data packet
         """
-        self._params = dict(packet_id=0x31,
-                            red=red,
-                            green=green,
-                            blue=blue,
-                            warm_white=warm_white,
-                            cold_white=cold_white,
-                            rgbww_selection=0xFF,
-                            remote_or_local=0x0F,
-                            checksum=0)
-
-        self._attach_checksum()
-        return self.build(self._params)
+        params = dict(packet_id=0x31,
+                      red=red,
+                      green=green,
+                      blue=blue,
+                      warm_white=warm_white,
+                      cold_white=cold_white,
+                      rgbww_selection=0xFF,
+                      remote_or_local=0x0F,
+                      checksum=0)
+
+        return self._build_with_checksum(params)
 
     def get_rgb_data(self, red: int, green: int, blue: int) -> dict:
         """
@@ -254,18 +251,17 @@ class UpdateColorRequest(Request):
         :return: binary data packet
         """
 
-        self._params = dict(packet_id=0x31,
-                            red=red,
-                            green=green,
-                            blue=blue,
-                            warm_white=0,
-                            cold_white=0,
-                            rgbww_selection=0xF0,
-                            remote_or_local=0x0F,
-                            checksum=0)
+        params = dict(packet_id=0x31,
+                      red=red,
+                      green=green,
+                      blue=blue,
+                      warm_white=0,
+                      cold_white=0,
+                      rgbww_selection=0xF0,
+                      remote_or_local=0x0F,
+                      checksum=0)
 
-        self._attach_checksum()
-        return self.build(self._params)
+        return self._build_with_checksum(params)
 
     def get_ww_data(self, warm_white: int, cold_white: int) -> dict:
         """
@@ -276,18 +272,47 @@ class UpdateColorRequest(Request):
         :return: binary data packet
         """
 
-        self._params = dict(packet_id=0x31,
-                            red=0,
-                            green=0,
-                            blue=0,
-                            warm_white=warm_white,
-                            cold_white=cold_white,
-                            rgbww_selection=0x0F,
-                            remote_or_local=0x0F,
-                            checksum=0)
+        params = dict(packet_id=0x31,
+                      red=0,
+                      green=0,
+                      blue=0,
+                      warm_white=warm_white,
+                      cold_white=cold_white,
+                      rgbww_selection=0x0F,
+                      remote_or_local=0x0F,
+                      checksum=0)
 
-        self._attach_checksum()
-        return self.build(self._params)
+        return self._build_with_checksum(params)
+
+
+def encode_rgbww(red: int, green: int, blue: int, warm_white: int, cold_white: int) -> bytes:
+    """
+    Fast path for UpdateColorRequest().get_rgbww_data() that encodes the packet without
+    any intermediate objects. Values are not validated besides the byte range.
+
+    :return: binary data packet
+    """
+    checksum = (0x31 + red + green + blue + warm_white + cold_white + 0xFF + 0x0F) % 0x100
+    return bytes((0x31, red, green, blue, warm_white, cold_white, 0xFF, 0x0F, checksum))
+
+
+def encode_rgbww_batch(colors) -> [bytes]:
+    """
+    Encodes one UpdateColorRequest packet per color of a buffer.
+    All colors are validated at once before anything is encoded.
+
+    :param colors: a flat byte buffer with 5 values (red, green, blue, warm_white, cold_white) per color
+                   or a NumPy integer array of shape (n, 5)
+    :return: list of binary data packets
+    """
+    data = to_color_bytes(colors, 5)
+
+    packets = []
+    for offset in range(0, len(data), 5):
+        color = data[offset:offset + 5]
+        checksum = (0x31 + 0xFF + 0x0F + sum(color)) % 0x100
+        packets.append(b'\x31' + color + bytes((0xFF, 0x0F, checksum)))
+    return packets
 
 
 class SetFunctionRequest(Request):
@@ -295,27 +320,26 @@ class SetFunctionRequest(Request):
     Request for setting a function
     """
 
-    def __init__(self):
-        super().__init__(
-            # this is the id of the action to perform
-            "packet_id" / Int8ub,
-
-            # the id of the function to set
-            # have a look at functions.FunctionId for a complete list
-            "function_id" / Int8ub,
-            # the speed at which the function should change colors or strobe etc.
-            # originally this value is inverted, meaning 0 is fastest and 255 is slowest
-            "speed" / Int8ub,
-
-            # this value specifies if the gateway is accessible locally or remotely
-            # the remote value is only used by the official app
-            # 0x0F for local
-            # 0xF0 for remote
-            "remote_or_local" / Int8ub,
-
-            # this is a checksum of the data packet
-            "checksum" / Int8ub
-        )
+    _layout = (
+        # this is the id of the action to perform
+        "packet_id",
+
+        # the id of the function to set
+        # have a look at functions.FunctionId for a complete list
+        "function_id",
+        # the speed at which the function should change colors or strobe etc.
+        # originally this value is inverted, meaning 0 is fastest and 255 is slowest
+        "speed",
+
+        # this value specifies if the gateway is accessible locally or remotely
+        # the remote value is only used by the official app
+        # 0x0F for local
+        # 0xF0 for remote
+        "remote_or_local",
+
+        # this is a checksum of the data packet
+        "checksum",
+    )
 
     def get_data(self, function_id: FunctionId or str or int, speed: int) -> dict:
         """
@@ -340,14 +364,13 @@ class SetFunctionRequest(Request):
         if speed < 0 or speed > 255:
             raise ValueError("Invalid speed value! Expected 0-255, got: %d" % speed)
 
-        self._params = dict(packet_id=0x61,
-                            function_id=function_id.value,
-                            speed=255 - speed,
-                            remote_or_local=0x0F,
-                            checksum=0)
+        params = dict(packet_id=0x61,
+                      function_id=function_id.value,
+                      speed=255 - speed,
+                      remote_or_local=0x0F,
+                      checksum=0)
 
-        self._attach_checksum()
-        return self.build(self._params)
+        return self._build_with_checksum(params)
 
 
 class SetCustomFunctionRequest(Request):
@@ -355,113 +378,112 @@ class SetCustomFunctionRequest(Request):
     Request for setting a function
     """
 
-    def __init__(self):
-        super().__init__(
-            # this is the id of the action to perform
-            "packet_id" / Int8ub,
-
-            # these are the color values
-            "red_1" / Int8ub,
-            "green_1" / Int8ub,
-            "blue_1" / Int8ub,
-            "unknown_1" / Int8ub,
-
-            "red_2" / Int8ub,
-            "green_2" / Int8ub,
-            "blue_2" / Int8ub,
-            "unknown_2" / Int8ub,
-
-            "red_3" / Int8ub,
-            "green_3" / Int8ub,
-            "blue_3" / Int8ub,
-            "unknown_3" / Int8ub,
-
-            "red_4" / Int8ub,
-            "green_4" / Int8ub,
-            "blue_4" / Int8ub,
-            "unknown_4" / Int8ub,
-
-            "red_5" / Int8ub,
-            "green_5" / Int8ub,
-            "blue_5" / Int8ub,
-            "unknown_5" / Int8ub,
-
-            "red_6" / Int8ub,
-            "green_6" / Int8ub,
-            "blue_6" / Int8ub,
-            "unknown_6" / Int8ub,
-
-            "red_7" / Int8ub,
-            "green_7" / Int8ub,
-            "blue_7" / Int8ub,
-            "unknown_7" / Int8ub,
-
-            "red_8" / Int8ub,
-            "green_8" / Int8ub,
-            "blue_8" / Int8ub,
-            "unknown_8" / Int8ub,
-
-            "red_9" / Int8ub,
-            "green_9" / Int8ub,
-            "blue_9" / Int8ub,
-            "unknown_9" / Int8ub,
-
-            "red_10" / Int8ub,
-            "green_10" / Int8ub,
-            "blue_10" / Int8ub,
-            "unknown_10" / Int8ub,
-
-            "red_11" / Int8ub,
-            "green_11" / Int8ub,
-            "blue_11" / Int8ub,
-            "unknown_11" / Int8ub,
-
-            "red_12" / Int8ub,
-            "green_12" / Int8ub,
-            "blue_12" / Int8ub,
-            "unknown_12" / Int8ub,
-
-            "red_13" / Int8ub,
-            "green_13" / Int8ub,
-            "blue_13" / Int8ub,
-            "unknown_13" / Int8ub,
-
-            "red_14" / Int8ub,
-            "green_14" / Int8ub,
-            "blue_14" / Int8ub,
-            "unknown_14" / Int8ub,
-
-            "red_15" / Int8ub,
-            "green_15" / Int8ub,
-            "blue_15" / Int8ub,
-            "unknown_15" / Int8ub,
-
-            "red_16" / Int8ub,
-            "green_16" / Int8ub,
-            "blue_16" / Int8ub,
-            "unknown_16" / Int8ub,
-
-            # the speed at which the function should change colors or strobe etc.
-            # originally this value is inverted, meaning 0 is fastest and 255 is slowest
-            "speed" / Int8ub,
-
-            # the transition type between colors
-            # have a look at the TransitionType enum for more info
-            "transition_type" / Int8ub,
-
-            # this value normaly specifies if only rgb, only ww or both values will be changed
-            # this is not supported for custom functions though and can not be altered as it has no effect
-            "rgbww_selection" / Int8ub,
-
-            # this value specifies if the gateway is accessible locally or remotely
-            # the remote value is only used by the official app
-            # 0x0F for local
-            # 0xF0 for remote
-            "remote_or_local" / Int8ub,
-
-            # this is a checksum of the data packet
-            "checksum" / Int8ub
-        )
+    _layout = (
+        # this is the id of the action to perform
+        "packet_id",
+
+        # these are the color values
+        "red_1",
+        "green_1",
+        "blue_1",
+        "unknown_1",
+
+        "red_2",
+        "green_2",
+        "blue_2",
+        "unknown_2",
+
+        "red_3",
+        "green_3",
+        "blue_3",
+        "unknown_3",
+
+        "red_4",
+        "green_4",
+        "blue_4",
+        "unknown_4",
+
+        "red_5",
+        "green_5",
+        "blue_5",
+        "unknown_5",
+
+        "red_6",
+        "green_6",
+        "blue_6",
+        "unknown_6",
+
+        "red_7",
+        "green_7",
+        "blue_7",
+        "unknown_7",
+
+        "red_8",
+        "green_8",
+        "blue_8",
+        "unknown_8",
+
+        "red_9",
+        "green_9",
+        "blue_9",
+        "unknown_9",
+
+        "red_10",
+        "green_10",
+        "blue_10",
+        "unknown_10",
+
+        "red_11",
+        "green_11",
+        "blue_11",
+        "unknown_11",
+
+        "red_12",
+        "green_12",
+        "blue_12",
+        "unknown_12",
+
+        "red_13",
+        "green_13",
+        "blue_13",
+        "unknown_13",
+
+        "red_14",
+        "green_14",
+        "blue_14",
+        "unknown_14",
+
+        "red_15",
+        "green_15",
+        "blue_15",
+        "unknown_15",
+
+        "red_16",
+        "green_16",
+        "blue_16",
+        "unknown_16",
+
+        # the speed at which the function should change colors or strobe etc.
+        # originally this value is inverted, meaning 0 is fastest and 255 is slowest
+        "speed",
+
+        # the transition type between colors
+        # have a look at the TransitionType enum for more info
+        "transition_type",
+
+        # this value normaly specifies if only rgb, only ww or both values will be changed
+        # this is not supported for custom functions though and can not be altered as it has no effect
+        "rgbww_selection",
+
+        # this value specifies if the gateway is accessible locally or remotely
+        # the remote value is only used by the official app
+        # 0x0F for local
+        # 0xF0 for remote
+        "remote_or_local",
+
+        # this is a checksum of the data packet
+        "checksum",
+    )
 
     def get_data(self, colors: [(int, int, int, int)], speed: int, transition_type: TransitionType) -> dict:
         """
@@ -469,11 +491,15 @@ class SetCustomFunctionRequest(Request):
 
         :param colors: a list of color tuples of the form (red, green, blue) or (red, green, blue, unknown).
                        I couldn't figure out what the last parameter is used for so the rgb is a shortcut.
+                       Alternatively a buffer with 4 bytes per color or a NumPy array of shape (n, 3) or (n, 4).
         :param transition_type: the transition type between colors
         :param speed: function speed [0..255] 0 is slow, 255 is fast
         :return: binary data packet
         """
 
+        if is_color_buffer(colors):
+            return encode_custom_function(to_program_bytes(colors), speed, transition_type)
+
         # do a little input validation
         if len(colors) > 16:
             raise ValueError("Only up to 16 color states are supported! You provided %d :(" % len(colors))
@@ -501,26 +527,49 @@ class SetCustomFunctionRequest(Request):
             for channel_idx, value in enumerate(color):
                 processed_colors[color_idx][channel_idx] = value
 
-        self._params = dict(packet_id=0x51,
+        params = dict(packet_id=0x51,
 
-                            # config data
-                            speed=255 - speed,
-                            transition_type=transition_type.value,
-                            rgbww_selection=0xFF,
-                            remote_or_local=0x0F,
+                      # config data
+                      speed=255 - speed,
+                      transition_type=transition_type.value,
+                      rgbww_selection=0xFF,
+                      remote_or_local=0x0F,
 
-                            checksum=0)
+                      checksum=0)
 
         # append color data to dictionary
         for idx, color in enumerate(processed_colors):
             idx += 1
-            self._params["red_%d" % idx] = color[index_red]
-            self._params["green_%d" % idx] = color[index_green]
-            self._params["blue_%d" % idx] = color[index_blue]
-            self._params["unknown_%d" % idx] = color[index_brightness]
+            params["red_%d" % idx] = color[index_red]
+            params["green_%d" % idx] = color[index_green]
+            params["blue_%d" % idx] = color[index_blue]
+            params["unknown_%d" % idx] = color[index_brightness]
 
-        self._attach_checksum()
-        return self.build(self._params)
+        return self._build_with_checksum(params)
+
+
+def encode_custom_function(program: bytes, speed: int, transition_type: TransitionType) -> bytes:
+    """
+    Fast path for SetCustomFunctionRequest().get_data() that copies already validated colors
+    into the packet as a whole (see buffers.to_program_bytes()).
+
+    :param program: 4 bytes (red, green, blue, unknown) for each of up to 16 colors
+    :param speed: function speed [0..255] 0 is slow, 255 is fast
+    :param transition_type: the transition type between colors
+    :return: binary data packet
+    """
+    if speed < 0 or speed > 255:
+        raise ValueError("Invalid speed value! Expected 0-255, got: %d" % speed)
+
+    # unused color slots keep the default values
+    data = bytearray(b'\x51' + _DEFAULT_CUSTOM_FUNCTION_COLORS)
+    data[1:1 + len(program)] = program
+    data += bytes((255 - speed, transition_type.value, 0xFF, 0x0F))
+    data.append(sum(data) % 0x100)
+    return bytes(data)
+
+
+_DEFAULT_CUSTOM_FUNCTION_COLORS = b'\x01\x02\x03\x00' * 16
 
 
 class GetTimerRequest(Request):
@@ -528,23 +577,22 @@ class GetTimerRequest(Request):
     Request for getting a timer
     """
 
-    def __init__(self):
-        super().__init__(
-            # this is the id of the action to perform
-            "packet_id" / Int8ub,
+    _layout = (
+        # this is the id of the action to perform
+        "packet_id",
 
-            "arg1" / Int8ub,
-            "arg2" / Int8ub,
+        "arg1",
+        "arg2",
 
-            # this value specifies if the gateway is accessible locally or remotely
-            # the remote value is only used by the official app
-            # 0x0F for local
-            # 0xF0 for remote
-            "remote_or_local" / Int8ub,
+        # this value specifies if the gateway is accessible locally or remotely
+        # the remote value is only used by the official app
+        # 0x0F for local
+        # 0xF0 for remote
+        "remote_or_local",
 
-            # this is a checksum of the data packet
-            "checksum" / Int8ub
-        )
+        # this is a checksum of the data packet
+        "checksum",
+    )
 
     def get_data(self) -> dict:
         """
@@ -553,11 +601,10 @@ class GetTimerRequest(Request):
         :return: binary data packet
         """
 
-        self._params = dict(packet_id=0x22,
-                            arg1=0x2a,
-                            arg2=0x2b,
-                            remote_or_local=0x0F,
-                            checksum=0)
+        params = dict(packet_id=0x22,
+                      arg1=0x2a,
+                      arg2=0x2b,
+                      remote_or_local=0x0F,
+                      checksum=0)
 
-        self._attach_checksum()
-        return self.build(self._params)
+        return self._build_with_checksum(params)
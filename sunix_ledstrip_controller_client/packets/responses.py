@@ -1,5 +1,4 @@
-from construct import Int8ub
-
+from sunix_ledstrip_controller_client.exceptions import ChecksumError
 from sunix_ledstrip_controller_client.packets import Packet
 
 
@@ -7,7 +6,10 @@ class Response(Packet):
     """
     Base class for a response packet
     """
-    _data = []
+
+    def __init__(self, data: bytearray = None):
+        # the received binary data (per instance)
+        self._data = data
 
     def evaluate(self) -> bool:
         """
@@ -20,7 +22,7 @@ class Response(Packet):
         :return: the response in the expected format
         """
         if not self.evaluate():
-            raise ValueError("invalid or missing checksum")
+            raise ChecksumError("invalid or missing checksum")
 
         return self.parse(self._data)
 
@@ -30,29 +32,29 @@ class StatusResponse(Response):
     The response to the StatusRequest request
     """
 
-    def __init__(self, data: bytearray):
-        super().__init__(
-            "packet_id" / Int8ub,
+    _layout = (
+        "packet_id",
 
-            "device_name" / Int8ub,
-            "power_status" / Int8ub,
+        "device_name",
+        "power_status",
 
-            "mode" / Int8ub,
-            "run_status" / Int8ub,
-            "speed" / Int8ub,
+        "mode",
+        "run_status",
+        "speed",
 
-            "red" / Int8ub,
-            "green" / Int8ub,
-            "blue" / Int8ub,
-            "warm_white" / Int8ub,
-            "unknown1" / Int8ub,
-            "cold_white" / Int8ub,
+        "red",
+        "green",
+        "blue",
+        "warm_white",
+        "unknown1",
+        "cold_white",
 
-            "unknown2" / Int8ub,
+        "unknown2",
 
-            "checksum" / Int8ub
-        )
+        "checksum",
+    )
 
+    def __init__(self, data: bytearray):
         self._data = data
 
 
@@ -61,27 +63,27 @@ class GetTimeResponse(Response):
     The response to the GetTimeRequest request
     """
 
-    def __init__(self, data: bytearray):
-        super().__init__(
-            "packet_id" / Int8ub,
+    _layout = (
+        "packet_id",
 
-            "unknown1" / Int8ub,
-            "unknown2" / Int8ub,
+        "unknown1",
+        "unknown2",
 
-            # add 2000 to this value to get the correct year
-            "year" / Int8ub,
-            "month" / Int8ub,
-            "day" / Int8ub,
-            "hour" / Int8ub,
-            "minute" / Int8ub,
-            "second" / Int8ub,
+        # add 2000 to this value to get the correct year
+        "year",
+        "month",
+        "day",
+        "hour",
+        "minute",
+        "second",
 
-            "dayofweek" / Int8ub,
-            "unknown3" / Int8ub,
+        "dayofweek",
+        "unknown3",
 
-            "checksum" / Int8ub
-        )
+        "checksum",
+    )
 
+    def __init__(self, data: bytearray):
         self._data = data
 
 
@@ -90,168 +92,168 @@ class GetTimerResponse(Response):
     The response to the GetTimerRequest request
     """
 
-    def __init__(self, data: bytearray):
-        super().__init__(
-            "packet_id" / Int8ub,
-
-            "unknown_begin_1" / Int8ub,
-
-            "is_active_1" / Int8ub,
+    _layout = (
+        "packet_id",
+
+        "unknown_begin_1",
 
-            # (0f=15??) add 2000 to this value to get the correct year
-            "year_1" / Int8ub,
-            "month_1" / Int8ub,
-            "day_1" / Int8ub,
-            "hour_1" / Int8ub,
-            "minute_1" / Int8ub,
-            "second_1" / Int8ub,
-
-            # repeat mask
-            # 0 = only once
-            "dayofweek_1" / Int8ub,
+        "is_active_1",
 
-            # 0x61 = color, 0x00, turn_on,
-            "action_code_1" / Int8ub,
+        # (0f=15??) add 2000 to this value to get the correct year
+        "year_1",
+        "month_1",
+        "day_1",
+        "hour_1",
+        "minute_1",
+        "second_1",
+
+        # repeat mask
+        # 0 = only once
+        "dayofweek_1",
 
-            # the actual color value
-            "red_1" / Int8ub,
-            "green_1" / Int8ub,
-            "blue_1" / Int8ub,
-            "warm_white_1" / Int8ub,
-            "cold_white_1" / Int8ub,
-
-            "unknown_end_1" / Int8ub,
+        # 0x61 = color, 0x00, turn_on,
+        "action_code_1",
 
-            "is_active_2" / Int8ub,
+        # the actual color value
+        "red_1",
+        "green_1",
+        "blue_1",
+        "warm_white_1",
+        "cold_white_1",
 
-            # (0f=15??) add 2000 to this value to get the correct year
-            "year_2" / Int8ub,
-            "month_2" / Int8ub,
-            "day_2" / Int8ub,
-            "hour_2" / Int8ub,
-            "minute_2" / Int8ub,
-            "second_2" / Int8ub,
-
-            # repeat mask
-            "dayofweek_2" / Int8ub,
-
-            # 0x61 = color, 0x00, turn_on,
-            "action_code_2" / Int8ub,
+        "unknown_end_1",
 
-            # the actual color value
-            "red_2" / Int8ub,
-            "green_2" / Int8ub,
-            "blue_2" / Int8ub,
-            "warm_white_2" / Int8ub,
-            "cold_white_2" / Int8ub,
-
-            "unknown_end_2" / Int8ub,
-
-            "is_active_3" / Int8ub,
+        "is_active_2",
 
-            # (0f=15??) add 2000 to this value to get the correct year
-            "year_3" / Int8ub,
-            "month_3" / Int8ub,
-            "day_3" / Int8ub,
-            "hour_3" / Int8ub,
-            "minute_3" / Int8ub,
-            "second_3" / Int8ub,
+        # (0f=15??) add 2000 to this value to get the correct year
+        "year_2",
+        "month_2",
+        "day_2",
+        "hour_2",
+        "minute_2",
+        "second_2",
 
-            # repeat mask
-            "dayofweek_3" / Int8ub,
+        # repeat mask
+        "dayofweek_2",
 
-            # 0x61 = color, 0x00, turn_on,
-            "action_code_3" / Int8ub,
+        # 0x61 = color, 0x00, turn_on,
+        "action_code_2",
 
-            # the actual color value
-            "red_3" / Int8ub,
-            "green_3" / Int8ub,
-            "blue_3" / Int8ub,
-            "warm_white_3" / Int8ub,
-            "cold_white_3" / Int8ub,
+        # the actual color value
+        "red_2",
+        "green_2",
+        "blue_2",
+        "warm_white_2",
+        "cold_white_2",
 
-            "unknown_end_3" / Int8ub,
+        "unknown_end_2",
 
-            "is_active_4" / Int8ub,
+        "is_active_3",
 
-            # (0f=15??) add 2000 to this value to get the correct year
-            "year_4" / Int8ub,
-            "month_4" / Int8ub,
-            "day_4" / Int8ub,
-            "hour_4" / Int8ub,
-            "minute_4" / Int8ub,
-            "second_4" / Int8ub,
+        # (0f=15??) add 2000 to this value to get the correct year
+        "year_3",
+        "month_3",
+        "day_3",
+        "hour_3",
+        "minute_3",
+        "second_3",
 
-            # repeat mask
-            "dayofweek_4" / Int8ub,
+        # repeat mask
+        "dayofweek_3",
 
-            # 0x61 = color, 0x00, turn_on,
-            "action_code_4" / Int8ub,
+        # 0x61 = color, 0x00, turn_on,
+        "action_code_3",
 
-            # the actual color value
-            "red_4" / Int8ub,
-            "green_4" / Int8ub,
-            "blue_4" / Int8ub,
-            "warm_white_4" / Int8ub,
-            "cold_white_4" / Int8ub,
+        # the actual color value
+        "red_3",
+        "green_3",
+        "blue_3",
+        "warm_white_3",
+        "cold_white_3",
 
-            "unknown_end_4" / Int8ub,
-
-            "is_active_5" / Int8ub,
-
-            # (0f=15??) add 2000 to this value to get the correct year
-            "year_5" / Int8ub,
-            "month_5" / Int8ub,
-            "day_5" / Int8ub,
-            "hour_5" / Int8ub,
-            "minute_5" / Int8ub,
-            "second_5" / Int8ub,
+        "unknown_end_3",
 
-            # repeat mask
-            "dayofweek_5" / Int8ub,
+        "is_active_4",
 
-            # 0x61 = color, 0x00, turn_on,
-            "action_code_5" / Int8ub,
+        # (0f=15??) add 2000 to this value to get the correct year
+        "year_4",
+        "month_4",
+        "day_4",
+        "hour_4",
+        "minute_4",
+        "second_4",
 
-            # the actual color value
-            "red_5" / Int8ub,
-            "green_5" / Int8ub,
-            "blue_5" / Int8ub,
-            "warm_white_5" / Int8ub,
-            "cold_white_5" / Int8ub,
+        # repeat mask
+        "dayofweek_4",
 
-            "unknown_end_5" / Int8ub,
+        # 0x61 = color, 0x00, turn_on,
+        "action_code_4",
 
-            "is_active_6" / Int8ub,
+        # the actual color value
+        "red_4",
+        "green_4",
+        "blue_4",
+        "warm_white_4",
+        "cold_white_4",
 
-            # (0f=15??) add 2000 to this value to get the correct year
-            "year_6" / Int8ub,
-            "month_6" / Int8ub,
-            "day_6" / Int8ub,
-            "hour_6" / Int8ub,
-            "minute_6" / Int8ub,
-            "second_6" / Int8ub,
+        "unknown_end_4",
+
+        "is_active_5",
+
+        # (0f=15??) add 2000 to this value to get the correct year
+        "year_5",
+        "month_5",
+        "day_5",
+        "hour_5",
+        "minute_5",
+        "second_5",
 
-            # repeat mask
-            "dayofweek_6" / Int8ub,
+        # repeat mask
+        "dayofweek_5",
 
-            # 0x61 = color, 0x00, turn_on,
-            "action_code_6" / Int8ub,
+        # 0x61 = color, 0x00, turn_on,
+        "action_code_5",
 
-            # the actual color value
-            "red_6" / Int8ub,
-            "green_6" / Int8ub,
-            "blue_6" / Int8ub,
-            "warm_white_6" / Int8ub,
-            "cold_white_6" / Int8ub,
+        # the actual color value
+        "red_5",
+        "green_5",
+        "blue_5",
+        "warm_white_5",
+        "cold_white_5",
 
-            "unknown_end_6" / Int8ub,
+        "unknown_end_5",
 
-            "unknown_end_7" / Int8ub,
+        "is_active_6",
 
-            "checksum" / Int8ub
-        )
+        # (0f=15??) add 2000 to this value to get the correct year
+        "year_6",
+        "month_6",
+        "day_6",
+        "hour_6",
+        "minute_6",
+        "second_6",
 
+        # repeat mask
+        "dayofweek_6",
+
+        # 0x61 = color, 0x00, turn_on,
+        "action_code_6",
+
+        # the actual color value
+        "red_6",
+        "green_6",
+        "blue_6",
+        "warm_white_6",
+        "cold_white_6",
+
+        "unknown_end_6",
+
+        "unknown_end_7",
+
+        "checksum",
+    )
+
+    def __init__(self, data: bytearray):
         # data_as_int = []
         # data_as_hex = []
         # for byte in data:
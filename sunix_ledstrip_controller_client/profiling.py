@@ -0,0 +1,291 @@
+"""
+Profiling mode that attributes the time spent in client operations to phases:
+
+- ``encode`` validation and encoding of the packet
+- ``queue`` waiting for the rate limiter and the connection of the device
+- ``connect`` opening a connection (only if no pooled connection is reused)
+- ``send`` writing the packet to the socket
+- ``wait`` waiting for the response
+- ``decode`` parsing the response
+- ``apply`` applying the response to the state of a Controller
+
+Wall time, CPU time of the calling thread and (optionally) net allocated memory are recorded per operation
+(f.ex. ``set_rgbww`` or ``get_state``) and phase. Nested operations (f.ex. set_kelvin calling set_rgbww)
+are recorded separately and are not included in the phases of the outer operation.
+
+Enable it at runtime::
+
+    profiler = profiling.enable()
+    ...
+    print(profiler.format_report())
+
+or by setting the environment variable ``SUNIX_LEDSTRIP_PROFILE=1`` (``alloc`` to track allocations as well),
+which prints the report to stderr when the interpreter exits.
+While disabled every operation only costs a check of a module variable.
+"""
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+
+ENV_VARIABLE = "SUNIX_LEDSTRIP_PROFILE"
+
+# the phases in the order they usually occur, used to sort the report
+PHASES = ("encode", "queue", "connect", "send", "wait", "decode", "apply")
+
+_profiler = None
+# True if tracemalloc was started by enable() and has to be stopped by disable()
+_started_tracemalloc = False
+
+
+class _Frame:
+    """
+    An operation that is currently executed by a thread
+    """
+
+    __slots__ = ("operation", "start", "wall", "cpu", "memory", "undecoded")
+
+    def __init__(self, operation: str, wall: float, cpu: float, memory: int):
+        self.operation = operation
+        self.start = wall
+        # values at the previous mark
+        self.wall = wall
+        self.cpu = cpu
+        self.memory = memory
+        # a response was received but not marked as decoded yet
+        self.undecoded = False
+
+
+class Profiler:
+    """
+    Collects the time spent per operation and phase
+    """
+
+    def __init__(self, track_allocations: bool = False):
+        """
+        :param track_allocations: True to record the net amount of allocated memory per phase using tracemalloc
+                                  (this slows down the whole interpreter and includes allocations of other threads)
+        """
+        self.track_allocations = track_allocations
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # operation -> [count, wall time]
+        self._operations = {}
+        # (operation, phase) -> [count, wall time, cpu time, allocated bytes]
+        self._phases = {}
+
+    def begin(self, operation: str) -> None:
+        """
+        Starts an operation in the current thread, the time until the first mark is attributed to ``encode``
+
+        :param operation: name of the operation
+        """
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        elif stack:
+            # f.ex. the color conversion of set_kelvin before it calls set_rgbww
+            self.mark("encode")
+        stack.append(_Frame(operation, time.perf_counter(), time.thread_time(), self._get_memory()))
+
+    def end(self) -> None:
+        """
+        Ends the current operation of the current thread, the time since the last mark is attributed
+        to ``decode`` if a response was received
+        """
+        stack = self._local.stack
+        frame = stack[-1]
+        if frame.undecoded:
+            self.mark("decode")
+        stack.pop()
+
+        wall = time.perf_counter()
+        with self._lock:
+            totals = self._operations.setdefault(frame.operation, [0, 0.0])
+            totals[0] += 1
+            totals[1] += wall - frame.start
+
+        if stack:
+            # the time of the nested operation is not part of the outer one
+            outer = stack[-1]
+            outer.wall, outer.cpu, outer.memory = wall, time.thread_time(), self._get_memory()
+
+    def mark(self, phase: str) -> None:
+        """
+        Attributes the time since the start of the operation or the previous mark to a phase
+
+        :param phase: name of the phase
+        """
+        stack = getattr(self._local, "stack", None)
+        if not stack:
+            return
+        frame = stack[-1]
+
+        wall, cpu, memory = time.perf_counter(), time.thread_time(), self._get_memory()
+        with self._lock:
+            values = self._phases.get((frame.operation, phase))
+            if values is None:
+                values = self._phases[(frame.operation, phase)] = [0, 0.0, 0.0, 0]
+            values[0] += 1
+            values[1] += wall - frame.wall
+            values[2] += cpu - frame.cpu
+            values[3] += memory - frame.memory
+
+        frame.wall, frame.cpu, frame.memory = wall, cpu, memory
+        frame.undecoded = phase == "wait"
+
+    def reset(self) -> None:
+        """
+        Discards all recorded values
+        """
+        with self._lock:
+            self._operations.clear()
+            self._phases.clear()
+
+    def get_stats(self) -> dict:
+        """
+        :return: dictionary keyed by operation with the amount of calls ("count"), the total wall time ("wall")
+                 and the phases keyed by name with count, wall, cpu (seconds) and allocated (bytes)
+        """
+        with self._lock:
+            stats = {operation: dict(count=count, wall=wall, phases={})
+                     for operation, (count, wall) in self._operations.items()}
+            for (operation, phase), (count, wall, cpu, allocated) in self._phases.items():
+                operation_stats = stats.setdefault(operation, dict(count=0, wall=0.0, phases={}))
+                operation_stats["phases"][phase] = dict(count=count, wall=wall, cpu=cpu, allocated=allocated)
+        return stats
+
+    def format_report(self) -> str:
+        """
+        :return: the recorded values as a table, operations sorted by total wall time
+        """
+        lines = ["%-28s %-8s %8s %11s %11s %11s %12s" % (
+            "operation", "phase", "count", "wall ms", "avg us", "cpu ms", "alloc KiB")]
+
+        stats = self.get_stats()
+        for operation in sorted(stats, key=lambda name: -stats[name]["wall"]):
+            operation_stats = stats[operation]
+            lines.append("%-28s %-8s %8d %11.3f %11.1f" % (
+                operation, "total", operation_stats["count"], operation_stats["wall"] * 1000,
+                operation_stats["wall"] * 1e6 / operation_stats["count"] if operation_stats["count"] else 0.0))
+
+            phases = operation_stats["phases"]
+            for phase in sorted(phases, key=lambda name: PHASES.index(name) if name in PHASES else len(PHASES)):
+                values = phases[phase]
+                lines.append("%-28s %-8s %8d %11.3f %11.1f %11.3f %12s" % (
+                    "", phase, values["count"], values["wall"] * 1000, values["wall"] * 1e6 / values["count"],
+                    values["cpu"] * 1000, "%.1f" % (values["allocated"] / 1024) if self.track_allocations else "-"))
+
+        return "\n".join(lines)
+
+    def dump(self, file=None) -> None:
+        """
+        Prints the report
+
+        :param file: the file to print to, defaults to stderr
+        """
+        print(self.format_report(), file=file or sys.stderr)
+
+    def _get_memory(self) -> int:
+        if not self.track_allocations:
+            return 0
+
+        import tracemalloc
+        return tracemalloc.get_traced_memory()[0]
+
+
+def enable(track_allocations: bool = False) -> Profiler:
+    """
+    Enables profiling for all clients, an already enabled profiler is replaced
+
+    :param track_allocations: True to record the net amount of allocated memory per phase (slow)
+    :return: the profiler that collects the values
+    """
+    global _profiler, _started_tracemalloc
+
+    if track_allocations:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracemalloc = True
+
+    _profiler = Profiler(track_allocations)
+    return _profiler
+
+
+def disable() -> Profiler or None:
+    """
+    Disables profiling
+
+    :return: the profiler that collected the values until now or None if profiling wasn't enabled
+    """
+    global _profiler, _started_tracemalloc
+
+    profiler, _profiler = _profiler, None
+    if _started_tracemalloc:
+        import tracemalloc
+        tracemalloc.stop()
+        _started_tracemalloc = False
+    return profiler
+
+
+def get_profiler() -> Profiler or None:
+    """
+    :return: the active profiler or None if profiling is disabled
+    """
+    return _profiler
+
+
+def mark(phase: str) -> None:
+    """
+    Attributes the time since the previous mark of the current operation to a phase (if profiling is enabled)
+
+    :param phase: name of the phase
+    """
+    profiler = _profiler
+    if profiler is not None:
+        profiler.mark(phase)
+
+
+def profiled(operation: str):
+    """
+    Decorator that records the calls of a function as an operation (if profiling is enabled)
+
+    :param operation: name of the operation
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return function(*args, **kwargs)
+
+            profiler.begin(operation)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.end()
+
+        return wrapper
+
+    return decorator
+
+
+def _enable_from_environment() -> None:
+    value = os.environ.get(ENV_VARIABLE, "").strip().lower()
+    if value in ("", "0", "false", "no"):
+        return
+
+    enable(track_allocations=value == "alloc")
+
+    def dump() -> None:
+        if _profiler is not None:
+            _profiler.dump()
+
+    atexit.register(dump)
+
+
+_enable_from_environment()
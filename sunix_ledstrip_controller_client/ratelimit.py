@@ -0,0 +1,318 @@
+import threading
+import time
+from collections import deque
+from enum import Enum
+
+from .exceptions import LEDStripControllerError
+
+
+class RateLimitPolicy(Enum):
+    """
+    What to do with a packet when the send budget of a device is exhausted
+    """
+
+    # wait until the budget allows sending the packet
+    Block = "block"
+    # queue the packet and send it in the background, dropping the oldest queued packet if the queue is full
+    DropOldest = "drop_oldest"
+    # queue the packet and send it in the background, replacing a queued packet of the same type
+    Coalesce = "coalesce"
+    # raise a RateLimitExceeded error
+    Raise = "raise"
+
+
+def _get_coalesce_key(data: bytes) -> bytes:
+    """
+    :return: the type of a packet, its packet id (first byte) and for color packets
+             the selection byte, so f.ex. an RGB update does not supersede a warm white one
+    """
+    if data[:1] == b'\x31' and len(data) > 6:
+        return data[0:1] + data[6:7]
+    return data[:1]
+
+
+class RateLimitExceeded(LEDStripControllerError):
+    """
+    Raised by the RateLimitPolicy.Raise policy when the send budget of a device is exhausted
+    """
+
+    def __init__(self, host: str, port: int, retry_after: float):
+        super().__init__("Rate limit exceeded for %s:%d, retry after %.3fs" % (host, port, retry_after), host, port)
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        # keeps the error picklable (f.ex. to pass it between processes)
+        return type(self), (self.host, self.port, self.retry_after)
+
+
+class TokenBucket:
+    """
+    Classic token bucket: tokens are refilled continuously at a fixed rate up to a maximum capacity,
+    every packet consumes one token.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        :param rate: tokens (packets) per second
+        :param capacity: maximum amount of tokens, this is the allowed burst size
+        """
+        if rate <= 0:
+            raise ValueError("Invalid rate! Expected a value > 0, got: %s" % rate)
+        if capacity < 1:
+            raise ValueError("Invalid capacity! Expected a value >= 1, got: %s" % capacity)
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._timestamp = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._timestamp) * self.rate)
+        self._timestamp = now
+
+    def try_consume(self, now: float = None) -> float:
+        """
+        Tries to consume a single token.
+
+        :param now: the current monotonic time
+        :return: 0 if a token was consumed, otherwise the time in seconds until a token will be available
+        """
+        if now is None:
+            now = time.monotonic()
+        self._refill(now)
+
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+
+        return (1 - self._tokens) / self.rate
+
+
+class _DeviceQueue:
+    """
+    Send budget, pending packets and metrics of a single device
+    """
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        # pending (packet, send function, enqueue time) tuples
+        self.pending = deque()
+
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.throttle_time = 0.0
+
+
+class RateLimiter:
+    """
+    Limits the rate at which packets are sent to each device (host, port).
+
+    Packets that expect a response are always sent synchronously, so they are blocked
+    (or rejected with the Raise policy) when the budget is exhausted.
+    Fire-and-forget packets are handled according to the configured policy.
+    Queued packets are sent by a background thread in the order they were submitted.
+    """
+
+    def __init__(self, rate: float = 10, burst: int = 5, policy: RateLimitPolicy = RateLimitPolicy.Block,
+                 max_queue_size: int = 16):
+        """
+        :param rate: packets per second per device
+        :param burst: amount of packets that can be sent at once before throttling starts
+        :param policy: the policy to apply when the budget of a device is exhausted
+        :param max_queue_size: the maximum amount of queued packets per device (DropOldest policy)
+        """
+        if max_queue_size < 1:
+            raise ValueError("Invalid max_queue_size! Expected a value >= 1, got: %s" % max_queue_size)
+
+        self._rate = rate
+        self._burst = burst
+        self._policy = policy
+        self._max_queue_size = max_queue_size
+
+        # validate the default bucket configuration early
+        TokenBucket(rate, burst)
+
+        self._devices = {}
+        self._condition = threading.Condition()
+        self._worker = None
+
+    def get_policy(self) -> RateLimitPolicy:
+        """
+        :return: the policy applied when the budget of a device is exhausted
+        """
+        return self._policy
+
+    def configure(self, host: str, port: int, rate: float, burst: int) -> None:
+        """
+        Overrides the send budget of a single device
+
+        :param host: device host address
+        :param port: device port
+        :param rate: packets per second
+        :param burst: amount of packets that can be sent at once before throttling starts
+        """
+        with self._condition:
+            self._get_device(host, port).bucket = TokenBucket(rate, burst)
+
+    def submit(self, host: str, port: int, data: bytes, send, wait_for_response: bool = False):
+        """
+        Sends a packet as soon as the budget of the device allows it.
+
+        :param host: device host address
+        :param port: device port
+        :param data: the binary data to send
+        :param send: function that actually sends the data, called with the data as its only argument
+        :param wait_for_response: True if the caller needs the return value of the send function
+        :return: the return value of the send function or None if the packet was queued or dropped
+        """
+        with self._condition:
+            device = self._get_device(host, port)
+
+            if not device.pending:
+                wait_time = device.bucket.try_consume()
+            else:
+                # keep the order of packets if there are already queued ones
+                wait_time = 1 / device.bucket.rate
+
+            if wait_time > 0:
+                if self._policy is RateLimitPolicy.Raise:
+                    raise RateLimitExceeded(host, port, wait_time)
+
+                if self._policy is not RateLimitPolicy.Block and not wait_for_response:
+                    self._enqueue(device, data, send)
+                    return None
+
+                self._wait_for_token(device)
+
+        return self._send(device, data, send)
+
+    def get_metrics(self, host: str = None, port: int = None) -> dict:
+        """
+        Returns throttling metrics.
+
+        :param host: device host address, if omitted metrics of all devices are returned
+        :param port: device port
+        :return: a metrics dictionary for a single device or a dictionary of those keyed by (host, port)
+        """
+        with self._condition:
+            if host is not None:
+                return self._device_metrics(self._get_device(host, port))
+
+            return {key: self._device_metrics(device) for key, device in self._devices.items()}
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Waits until all queued packets have been sent
+
+        :param timeout: maximum time to wait in seconds
+        :return: True if all queues are empty, False if the timeout was reached
+        """
+        with self._condition:
+            # the worker stops once every queued packet has been sent
+            return self._condition.wait_for(lambda: self._worker is None, timeout)
+
+    def _get_device(self, host: str, port: int) -> _DeviceQueue:
+        key = (host, port)
+        device = self._devices.get(key)
+        if device is None:
+            device = _DeviceQueue(TokenBucket(self._rate, self._burst))
+            self._devices[key] = device
+        return device
+
+    @staticmethod
+    def _device_metrics(device: _DeviceQueue) -> dict:
+        return dict(sent=device.sent,
+                    dropped=device.dropped,
+                    coalesced=device.coalesced,
+                    errors=device.errors,
+                    queue_depth=len(device.pending),
+                    max_queue_depth=device.max_queue_depth,
+                    throttle_time=device.throttle_time)
+
+    def _wait_for_token(self, device: _DeviceQueue) -> None:
+        """
+        Blocks until a token could be consumed, must be called with the lock held
+        """
+        start = time.monotonic()
+        while True:
+            wait_time = device.bucket.try_consume()
+            if wait_time <= 0:
+                break
+            self._condition.wait(wait_time)
+        device.throttle_time += time.monotonic() - start
+
+    def _enqueue(self, device: _DeviceQueue, data: bytes, send) -> None:
+        """
+        Queues a packet according to the configured policy, must be called with the lock held
+        """
+        if self._policy is RateLimitPolicy.Coalesce:
+            # a newer packet of the same type supersedes the queued one, it is queued behind all other
+            # packets so it is not overtaken by older packets of other types (f.ex. rgbww and rgb colors)
+            key = _get_coalesce_key(data)
+            for idx, (pending_data, _, _) in enumerate(device.pending):
+                if _get_coalesce_key(pending_data) == key:
+                    del device.pending[idx]
+                    device.coalesced += 1
+                    break
+
+        if len(device.pending) >= self._max_queue_size:
+            device.pending.popleft()
+            device.dropped += 1
+
+        device.pending.append((data, send, time.monotonic()))
+        device.max_queue_depth = max(device.max_queue_depth, len(device.pending))
+
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._drain, name="RateLimiter", daemon=True)
+            self._worker.start()
+
+    def _drain(self) -> None:
+        """
+        Background loop that sends queued packets as soon as the budget allows it
+        """
+        while True:
+            with self._condition:
+                device = None
+                wait_time = None
+                now = time.monotonic()
+                for candidate in self._devices.values():
+                    if not candidate.pending:
+                        continue
+                    candidate_wait = candidate.bucket.try_consume(now)
+                    if candidate_wait <= 0:
+                        device = candidate
+                        break
+                    wait_time = candidate_wait if wait_time is None else min(wait_time, candidate_wait)
+
+                if device is None:
+                    if wait_time is None:
+                        # nothing left to do
+                        self._worker = None
+                        self._condition.notify_all()
+                        return
+                    self._condition.wait(wait_time)
+                    continue
+
+                data, send, enqueued_at = device.pending.popleft()
+                device.throttle_time += now - enqueued_at
+
+            self._send(device, data, send, raise_errors=False)
+
+    def _send(self, device: _DeviceQueue, data: bytes, send, raise_errors: bool = True):
+        try:
+            result = send(data)
+        except Exception:
+            with self._condition:
+                device.errors += 1
+                self._condition.notify_all()
+            if raise_errors:
+                raise
+            return None
+
+        with self._condition:
+            device.sent += 1
+            self._condition.notify_all()
+        return result
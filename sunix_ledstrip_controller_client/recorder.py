@@ -0,0 +1,288 @@
+"""
+Records the traffic of a LEDStripControllerClient into a compact append-only binary file
+and replays recordings against devices (or a local stand-in).
+
+Replay a recording from the command line using:
+
+    python -m sunix_ledstrip_controller_client.recorder recording.bin --speed 2 --target 127.0.0.1:5577
+"""
+import os
+import struct
+import threading
+import time
+from typing import TYPE_CHECKING
+
+# workaround for cyclic dependencies introduced by typing
+if TYPE_CHECKING:
+    from .client import LEDStripControllerClient
+
+_MAGIC = b'SLRC'
+_FORMAT_VERSION = 1
+
+# record types
+_RECORD_HOST = 0
+DIRECTION_SENT = 1
+DIRECTION_RECEIVED = 2
+
+# type, host id
+_RECORD_HEADER = struct.Struct(">BH")
+# host name length (followed by the host name), port
+_HOST_RECORD = struct.Struct(">BH")
+# timestamp, data length (followed by the data)
+_PACKET_RECORD = struct.Struct(">dH")
+
+
+class RecordedPacket:
+    """
+    A single packet of a recording
+    """
+
+    __slots__ = ("timestamp", "direction", "host", "port", "data")
+
+    def __init__(self, timestamp: float, direction: int, host: str, port: int, data: bytes):
+        self.timestamp = timestamp
+        self.direction = direction
+        self.host = host
+        self.port = port
+        self.data = data
+
+    def is_sent(self) -> bool:
+        """
+        :return: True if this packet was sent by the client, False if it was received from a device
+        """
+        return self.direction == DIRECTION_SENT
+
+    def __repr__(self):
+        return "RecordedPacket(timestamp=%f, direction=%d, host=%r, port=%d, data=%r)" % (
+            self.timestamp, self.direction, self.host, self.port, self.data)
+
+
+class TrafficRecorder:
+    """
+    Appends timestamped request and response packets to a binary file.
+
+    Every host is written once and referenced by a short id afterwards, so a packet record
+    only adds 13 bytes to the packet itself.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: the file to append to, it is created if it does not exist
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        self._host_ids = {}
+
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_file:
+            # continue an existing recording, host ids are scoped to the file
+            end = len(_MAGIC) + 1
+            for packet, end in _read_records(_read_file(path)):
+                self._host_ids.setdefault((packet.host, packet.port), len(self._host_ids))
+
+            # drop an incomplete record at the end (f.ex. after a crash), it would hide the new ones
+            if end < os.path.getsize(path):
+                os.truncate(path, end)
+
+        self._file = open(path, "ab")
+        if new_file:
+            self._file.write(_MAGIC + bytes([_FORMAT_VERSION]))
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def record(self, host: str, port: int, direction: int, data: bytes, timestamp: float = None) -> None:
+        """
+        Appends a packet to the recording
+
+        :param host: device host address
+        :param port: device port
+        :param direction: DIRECTION_SENT or DIRECTION_RECEIVED
+        :param data: the binary packet data
+        :param timestamp: unix timestamp, defaults to now
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._lock:
+            if self._file is None:
+                raise ValueError("The recorder is closed")
+
+            record = bytearray()
+            host_id = self._host_ids.get((host, port))
+            if host_id is None:
+                host_id = len(self._host_ids)
+                self._host_ids[(host, port)] = host_id
+                encoded_host = host.encode()
+                record += _RECORD_HEADER.pack(_RECORD_HOST, host_id)
+                record += _HOST_RECORD.pack(len(encoded_host), port) + encoded_host
+
+            record += _RECORD_HEADER.pack(direction, host_id)
+            record += _PACKET_RECORD.pack(timestamp, len(data)) + bytes(data)
+
+            self._file.write(record)
+            self._file.flush()
+
+    def close(self) -> None:
+        """
+        Closes the recording file
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_recording(path: str):
+    """
+    Reads all packets of a recording
+
+    :param path: the recording file
+    :return: generator of RecordedPacket objects in the order they were recorded,
+             an incomplete record at the end (f.ex. after a crash) is skipped
+    """
+    for packet, _ in _read_records(_read_file(path)):
+        yield packet
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as file:
+        data = file.read()
+
+    if len(data) <= len(_MAGIC) or data[:len(_MAGIC)] != _MAGIC:
+        raise ValueError("Not a traffic recording: %s" % path)
+    if data[len(_MAGIC)] != _FORMAT_VERSION:
+        raise ValueError("Unsupported recording format version: %d" % data[len(_MAGIC)])
+    return data
+
+
+def _read_records(data: bytes):
+    # yields (packet, offset after its record) and stops at the first incomplete record
+    hosts = {}
+    offset = len(_MAGIC) + 1
+    while offset + _RECORD_HEADER.size <= len(data):
+        record_type, host_id = _RECORD_HEADER.unpack_from(data, offset)
+        offset += _RECORD_HEADER.size
+
+        if record_type == _RECORD_HOST:
+            if offset + _HOST_RECORD.size > len(data):
+                return
+            host_length, port = _HOST_RECORD.unpack_from(data, offset)
+            offset += _HOST_RECORD.size
+            if offset + host_length > len(data):
+                return
+            hosts[host_id] = (data[offset:offset + host_length].decode(), port)
+            offset += host_length
+            continue
+
+        if offset + _PACKET_RECORD.size > len(data):
+            return
+        timestamp, length = _PACKET_RECORD.unpack_from(data, offset)
+        offset += _PACKET_RECORD.size
+        if offset + length > len(data):
+            return
+        host, port = hosts[host_id]
+        offset += length
+        yield RecordedPacket(timestamp, record_type, host, port, data[offset - length:offset]), offset
+
+
+def replay(path: str, api: 'LEDStripControllerClient', speed: float or None = 1.0, target=None) -> dict:
+    """
+    Sends the requests of a recording again
+
+    :param path: the recording file
+    :param api: the client used to send the packets
+    :param speed: 1 for the original timing, 2 for double speed etc. and None to send as fast as possible
+    :param target: optional function (host, port) -> (host, port) to redirect packets f.ex. to a local stand-in
+    :return: report with the amount of packets, errors, duration, throughput (packets per second)
+             and round trip latency of requests with a response (in seconds)
+    """
+    packets = list(read_recording(path))
+
+    # requests that were answered by the device are replayed with wait_for_response
+    requests = []
+    pending = {}
+    for packet in packets:
+        key = (packet.host, packet.port)
+        if packet.is_sent():
+            pending[key] = len(requests)
+            requests.append([packet, False])
+        elif key in pending:
+            requests[pending.pop(key)][1] = True
+
+    latencies = []
+    errors = 0
+    start = time.monotonic()
+    first_timestamp = requests[0][0].timestamp if requests else 0
+
+    for packet, answered in requests:
+        if speed is not None:
+            delay = start + (packet.timestamp - first_timestamp) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        host, port = (packet.host, packet.port) if target is None else target(packet.host, packet.port)
+        sent_at = time.monotonic()
+        try:
+            api._send_data(host, port, packet.data, answered)
+        except Exception:
+            errors += 1
+            continue
+        if answered:
+            latencies.append(time.monotonic() - sent_at)
+
+    duration = time.monotonic() - start
+    latencies.sort()
+
+    return dict(packets=len(requests),
+                errors=errors,
+                duration=duration,
+                throughput=len(requests) / duration if duration > 0 else 0.0,
+                latency_avg=sum(latencies) / len(latencies) if latencies else None,
+                latency_p95=latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+                latency_max=latencies[-1] if latencies else None)
+
+
+def main(args: [str] = None) -> dict:
+    """
+    Command line interface of the replay tool
+    """
+    # argparse is only needed by the command line, importing the recorder should stay fast
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a recorded controller session")
+    parser.add_argument("recording", help="the recording file")
+    speed_group = parser.add_mutually_exclusive_group()
+    speed_group.add_argument("--speed", type=float, default=1.0, help="replay speed factor (default: 1)")
+    speed_group.add_argument("--flat-out", action="store_true", help="send as fast as possible")
+    parser.add_argument("--target", help="send all packets to this host:port instead of the recorded devices")
+    parsed = parser.parse_args(args)
+
+    target = None
+    if parsed.target:
+        target_host, target_port = parsed.target.rsplit(":", 1)
+        target_address = (target_host, int(target_port))
+
+        def target(host, port):
+            return target_address
+
+    from .client import LEDStripControllerClient
+    from .connection import ConnectionPool
+
+    api = LEDStripControllerClient(connection_pool=ConnectionPool())
+    try:
+        report = replay(parsed.recording, api, None if parsed.flat_out else parsed.speed, target)
+    finally:
+        api.close()
+
+    for key, value in report.items():
+        print("%s: %s" % (key, value))
+    return report
+
+
+if __name__ == '__main__':
+    main()
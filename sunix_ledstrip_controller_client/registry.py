@@ -0,0 +1,148 @@
+import threading
+from typing import TYPE_CHECKING
+
+from .controller import Controller
+
+# workaround for cyclic dependencies introduced by typing
+if TYPE_CHECKING:
+    from .client import LEDStripControllerClient
+
+
+class ControllerRegistry:
+    """
+    Keeps exactly one Controller object per device, identified by its hardware id.
+
+    When a device gets a new IP address (f.ex. from DHCP) the registered Controller object is
+    updated in place, so its cached state is kept and the persistent connection of the client
+    (if any) is moved to the new address instead of timing out on the old one.
+    Controllers can be looked up by hardware id, device name or address in constant time.
+    The device name is the model reported by the controller, so all devices of a model share it.
+    """
+
+    def __init__(self, api: 'LEDStripControllerClient'):
+        """
+        :param api: the client used to communicate with the controllers
+        """
+        self._api = api
+        self._lock = threading.RLock()
+
+        self._by_hardware_id = {}
+        self._by_address = {}
+        self._by_name = {}
+
+    def __len__(self):
+        return len(self._by_hardware_id)
+
+    def __iter__(self):
+        return iter(self.get_controllers())
+
+    def __contains__(self, hardware_id: str):
+        return hardware_id in self._by_hardware_id
+
+    def register(self, controller: Controller) -> Controller:
+        """
+        Registers a controller or updates the address of an already registered one
+
+        :param controller: a controller with a hardware id (f.ex. from discover_controllers())
+        :return: the registered controller object, this is not the passed in object if the device was already known
+        """
+        hardware_id = controller.get_hardware_id()
+        if not hardware_id:
+            raise ValueError("Invalid controller! Expected a hardware id, got: %s" % hardware_id)
+
+        with self._lock:
+            known = self._by_hardware_id.get(hardware_id)
+            if known is None:
+                self._by_hardware_id[hardware_id] = controller
+                self._index(controller)
+                return controller
+
+            self._unindex(known)
+            if (known.get_host(), known.get_port()) != (controller.get_host(), controller.get_port()):
+                self._api.move_controller(known.get_host(), known.get_port(),
+                                          controller.get_host(), controller.get_port())
+                known.set_address(controller.get_host(), controller.get_port())
+            if controller.get_device_name() is not None:
+                known._device_name = controller.get_device_name()
+            if controller.get_model() is not None:
+                known._model = controller.get_model()
+            self._index(known)
+            return known
+
+    def update(self, controllers: [Controller]) -> [Controller]:
+        """
+        Registers a list of controllers (f.ex. the result of discover_controllers())
+
+        :param controllers: controllers with hardware ids
+        :return: the registered controller objects in the same order
+        """
+        return [self.register(controller) for controller in controllers]
+
+    def discover(self) -> [Controller]:
+        """
+        Discovers controllers in the local network and registers them
+
+        :return: the registered controller objects of all devices that responded
+        """
+        return self.update(self._api.discover_controllers())
+
+    def remove(self, hardware_id: str) -> Controller or None:
+        """
+        Removes a controller from the registry
+
+        :param hardware_id: the hardware id of the controller
+        :return: the removed controller or None if it was not registered
+        """
+        with self._lock:
+            controller = self._by_hardware_id.pop(hardware_id, None)
+            if controller is not None:
+                self._unindex(controller)
+            return controller
+
+    def get(self, hardware_id: str) -> Controller or None:
+        """
+        :param hardware_id: the hardware id of the device (f.ex. 'F0FE6B2333C6')
+        :return: the registered controller or None
+        """
+        return self._by_hardware_id.get(hardware_id)
+
+    def get_by_name(self, device_name: str) -> [Controller]:
+        """
+        :param device_name: the device name reported by the controller
+        :return: all registered controllers with this name (all devices of the same model share it)
+        """
+        with self._lock:
+            return list(self._by_name.get(device_name, ()))
+
+    def get_by_address(self, host: str, port: int = Controller.DEFAULT_PORT) -> Controller or None:
+        """
+        :param host: the current host address of the device
+        :param port: the port of the device
+        :return: the registered controller or None
+        """
+        return self._by_address.get((host, port))
+
+    def get_controllers(self) -> [Controller]:
+        """
+        :return: all registered controllers
+        """
+        with self._lock:
+            return list(self._by_hardware_id.values())
+
+    def _index(self, controller: Controller) -> None:
+        # a device that got the old address of another one replaces it in the address index
+        self._by_address[(controller.get_host(), controller.get_port())] = controller
+
+        if controller.get_device_name() is not None:
+            self._by_name.setdefault(controller.get_device_name(), []).append(controller)
+
+    def _unindex(self, controller: Controller) -> None:
+        address = (controller.get_host(), controller.get_port())
+        if self._by_address.get(address) is controller:
+            del self._by_address[address]
+
+        controllers = self._by_name.get(controller.get_device_name())
+        if controllers is not None and controller in controllers:
+            controllers.remove(controller)
+            if not controllers:
+                del self._by_name[controller.get_device_name()]
@@ -0,0 +1,107 @@
+class DeviceResult:
+    """
+    Outcome of an operation on a single device, either a value or an error
+    """
+
+    __slots__ = ("host", "port", "value", "error", "duration")
+
+    def __init__(self, host: str, port: int, value=None, error: Exception = None, duration: float = 0.0):
+        """
+        :param host: host address of the device
+        :param port: port of the device
+        :param value: the return value of the operation (if it succeeded)
+        :param error: the error raised by the operation (if it failed)
+        :param duration: time the operation took in seconds
+        """
+        self.host = host
+        self.port = port
+        self.value = value
+        self.error = error
+        self.duration = duration
+
+    def __repr__(self):
+        if self.error is not None:
+            return "DeviceResult(%s:%d, error=%r, duration=%.3f)" % (self.host, self.port, self.error, self.duration)
+        return "DeviceResult(%s:%d, value=%r, duration=%.3f)" % (self.host, self.port, self.value, self.duration)
+
+    def get_address(self) -> (str, int):
+        """
+        :return: (host, port) of the device
+        """
+        return self.host, self.port
+
+    def is_ok(self) -> bool:
+        """
+        :return: True if the operation succeeded
+        """
+        return self.error is None
+
+    def get(self):
+        """
+        :return: the value of a successful operation, raises the error of a failed one
+        """
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class BulkResult:
+    """
+    Outcome of an operation on a group of devices.
+    Failures of single devices are reported instead of raised.
+    """
+
+    def __init__(self, results: [DeviceResult]):
+        """
+        :param results: the result of each device
+        """
+        self._results = list(results)
+        self._by_address = {result.get_address(): result for result in self._results}
+
+    def __iter__(self):
+        return iter(self._results)
+
+    def __len__(self):
+        return len(self._results)
+
+    def __getitem__(self, address: (str, int)) -> DeviceResult:
+        return self._by_address[address]
+
+    def __repr__(self):
+        return "BulkResult(%d succeeded, %d failed)" % (len(self.get_succeeded()), len(self.get_failed()))
+
+    def is_ok(self) -> bool:
+        """
+        :return: True if the operation succeeded on all devices
+        """
+        return all(result.error is None for result in self._results)
+
+    def get_succeeded(self) -> [DeviceResult]:
+        """
+        :return: the results of all devices the operation succeeded on
+        """
+        return [result for result in self._results if result.error is None]
+
+    def get_failed(self) -> [DeviceResult]:
+        """
+        :return: the results of all devices the operation failed on
+        """
+        return [result for result in self._results if result.error is not None]
+
+    def get_values(self) -> dict:
+        """
+        :return: dictionary of the values of all successful operations keyed by (host, port)
+        """
+        return {result.get_address(): result.value for result in self._results if result.error is None}
+
+    def get_errors(self) -> dict:
+        """
+        :return: dictionary of the errors of all failed operations keyed by (host, port)
+        """
+        return {result.get_address(): result.error for result in self._results if result.error is not None}
+
+    def get_duration(self) -> float:
+        """
+        :return: the longest duration of a single device operation in seconds
+        """
+        return max((result.duration for result in self._results), default=0.0)
@@ -0,0 +1,208 @@
+import random
+import socket
+import threading
+import time
+
+from .exceptions import DeviceConnectionError
+
+
+class RetryPolicy:
+    """
+    Describes how often and how long an operation is attempted
+    """
+
+    def __init__(self, attempts: int = 1, timeout: float = 1, deadline: float = None,
+                 backoff: float = 0.05, max_backoff: float = 1, jitter: float = 0.5):
+        """
+        :param attempts: maximum amount of attempts (1 means no retry)
+        :param timeout: socket timeout of a single attempt in seconds
+        :param deadline: maximum total time of all attempts (incl. backoff) in seconds, None for no limit
+        :param backoff: delay before the first retry in seconds, this value doubles with every retry
+        :param max_backoff: upper limit for the delay between two attempts in seconds
+        :param jitter: fraction (0..1) of the delay that is randomized to avoid synchronized retries
+        """
+        if attempts < 1:
+            raise ValueError("Invalid amount of attempts! Expected a value >= 1, got: %s" % attempts)
+        if timeout <= 0:
+            raise ValueError("Invalid timeout! Expected a value > 0, got: %s" % timeout)
+        if jitter < 0 or jitter > 1:
+            raise ValueError("Invalid jitter! Expected 0-1, got: %s" % jitter)
+
+        self.attempts = attempts
+        self.timeout = timeout
+        self.deadline = deadline
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+    def get_delay(self, retry: int) -> float:
+        """
+        Calculates the jittered exponential backoff delay before a retry
+
+        :param retry: the number of the retry (starting at 0)
+        :return: delay in seconds
+        """
+        delay = min(self.max_backoff, self.backoff * (2 ** retry))
+        return delay * (1 - self.jitter * random.random())
+
+    def execute(self, operation, retry_on: tuple = (OSError,)):
+        """
+        Executes an operation according to this policy.
+
+        :param operation: function that is called with the socket timeout (in seconds) of the current attempt
+        :param retry_on: exception types that trigger a retry
+        :return: the return value of the operation
+        """
+        start = time.monotonic()
+        retry = 0
+        while True:
+            timeout = self.timeout
+            if self.deadline is not None:
+                timeout = min(timeout, self.deadline - (time.monotonic() - start))
+                if timeout <= 0:
+                    raise socket.timeout("Deadline of %ss exceeded" % self.deadline)
+
+            try:
+                return operation(timeout)
+            except retry_on:
+                if retry + 1 >= self.attempts:
+                    raise
+
+                delay = self.get_delay(retry)
+                if self.deadline is not None and time.monotonic() - start + delay >= self.deadline:
+                    raise
+
+                time.sleep(delay)
+                retry += 1
+
+
+class CircuitOpenError(DeviceConnectionError):
+    """
+    Raised when a command is sent to a device whose circuit is open,
+    meaning the device has failed repeatedly and is considered offline.
+    """
+
+    def __init__(self, host: str, port: int):
+        super().__init__("Circuit open for %s:%d, the device is considered offline" % (host, port), host, port)
+
+    def __reduce__(self):
+        # keeps the error picklable (f.ex. to pass it between processes)
+        return type(self), (self.host, self.port)
+
+
+class CircuitBreaker:
+    """
+    Fails commands to devices that have timed out repeatedly without touching the network.
+
+    After ``failure_threshold`` consecutive failed operations the circuit of a device opens.
+    A background thread then probes the device every ``probe_interval`` seconds and closes
+    the circuit again as soon as the device accepts a connection.
+    """
+
+    def __init__(self, failure_threshold: int = 3, probe_interval: float = 5, probe_timeout: float = 0.5,
+                 probe=None):
+        """
+        :param failure_threshold: amount of consecutive failures that opens the circuit of a device
+        :param probe_interval: time between two probes of an offline device in seconds
+        :param probe_timeout: connection timeout of a probe in seconds
+        :param probe: optional function (host, port, timeout) -> bool that checks if a device is reachable again
+        """
+        if failure_threshold < 1:
+            raise ValueError("Invalid failure_threshold! Expected a value >= 1, got: %s" % failure_threshold)
+
+        self._failure_threshold = failure_threshold
+        self._probe_interval = probe_interval
+        self._probe_timeout = probe_timeout
+        self._probe = probe if probe is not None else self._connect_probe
+
+        # consecutive failures by (host, port)
+        self._failures = {}
+        # set of (host, port) tuples with an open circuit
+        self._open = set()
+
+        self._condition = threading.Condition()
+        self._prober = None
+
+    def is_open(self, host: str, port: int) -> bool:
+        """
+        :return: True if the device is considered offline
+        """
+        return (host, port) in self._open
+
+    def check(self, host: str, port: int) -> None:
+        """
+        Raises a CircuitOpenError if the circuit of the device is open
+        """
+        if (host, port) in self._open:
+            raise CircuitOpenError(host, port)
+
+    def record_success(self, host: str, port: int) -> None:
+        """
+        Records a successful operation and closes the circuit of the device
+        """
+        key = (host, port)
+        with self._condition:
+            self._failures.pop(key, None)
+            self._open.discard(key)
+
+    def record_failure(self, host: str, port: int, error: Exception = None) -> None:
+        """
+        Records a failed operation and opens the circuit of the device if the failure threshold is reached
+
+        :param error: the error of the operation (if any)
+        """
+        key = (host, port)
+        with self._condition:
+            failures = self._failures.get(key, 0) + 1
+            self._failures[key] = failures
+
+            if failures >= self._failure_threshold and key not in self._open:
+                self._open.add(key)
+                self._start_prober()
+
+    def move(self, old_host: str, old_port: int, new_host: str, new_port: int) -> None:
+        """
+        Moves the state of a device to its new address (f.ex. after its IP changed),
+        the old address is forgotten and not probed anymore
+        """
+        old_key, new_key = (old_host, old_port), (new_host, new_port)
+        with self._condition:
+            failures = self._failures.pop(old_key, None)
+            if failures is not None:
+                self._failures[new_key] = failures
+            if old_key in self._open:
+                self._open.discard(old_key)
+                self._open.add(new_key)
+
+    def get_open_circuits(self) -> [(str, int)]:
+        """
+        :return: list of (host, port) tuples of devices that are considered offline
+        """
+        with self._condition:
+            return list(self._open)
+
+    def _start_prober(self) -> None:
+        if self._prober is None or not self._prober.is_alive():
+            self._prober = threading.Thread(target=self._probe_loop, name="CircuitBreakerProbe", daemon=True)
+            self._prober.start()
+
+    def _probe_loop(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait(self._probe_interval)
+                if not self._open:
+                    self._prober = None
+                    return
+                devices = list(self._open)
+
+            for host, port in devices:
+                if self._probe(host, port, self._probe_timeout):
+                    self.record_success(host, port)
+
+    @staticmethod
+    def _connect_probe(host: str, port: int, timeout: float) -> bool:
+        try:
+            with socket.create_connection((host, port), timeout=timeout):
+                return True
+        except OSError:
+            return False
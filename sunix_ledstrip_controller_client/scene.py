@@ -0,0 +1,237 @@
+import struct
+from typing import TYPE_CHECKING
+
+from .controller import Controller
+from .functions import FunctionId
+from .results import BulkResult
+
+# workaround for cyclic dependencies introduced by typing
+if TYPE_CHECKING:
+    from .client import LEDStripControllerClient
+
+
+class DeviceSnapshot:
+    """
+    The captured state of a single controller
+    """
+
+    __slots__ = ("power_state", "mode", "speed", "rgbww")
+
+    def __init__(self, power_state: int, mode: int, speed: int, rgbww: (int, int, int, int, int)):
+        """
+        :param power_state: Controller.POWER_STATE_ON or Controller.POWER_STATE_OFF
+        :param mode: the raw function id reported by the controller
+        :param speed: function speed [0..255] 0 is slow, 255 is fast
+        :param rgbww: (red, green, blue, warm_white, cold_white)
+        """
+        self.power_state = power_state
+        self.mode = mode
+        self.speed = speed
+        self.rgbww = tuple(rgbww)
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'DeviceSnapshot':
+        """
+        Creates a snapshot from a status response
+
+        :param state: the state dictionary as returned by LEDStripControllerClient.get_state()
+        """
+        return cls(state["power_status"], state["mode"],
+                   # the protocol uses an inverted speed value
+                   255 - state["speed"],
+                   (state["red"], state["green"], state["blue"], state["warm_white"], state["cold_white"]))
+
+    def is_on(self) -> bool:
+        """
+        :return: True if the controller was turned on
+        """
+        return self.power_state == Controller.POWER_STATE_ON
+
+    def get_function(self) -> FunctionId or None:
+        """
+        :return: the active built-in function or None if the controller shows a static color
+        """
+        if self.mode == FunctionId.NO_FUNCTION.value:
+            return None
+
+        try:
+            return FunctionId(self.mode)
+        except ValueError:
+            # custom functions can not be read back from the controller
+            return None
+
+    def matches(self, other: 'DeviceSnapshot') -> bool:
+        """
+        Checks if restoring this snapshot would change anything on a controller in the given state
+
+        :param other: the current state of the controller
+        :return: True if the controller is already in this state
+        """
+        if other is None or self.is_on() != other.is_on():
+            return False
+
+        function = self.get_function()
+        if function is not None:
+            return other.mode == self.mode and other.speed == self.speed
+
+        return other.get_function() is None and other.rgbww == self.rgbww
+
+    def __eq__(self, other):
+        return (isinstance(other, DeviceSnapshot) and self.power_state == other.power_state
+                and self.mode == other.mode and self.speed == other.speed and self.rgbww == other.rgbww)
+
+    def __repr__(self):
+        return "DeviceSnapshot(power_state=0x%02X, mode=0x%02X, speed=%d, rgbww=%s)" % (
+            self.power_state, self.mode, self.speed, self.rgbww)
+
+
+class Scene:
+    """
+    A snapshot of the state of a set of controllers that can be restored later on.
+
+    Capturing and restoring only takes a single parallel sweep over all controllers.
+    """
+
+    _FORMAT_VERSION = 1
+    _HEADER = struct.Struct(">BH")
+    _ENTRY = struct.Struct(">HBBB5B")
+
+    def __init__(self, snapshots: dict = None):
+        """
+        :param snapshots: dictionary of DeviceSnapshot objects keyed by (host, port)
+        """
+        self._snapshots = dict(snapshots) if snapshots else {}
+
+    @classmethod
+    def capture(cls, api: 'LEDStripControllerClient', controllers: [Controller or (str, int)],
+                max_workers: int = 32) -> 'Scene':
+        """
+        Captures the state of all given controllers in a single parallel status sweep.
+        Controllers that can not be reached are not part of the resulting scene.
+
+        :param api: the client used to communicate with the controllers
+        :param controllers: list of Controller objects or (host, port) tuples
+        :param max_workers: maximum amount of concurrent requests
+        :return: the captured scene
+        """
+        states = api.get_states(_get_addresses(controllers), max_workers)
+
+        return cls({address: DeviceSnapshot.from_state(state)
+                    for address, state in states.items() if not isinstance(state, Exception)})
+
+    def get_snapshots(self) -> dict:
+        """
+        :return: dictionary of DeviceSnapshot objects keyed by (host, port)
+        """
+        return dict(self._snapshots)
+
+    def get_snapshot(self, host: str, port: int = Controller.DEFAULT_PORT) -> DeviceSnapshot or None:
+        """
+        :return: the captured state of a single controller or None if it is not part of this scene
+        """
+        return self._snapshots.get((host, port))
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    def __eq__(self, other):
+        return isinstance(other, Scene) and self._snapshots == other._snapshots
+
+    def encode_packets(self) -> dict:
+        """
+        Pre-encodes all packets needed to restore this scene
+
+        :return: dictionary of packet lists keyed by (host, port)
+        """
+        from .packets.constants import TURN_ON_REQUEST, TURN_OFF_REQUEST
+        from .packets.requests import SetFunctionRequest, UpdateColorRequest
+
+        power_packets = {
+            True: TURN_ON_REQUEST,
+            False: TURN_OFF_REQUEST,
+        }
+        function_request = SetFunctionRequest()
+        color_request = UpdateColorRequest()
+
+        packets = {}
+        for address, snapshot in self._snapshots.items():
+            function = snapshot.get_function()
+            if function is not None:
+                data = function_request.get_data(function, snapshot.speed)
+            else:
+                data = color_request.get_rgbww_data(*snapshot.rgbww)
+
+            packets[address] = [data, power_packets[snapshot.is_on()]]
+
+        return packets
+
+    def restore(self, api: 'LEDStripControllerClient', skip_unchanged: bool = True,
+                max_workers: int = 32) -> BulkResult:
+        """
+        Restores the state of all controllers in this scene.
+        All packets are encoded up front and then sent to all controllers in parallel.
+
+        :param api: the client used to communicate with the controllers
+        :param skip_unchanged: True to query the current state of all controllers (in a single parallel sweep)
+                               and skip the ones that are already in the target state
+        :param max_workers: maximum amount of concurrent requests
+        :return: the outcome of every controller that was updated, skipped controllers are not included
+        """
+        packets = self.encode_packets()
+
+        if skip_unchanged:
+            for address, state in api.get_states(list(packets), max_workers).items():
+                if not isinstance(state, Exception) and self._snapshots[address].matches(
+                        DeviceSnapshot.from_state(state)):
+                    del packets[address]
+
+        def send(host: str, port: int) -> None:
+            api.send_packets(host, port, packets[(host, port)])
+
+        return api.execute_bulk(list(packets), send, max_workers)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes this scene into a compact binary representation
+
+        :return: binary data
+        """
+        data = bytearray(self._HEADER.pack(self._FORMAT_VERSION, len(self._snapshots)))
+        for (host, port), snapshot in self._snapshots.items():
+            encoded_host = host.encode()
+            data.append(len(encoded_host))
+            data += encoded_host
+            data += self._ENTRY.pack(port, snapshot.power_state, snapshot.mode, snapshot.speed, *snapshot.rgbww)
+
+        return bytes(data)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Scene':
+        """
+        Deserializes a scene created with to_bytes()
+
+        :param data: binary data
+        :return: the deserialized scene
+        """
+        version, count = cls._HEADER.unpack_from(data)
+        if version != cls._FORMAT_VERSION:
+            raise ValueError("Unsupported scene format version: %d" % version)
+
+        snapshots = {}
+        offset = cls._HEADER.size
+        for i in range(count):
+            host_length = data[offset]
+            host = bytes(data[offset + 1:offset + 1 + host_length]).decode()
+            offset += 1 + host_length
+
+            port, power_state, mode, speed, *rgbww = cls._ENTRY.unpack_from(data, offset)
+            offset += cls._ENTRY.size
+
+            snapshots[(host, port)] = DeviceSnapshot(power_state, mode, speed, rgbww)
+
+        return cls(snapshots)
+
+
+def _get_addresses(controllers: [Controller or (str, int)]) -> [(str, int)]:
+    return [(controller.get_host(), controller.get_port()) if isinstance(controller, Controller) else tuple(controller)
+            for controller in controllers]
@@ -0,0 +1,372 @@
+"""
+In-process scheduler for timed commands, an alternative to the six timer slots of the hardware
+and to cron jobs that pay interpreter startup and connection setup on every run.
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from .commands import validate_command, encode_command
+
+# workaround for cyclic dependencies introduced by typing
+if TYPE_CHECKING:
+    from .client import LEDStripControllerClient
+
+# maximum amount of shared addresses and packets, sharing is dropped and started over beyond that
+_SHARED_LIMIT = 65536
+
+
+class CommandScheduler:
+    """
+    Sends commands to controllers at given points in time.
+
+    Pending commands are kept in a timing wheel: a dictionary of coarse slots (``resolution`` seconds each)
+    and a heap of the slot numbers, so millions of commands only cost one tuple each. Commands are validated
+    and encoded when they are scheduled and identical packets are shared. ``lookahead`` seconds before
+    a slot is due its commands are moved into a heap ordered by deadline and the connections to their
+    controllers are opened (if the client uses a ConnectionPool), so firing a command only writes its packets.
+
+    Deadlines are points in time of time.monotonic(). The scheduler thread sleeps until shortly
+    before the next deadline and spins for the last ``spin`` seconds to fire it on time.
+    Commands are sent by a pool of threads, commands to the same controller are sent in order.
+
+        scheduler = CommandScheduler(api)
+        scheduler.schedule_in(3600, "192.168.2.53", 5577, {"on": True, "rgb": [255, 128, 0]})
+        scheduler.schedule_at(datetime(2024, 12, 24, 18), "192.168.2.53", 5577, {"on": False},
+                              interval=24 * 3600)
+    """
+
+    def __init__(self, api: 'LEDStripControllerClient', lookahead: float = 1, resolution: float = 1,
+                 spin: float = 0.002, max_workers: int = 16, on_error=None):
+        """
+        :param api: the client used to send the commands, use one with a ConnectionPool
+        :param lookahead: time in seconds before their deadline at which connections are opened
+        :param resolution: width of a slot of the timing wheel in seconds
+        :param spin: time in seconds before a deadline at which the scheduler stops sleeping and busy waits,
+                     0 to rely on the precision of sleeping only
+        :param max_workers: maximum amount of controllers commands are sent to at the same time
+        :param on_error: optional function (host, port, error) that is called when a command failed
+        """
+        if lookahead < 0:
+            raise ValueError("Invalid lookahead! Expected a value >= 0, got: %s" % lookahead)
+        if resolution <= 0:
+            raise ValueError("Invalid resolution! Expected a value > 0, got: %s" % resolution)
+        if spin < 0:
+            raise ValueError("Invalid spin! Expected a value >= 0, got: %s" % spin)
+
+        self._api = api
+        self._lookahead = lookahead
+        self._resolution = resolution
+        self._spin = spin
+        self._on_error = on_error
+
+        from concurrent.futures import ThreadPoolExecutor
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="CommandScheduler")
+
+        self._condition = threading.Condition()
+        self._worker = None
+        self._closed = False
+        self._ids = itertools.count(1)
+
+        # slot number -> list of (deadline, id, address, packets, interval) tuples
+        self._slots = {}
+        self._slot_numbers = []
+        # all slots up to this number were moved to the ready heap
+        self._moved_slot = int(time.monotonic() // resolution) - 1
+        # heap of the commands of the moved slots
+        self._ready = []
+        # ids of cancelled commands that were not removed yet
+        self._cancelled = set()
+        self._pending = 0
+
+        # shared objects for equal addresses and packets
+        self._addresses = {}
+        self._packets = {}
+
+        # commands to send per controller, a controller is in here while a thread sends its commands
+        self._queues = {}
+
+        self._fired = 0
+        self._errors = 0
+        self._max_lateness = 0.0
+        self._total_lateness = 0.0
+
+    def __len__(self):
+        return self._pending
+
+    def close(self) -> None:
+        """
+        Stops the scheduler, pending commands are discarded and commands that are being sent are completed
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            worker = self._worker
+        if worker is not None:
+            worker.join()
+        self._executor.shutdown(wait=True)
+
+    def schedule(self, deadline: float, host: str, port: int, command: dict or bytes,
+                 interval: float = None) -> int:
+        """
+        Schedules a command
+
+        :param deadline: the point in time (of time.monotonic()) at which the command is sent
+        :param host: controller host address
+        :param port: controller port
+        :param command: a command as used by the HTTP gateway (f.ex. {"on": True, "rgb": [255, 0, 0]})
+                        or a binary(!) data packet
+        :param interval: time in seconds after which the command is repeated, None to send it once
+        :return: id of the command used to cancel it
+        """
+        return self.schedule_many([(deadline, host, port, command)], interval)[0]
+
+    def schedule_in(self, delay: float, host: str, port: int, command: dict or bytes,
+                    interval: float = None) -> int:
+        """
+        Schedules a command that is sent after a delay
+
+        :param delay: time in seconds from now
+        :return: id of the command used to cancel it
+        """
+        return self.schedule(time.monotonic() + delay, host, port, command, interval)
+
+    def schedule_at(self, date_time: datetime, host: str, port: int, command: dict or bytes,
+                    interval: float = None) -> int:
+        """
+        Schedules a command that is sent at a wall clock time.
+        The time is converted to a monotonic deadline now, later changes of the system clock are not followed.
+
+        :param date_time: the time at which the command is sent (naive values are local time)
+        :return: id of the command used to cancel it
+        """
+        delay = (date_time - datetime.now(date_time.tzinfo)).total_seconds()
+        return self.schedule(time.monotonic() + delay, host, port, command, interval)
+
+    def schedule_many(self, commands: [(float, str, int, dict or bytes)], interval: float = None) -> [int]:
+        """
+        Schedules many commands at once
+
+        :param commands: list of (deadline, host, port, command) tuples, see schedule()
+        :param interval: time in seconds after which the commands are repeated, None to send them once
+        :return: ids of the commands
+        """
+        if interval is not None and interval <= 0:
+            raise ValueError("Invalid interval! Expected a value > 0, got: %s" % interval)
+
+        if len(self._packets) > _SHARED_LIMIT or len(self._addresses) > _SHARED_LIMIT:
+            self._packets.clear()
+            self._addresses.clear()
+
+        entries = []
+        for deadline, host, port, command in commands:
+            address = (host, port)
+            packets = self._encode(command)
+            entries.append((float(deadline), self._addresses.setdefault(address, address),
+                            self._packets.setdefault(packets, packets)))
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The scheduler is closed")
+
+            ids = []
+            for deadline, address, packets in entries:
+                command_id = next(self._ids)
+                self._add((deadline, command_id, address, packets, interval))
+                ids.append(command_id)
+            self._pending += len(entries)
+
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="CommandScheduler", daemon=True)
+                self._worker.start()
+            self._condition.notify_all()
+        return ids
+
+    def cancel(self, command_id: int) -> None:
+        """
+        Cancels a scheduled (or repeated) command, cancelling a command that was already sent has no effect
+
+        :param command_id: id returned when the command was scheduled
+        """
+        with self._condition:
+            self._cancelled.add(command_id)
+            if len(self._cancelled) > 2 * self._pending + 64:
+                # drop the ids of commands that were already sent or never existed
+                self._cancelled.intersection_update(entry[1] for entry in self._iter_entries())
+
+    def get_stats(self) -> dict:
+        """
+        :return: amount of pending (incl. cancelled ones until their deadline), fired and failed commands
+                 and the maximum and average time in seconds commands were sent after their deadline
+        """
+        with self._condition:
+            return dict(pending=self._pending,
+                        fired=self._fired,
+                        errors=self._errors,
+                        max_lateness=self._max_lateness,
+                        avg_lateness=self._total_lateness / self._fired if self._fired else 0.0)
+
+    @staticmethod
+    def _encode(command: dict or bytes) -> (bytes, ...):
+        if isinstance(command, (bytes, bytearray)):
+            if not command:
+                raise ValueError("Invalid command! Expected a non-empty packet")
+            return bytes(command),
+        return encode_command(validate_command(command))
+
+    def _iter_entries(self):
+        # all pending commands, called while holding the lock
+        yield from self._ready
+        for commands in self._slots.values():
+            yield from commands
+
+    def _add(self, entry: tuple) -> None:
+        slot = int(entry[0] // self._resolution)
+        if slot <= self._moved_slot:
+            heapq.heappush(self._ready, entry)
+            self._executor.submit(self._connect, entry[2])
+            return
+
+        commands = self._slots.get(slot)
+        if commands is None:
+            commands = self._slots[slot] = []
+            heapq.heappush(self._slot_numbers, slot)
+        commands.append(entry)
+
+    def _advance(self, now: float) -> None:
+        # moves the slots that start within the lookahead to the ready heap and opens their connections
+        addresses = set()
+        while self._slot_numbers and self._slot_numbers[0] * self._resolution <= now + self._lookahead:
+            slot = heapq.heappop(self._slot_numbers)
+            self._moved_slot = slot
+            for entry in self._slots.pop(slot):
+                heapq.heappush(self._ready, entry)
+                addresses.add(entry[2])
+        self._moved_slot = max(self._moved_slot, int((now + self._lookahead) // self._resolution) - 1)
+
+        for address in addresses:
+            self._executor.submit(self._connect, address)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        self._worker = None
+                        return
+
+                    now = time.monotonic()
+                    self._advance(now)
+                    if self._ready and self._ready[0][0] - now <= self._spin:
+                        break
+
+                    timeout = None
+                    if self._ready:
+                        timeout = self._ready[0][0] - now - self._spin
+                    if self._slot_numbers:
+                        slot_timeout = self._slot_numbers[0] * self._resolution - self._lookahead - now
+                        timeout = slot_timeout if timeout is None else min(timeout, slot_timeout)
+                    if timeout is None:
+                        # nothing is scheduled anymore
+                        self._worker = None
+                        return
+                    self._condition.wait(timeout)
+
+                deadline = self._ready[0][0]
+
+            # busy wait for the last moment, sleeping is not precise enough
+            while time.monotonic() < deadline and not self._closed:
+                time.sleep(0)
+
+            with self._condition:
+                if self._closed:
+                    self._worker = None
+                    return
+
+                now = time.monotonic()
+                due = []
+                while self._ready and self._ready[0][0] <= now:
+                    entry = heapq.heappop(self._ready)
+                    command_id, interval = entry[1], entry[4]
+                    if command_id in self._cancelled:
+                        self._cancelled.discard(command_id)
+                        self._pending -= 1
+                        continue
+
+                    due.append(entry)
+                    if interval is None:
+                        self._pending -= 1
+                    else:
+                        self._add((entry[0] + interval,) + entry[1:])
+
+                for entry in due:
+                    self._dispatch(entry)
+
+    def _dispatch(self, entry: tuple) -> None:
+        # queues the packets of a due command, called while holding the lock
+        deadline, _, address, packets, _ = entry
+        queue = self._queues.get(address)
+        if queue is not None:
+            # a thread is still sending to this controller, it sends these packets afterwards
+            queue.append((deadline, packets))
+            return
+
+        self._queues[address] = deque([(deadline, packets)])
+        self._executor.submit(self._send, address)
+
+    def _send(self, address: (str, int)) -> None:
+        host, port = address
+        finished = False
+        try:
+            while True:
+                with self._condition:
+                    queue = self._queues[address]
+                    if not queue:
+                        del self._queues[address]
+                        finished = True
+                        return
+                    deadline, packets = queue.popleft()
+
+                    lateness = max(0.0, time.monotonic() - deadline)
+                    self._fired += 1
+                    self._total_lateness += lateness
+                    self._max_lateness = max(self._max_lateness, lateness)
+
+                try:
+                    for packet in packets:
+                        self._api._send_data(host, port, packet)
+                except Exception as ex:
+                    with self._condition:
+                        self._errors += 1
+                    self._notify_error(host, port, ex)
+        finally:
+            if not finished:
+                # the controller must not stay marked as busy if sending ended abnormally,
+                # otherwise it would never receive a command again
+                with self._condition:
+                    self._queues.pop(address, None)
+
+    def _notify_error(self, host: str, port: int, error: Exception) -> None:
+        if self._on_error is None:
+            return
+
+        try:
+            self._on_error(host, port, error)
+        except Exception:
+            # a failing callback must not stop the commands of the controller
+            pass
+
+    def _connect(self, address: (str, int)) -> None:
+        pool = self._api._connection_pool
+        if pool is None:
+            return
+
+        try:
+            pool.connect(*address)
+        except OSError:
+            # the command is sent (and fails) anyway
+            pass
@@ -0,0 +1,558 @@
+"""
+Multi-process mode for very large installations, where a single process becomes CPU bound in encoding
+and scheduling packets.
+
+Controllers are partitioned across worker processes by their hardware id. Every worker owns a client
+(with its own connections, caches and state) for its partition, the coordinator in the calling process
+routes commands to the owning worker and merges states and metrics of all workers.
+"""
+import functools
+import itertools
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+
+from .client import LEDStripControllerClient
+from .colors import WhiteMixing, get_white_mixing
+from .connection import ConnectionPool
+from .controller import Controller
+from .effects import Effect
+from .exceptions import LEDStripControllerError
+from .results import BulkResult
+from .retry import RetryPolicy
+
+
+class ShardError(LEDStripControllerError):
+    """
+    Raised when a worker process is not running (anymore) or an error could not be passed from a worker
+    """
+
+
+def default_client_factory() -> LEDStripControllerClient:
+    """
+    Creates the client of a worker process, using persistent connections
+
+    :return: a new client
+    """
+    return LEDStripControllerClient(connection_pool=ConnectionPool())
+
+
+def _get_partition(key: str, shards: int) -> int:
+    # stable across processes and interpreter runs unlike hash()
+    return zlib.crc32(key.encode()) % shards
+
+
+def _portable_error(error: Exception) -> Exception:
+    # errors that can't be rebuilt in the coordinator are replaced by a ShardError with the same message
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return ShardError("%s: %s" % (type(error).__name__, error),
+                          getattr(error, "host", None), getattr(error, "port", None))
+
+
+class _ShardWorker:
+    """
+    The state of a worker process: its client, effects and counters
+    """
+
+    def __init__(self, index: int, client: LEDStripControllerClient):
+        self._index = index
+        self._client = client
+        self._lock = threading.Lock()
+
+        # effect engines by frame rate and running effects by id
+        self._engines = {}
+        self._effects = {}
+
+        self.requests = 0
+        self.errors = 0
+
+    def handle(self, name: str, args: tuple, kwargs: dict):
+        target = self if name.startswith("shard_") else self._client
+        try:
+            result = getattr(target, name)(*args, **kwargs)
+        except Exception:
+            self._count(1)
+            raise
+
+        if isinstance(result, BulkResult):
+            self._count(len(result.get_failed()))
+        elif name == "get_states":
+            self._count(sum(1 for state in result.values() if isinstance(state, Exception)))
+        else:
+            self._count(0)
+        return result
+
+    def close(self) -> None:
+        for engine in self._engines.values():
+            engine.close()
+        self._client.close()
+
+    def shard_set_rgbww_many(self, colors: dict, max_workers: int) -> BulkResult:
+        return self._client.execute_bulk(
+            list(colors), lambda host, port: self._client.set_rgbww(host, port, *colors[(host, port)]), max_workers)
+
+    def shard_start_effect(self, effect_id: int, effect: Effect, addresses: [(str, int)], phases: [float],
+                           duration: float or None, fps: float) -> None:
+        from .effects import EffectEngine
+
+        engine = self._engines.get(fps)
+        if engine is None:
+            engine = self._engines[fps] = EffectEngine(self._client, fps)
+        self._effects[effect_id] = engine.start(effect, addresses, duration=duration, phases=phases)
+
+    def shard_stop_effect(self, effect_id: int) -> None:
+        handle = self._effects.pop(effect_id, None)
+        if handle is not None:
+            handle.stop()
+
+    def shard_get_stats(self) -> dict:
+        for effect_id, handle in list(self._effects.items()):
+            if not handle.is_running():
+                del self._effects[effect_id]
+
+        with self._lock:
+            return dict(shard=self._index, pid=os.getpid(), requests=self.requests, errors=self.errors,
+                        cpu_time=time.process_time(),
+                        effects={effect_id: handle.get_stats() for effect_id, handle in self._effects.items()})
+
+    def _count(self, errors: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.errors += errors
+
+
+def _run_worker(index: int, connection, client_factory, max_threads: int) -> None:
+    """
+    Main function of a worker process, executes requests of the coordinator until it sends None
+    """
+    import signal
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Ctrl+C is handled by the coordinator, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    worker = _ShardWorker(index, client_factory())
+    send_lock = threading.Lock()
+
+    def execute(request_id: int, name: str, args: tuple, kwargs: dict) -> None:
+        try:
+            response = (request_id, True, worker.handle(name, args, kwargs))
+        except Exception as ex:
+            response = (request_id, False, _portable_error(ex))
+
+        with send_lock:
+            try:
+                connection.send(response)
+            except (OSError, EOFError):
+                # the coordinator is gone
+                pass
+            except Exception as ex:
+                # the result can't be pickled
+                connection.send((request_id, False, ShardError("Unable to return the result of %s: %s" % (
+                    name, ex))))
+
+    with ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="LEDStripShard") as executor:
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                break
+            if message is None:
+                break
+            executor.submit(execute, *message)
+
+    worker.close()
+    connection.close()
+
+
+class _Shard:
+    """
+    Coordinator side of a worker process, requests are answered asynchronously
+    """
+
+    def __init__(self, index: int, context, client_factory, max_threads: int):
+        self.index = index
+        self._connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_run_worker, name="LEDStripShard-%d" % index, daemon=True,
+                                       args=(index, child_connection, client_factory, max_threads))
+        self.process.start()
+        child_connection.close()
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._pending = {}
+        self._closed = False
+
+        self._receiver = threading.Thread(target=self._receive, name="LEDStripShard-%d" % index, daemon=True)
+        self._receiver.start()
+
+    def submit(self, name: str, args: tuple = (), kwargs: dict = None) -> Future:
+        """
+        Sends a request to the worker
+
+        :param name: method of the worker client (or of the worker itself if it starts with shard_)
+        :return: future of the result
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                future.set_exception(ShardError("Shard %d is not running" % self.index))
+                return future
+
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            try:
+                self._connection.send((request_id, name, args, kwargs or {}))
+            except OSError as ex:
+                del self._pending[request_id]
+                future.set_exception(ShardError("Shard %d is not running: %s" % (self.index, ex)))
+            except Exception:
+                # the arguments can't be pickled
+                del self._pending[request_id]
+                raise
+        return future
+
+    def call(self, name: str, args: tuple = (), kwargs: dict = None):
+        return self.submit(name, args, kwargs).result()
+
+    def close(self, timeout: float = 5) -> None:
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._connection.send(None)
+                except OSError:
+                    pass
+
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self._receiver.join()
+        self._connection.close()
+
+    def _receive(self) -> None:
+        while True:
+            try:
+                request_id, ok, value = self._connection.recv()
+            except (EOFError, OSError):
+                break
+
+            future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+        with self._lock:
+            self._closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(ShardError("Shard %d exited" % self.index))
+
+
+def _routed(name: str):
+    """
+    Creates a method that executes the client method of the same name in the worker owning the controller
+    """
+    method = getattr(LEDStripControllerClient, name)
+
+    @functools.wraps(method)
+    def wrapper(self, host: str, port: int, *args, **kwargs):
+        return self._get_shard(host, port).call(name, (host, port) + args, kwargs)
+
+    return wrapper
+
+
+class ShardedClient(LEDStripControllerClient):
+    """
+    A drop-in replacement of LEDStripControllerClient that spreads the controllers across worker processes,
+    so encoding, scheduling and effects scale with the amount of CPU cores.
+
+    Register controllers by hardware id (discovered controllers are registered automatically), so every
+    device is always handled by the same worker even if its address changes. Unregistered addresses are
+    partitioned by address. Every worker creates its own client using ``client_factory``.
+
+        api = ShardedClient(shards=4)
+        for controller in api.discover_controllers():
+            controller.turn_on()
+        api.close()
+
+    Workers are separate processes: arguments and results are pickled, and settings made in the coordinator
+    process (f.ex. set_white_mixing()) only apply to the workers if they are passed explicitly.
+    """
+
+    def __init__(self, shards: int = None, client_factory=default_client_factory, max_threads: int = 32,
+                 start_method: str = "spawn", discovery_policy: RetryPolicy = None):
+        """
+        :param shards: amount of worker processes, defaults to the amount of CPU cores
+        :param client_factory: picklable function () -> LEDStripControllerClient (f.ex. a module level function)
+                               that creates the client of each worker
+        :param max_threads: maximum amount of concurrent requests per worker
+        :param start_method: multiprocessing start method of the workers ('spawn', 'forkserver' or 'fork')
+        :param discovery_policy: amount of discovery broadcasts and time to wait for responses to each of them
+        """
+        if shards is None:
+            shards = os.cpu_count() or 1
+        if shards < 1:
+            raise ValueError("Invalid shards! Expected a value >= 1, got: %s" % shards)
+
+        super().__init__(discovery_policy=discovery_policy)
+
+        context = multiprocessing.get_context(start_method)
+        self._shards = [_Shard(index, context, client_factory, max_threads) for index in range(shards)]
+
+        # shard by (host, port) of registered controllers and address by hardware id
+        self._routes = {}
+        self._addresses = {}
+        self._routes_lock = threading.Lock()
+
+        self._effect_ids = itertools.count(1)
+        # shards by effect id
+        self._effects = {}
+
+    def close(self) -> None:
+        """
+        Stops all worker processes, which closes their connections
+        """
+        for shard in self._shards:
+            shard.close()
+
+    def get_shard_count(self) -> int:
+        """
+        :return: the amount of worker processes
+        """
+        return len(self._shards)
+
+    def get_shard_index(self, host: str, port: int = Controller.DEFAULT_PORT) -> int:
+        """
+        :return: index of the worker that handles the controller with the passed in address
+        """
+        shard = self._routes.get((host, port))
+        if shard is None:
+            shard = _get_partition("%s:%d" % (host, port), len(self._shards))
+        return shard
+
+    def register(self, hardware_id: str, host: str, port: int = Controller.DEFAULT_PORT) -> int:
+        """
+        Assigns a controller to a worker by its hardware id.
+        If the controller was registered with another address before, it is moved to the new address.
+
+        :param hardware_id: the hardware id of the device (f.ex. 'F0FE6B2333C6')
+        :param host: the current host address of the device
+        :param port: the port of the device
+        :return: index of the worker that handles the controller
+        """
+        if not hardware_id:
+            raise ValueError("Invalid hardware id! Expected a non-empty string, got: %s" % hardware_id)
+
+        shard = _get_partition(hardware_id, len(self._shards))
+        with self._routes_lock:
+            old_address = self._addresses.get(hardware_id)
+            self._addresses[hardware_id] = (host, port)
+            self._routes[(host, port)] = shard
+            if old_address is None or old_address == (host, port):
+                return shard
+            self._routes.pop(old_address, None)
+
+        self._shards[shard].call("move_controller", old_address + (host, port))
+        return shard
+
+    def move_controller(self, old_host: str, old_port: int, new_host: str, new_port: int) -> None:
+        shard = self.get_shard_index(old_host, old_port)
+        with self._routes_lock:
+            self._routes.pop((old_host, old_port), None)
+            self._routes[(new_host, new_port)] = shard
+            for hardware_id, address in self._addresses.items():
+                if address == (old_host, old_port):
+                    self._addresses[hardware_id] = (new_host, new_port)
+
+        self._shards[shard].call("move_controller", (old_host, old_port, new_host, new_port))
+
+    move_controller.__doc__ = LEDStripControllerClient.move_controller.__doc__
+
+    def get_rate_limit_metrics(self, host: str = None, port: int = None) -> dict or None:
+        """
+        Returns throttling metrics of the rate limiters of the workers (if any).
+
+        :param host: controller host address, if omitted metrics of all controllers are returned
+        :param port: controller port
+        :return: metrics dictionary or None if no rate limiter is used
+        """
+        if host is not None:
+            return self._get_shard(host, port).call("get_rate_limit_metrics", (host, port))
+
+        merged = None
+        for metrics in self._call_all("get_rate_limit_metrics"):
+            if metrics is not None:
+                merged = merged or {}
+                merged.update(metrics)
+        return merged
+
+    def get_stats(self) -> dict:
+        """
+        :return: counters of all workers ("shards") and their totals: executed requests, failed requests
+                 (incl. single controllers of group operations), CPU time of the worker processes in seconds
+                 and the statistics of running effects keyed by effect id
+        """
+        shards = self._call_all("shard_get_stats")
+
+        effects = {}
+        for stats in shards:
+            for effect_id, effect_stats in stats["effects"].items():
+                merged = effects.get(effect_id)
+                if merged is None:
+                    effects[effect_id] = dict(effect_stats)
+                    continue
+                for key in ("controllers", "packets", "errors", "cpu_time"):
+                    merged[key] += effect_stats[key]
+                merged["frames"] = max(merged["frames"], effect_stats["frames"])
+        for stats in effects.values():
+            stats["cpu_time_per_frame"] = stats["cpu_time"] / stats["frames"] if stats["frames"] else 0.0
+
+        return dict(shards=shards,
+                    requests=sum(stats["requests"] for stats in shards),
+                    errors=sum(stats["errors"] for stats in shards),
+                    cpu_time=sum(stats["cpu_time"] for stats in shards),
+                    effects=effects)
+
+    get_time = _routed("get_time")
+    set_time = _routed("set_time")
+    get_state = _routed("get_state")
+    turn_on = _routed("turn_on")
+    turn_off = _routed("turn_off")
+    set_rgbww = _routed("set_rgbww")
+    set_rgb = _routed("set_rgb")
+    set_ww = _routed("set_ww")
+    set_function = _routed("set_function")
+    set_custom_function = _routed("set_custom_function")
+    get_timers = _routed("get_timers")
+    send_packets = _routed("send_packets")
+
+    def set_kelvin(self, host: str, port: int, kelvin: float, brightness: int = 255,
+                   mixing: WhiteMixing = None) -> None:
+        # the white mixing of the coordinator is passed, the registry of the worker might differ
+        self._get_shard(host, port).call("set_kelvin", (host, port, kelvin, brightness, mixing or get_white_mixing()))
+
+    set_kelvin.__doc__ = LEDStripControllerClient.set_kelvin.__doc__
+
+    def set_hsv(self, host: str, port: int, hue: float, saturation: int, value: int,
+                mixing: WhiteMixing = None) -> None:
+        self._get_shard(host, port).call("set_hsv", (host, port, hue, saturation, value,
+                                                     mixing or get_white_mixing()))
+
+    set_hsv.__doc__ = LEDStripControllerClient.set_hsv.__doc__
+
+    def get_states(self, addresses: [(str, int)], max_workers: int = 32) -> dict:
+        addresses = list(dict.fromkeys(addresses))
+        states = {}
+        for future in [shard.submit("get_states", (partition, max_workers))
+                       for shard, partition in self._partition(addresses).items()]:
+            states.update(future.result())
+        return {address: states[address] for address in addresses}
+
+    get_states.__doc__ = LEDStripControllerClient.get_states.__doc__
+
+    def set_rgbww_many(self, colors: dict, max_workers: int = 32) -> BulkResult:
+        """
+        Sets a different color on each controller in parallel, f.ex. a frame rendered by the caller.
+        The packets are encoded by the workers.
+
+        :param colors: dictionary of (red, green, blue, warm_white, cold_white) tuples keyed by (host, port)
+        :param max_workers: maximum amount of concurrent operations per worker
+        :return: the outcome on each controller
+        """
+        futures = [shard.submit("shard_set_rgbww_many", ({address: tuple(colors[address]) for address in partition},
+                                                         max_workers))
+                   for shard, partition in self._partition(colors).items()]
+        return self._merge_results(list(colors), futures)
+
+    def start_effect(self, effect: Effect, controllers: [Controller or (str, int)], phase_spread: float = 0,
+                     duration: float = None, fps: float = 20) -> int:
+        """
+        Starts a client side effect on a group of controllers, every worker renders and sends the frames
+        of its part of the group (see EffectEngine.start())
+
+        :param effect: the effect to run, it is pickled for every worker
+        :param controllers: list of Controller objects or (host, port) tuples
+        :param phase_spread: total phase offset distributed evenly over the whole group
+        :param duration: time in seconds after which the effect stops automatically, None to run until stopped
+        :param fps: frames per second
+        :return: id of the effect used by stop_effect() and get_stats()
+        """
+        addresses = [(controller.get_host(), controller.get_port()) if isinstance(controller, Controller)
+                     else tuple(controller) for controller in controllers]
+        if not addresses:
+            raise ValueError("At least one controller is required")
+        if fps <= 0:
+            raise ValueError("Invalid fps! Expected a value > 0, got: %s" % fps)
+
+        # the phases are distributed over the whole group, not per worker
+        phases = {address: idx * phase_spread / len(addresses) for idx, address in enumerate(addresses)}
+
+        effect_id = next(self._effect_ids)
+        partitions = self._partition(addresses)
+        self._effects[effect_id] = list(partitions)
+        for future in [shard.submit("shard_start_effect", (effect_id, effect, partition,
+                                                           [phases[address] for address in partition],
+                                                           duration, fps))
+                       for shard, partition in partitions.items()]:
+            future.result()
+        return effect_id
+
+    def stop_effect(self, effect_id: int) -> None:
+        """
+        Stops an effect started by start_effect(), the controllers keep showing their last color
+
+        :param effect_id: id of the effect
+        """
+        for future in [shard.submit("shard_stop_effect", (effect_id,))
+                       for shard in self._effects.pop(effect_id, [])]:
+            future.result()
+
+    def _set_rgbww_group(self, addresses: [(str, int)], rgbww: (int, int, int, int, int),
+                         max_workers: int) -> BulkResult:
+        addresses = list(dict.fromkeys(addresses))
+        futures = [shard.submit("_set_rgbww_group", (partition, rgbww, max_workers))
+                   for shard, partition in self._partition(addresses).items()]
+        return self._merge_results(addresses, futures)
+
+    def _send_data(self, host: str, port: int, data, wait_for_response: bool = False) -> bytearray or None:
+        return self._get_shard(host, port).call("_send_data", (host, port, bytes(data), wait_for_response))
+
+    def _parse_discovery_response(self, message: str) -> (str, str, str) or None:
+        # register the hardware id before the states of the discovered controllers are queried
+        data = str.split(message, ",")
+        if len(data) == 3 and data[1]:
+            self.register(data[1], data[0], Controller.DEFAULT_PORT)
+
+        return super()._parse_discovery_response(message)
+
+    def _get_shard(self, host: str, port: int) -> _Shard:
+        return self._shards[self.get_shard_index(host, port)]
+
+    def _partition(self, addresses) -> dict:
+        # groups the addresses by shard keeping their order
+        partitions = {}
+        for address in addresses:
+            partitions.setdefault(self._get_shard(*address), []).append(tuple(address))
+        return partitions
+
+    def _call_all(self, name: str, args: tuple = ()) -> list:
+        return [future.result() for future in [shard.submit(name, args) for shard in self._shards]]
+
+    @staticmethod
+    def _merge_results(addresses: [(str, int)], futures: [Future]) -> BulkResult:
+        results = {}
+        for future in futures:
+            for result in future.result():
+                results[result.get_address()] = result
+        return BulkResult(results[tuple(address)] for address in addresses)
@@ -0,0 +1,185 @@
+import socket
+import struct
+import threading
+import time
+
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for index, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if index >= len(topic_levels) or (level != "+" and level != topic_levels[index]):
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+def encode_packet(packet_type: int, flags: int, body: bytes) -> bytes:
+    header = bytearray([packet_type << 4 | flags])
+    length = len(body)
+    while True:
+        byte = length % 128
+        length //= 128
+        header.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(header) + body
+
+
+def encode_string(value: bytes) -> bytes:
+    return struct.pack(">H", len(value)) + value
+
+
+class FakeBroker:
+    """
+    Minimal MQTT 3.1.1 broker on the loopback interface (QoS 0 only, retained messages and + / # wildcards)
+    """
+
+    def __init__(self):
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen()
+        self.host, self.port = self._server.getsockname()
+
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._clients = {}
+        self.retained = {}
+        self.messages = []
+
+    def __enter__(self):
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.close()
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            client.close()
+
+    def get_messages(self, topic: str) -> [bytes]:
+        with self._lock:
+            return [payload for message_topic, payload, _ in self.messages if message_topic == topic]
+
+    def wait_for(self, predicate, timeout: float = 2) -> bool:
+        # also wakes up periodically, so the predicate may depend on state outside of the broker
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not predicate():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(min(remaining, 0.01))
+            return True
+
+    def wait_for_subscribers(self, count: int = 1, timeout: float = 2) -> bool:
+        return self.wait_for(lambda: sum(len(filters) for filters in self._clients.values()) >= count, timeout)
+
+    def publish(self, topic: str, payload: bytes, retain: bool = False) -> None:
+        with self._condition:
+            self.messages.append((topic, payload, retain))
+            if retain:
+                if payload:
+                    self.retained[topic] = payload
+                else:
+                    self.retained.pop(topic, None)
+            receivers = [client for client, filters in self._clients.items()
+                         if any(topic_matches(topic_filter, topic) for topic_filter in filters)]
+            self._condition.notify_all()
+
+        packet = encode_packet(PUBLISH, 0, encode_string(topic.encode()) + payload)
+        for client in receivers:
+            try:
+                client.sendall(packet)
+            except OSError:
+                pass
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _read_packet(self, client: socket.socket) -> (int, int, bytes):
+        first = self._read(client, 1)[0]
+        length, multiplier = 0, 1
+        while True:
+            byte = self._read(client, 1)[0]
+            length += (byte & 0x7F) * multiplier
+            multiplier *= 128
+            if not byte & 0x80:
+                break
+        return first >> 4, first & 0x0F, self._read(client, length)
+
+    @staticmethod
+    def _read(client: socket.socket, length: int) -> bytes:
+        data = b""
+        while len(data) < length:
+            chunk = client.recv(length - len(data))
+            if not chunk:
+                raise ConnectionError("client disconnected")
+            data += chunk
+        return data
+
+    def _serve(self, client: socket.socket) -> None:
+        with self._lock:
+            self._clients[client] = []
+        try:
+            while True:
+                packet_type, flags, body = self._read_packet(client)
+                if packet_type == CONNECT:
+                    client.sendall(encode_packet(CONNACK, 0, b"\x00\x00"))
+                elif packet_type == PUBLISH:
+                    topic_length = struct.unpack(">H", body[:2])[0]
+                    topic = body[2:2 + topic_length].decode()
+                    # QoS > 0 messages have a packet id that is not acknowledged here
+                    offset = 2 + topic_length + (2 if flags & 0x06 else 0)
+                    self.publish(topic, body[offset:], bool(flags & 0x01))
+                elif packet_type == SUBSCRIBE:
+                    self._subscribe(client, body)
+                elif packet_type == UNSUBSCRIBE:
+                    client.sendall(encode_packet(UNSUBACK, 0, body[:2]))
+                elif packet_type == PINGREQ:
+                    client.sendall(encode_packet(PINGRESP, 0, b""))
+                elif packet_type == DISCONNECT:
+                    return
+        except OSError:
+            pass
+        finally:
+            with self._condition:
+                self._clients.pop(client, None)
+                self._condition.notify_all()
+            client.close()
+
+    def _subscribe(self, client: socket.socket, body: bytes) -> None:
+        packet_id, offset = body[:2], 2
+        topic_filters = []
+        while offset < len(body):
+            length = struct.unpack(">H", body[offset:offset + 2])[0]
+            topic_filters.append(body[offset + 2:offset + 2 + length].decode())
+            offset += 2 + length + 1
+
+        client.sendall(encode_packet(SUBACK, 0, packet_id + bytes(len(topic_filters))))
+        with self._condition:
+            retained = [(topic, payload) for topic, payload in self.retained.items()
+                        if any(topic_matches(topic_filter, topic) for topic_filter in topic_filters)]
+            self._clients[client].extend(topic_filters)
+            self._condition.notify_all()
+
+        for topic, payload in retained:
+            client.sendall(encode_packet(PUBLISH, 1, encode_string(topic.encode()) + payload))
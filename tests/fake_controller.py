@@ -0,0 +1,182 @@
+"""
+A local stand-in for a controller device that listens on the loopback interface.
+It understands the packets sent by the library, keeps a simple state and answers requests.
+"""
+import socket
+import socketserver
+import threading
+import time
+
+# packet id -> packet length
+PACKET_LENGTHS = {
+    0x10: 12,
+    0x11: 5,
+    0x22: 5,
+    0x31: 9,
+    0x51: 70,
+    0x61: 5,
+    0x71: 4,
+    0x81: 4,
+}
+
+
+def with_checksum(data: [int]) -> bytes:
+    return bytes(data) + bytes([sum(data) % 0x100])
+
+
+class FakeController:
+    """
+    Fake controller device, use it as a context manager
+    """
+
+    def __init__(self, respond: bool = True, confirm: bool = False):
+        """
+        :param respond: False to never answer requests (simulates a hanging device)
+        :param confirm: True to answer power commands as well (like some firmware versions do)
+        """
+        self.respond = respond
+        self.confirm = confirm
+
+        self.power_state = 0x24
+        self.mode = 0x61
+        self.speed = 0x10
+        self.rgbww = (0, 0, 0, 0, 0)
+
+        self.packets = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+        controller = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                with controller.lock:
+                    controller.connections += 1
+                buffer = b''
+                while True:
+                    try:
+                        chunk = self.request.recv(4096)
+                    except OSError:
+                        return
+                    if not chunk:
+                        return
+                    buffer += chunk
+                    while buffer and len(buffer) >= PACKET_LENGTHS.get(buffer[0], 1):
+                        length = PACKET_LENGTHS.get(buffer[0], len(buffer))
+                        packet, buffer = buffer[:length], buffer[length:]
+                        response = controller.handle_packet(packet)
+                        if response is not None and controller.respond:
+                            self.request.sendall(response)
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self.host, self.port = self._server.server_address
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs=dict(poll_interval=0.01),
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def get_packets(self, packet_id: int = None) -> [bytes]:
+        with self.lock:
+            return [packet for packet in self.packets if packet_id is None or packet[0] == packet_id]
+
+    def wait_for_packets(self, count: int, packet_id: int = None, timeout: float = 1) -> [bytes]:
+        """
+        Waits until at least count packets were handled, packets without a response are handled asynchronously
+        """
+        deadline = time.monotonic() + timeout
+        packets = self.get_packets(packet_id)
+        while len(packets) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+            packets = self.get_packets(packet_id)
+        return packets
+
+    def get_status_response(self) -> bytes:
+        red, green, blue, warm_white, cold_white = self.rgbww
+        return with_checksum([0x81, 0x25, self.power_state, self.mode, 0x21, self.speed,
+                              red, green, blue, warm_white, 0x01, cold_white, 0xFF])
+
+    def handle_packet(self, packet: bytes) -> bytes or None:
+        with self.lock:
+            self.packets.append(packet)
+
+            packet_id = packet[0]
+            if packet_id == 0x81:
+                return self.get_status_response()
+            elif packet_id == 0x11:
+                return with_checksum([0x0F, 0x11, 0x14, 21, 3, 4, 5, 6, 7, 4, 0x00])
+            elif packet_id == 0x71:
+                self.power_state = packet[1]
+                if self.confirm:
+                    return with_checksum([0xF0, 0x71, packet[1]])
+            elif packet_id == 0x31:
+                selection = packet[6]
+                red, green, blue, warm_white, cold_white = self.rgbww
+                if selection & 0xF0:
+                    red, green, blue = packet[1:4]
+                if selection & 0x0F:
+                    warm_white, cold_white = packet[4:6]
+                self.rgbww = (red, green, blue, warm_white, cold_white)
+                self.mode = 0x61
+            elif packet_id == 0x61:
+                self.mode = packet[1]
+                self.speed = packet[2]
+            elif packet_id == 0x51:
+                self.mode = 0x60
+                self.speed = packet[65]
+
+        return None
+
+
+class FakeDiscoveryResponder:
+    """
+    Answers discovery messages on the loopback interface like a controller
+    """
+
+    def __init__(self, hardware_id: str):
+        self.hardware_id = hardware_id
+        self.messages = []
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.settimeout(0.05)
+        self.port = self._socket.getsockname()[1]
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._running = False
+        self._thread.join()
+        self._socket.close()
+
+    def _run(self):
+        while self._running:
+            try:
+                data, address = self._socket.recvfrom(4096)
+            except socket.timeout:
+                continue
+            self.messages.append((data, address))
+            if data == b'HF-A11ASSISTHREAD':
+                self._socket.sendto(("127.0.0.1,%s,AK001-ZJ200" % self.hardware_id).encode(), address)
+
+
+def unused_port() -> int:
+    """
+    :return: a local port nobody is listening on
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
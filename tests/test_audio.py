@@ -0,0 +1,154 @@
+import io
+import math
+import os
+import struct
+import tempfile
+import unittest
+import wave
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SAMPLE_RATE = 22050
+
+
+def sine_pcm(frequency: float, duration: float, channels: int = 1) -> bytes:
+    samples = []
+    for idx in range(int(SAMPLE_RATE * duration)):
+        value = int(20000 * math.sin(2 * math.pi * frequency * idx / SAMPLE_RATE))
+        samples.extend([value] * channels)
+    return struct.pack("<%dh" % len(samples), *samples)
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestAudio(unittest.TestCase):
+
+    def test_bands(self):
+        """
+        Checks that a tone is mapped to the color of its band
+        """
+
+        from sunix_ledstrip_controller_client.audio import pcm_source, SpectrumAnalyzer, BandColorMapper
+
+        for frequency, expected_channel in [(100, 0), (1000, 1), (4000, 2)]:
+            analyzer = SpectrumAnalyzer(SAMPLE_RATE, attack=1)
+            mapper = BandColorMapper()
+
+            color = None
+            for samples, sample_rate in pcm_source(io.BytesIO(sine_pcm(frequency, 0.5)), SAMPLE_RATE):
+                color = mapper.map(analyzer.process(samples))
+
+            self.assertEqual(max(range(3), key=lambda idx: color[idx]), expected_channel)
+            self.assertEqual(color[expected_channel], 255)
+
+    def test_partial_reads(self):
+        """
+        Checks that reads that end within a sample are completed by the next read
+        """
+
+        from sunix_ledstrip_controller_client.audio import pcm_source
+
+        class ChunkedStream:
+            # returns at most 7 bytes per read like a slow pipe
+            def __init__(self, data):
+                self._stream = io.BytesIO(data)
+
+            def read(self, size):
+                return self._stream.read(min(size, 7))
+
+        pcm = sine_pcm(1000, 0.01, channels=2)
+        blocks = [samples for samples, _ in pcm_source(ChunkedStream(pcm), SAMPLE_RATE, channels=2)]
+        expected = [samples for samples, _ in pcm_source(io.BytesIO(pcm), SAMPLE_RATE, channels=2)]
+
+        numpy.testing.assert_array_equal(numpy.concatenate(blocks), numpy.concatenate(expected))
+
+    def test_empty_block(self):
+        """
+        Checks that an empty block keeps the current levels
+        """
+
+        from sunix_ledstrip_controller_client.audio import SpectrumAnalyzer
+
+        analyzer = SpectrumAnalyzer(SAMPLE_RATE)
+        levels = analyzer.process(numpy.zeros(0))
+        numpy.testing.assert_array_equal(levels, numpy.zeros(3))
+
+    def test_wav_source(self):
+        """
+        Checks that stereo WAV files are read as mono float blocks
+        """
+
+        from sunix_ledstrip_controller_client.audio import wav_source
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.wav")
+            with wave.open(path, "wb") as wav:
+                wav.setnchannels(2)
+                wav.setsampwidth(2)
+                wav.setframerate(SAMPLE_RATE)
+                wav.writeframes(sine_pcm(440, 0.1, channels=2))
+
+            blocks = list(wav_source(path, block_size=512))
+
+        self.assertEqual(sum(len(samples) for samples, sample_rate in blocks), int(SAMPLE_RATE * 0.1))
+        for samples, sample_rate in blocks:
+            self.assertEqual(sample_rate, SAMPLE_RATE)
+            self.assertLessEqual(float(numpy.abs(samples).max()), 1)
+
+    def test_stream_to_controllers(self):
+        """
+        Checks that colors are sent to all controllers with latest wins pacing and measured latency
+        """
+
+        from sunix_ledstrip_controller_client import LEDStripControllerClient, ConnectionPool
+        from sunix_ledstrip_controller_client.audio import AudioReactive, pcm_source
+        from tests.fake_controller import FakeController
+
+        with FakeController() as first, FakeController() as second:
+            api = LEDStripControllerClient(connection_pool=ConnectionPool())
+            reactive = AudioReactive(api, [(first.host, first.port), (second.host, second.port)],
+                                     SAMPLE_RATE, max_fps=10)
+
+            pcm = sine_pcm(100, 0.5) + sine_pcm(4000, 0.5)
+            reactive.run(pcm_source(io.BytesIO(pcm), SAMPLE_RATE, block_size=256), realtime=False)
+            api.close()
+
+            stats = reactive.get_stats()
+            self.assertEqual(stats["analyzed"], math.ceil(SAMPLE_RATE / 256))
+            self.assertGreater(stats["sent"], 0)
+            # blocks were fed faster than the frame rate, so most of them were replaced
+            self.assertGreater(stats["dropped"], 0)
+            self.assertEqual(stats["errors"], 0)
+            self.assertIsNotNone(stats["latency_max"])
+
+            for device in (first, second):
+                self.assertEqual(len(device.wait_for_packets(stats["sent"], 0x31)), stats["sent"])
+                # the last tone was high
+                self.assertGreater(device.rgbww[2], device.rgbww[0])
+
+    def test_failed_color_is_sent_again(self):
+        """
+        Checks that a color that could not be sent to any controller is not skipped as unchanged
+        """
+
+        from unittest.mock import MagicMock
+        from sunix_ledstrip_controller_client import LEDStripControllerClient
+        from sunix_ledstrip_controller_client.audio import AudioReactive
+
+        api = LEDStripControllerClient()
+        api._send_data = MagicMock(side_effect=[OSError(), None])
+        reactive = AudioReactive(api, [("192.168.2.10", 5577)], SAMPLE_RATE, block_size=256, max_fps=100)
+
+        for attempt in range(2):
+            reactive.start()
+            reactive.feed(numpy.zeros(256))
+            reactive.stop()
+
+        self.assertEqual(api._send_data.call_count, 2)
+        self.assertEqual(reactive.get_stats()["errors"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
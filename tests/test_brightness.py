@@ -0,0 +1,120 @@
+import unittest
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient, Controller, ConnectionPool
+from sunix_ledstrip_controller_client.colors import scale_color, split_brightness
+from tests.fake_controller import FakeController
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STATUS_REQUEST_ID = 0x81
+SET_COLOR_REQUEST_ID = 0x31
+
+
+class TestColorScaling(unittest.TestCase):
+
+    def test_scale_color(self):
+        """
+        Checks the rounding of scaled colors
+        """
+
+        self.assertEqual(scale_color((255, 128, 1, 0, 10), 255), (255, 128, 1, 0, 10))
+        self.assertEqual(scale_color((255, 128, 1, 0, 10), 128), (128, 64, 1, 0, 5))
+        self.assertEqual(scale_color((255, 128, 1, 0, 10), 0), (0, 0, 0, 0, 0))
+
+    def test_split_brightness(self):
+        """
+        Checks that every color is restored exactly from its base color and level
+        """
+
+        self.assertEqual(split_brightness((128, 64, 0, 0, 0)), ((255, 128, 0, 0, 0), 128))
+        self.assertEqual(split_brightness((0, 0, 0, 0, 0)), ((0, 0, 0, 0, 0), 0))
+
+        for level in range(1, 256):
+            for value in range(level + 1):
+                color = (value, level, 0)
+                self.assertEqual(scale_color(*split_brightness(color)), color)
+
+
+class TestControllerBrightness(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeController().__enter__()
+        self.device.rgbww = (200, 100, 50, 0, 20)
+        self.api = LEDStripControllerClient(connection_pool=ConnectionPool())
+        self.controller = Controller(self.api, self.device.host, self.device.port)
+
+    def tearDown(self):
+        self.api.close()
+        self.device.__exit__(None, None, None)
+
+    def test_single_packet_per_change(self):
+        """
+        Checks that each brightness change sends one packet and doesn't query the state
+        """
+
+        self.assertEqual(self.controller.get_brightness(), 200)
+        status_requests = len(self.device.get_packets(STATUS_REQUEST_ID))
+
+        for brightness in range(200, -1, -10):
+            self.controller.set_brightness(brightness)
+        self.controller.set_brightness(0)
+
+        packets = self.device.wait_for_packets(20, SET_COLOR_REQUEST_ID)
+        self.assertEqual(len(packets), 20)
+        self.assertEqual(len(self.device.get_packets(STATUS_REQUEST_ID)), status_requests)
+        self.assertEqual(self.controller.get_brightness(), 0)
+        self.assertEqual(self.controller.get_rgbww(), (0, 0, 0, 0, 0))
+
+    def test_no_drift(self):
+        """
+        Checks that the color is restored exactly after dimming (even to 0) and a status update
+        """
+
+        for brightness in (100, 3, 0, 57):
+            self.controller.set_brightness(brightness)
+        self.controller.update_state()
+        self.controller.set_brightness(200)
+
+        self.device.wait_for_packets(5, SET_COLOR_REQUEST_ID)
+        self.assertEqual(self.device.rgbww, (200, 100, 50, 0, 20))
+        self.assertEqual(self.controller.get_rgbww(), (200, 100, 50, 0, 20))
+
+        self.controller.set_brightness(255)
+        self.device.wait_for_packets(6, SET_COLOR_REQUEST_ID)
+        self.assertEqual(self.device.rgbww, (255, 128, 64, 0, 26))
+
+    def test_new_color(self):
+        """
+        Checks that setting a color replaces the base color
+        """
+
+        self.controller.set_brightness(10)
+        self.controller.set_rgbww(0, 0, 128, 0, 0)
+        self.assertEqual(self.controller.get_brightness(), 128)
+
+        self.controller.set_brightness(255)
+        self.device.wait_for_packets(3, SET_COLOR_REQUEST_ID)
+        self.assertEqual(self.device.rgbww, (0, 0, 255, 0, 0))
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_numpy_brightness(self):
+        """
+        Checks that NumPy integers are accepted as brightness
+        """
+
+        self.controller.set_brightness(np.uint8(100))
+        self.assertEqual(self.device.wait_for_packets(1, SET_COLOR_REQUEST_ID)[0][1:6], bytes((100, 50, 25, 0, 10)))
+        self.assertEqual(type(self.controller.get_brightness()), int)
+
+    def test_invalid_brightness(self):
+        """
+        Checks that invalid values are rejected without sending anything
+        """
+
+        for brightness in (-1, 256, 0.5):
+            with self.assertRaises(ValueError):
+                self.controller.set_brightness(brightness)
+        self.assertEqual(self.device.get_packets(SET_COLOR_REQUEST_ID), [])
@@ -0,0 +1,112 @@
+import unittest
+from array import array
+from unittest.mock import MagicMock
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient
+from sunix_ledstrip_controller_client.packets import TransitionType
+from sunix_ledstrip_controller_client.packets.buffers import to_color_bytes, to_program_bytes
+from sunix_ledstrip_controller_client.packets.cache import PacketCache
+from sunix_ledstrip_controller_client.packets.requests import SetCustomFunctionRequest, UpdateColorRequest, \
+    encode_custom_function, encode_rgbww_batch
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HOST = "192.168.2.53"
+PORT = 5577
+
+COLORS = [(255, 0, 0, 0), (0, 255, 0, 7), (0, 0, 255, 0)]
+PROGRAM = bytes([255, 0, 0, 0, 0, 255, 0, 7, 0, 0, 255, 0])
+
+
+class TestColorBuffers(unittest.TestCase):
+
+    def test_byte_buffers(self):
+        """
+        Checks that all kinds of byte buffers are accepted
+        """
+
+        for buffer in [PROGRAM, bytearray(PROGRAM), memoryview(PROGRAM), array('B', PROGRAM)]:
+            self.assertEqual(to_program_bytes(buffer), PROGRAM)
+
+        with self.assertRaises(ValueError):
+            to_color_bytes(array('h', [1, 2, 3]), 3)
+        with self.assertRaises(ValueError):
+            to_color_bytes(b'\x01\x02\x03\x04', 3)
+        with self.assertRaises(ValueError):
+            to_program_bytes(bytes(17 * 4))
+
+    def test_custom_function_from_buffer(self):
+        """
+        Checks that a custom function encoded from a buffer equals the one encoded from tuples
+        """
+
+        expected = SetCustomFunctionRequest().get_data(COLORS, 100, TransitionType.Strobe)
+
+        self.assertEqual(encode_custom_function(PROGRAM, 100, TransitionType.Strobe), expected)
+        self.assertEqual(SetCustomFunctionRequest().get_data(array('B', PROGRAM), 100, TransitionType.Strobe),
+                         expected)
+
+        with self.assertRaises(ValueError):
+            encode_custom_function(PROGRAM, 256, TransitionType.Strobe)
+
+    def test_rgbww_batch(self):
+        """
+        Checks that a batch of colors is encoded into one packet per color
+        """
+
+        packets = encode_rgbww_batch(bytes([1, 2, 3, 4, 5, 250, 251, 252, 253, 254]))
+
+        self.assertEqual(packets, [UpdateColorRequest().get_rgbww_data(1, 2, 3, 4, 5),
+                                   UpdateColorRequest().get_rgbww_data(250, 251, 252, 253, 254)])
+
+    def test_client_accepts_buffers(self):
+        """
+        Checks that the client validates and sends programs given as buffers
+        """
+
+        api = LEDStripControllerClient(custom_function_cache=PacketCache())
+        api._send_data = MagicMock()
+
+        api.set_custom_function(HOST, PORT, PROGRAM, 100, TransitionType.Strobe)
+        api.set_custom_function(HOST, PORT, bytearray(PROGRAM), 100, TransitionType.Strobe)
+
+        expected = SetCustomFunctionRequest().get_data(COLORS, 100, TransitionType.Strobe)
+        api._send_data.assert_called_with(HOST, PORT, expected)
+        self.assertEqual(api.get_custom_function_cache_stats()["hits"], 1)
+
+        LEDStripControllerClient._validate_color(b'\x01\x02\x03', 3)
+        with self.assertRaises(ValueError):
+            LEDStripControllerClient._validate_color(b'\x01\x02\x03\x04\x05\x06', 3)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_numpy_arrays(self):
+        """
+        Checks that NumPy arrays are validated in one pass and encoded like tuples
+        """
+
+        expected = SetCustomFunctionRequest().get_data(COLORS, 100, TransitionType.Strobe)
+        self.assertEqual(SetCustomFunctionRequest().get_data(np.array(COLORS), 100, TransitionType.Strobe),
+                         expected)
+
+        rgb = [color[:3] for color in COLORS]
+        self.assertEqual(to_program_bytes(np.array(rgb, dtype=np.uint8)),
+                         bytes([255, 0, 0, 0, 0, 255, 0, 0, 0, 0, 255, 0]))
+
+        frames = np.array([[1, 2, 3, 4, 5], [6, 7, 8, 9, 10]], dtype=np.int64)
+        self.assertEqual(encode_rgbww_batch(frames)[1], UpdateColorRequest().get_rgbww_data(6, 7, 8, 9, 10))
+
+        with self.assertRaises(ValueError):
+            to_program_bytes(np.array([[0, 0, 256, 0]]))
+        with self.assertRaises(ValueError):
+            to_program_bytes(np.array([[0, 0, -1]]))
+        with self.assertRaises(ValueError):
+            to_program_bytes(np.array([[0.5, 0, 0, 0]]))
+        with self.assertRaises(ValueError):
+            to_program_bytes(np.array([[0, 0, 0, 0, 0]]))
+
+        LEDStripControllerClient._validate_color(np.array([1, 2, 3, 4, 5]), 5)
+        with self.assertRaises(ValueError):
+            LEDStripControllerClient._validate_color(np.array([1, 2, 300]), 3)
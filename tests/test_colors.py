@@ -0,0 +1,168 @@
+import unittest
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient, Controller, ConnectionPool, WhiteMixing, \
+    set_white_mixing
+from sunix_ledstrip_controller_client.colors import hsv_to_rgb, KELVIN_MIN, KELVIN_MAX, _WHITE_MIXING_BY_MODEL
+from tests.fake_controller import FakeController
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SET_COLOR_REQUEST_ID = 0x31
+
+
+class TestColorConversion(unittest.TestCase):
+
+    def test_hsv_to_rgb(self):
+        """
+        Checks the conversion of some well known colors
+        """
+
+        self.assertEqual(hsv_to_rgb(0, 255, 255), (255, 0, 0))
+        self.assertEqual(hsv_to_rgb(120, 255, 255), (0, 255, 0))
+        self.assertEqual(hsv_to_rgb(240, 255, 128), (0, 0, 128))
+        self.assertEqual(hsv_to_rgb(30, 255, 255), (255, 128, 0))
+        self.assertEqual(hsv_to_rgb(360, 0, 255), (255, 255, 255))
+        self.assertEqual(hsv_to_rgb(200, 100, 0), (0, 0, 0))
+
+    def test_kelvin(self):
+        """
+        Checks that color temperatures are mixed according to the strategy
+        """
+
+        dual_white = WhiteMixing(WhiteMixing.DUAL_WHITE, warm_kelvin=3000, cold_kelvin=6000)
+        self.assertEqual(dual_white.kelvin_to_rgbww(2000), (0, 0, 0, 255, 0))
+        self.assertEqual(dual_white.kelvin_to_rgbww(4500), (0, 0, 0, 127, 128))
+        self.assertEqual(dual_white.kelvin_to_rgbww(9000, 128), (0, 0, 0, 0, 128))
+
+        single_white = WhiteMixing(WhiteMixing.SINGLE_WHITE).kelvin_to_rgbww(6500)
+        self.assertEqual(single_white[4], 0)
+        self.assertGreater(single_white[3], 200)
+
+        self.assertEqual(WhiteMixing(WhiteMixing.RGB).kelvin_to_rgbww(6600), (255, 255, 255, 0, 0))
+
+    def test_kelvin_rounding(self):
+        """
+        Checks that color temperatures use the nearest table entry
+        """
+
+        mixing = WhiteMixing(WhiteMixing.SINGLE_WHITE)
+        self.assertEqual(mixing.kelvin_to_rgbww(2999), mixing.kelvin_to_rgbww(3000))
+        self.assertEqual(mixing.kelvin_to_rgbww(2994.9), mixing.kelvin_to_rgbww(2990))
+        self.assertNotEqual(mixing.kelvin_to_rgbww(2999), mixing.kelvin_to_rgbww(2990))
+        self.assertEqual(mixing.kelvin_to_rgbww(KELVIN_MAX - 1), mixing.kelvin_to_rgbww(KELVIN_MAX))
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_numpy_integers(self):
+        """
+        Checks that NumPy integers are accepted as color values
+        """
+
+        mixing = WhiteMixing()
+        self.assertEqual(mixing.kelvin_to_rgbww(4000, np.uint8(128)), mixing.kelvin_to_rgbww(4000, 128))
+        self.assertEqual(mixing.hsv_to_rgbww(np.int64(30), np.int64(255), np.uint8(255)),
+                         mixing.hsv_to_rgbww(30, 255, 255))
+        self.assertEqual(hsv_to_rgb(120, np.int32(255), np.int16(255)), (0, 255, 0))
+
+    def test_hsv_white_part(self):
+        """
+        Checks that the white part of unsaturated colors is moved to the white channels
+        """
+
+        self.assertEqual(WhiteMixing(WhiteMixing.RGB).hsv_to_rgbww(0, 128, 255), (255, 127, 127, 0, 0))
+        self.assertEqual(WhiteMixing(WhiteMixing.SINGLE_WHITE).hsv_to_rgbww(0, 128, 255), (128, 0, 0, 127, 0))
+
+        red, green, blue, warm_white, cold_white = WhiteMixing().hsv_to_rgbww(0, 0, 255)
+        self.assertEqual((red, green, blue), (0, 0, 0))
+        self.assertEqual(warm_white + cold_white, 255)
+
+    def test_invalid_values(self):
+        """
+        Checks that invalid values are rejected
+        """
+
+        mixing = WhiteMixing()
+        for args in ((KELVIN_MIN - 1,), (KELVIN_MAX + 1,), (4000, 256)):
+            with self.assertRaises(ValueError):
+                mixing.kelvin_to_rgbww(*args)
+        for args in ((361, 0, 0), (0, -1, 0), (0, 0, 256), (0, 0, 1.5)):
+            with self.assertRaises(ValueError):
+                mixing.hsv_to_rgbww(*args)
+        with self.assertRaises(ValueError):
+            WhiteMixing("rgbwwcw")
+        with self.assertRaises(ValueError):
+            WhiteMixing(warm_kelvin=6500, cold_kelvin=2700)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_batch_matches_single_conversions(self):
+        """
+        Checks that vectorized conversions return exactly the values of single conversions
+        """
+
+        rng = np.random.default_rng(1)
+        hsv = np.column_stack([rng.integers(0, 361, 500), rng.integers(0, 256, 500), rng.integers(0, 256, 500)])
+        kelvins = rng.uniform(KELVIN_MIN, KELVIN_MAX, 500)
+        levels = rng.integers(0, 256, 500)
+
+        for strategy in (WhiteMixing.DUAL_WHITE, WhiteMixing.SINGLE_WHITE, WhiteMixing.RGB):
+            mixing = WhiteMixing(strategy)
+
+            colors = mixing.hsv_to_rgbww_batch(hsv)
+            self.assertEqual(colors.shape, (500, 5))
+            self.assertEqual([tuple(color) for color in colors.tolist()],
+                             [mixing.hsv_to_rgbww(*color) for color in hsv.tolist()])
+
+            colors = mixing.kelvin_to_rgbww_batch(kelvins, levels)
+            self.assertEqual([tuple(color) for color in colors.tolist()],
+                             [mixing.kelvin_to_rgbww(kelvin, level)
+                              for kelvin, level in zip(kelvins.tolist(), levels.tolist())])
+
+        with self.assertRaises(ValueError):
+            WhiteMixing().hsv_to_rgbww_batch([[0, 0, 256]])
+        with self.assertRaises(ValueError):
+            WhiteMixing().kelvin_to_rgbww_batch([KELVIN_MAX + 1])
+
+
+class TestColorCommands(unittest.TestCase):
+
+    def tearDown(self):
+        _WHITE_MIXING_BY_MODEL.clear()
+
+    def test_group(self):
+        """
+        Checks that group variants set the same color on every controller
+        """
+
+        with FakeController() as first, FakeController() as second:
+            api = LEDStripControllerClient(connection_pool=ConnectionPool())
+            addresses = [(first.host, first.port), (second.host, second.port)]
+
+            result = api.set_hsv_group(addresses, 240, 255, 255)
+            self.assertTrue(result.is_ok())
+            result = api.set_kelvin_group(addresses, 12000, mixing=WhiteMixing(warm_kelvin=2000, cold_kelvin=6000))
+            self.assertTrue(result.is_ok())
+
+            for device in (first, second):
+                device.wait_for_packets(2, SET_COLOR_REQUEST_ID)
+                self.assertEqual(device.rgbww, (0, 0, 0, 0, 255))
+            api.close()
+
+    def test_model_mixing(self):
+        """
+        Checks that a controller uses the mixing configured for its model
+        """
+
+        set_white_mixing("RGB only", WhiteMixing(WhiteMixing.RGB))
+
+        with FakeController() as device:
+            api = LEDStripControllerClient()
+            Controller(api, device.host, device.port, model="RGB only").set_hsv(0, 0, 255)
+            self.assertEqual(device.rgbww, (255, 255, 255, 0, 0))
+
+            Controller(api, device.host, device.port, model="Other").set_hsv(0, 0, 255)
+            self.assertEqual(device.rgbww[:3], (0, 0, 0))
+
+            Controller(api, device.host, device.port).set_kelvin(2700, 128)
+            self.assertEqual(device.rgbww, (0, 0, 0, 128, 0))
@@ -0,0 +1,81 @@
+import socket
+import time
+import unittest
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient
+from sunix_ledstrip_controller_client.connection import ConnectionPool
+from tests.fake_controller import FakeController, unused_port
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def test_connection_is_reused(self):
+        """
+        Checks that all requests to a device share a single connection
+        """
+
+        with FakeController() as device:
+            pool = ConnectionPool()
+            api = LEDStripControllerClient(connection_pool=pool)
+
+            api.turn_on(device.host, device.port)
+            api.set_rgb(device.host, device.port, 1, 2, 3)
+            state = api.get_state(device.host, device.port)
+
+            self.assertEqual(state["power_status"], 0x23)
+            self.assertEqual((state["red"], state["green"], state["blue"]), (1, 2, 3))
+            self.assertEqual(device.connections, 1)
+            self.assertEqual(len(pool), 1)
+
+            pool.close()
+            self.assertEqual(len(pool), 0)
+
+    def test_unread_replies_are_discarded(self):
+        """
+        Checks that replies to commands that were not waited for are not taken as the response of the next request
+        """
+
+        with FakeController(confirm=True) as device:
+            pool = ConnectionPool()
+            api = LEDStripControllerClient(connection_pool=pool)
+
+            api.turn_on(device.host, device.port)
+            device.wait_for_packets(1)
+            # give the reply time to arrive
+            time.sleep(0.05)
+
+            state = api.get_state(device.host, device.port)
+            self.assertEqual(state["power_status"], 0x23)
+            self.assertEqual(device.connections, 1)
+
+            pool.close()
+
+    def test_reconnect(self):
+        """
+        Checks that a connection closed by the device is replaced transparently
+        """
+
+        with FakeController() as device:
+            pool = ConnectionPool()
+            api = LEDStripControllerClient(connection_pool=pool)
+
+            api.get_state(device.host, device.port)
+            # simulate a connection that was closed by the device
+            pool._get_connection(device.host, device.port).socket.shutdown(socket.SHUT_RDWR)
+            api.get_state(device.host, device.port)
+
+            self.assertEqual(device.connections, 2)
+
+    def test_connection_refused(self):
+        """
+        Checks that connection errors are raised
+        """
+
+        api = LEDStripControllerClient(connection_pool=ConnectionPool())
+
+        with self.assertRaises(ConnectionRefusedError):
+            api.get_state("127.0.0.1", unused_port())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,264 @@
+import time
+import unittest
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient
+from sunix_ledstrip_controller_client.connection import ConnectionPool
+from sunix_ledstrip_controller_client.effects import Effect, EffectEngine, PaletteEffect, NoiseEffect, SolidEffect
+from sunix_ledstrip_controller_client.packets.requests import UpdateColorRequest, encode_rgbww
+from tests.fake_controller import FakeController
+
+
+class CountingEffect(Effect):
+    """
+    Shows the frame number in the red channel
+    """
+
+    def __init__(self):
+        self.frame = 0
+
+    def render(self, t, phases):
+        self.frame += 1
+        return [(self.frame % 256, 0, 0, 0, 0)] * len(phases)
+
+
+class BrokenEffect(Effect):
+    """
+    Fails after a few frames
+    """
+
+    def __init__(self, error_frame=3, colors=None):
+        self.frame = 0
+        self.error_frame = error_frame
+        self.colors = colors
+
+    def render(self, t, phases):
+        self.frame += 1
+        if self.frame >= self.error_frame:
+            if self.colors is not None:
+                return self.colors
+            raise RuntimeError("broken")
+        return [(self.frame, 0, 0, 0, 0)] * len(phases)
+
+
+class TimeEffect(Effect):
+    """
+    Remembers the times it was rendered at
+    """
+
+    def __init__(self):
+        self.times = []
+
+    def render(self, t, phases):
+        self.times.append(t)
+        return [(0, 0, 0, 0, 0)] * len(phases)
+
+
+class TestEffects(unittest.TestCase):
+
+    def test_encode_rgbww(self):
+        """
+        Checks that the fast encoder produces the same packets as UpdateColorRequest
+        """
+
+        request = UpdateColorRequest()
+        for color in [(0, 0, 0, 0, 0), (255, 255, 255, 255, 255), (1, 2, 3, 4, 5), (200, 100, 50, 25, 12)]:
+            self.assertEqual(encode_rgbww(*color), request.get_rgbww_data(*color))
+
+    def test_palette(self):
+        """
+        Checks palette interpolation and phase offsets
+        """
+
+        effect = PaletteEffect([(0, 0, 0), (200, 100, 0)], period=2)
+
+        self.assertEqual(effect.render(0, [0]), [(0, 0, 0, 0, 0)])
+        self.assertEqual(effect.render(0.5, [0]), [(100, 50, 0, 0, 0)])
+        self.assertEqual(effect.render(1, [0]), [(200, 100, 0, 0, 0)])
+        self.assertEqual(effect.render(0, [0, 0.25, 0.5]),
+                         [(0, 0, 0, 0, 0), (100, 50, 0, 0, 0), (200, 100, 0, 0, 0)])
+
+    def test_noise(self):
+        """
+        Checks that noise stays within the color range and is reproducible
+        """
+
+        effect = NoiseEffect((255, 128, 0), amplitude=1, seed=42)
+        other = NoiseEffect((255, 128, 0), amplitude=1, seed=42)
+
+        for frame in range(100):
+            colors = effect.render(frame / 20, [0, 0.5])
+            self.assertEqual(colors, other.render(frame / 20, [0, 0.5]))
+            for color in colors:
+                for channel in color:
+                    self.assertGreaterEqual(channel, 0)
+                    self.assertLessEqual(channel, 255)
+
+    def test_frames_are_lazy(self):
+        """
+        Checks that frames are generated on demand
+        """
+
+        effect = CountingEffect()
+        frames = effect.frames([0, 0.5], fps=20)
+
+        self.assertEqual(effect.frame, 0)
+        self.assertEqual(next(frames), [(1, 0, 0, 0, 0)] * 2)
+        self.assertEqual(effect.frame, 1)
+
+    def test_frames_follow_time(self):
+        """
+        Checks that frames are rendered at the time sent to the generator
+        """
+
+        effect = TimeEffect()
+        frames = effect.frames([0], fps=20)
+
+        next(frames)
+        next(frames)
+        frames.send(1.5)
+        next(frames)
+        self.assertEqual(effect.times, [0.0, 0.05, 1.5, 1.55])
+
+    def test_render_cost(self):
+        """
+        Checks that rendering and encoding 100 controllers at 20 fps takes only a fraction of a core
+        """
+
+        effect = PaletteEffect([(255, 0, 0), (0, 255, 0), (0, 0, 255)], period=5)
+        phases = [idx / 100 for idx in range(100)]
+        frames = effect.frames(phases, fps=20)
+
+        start = time.thread_time()
+        for i in range(20):
+            for color in next(frames):
+                encode_rgbww(*color)
+        cpu_time = time.thread_time() - start
+
+        self.assertLess(cpu_time, 0.5)
+
+    def test_engine(self):
+        """
+        Checks that the engine streams frames to all controllers over persistent connections
+        """
+
+        with FakeController() as first, FakeController() as second:
+            api = LEDStripControllerClient(connection_pool=ConnectionPool())
+            engine = EffectEngine(api, fps=50)
+            self.addCleanup(engine.close)
+
+            handle = engine.start(CountingEffect(), [(first.host, first.port), (second.host, second.port)],
+                                  duration=0.3)
+            solid = engine.start(SolidEffect((1, 2, 3)), [(first.host, first.port)], duration=0.3)
+
+            self.assertTrue(engine.join(timeout=2))
+            self.assertFalse(handle.is_running())
+
+            stats = handle.get_stats()
+            self.assertGreater(stats["frames"], 5)
+            self.assertEqual(stats["packets"], stats["frames"] * 2)
+            self.assertEqual(stats["errors"], 0)
+            self.assertGreater(stats["cpu_time"], 0)
+
+            # unchanged colors are only sent once
+            self.assertEqual(solid.get_stats()["packets"], 1)
+
+            for device in (first, second):
+                self.assertEqual(device.connections, 1)
+
+            api._connection_pool.close()
+
+    def test_engine_stop(self):
+        """
+        Checks that effects can be stopped
+        """
+
+        with FakeController() as device:
+            api = LEDStripControllerClient(connection_pool=ConnectionPool())
+            engine = EffectEngine(api, fps=50)
+            self.addCleanup(engine.close)
+
+            handle = engine.start(CountingEffect(), [(device.host, device.port)])
+            self.assertEqual(len(engine.get_stats()), 1)
+            handle.stop()
+
+            self.assertTrue(engine.join(timeout=1))
+            self.assertEqual(engine.get_running(), [])
+
+            api._connection_pool.close()
+
+    def test_engine_broken_effect(self):
+        """
+        Checks that failing effects and frames of the wrong size only stop that effect
+        """
+
+        with FakeController() as device:
+            api = LEDStripControllerClient(connection_pool=ConnectionPool())
+            engine = EffectEngine(api, fps=50)
+            self.addCleanup(engine.close)
+
+            broken = engine.start(BrokenEffect(), [(device.host, device.port)])
+            wrong_size = engine.start(BrokenEffect(colors=[(1, 2, 3, 4, 5)] * 2), [(device.host, device.port)])
+            counting = engine.start(CountingEffect(), [(device.host, device.port)], duration=0.3)
+
+            self.assertTrue(engine.join(timeout=2))
+            for handle in (broken, wrong_size):
+                self.assertFalse(handle.is_running())
+                self.assertEqual(handle.get_stats()["frames"], 2)
+                self.assertEqual(handle.get_stats()["errors"], 1)
+            self.assertGreater(counting.get_stats()["frames"], 5)
+
+            # the engine starts a new thread for new effects
+            handle = engine.start(SolidEffect((1, 2, 3)), [(device.host, device.port)], duration=0.1)
+            self.assertTrue(engine.join(timeout=2))
+            self.assertEqual(handle.get_stats()["packets"], 1)
+
+            api._connection_pool.close()
+
+    def test_engine_slow_controller(self):
+        """
+        Checks that a controller that does not respond in time does not hold up the others
+        """
+
+        class SlowClient(LEDStripControllerClient):
+            def _send_data(self, host, port, data, wait_for_response=False):
+                if port == 1:
+                    time.sleep(0.5)
+                    raise TimeoutError()
+                return super()._send_data(host, port, data, wait_for_response)
+
+        with FakeController() as device:
+            api = SlowClient(connection_pool=ConnectionPool())
+            engine = EffectEngine(api, fps=50)
+            self.addCleanup(engine.close)
+
+            handle = engine.start(CountingEffect(), [(device.host, device.port), ("127.0.0.1", 1)], duration=0.3)
+            self.assertTrue(engine.join(timeout=5))
+
+            stats = handle.get_stats()
+            self.assertGreater(stats["frames"], 10)
+            self.assertEqual(stats["packets"], stats["frames"])
+            self.assertEqual(stats["errors"], 1)
+
+            api._connection_pool.close()
+
+    def test_engine_close(self):
+        """
+        Checks that closing the engine stops all effects and its threads
+        """
+
+        with FakeController() as device:
+            api = LEDStripControllerClient(connection_pool=ConnectionPool())
+            with EffectEngine(api, fps=50) as engine:
+                handle = engine.start(CountingEffect(), [(device.host, device.port)])
+                time.sleep(0.1)
+
+            self.assertFalse(handle.is_running())
+            self.assertEqual(engine.get_running(), [])
+            self.assertFalse(any(thread.is_alive() for thread in engine._executor._threads))
+            self.assertIsNone(engine._worker)
+
+            api._connection_pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
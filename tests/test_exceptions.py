@@ -0,0 +1,112 @@
+import socket
+import unittest
+from unittest.mock import MagicMock
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient, RetryPolicy, LEDStripControllerError, \
+    DeviceConnectionError, DeviceConnectionRefusedError, DeviceTimeoutError, ProtocolError, ChecksumError
+from sunix_ledstrip_controller_client.ratelimit import RateLimitExceeded
+from sunix_ledstrip_controller_client.retry import CircuitOpenError
+from tests.fake_controller import FakeController, FakeDiscoveryResponder, unused_port
+
+HOST = "192.168.2.53"
+PORT = 5577
+
+
+class TestExceptions(unittest.TestCase):
+
+    def test_timeout(self):
+        """
+        Checks that a device that doesn't answer raises a DeviceTimeoutError
+        """
+
+        with FakeController(respond=False) as device:
+            api = LEDStripControllerClient(read_policy=RetryPolicy(timeout=0.1))
+
+            with self.assertRaises(DeviceTimeoutError) as context:
+                api.get_state(device.host, device.port)
+
+        # still compatible with code that catches the builtin error
+        self.assertIsInstance(context.exception, socket.timeout)
+        self.assertEqual((context.exception.host, context.exception.port), (device.host, device.port))
+
+    def test_connection_refused(self):
+        """
+        Checks that a refused connection raises a DeviceConnectionRefusedError
+        """
+
+        port = unused_port()
+        api = LEDStripControllerClient()
+
+        with self.assertRaises(DeviceConnectionRefusedError) as context:
+            api.turn_on("127.0.0.1", port)
+
+        self.assertIsInstance(context.exception, ConnectionRefusedError)
+        self.assertIsInstance(context.exception, DeviceConnectionError)
+        self.assertEqual(context.exception.port, port)
+
+    def test_protocol_errors(self):
+        """
+        Checks that invalid responses raise protocol errors
+        """
+
+        api = LEDStripControllerClient()
+
+        api._send_data = MagicMock(return_value=b'\x81%#a!\x05\xff\xff\xff\xff\x01\xff\xff\x00')
+        with self.assertRaises(ChecksumError):
+            api.get_state(HOST, PORT)
+
+        api._send_data = MagicMock(return_value=b'\x81%')
+        with self.assertRaises(ProtocolError) as context:
+            api.get_state(HOST, PORT)
+        self.assertIsInstance(context.exception, ValueError)
+
+    def test_hierarchy(self):
+        """
+        Checks that errors of the rate limiter and circuit breaker share the common base class
+        """
+
+        self.assertTrue(issubclass(RateLimitExceeded, LEDStripControllerError))
+        self.assertTrue(issubclass(CircuitOpenError, DeviceConnectionError))
+        self.assertTrue(issubclass(ChecksumError, ProtocolError))
+        self.assertEqual(CircuitOpenError(HOST, PORT).host, HOST)
+
+    def test_discovery_skips_unreachable_devices(self):
+        """
+        Checks that a device that answers the discovery but fails afterwards is skipped
+        """
+
+        api = LEDStripControllerClient()
+        api.get_state = MagicMock(side_effect=DeviceTimeoutError("timeout", HOST, PORT))
+
+        with FakeDiscoveryResponder("F0FE6B2333C6") as responder:
+            api._discovery_port = responder.port
+            self.assertEqual(api.sweep_controllers("127.0.0.1/32", timeout=0.2), [])
+
+
+class TestBulkResult(unittest.TestCase):
+
+    def test_execute_bulk(self):
+        """
+        Checks that the outcome of every device is reported without raising
+        """
+
+        with FakeController() as device:
+            offline = ("127.0.0.1", unused_port())
+            api = LEDStripControllerClient()
+
+            results = api.execute_bulk([(device.host, device.port), offline], api.turn_on)
+
+            self.assertEqual(len(results), 2)
+            self.assertFalse(results.is_ok())
+            self.assertEqual([result.get_address() for result in results.get_succeeded()],
+                             [(device.host, device.port)])
+            self.assertEqual(list(results.get_errors()), [offline])
+            self.assertIsInstance(results[offline].error, DeviceConnectionRefusedError)
+            self.assertGreater(results[(device.host, device.port)].duration, 0)
+
+            with self.assertRaises(DeviceConnectionRefusedError):
+                results[offline].get()
+
+            states = api.execute_bulk([(device.host, device.port)], api.get_state)
+            self.assertTrue(states.is_ok())
+            self.assertEqual(states.get_values()[(device.host, device.port)]["power_status"], 0x23)
@@ -0,0 +1,173 @@
+import unittest
+from unittest.mock import MagicMock
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient, FunctionId
+from sunix_ledstrip_controller_client.controller import Controller
+from sunix_ledstrip_controller_client.exceptions import ChecksumError, DeviceConnectionError
+from sunix_ledstrip_controller_client.fleet import FleetStore
+
+STATUS_ON = b'\x81%#a!\x05\xff\xff\xff\xff\x01\xff\xffK'
+STATUS_OFF = b'\x81%$a!\x0f\x00\x00\x00\xff\x01\xff\x0fi'
+
+
+class TestFleetStore(unittest.TestCase):
+
+    def setUp(self):
+        self.api = LEDStripControllerClient()
+        self.api._send_data = MagicMock(return_value=None)
+        self.store = FleetStore(self.api)
+
+    def test_add(self):
+        """
+        Checks that devices get stable ids and can be found by address and hardware id
+        """
+
+        first = self.store.add("192.168.2.10", hardware_id="F0FE6B2333C6")
+        second = self.store.add("192.168.2.11", 1234)
+
+        self.assertEqual(first, 0)
+        self.assertEqual(second, 1)
+        self.assertEqual(self.store.add("192.168.2.10"), first)
+        self.assertEqual(self.store.get_id("192.168.2.11", 1234), second)
+        self.assertEqual(self.store.get_id_by_hardware_id("F0FE6B2333C6"), first)
+        self.assertEqual(len(self.store), 2)
+
+        view = self.store.get_view(second)
+        self.assertEqual(view.get_host(), "192.168.2.11")
+        self.assertEqual(view.get_port(), 1234)
+        self.assertIsNone(view.get_rgbww())
+        self.assertEqual(self.store.get_ids_unknown(), [0, 1])
+
+    def test_apply_status(self):
+        """
+        Checks that binary status responses are stored
+        """
+
+        device_id = self.store.add("192.168.2.10")
+        view = self.store.get_view(device_id)
+        self.assertIsNone(view.is_on())
+
+        self.store.apply_status(device_id, STATUS_OFF)
+        self.assertFalse(view.is_on())
+        self.assertEqual(view.get_mode(), FunctionId.NO_FUNCTION.value)
+        self.assertEqual(view.get_function_speed(), 255 - 0x0f)
+        self.assertEqual(view.get_rgbww(), (0, 0, 0, 255, 255))
+
+        with self.assertRaises(ValueError):
+            self.store.apply_status(device_id, STATUS_OFF[:-1] + b'\x00')
+
+    def test_refresh_and_scans(self):
+        """
+        Checks that a refresh updates all devices and bulk scans find the right ones
+        """
+
+        for i in range(10):
+            self.store.add("192.168.2.%d" % i)
+
+        def send_data(host, port, data, wait_for_response=False):
+            idx = int(host.split(".")[-1])
+            if idx == 9:
+                raise ConnectionRefusedError()
+            return STATUS_ON if idx % 2 == 0 else STATUS_OFF
+
+        self.api._send_data = MagicMock(side_effect=send_data)
+
+        failed = self.store.refresh()
+
+        self.assertEqual(failed, [9])
+        self.assertEqual(self.store.get_ids_on(), [0, 2, 4, 6, 8])
+        self.assertEqual(self.store.get_ids_off(), [1, 3, 5, 7])
+        self.assertEqual(self.store.get_ids_unknown(), [9])
+        self.assertEqual(self.store.get_ids_with_mode(FunctionId.NO_FUNCTION.value), list(range(9)))
+
+    def test_view_commands(self):
+        """
+        Checks that commands sent through a view update the stored state without reading it back
+        """
+
+        device_id = self.store.add("192.168.2.10")
+        self.store.apply_status(device_id, STATUS_OFF)
+        view = self.store.get_view(device_id)
+
+        view.turn_on()
+        view.set_rgbww(1, 2, 3, 4, 5)
+        view.set_rgb(10, 20, 30)
+
+        self.assertTrue(view.is_on())
+        self.assertEqual(view.get_rgbww(), (10, 20, 30, 4, 5))
+        self.assertEqual(self.api._send_data.call_count, 3)
+        for call in self.api._send_data.call_args_list:
+            self.assertEqual(call.args[0], "192.168.2.10")
+
+    def test_commands_do_not_validate_unknown_state(self):
+        """
+        Checks that colors sent to a device that was never refreshed do not make up the rest of its state
+        """
+
+        view = self.store.get_view(self.store.add("192.168.2.10"))
+        view.set_rgb(10, 20, 30)
+
+        self.assertIsNone(view.get_rgbww())
+        self.assertIsNone(view.get_function_speed())
+        self.assertEqual(self.store.get_ids_unknown(), [0])
+
+    def test_update_state_error(self):
+        """
+        Checks that a failed update of a single view raises a device error caused by the original error
+        """
+
+        view = self.store.get_view(self.store.add("192.168.2.10"))
+        error = ConnectionRefusedError()
+        self.api._send_data = MagicMock(side_effect=error)
+
+        with self.assertRaises(DeviceConnectionError) as context:
+            view.update_state()
+        self.assertIs(context.exception.__cause__, error)
+
+        # invalid responses are not reported as connection errors
+        self.api._send_data = MagicMock(return_value=STATUS_OFF[:-1] + b'\x00')
+        with self.assertRaises(ChecksumError):
+            view.update_state()
+
+        # programming errors are not hidden as failed devices
+        self.api._send_data = MagicMock(side_effect=TypeError())
+        with self.assertRaises(TypeError):
+            self.store.refresh()
+
+    def test_add_controller(self):
+        """
+        Checks that an existing controller and its state can be added
+        """
+
+        self.api.get_state = MagicMock(return_value={
+            "device_name": 0x25,
+            "power_status": Controller.POWER_STATE_ON,
+            "mode": 0x61,
+            "speed": 5,
+            "red": 1,
+            "green": 2,
+            "blue": 3,
+            "warm_white": 4,
+            "cold_white": 5,
+        })
+        controller = Controller(self.api, "192.168.2.10", hardware_id="F0FE6B2333C6")
+
+        view = self.store.get_view(self.store.add_controller(controller))
+
+        self.assertTrue(view.is_on())
+        self.assertEqual(view.get_rgbww(), controller.get_rgbww())
+        self.assertEqual(view.get_hardware_id(), "F0FE6B2333C6")
+
+    def test_memory_is_flat(self):
+        """
+        Checks that the state of a device takes a small constant amount of memory
+        """
+
+        for i in range(1000):
+            self.store.add("10.0.%d.%d" % (i // 256, i % 256))
+
+        self.assertLess(self.store.get_memory_usage(), 1000 * 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
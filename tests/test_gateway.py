@@ -0,0 +1,226 @@
+import json
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient, ConnectionPool
+from sunix_ledstrip_controller_client.gateway import Gateway
+from tests.fake_controller import FakeController, unused_port
+
+
+class TestGateway(unittest.TestCase):
+
+    def setUp(self):
+        self.first = FakeController().__enter__()
+        self.second = FakeController().__enter__()
+        self.first.rgbww = (1, 2, 3, 4, 5)
+
+        self.api = LEDStripControllerClient(connection_pool=ConnectionPool())
+        self.offline = ("127.0.0.1", unused_port())
+        self.gateway = Gateway(self.api, {
+            "first": (self.first.host, self.first.port),
+            "second": (self.second.host, self.second.port),
+            "offline": self.offline,
+        })
+        self.address = self.gateway.start(port=0)
+
+    def tearDown(self):
+        self.gateway.stop()
+        self.api.close()
+        self.first.__exit__(None, None, None)
+        self.second.__exit__(None, None, None)
+
+    def request(self, path: str, body: dict = None) -> (int, dict):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request("http://%s:%d%s" % (self.address + (path,)), data=data)
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as ex:
+            return ex.code, json.loads(ex.read())
+
+    def test_cached_states(self):
+        """
+        Checks that states are queried once and served from the cache afterwards
+        """
+
+        status, response = self.request("/devices")
+        self.assertEqual(status, 200)
+
+        devices = {device["id"]: device for device in response["devices"]}
+        self.assertEqual(devices["first"]["state"]["rgbww"], [1, 2, 3, 4, 5])
+        self.assertFalse(devices["first"]["state"]["on"])
+        self.assertEqual(devices["first"]["source"], "device")
+        self.assertIsNone(devices["offline"]["state"])
+        self.assertIsNotNone(devices["offline"]["error"])
+
+        self.request("/devices")
+        status, response = self.request("/devices/first")
+        self.assertEqual(status, 200)
+        self.assertGreaterEqual(response["age"], 0)
+        self.assertEqual(len(self.first.get_packets(0x81)), 1)
+
+        # outdated states are refreshed on demand
+        self.request("/devices/first?max_age=0")
+        self.assertEqual(len(self.first.get_packets(0x81)), 2)
+
+        status, response = self.request("/devices/unknown")
+        self.assertEqual(status, 404)
+
+    def test_batch_commands(self):
+        """
+        Checks that one POST sets many devices and updates the cached state without querying the devices
+        """
+
+        self.request("/refresh", {})
+
+        status, response = self.request("/devices/state", {"commands": [
+            {"ids": ["first", "second", "offline"], "on": True, "rgb": [10, 20, 30]},
+            {"id": "second", "function": {"id": "RED_STROBE_FLASH", "speed": 100}},
+        ]})
+
+        self.assertEqual(status, 200)
+        results = response["results"]
+        self.assertTrue(results["first"]["ok"])
+        self.assertTrue(results["second"]["ok"])
+        self.assertFalse(results["offline"]["ok"])
+        self.assertIsNotNone(results["offline"]["error"])
+
+        self.assertEqual(self.first.wait_for_packets(1, 0x71), [b'\x71\x23\x0f\xa3'])
+        self.assertEqual(self.first.rgbww, (10, 20, 30, 4, 5))
+        self.assertEqual(self.second.wait_for_packets(1, 0x71), [b'\x71\x23\x0f\xa3'])
+        self.assertEqual(self.second.mode, 0x31)
+
+        status, response = self.request("/devices/second")
+        self.assertEqual(response["source"], "command")
+        self.assertTrue(response["state"]["on"])
+        self.assertEqual(response["state"]["function"], "RED_STROBE_FLASH")
+        self.assertEqual(response["state"]["speed"], 100)
+        self.assertEqual(len(self.second.get_packets(0x81)), 1)
+
+    def test_invalid_commands(self):
+        """
+        Checks that invalid commands are rejected before anything is sent
+        """
+
+        for commands in [
+            [{"ids": ["first"], "rgb": [256, 0, 0]}],
+            [{"ids": ["first"], "rgb": [0, 0]}],
+            [{"ids": ["first"], "on": "yes"}],
+            [{"ids": ["first"], "rgb": [True, 0, 0]}],
+            [{"ids": ["first"], "function": {"id": "SEVEN_COLOR_CROSS_FADE", "speed": False}}],
+            [{"ids": [["first"]], "on": True}],
+            [{"ids": ["first"], "brightness": 10}],
+            [{"ids": ["first"], "function": {"id": "NOPE"}}],
+            [{"rgb": [0, 0, 0]}],
+        ]:
+            status, response = self.request("/devices/state", {"commands": [{"ids": ["second"], "on": True}] + commands})
+            self.assertEqual(status, 400, commands)
+            self.assertIn("error", response)
+
+        status, response = self.request("/devices/state", {"commands": [{"ids": ["nope"], "on": True}]})
+        self.assertEqual(status, 404)
+
+        self.assertEqual(self.first.get_packets(), [])
+        self.assertEqual(self.second.get_packets(), [])
+
+    def test_commands_are_merged_in_order(self):
+        """
+        Checks that later commands for the same device replace the effect of earlier ones
+        """
+
+        status, response = self.request("/devices/state", {"commands": [
+            {"id": "first", "function": {"id": "RED_STROBE_FLASH", "speed": 100}},
+            {"id": "first", "rgb": [10, 20, 30]},
+        ]})
+
+        self.assertEqual(status, 200)
+        self.assertTrue(response["results"]["first"]["ok"])
+        self.assertEqual(self.first.wait_for_packets(1, 0x31)[0][1:4], b'\x0a\x14\x1e')
+        self.assertEqual(self.first.get_packets(0x61), [])
+
+        status, response = self.request("/devices/first")
+        self.assertEqual(response["state"]["rgbww"][:3], [10, 20, 30])
+        self.assertIsNone(response["state"]["function"])
+
+    def test_unexpected_errors(self):
+        """
+        Checks that unexpected errors are answered with a JSON error instead of dropping the request
+        """
+
+        def fail(*args):
+            raise RuntimeError("unexpected")
+
+        self.gateway.apply = fail
+        status, response = self.request("/devices/state", {"commands": [{"ids": ["first"], "on": True}]})
+        self.assertEqual(status, 500)
+        self.assertEqual(response["error"], "unexpected")
+
+
+class TestGatewayEvents(unittest.TestCase):
+
+    def test_subscribers_share_one_poller(self):
+        """
+        Checks that any amount of subscribers receives the changes found by a single poller
+        """
+
+        with FakeController() as device:
+            api = LEDStripControllerClient(connection_pool=ConnectionPool())
+            gateway = Gateway(api, [(device.host, device.port)], poll_interval=0.05)
+            device_id = "%s:%d" % (device.host, device.port)
+
+            subscriptions = [gateway.subscribe() for i in range(20)]
+            gateway.start(port=0)
+            start = time.monotonic()
+            try:
+                for subscription in subscriptions:
+                    self.assertEqual(subscription.get(timeout=1), ("snapshot", '{"devices":{}}'))
+
+                event, data = subscriptions[0].get(timeout=1)
+                self.assertEqual(event, "changes")
+                self.assertEqual(json.loads(data)["devices"][device_id]["state"]["rgbww"], [0, 0, 0, 0, 0])
+
+                # unchanged states are not published again
+                self.assertIsNone(subscriptions[0].get(timeout=0.2))
+
+                device.rgbww = (1, 2, 3, 0, 0)
+                event, data = subscriptions[0].get(timeout=1)
+                self.assertEqual(list(json.loads(data)["devices"][device_id]), ["state"])
+
+                # the amount of status requests only depends on the poll interval, not on the subscribers
+                polls = len(device.get_packets(0x81))
+                self.assertLessEqual(polls, (time.monotonic() - start) / 0.05 + 1)
+            finally:
+                gateway.stop()
+                api.close()
+
+            for subscription in subscriptions:
+                self.assertTrue(subscription.closed)
+
+    def test_event_stream(self):
+        """
+        Checks the Server-Sent Events endpoint
+        """
+
+        with FakeController() as device:
+            api = LEDStripControllerClient(connection_pool=ConnectionPool())
+            gateway = Gateway(api, {"strip": (device.host, device.port)})
+            address = gateway.start(port=0)
+            try:
+                gateway.refresh()
+                with urllib.request.urlopen("http://%s:%d/events" % address, timeout=2) as response:
+                    self.assertEqual(response.headers["Content-Type"], "text/event-stream")
+                    self.assertEqual(response.readline(), b"event: snapshot\n")
+                    snapshot = json.loads(response.readline()[len(b"data: "):])
+                    self.assertFalse(snapshot["devices"]["strip"]["state"]["on"])
+                    response.readline()
+
+                    gateway.apply([{"id": "strip", "on": True}])
+                    self.assertEqual(response.readline(), b"event: changes\n")
+                    changes = json.loads(response.readline()[len(b"data: "):])
+                    self.assertEqual(changes["devices"]["strip"]["source"], "command")
+                    self.assertTrue(changes["devices"]["strip"]["state"]["on"])
+            finally:
+                gateway.stop()
+                api.close()
@@ -0,0 +1,181 @@
+import errno
+import socket
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient, HealthMonitor, DeviceHealth
+from sunix_ledstrip_controller_client.exceptions import DeviceConnectionError
+from sunix_ledstrip_controller_client.retry import CircuitOpenError
+from tests.fake_controller import FakeController, unused_port
+
+HOST = "192.168.2.53"
+PORT = 5577
+
+
+def wait_until(predicate, timeout: float = 2) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class TestHealthMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.probe = MagicMock(return_value=False)
+        self.listener = MagicMock()
+        self.monitor = HealthMonitor(failure_threshold=2, min_probe_interval=0.01, max_probe_interval=0.04,
+                                     probe=self.probe, listener=self.listener)
+
+    def tearDown(self):
+        self.monitor.close()
+
+    def test_suspect_then_dead(self):
+        """
+        Checks that a failure makes a device suspect and consecutive failures make it dead
+        """
+
+        self.monitor.record_failure(HOST, PORT, socket.timeout())
+        self.assertEqual(self.monitor.get_health(HOST, PORT).state, DeviceHealth.SUSPECT)
+        self.monitor.check(HOST, PORT)
+
+        self.monitor.record_failure(HOST, PORT, socket.timeout())
+        self.assertEqual(self.monitor.get_states(), {(HOST, PORT): DeviceHealth.DEAD})
+        self.assertEqual(self.monitor.get_dead_devices(), [(HOST, PORT)])
+        with self.assertRaises(CircuitOpenError):
+            self.monitor.check(HOST, PORT)
+
+        self.listener.assert_any_call(HOST, PORT, DeviceHealth.SUSPECT)
+        self.listener.assert_called_with(HOST, PORT, DeviceHealth.DEAD)
+
+    def test_unreachable_is_dead_at_once(self):
+        """
+        Checks that an error that can only mean the device is unreachable marks it dead immediately
+        """
+
+        error = DeviceConnectionError("unreachable")
+        error.__cause__ = OSError(errno.EHOSTUNREACH, "No route to host")
+        self.monitor.record_failure(HOST, PORT, error)
+
+        health = self.monitor.get_health(HOST, PORT)
+        self.assertEqual(health.state, DeviceHealth.DEAD)
+        self.assertIs(health.last_error, error)
+
+    def test_probe_backoff(self):
+        """
+        Checks that the probe interval of a dead device doubles up to the maximum
+        """
+
+        self.monitor.record_failure(HOST, PORT)
+        self.monitor.record_failure(HOST, PORT)
+
+        self.assertTrue(wait_until(lambda: self.probe.call_count >= 3))
+        self.assertEqual(self.monitor.get_health(HOST, PORT).probe_interval, 0.04)
+        self.probe.assert_called_with(HOST, PORT, 0.5)
+
+    def test_probe_readmits_device(self):
+        """
+        Checks that a successful probe marks a dead device healthy again
+        """
+
+        self.monitor.record_failure(HOST, PORT)
+        self.monitor.record_failure(HOST, PORT)
+        self.probe.return_value = True
+
+        self.assertTrue(wait_until(lambda: not self.monitor.is_open(HOST, PORT)))
+        health = self.monitor.get_health(HOST, PORT)
+        self.assertEqual(health.state, DeviceHealth.HEALTHY)
+        self.assertEqual(health.failures, 0)
+        self.listener.assert_called_with(HOST, PORT, DeviceHealth.HEALTHY)
+
+    def test_success_cancels_probe(self):
+        """
+        Checks that a suspect device that answers again is not probed
+        """
+
+        self.monitor.record_failure(HOST, PORT)
+        self.monitor.record_success(HOST, PORT)
+
+        time.sleep(0.05)
+        self.probe.assert_not_called()
+        self.assertEqual(self.monitor.get_health(HOST, PORT).state, DeviceHealth.HEALTHY)
+
+    def test_idle_probe(self):
+        """
+        Checks that idle healthy devices are probed and marked suspect if the probe fails
+        """
+
+        monitor = HealthMonitor(min_probe_interval=0.01, idle_probe_interval=0.02, probe=self.probe)
+        try:
+            monitor.watch(HOST, PORT)
+            self.assertTrue(wait_until(lambda: monitor.get_health(HOST, PORT).state == DeviceHealth.SUSPECT))
+        finally:
+            monitor.close()
+
+    def test_invalid_intervals(self):
+        """
+        Checks that invalid probe intervals are rejected
+        """
+
+        with self.assertRaises(ValueError):
+            HealthMonitor(min_probe_interval=0)
+        with self.assertRaises(ValueError):
+            HealthMonitor(min_probe_interval=2, max_probe_interval=1)
+
+
+class TestHealthMonitorRouting(unittest.TestCase):
+
+    def test_fast_fail(self):
+        """
+        Checks that commands to a dead device fail without waiting for a timeout
+        """
+
+        monitor = HealthMonitor(failure_threshold=1, min_probe_interval=10)
+        api = LEDStripControllerClient(circuit_breaker=monitor)
+        port = unused_port()
+        try:
+            with self.assertRaises(DeviceConnectionError):
+                api.get_state("127.0.0.1", port)
+            self.assertEqual(monitor.get_health("127.0.0.1", port).state, DeviceHealth.DEAD)
+
+            start = time.monotonic()
+            with self.assertRaises(CircuitOpenError):
+                api.set_rgb("127.0.0.1", port, 1, 2, 3)
+            self.assertLess(time.monotonic() - start, 0.1)
+
+            with FakeController() as device:
+                api.get_state(device.host, device.port)
+                self.assertEqual(monitor.get_health(device.host, device.port).state, DeviceHealth.HEALTHY)
+        finally:
+            monitor.close()
+            api.close()
+
+    def test_moved_device(self):
+        """
+        Checks that the health of a device moves with its address and the old address is not probed anymore
+        """
+
+        probe = MagicMock(return_value=False)
+        monitor = HealthMonitor(failure_threshold=1, min_probe_interval=0.01, max_probe_interval=0.02, probe=probe)
+        api = LEDStripControllerClient(circuit_breaker=monitor)
+        try:
+            monitor.record_failure(HOST, PORT)
+            self.assertTrue(wait_until(lambda: probe.call_count >= 1))
+
+            api.move_controller(HOST, PORT, "192.168.2.54", PORT)
+            self.assertEqual(monitor.get_states(), {("192.168.2.54", PORT): DeviceHealth.DEAD})
+            self.assertTrue(monitor.is_open("192.168.2.54", PORT))
+            self.assertFalse(monitor.is_open(HOST, PORT))
+
+            probe.reset_mock()
+            self.assertTrue(wait_until(lambda: probe.call_count >= 3))
+            # a probe of the old address may have been running during the move
+            for call in probe.call_args_list[1:]:
+                self.assertEqual(call.args[:2], ("192.168.2.54", PORT))
+            self.assertNotIn((HOST, PORT), monitor.get_states())
+        finally:
+            monitor.close()
+            api.close()
@@ -0,0 +1,50 @@
+import subprocess
+import sys
+import unittest
+
+
+class TestImportTime(unittest.TestCase):
+    # generous budget for slow CI machines, a cold import usually takes ~20ms
+    IMPORT_TIME_BUDGET = 0.25
+
+    def _run_in_fresh_interpreter(self, code: str) -> str:
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, text=True)
+        return result.stdout.strip()
+
+    def test_import_does_not_load_construct(self):
+        """
+        Checks that importing the library and building/parsing packets does not import construct
+        """
+
+        output = self._run_in_fresh_interpreter(
+            "import sys\n"
+            "from sunix_ledstrip_controller_client import LEDStripControllerClient\n"
+            "from sunix_ledstrip_controller_client.packets.requests import StatusRequest\n"
+            "from sunix_ledstrip_controller_client.packets.responses import StatusResponse\n"
+            "StatusRequest().get_data()\n"
+            "StatusResponse(b'\\x81%#a!\\x05\\xff\\xff\\xff\\xff\\x01\\xff\\xffK').get_response()\n"
+            "print('construct' in sys.modules)"
+        )
+
+        self.assertEqual(output, "False")
+
+    def test_import_time_budget(self):
+        """
+        Checks that a cold import of the library stays within the import time budget
+        """
+
+        timings = []
+        for i in range(3):
+            output = self._run_in_fresh_interpreter(
+                "import time\n"
+                "start = time.perf_counter()\n"
+                "import sunix_ledstrip_controller_client\n"
+                "print(time.perf_counter() - start)"
+            )
+            timings.append(float(output))
+
+        self.assertLess(min(timings), self.IMPORT_TIME_BUDGET)
+
+
+if __name__ == '__main__':
+    unittest.main()
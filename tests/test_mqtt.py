@@ -0,0 +1,201 @@
+import json
+import unittest
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient, Controller, ControllerRegistry
+from sunix_ledstrip_controller_client.commands import validate_command, merge_commands
+from sunix_ledstrip_controller_client.connection import ConnectionPool
+from sunix_ledstrip_controller_client.functions import FunctionId
+from sunix_ledstrip_controller_client.mqtt import MqttBridge
+from sunix_ledstrip_controller_client.ratelimit import RateLimitExceeded
+from tests.fake_broker import FakeBroker
+from tests.fake_controller import FakeController, unused_port
+
+try:
+    import paho.mqtt.client as mqtt
+except ImportError:
+    mqtt = None
+
+STATUS_REQUEST_ID = 0x81
+SET_COLOR_REQUEST_ID = 0x31
+
+
+class TestMergeCommands(unittest.TestCase):
+
+    def merge(self, *commands: dict) -> dict:
+        merged = {}
+        for command in commands:
+            merged = merge_commands(merged, validate_command(command))
+        return merged
+
+    def test_later_fields_win(self):
+        """
+        Checks that the newer value of a field replaces the older one
+        """
+
+        self.assertEqual(self.merge({"rgb": [1, 2, 3], "on": True}, {"rgb": [4, 5, 6]}, {"on": False}),
+                         {"rgb": (4, 5, 6), "on": False})
+
+    def test_partial_colors(self):
+        """
+        Checks that partial colors are folded into a single full color
+        """
+
+        self.assertEqual(self.merge({"rgbww": [1, 2, 3, 4, 5]}, {"rgb": [6, 7, 8]}, {"ww": [9, 10]}),
+                         {"rgbww": (6, 7, 8, 9, 10)})
+        self.assertEqual(self.merge({"rgb": [1, 2, 3]}, {"ww": [4, 5]}), {"rgbww": (1, 2, 3, 4, 5)})
+        self.assertEqual(self.merge({"rgb": [1, 2, 3], "ww": [4, 5]}, {"rgbww": [6, 7, 8, 9, 10]}),
+                         {"rgbww": (6, 7, 8, 9, 10)})
+
+    def test_function_replaces_color(self):
+        """
+        Checks that functions and colors replace each other
+        """
+
+        self.assertEqual(self.merge({"rgb": [1, 2, 3]}, {"function": {"id": "SEVEN_COLOR_CROSS_FADE"}}),
+                         {"function": (FunctionId.SEVEN_COLOR_CROSS_FADE, 128)})
+        self.assertEqual(self.merge({"function": {"id": "SEVEN_COLOR_CROSS_FADE"}}, {"ww": [1, 2]}),
+                         {"ww": (1, 2)})
+
+
+@unittest.skipIf(mqtt is None, "paho-mqtt is not installed")
+class TestMqttBridge(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = FakeBroker().__enter__()
+        self.device = FakeController().__enter__()
+        self.device.rgbww = (1, 2, 3, 4, 5)
+
+        self.api = LEDStripControllerClient(connection_pool=ConnectionPool())
+        self.registry = ControllerRegistry(self.api)
+        self.registry.register(Controller(self.api, self.device.host, self.device.port, hardware_id="AABBCC"))
+        # Controller queries the state of the device on creation
+        offline = Controller(self.api, self.device.host, self.device.port, hardware_id="OFFLINE")
+        offline.set_address("127.0.0.1", unused_port())
+        self.registry.register(offline)
+
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        self.bridge = MqttBridge(self.api, self.registry, self.client)
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+        self.bridge.stop()
+        self.api.close()
+        self.device.__exit__(None, None, None)
+        self.broker.__exit__(None, None, None)
+
+    def connect(self) -> None:
+        self.bridge.start()
+        self.client.connect(self.broker.host, self.broker.port)
+        self.client.loop_start()
+        self.assertTrue(self.broker.wait_for_subscribers())
+
+    def get_state(self, hardware_id: str) -> dict or None:
+        payload = self.broker.retained.get("ledstrip/%s/state" % hardware_id)
+        return json.loads(payload) if payload is not None else None
+
+    def wait_for_state(self, hardware_id: str, predicate) -> dict:
+        topic = "ledstrip/%s/state" % hardware_id
+        self.assertTrue(self.broker.wait_for(
+            lambda: topic in self.broker.retained and predicate(json.loads(self.broker.retained[topic]))))
+        return self.get_state(hardware_id)
+
+    def test_retained_state(self):
+        """
+        Checks that the state and availability of all devices are published as retained messages
+        """
+
+        self.connect()
+
+        state = self.wait_for_state("AABBCC", lambda state: True)
+        self.assertEqual(state["rgbww"], [1, 2, 3, 4, 5])
+        self.assertTrue(self.broker.wait_for(lambda: "ledstrip/OFFLINE/availability" in self.broker.retained))
+        self.assertEqual(self.broker.retained["ledstrip/AABBCC/availability"], b"online")
+        self.assertEqual(self.broker.retained["ledstrip/OFFLINE/availability"], b"offline")
+        self.assertIsNone(self.get_state("OFFLINE"))
+
+    def test_set_without_status_request(self):
+        """
+        Checks that set messages are applied and the new state is published without querying the device
+        """
+
+        self.connect()
+        self.wait_for_state("AABBCC", lambda state: True)
+        status_requests = len(self.device.get_packets(STATUS_REQUEST_ID))
+
+        self.broker.publish("ledstrip/AABBCC/set", json.dumps({"rgb": [10, 20, 30], "on": True}).encode())
+
+        state = self.wait_for_state("AABBCC", lambda state: state["rgbww"][0] == 10)
+        self.assertTrue(state["on"])
+        self.assertEqual(state["rgbww"], [10, 20, 30, 4, 5])
+        self.device.wait_for_packets(1, SET_COLOR_REQUEST_ID)
+        self.assertEqual(self.device.rgbww[:3], (10, 20, 30))
+        self.assertEqual(len(self.device.get_packets(STATUS_REQUEST_ID)), status_requests)
+        self.assertEqual(self.bridge.get_stats()["sent"], 1)
+
+    def test_unchanged_state_is_not_published(self):
+        """
+        Checks that the state is only published if it changed
+        """
+
+        self.connect()
+        self.wait_for_state("AABBCC", lambda state: True)
+
+        for sent in range(1, 3):
+            self.broker.publish("ledstrip/AABBCC/set", json.dumps({"rgb": [10, 20, 30]}).encode())
+            self.assertTrue(self.broker.wait_for(lambda: self.bridge.get_stats()["sent"] == sent))
+
+        self.assertEqual(len(self.broker.get_messages("ledstrip/AABBCC/state")), 2)
+
+    def test_coalescing(self):
+        """
+        Checks that commands that arrive while a device is busy are merged into a single packet
+        """
+
+        for red in range(10):
+            self.bridge.submit("AABBCC", {"rgb": [red, 0, 0]})
+        self.bridge.submit("AABBCC", {"ww": [7, 8]})
+        self.connect()
+
+        self.wait_for_state("AABBCC", lambda state: state["rgbww"][0] == 9)
+        self.assertEqual(self.bridge.get_stats()["coalesced"], 10)
+        self.assertEqual(len(self.device.get_packets(SET_COLOR_REQUEST_ID)), 1)
+        self.assertEqual(self.device.rgbww, (9, 0, 0, 7, 8))
+
+    def test_invalid_messages(self):
+        """
+        Checks that invalid messages and messages to unknown devices are counted and ignored
+        """
+
+        self.connect()
+        self.broker.publish("ledstrip/AABBCC/set", b"no json")
+        self.broker.publish("ledstrip/AABBCC/set", json.dumps({"rgb": [256, 0, 0]}).encode())
+        self.broker.publish("ledstrip/UNKNOWN/set", json.dumps({"on": True}).encode())
+
+        self.assertTrue(self.broker.wait_for(lambda: self.bridge.get_stats()["invalid"] == 3))
+        self.assertEqual(self.device.get_packets(SET_COLOR_REQUEST_ID), [])
+
+        with self.assertRaises(KeyError):
+            self.bridge.submit("UNKNOWN", {"on": True})
+
+    def test_rate_limited_command(self):
+        """
+        Checks that a command rejected by the rate limiter is counted and the device keeps accepting commands
+        """
+
+        set_rgb = self.api.set_rgb
+
+        def rate_limited(host, port, *rgb):
+            self.api.set_rgb = set_rgb
+            raise RateLimitExceeded(host, port, 1)
+
+        self.api.set_rgb = rate_limited
+        self.connect()
+        self.wait_for_state("AABBCC", lambda state: True)
+
+        self.broker.publish("ledstrip/AABBCC/set", json.dumps({"rgb": [10, 20, 30]}).encode())
+        self.assertTrue(self.broker.wait_for(lambda: self.bridge.get_stats()["errors"] == 1))
+        self.broker.publish("ledstrip/AABBCC/set", json.dumps({"rgb": [40, 50, 60]}).encode())
+
+        self.wait_for_state("AABBCC", lambda state: state["rgbww"][0] == 40)
+        self.assertEqual(self.device.rgbww[:3], (40, 50, 60))
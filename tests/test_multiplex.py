@@ -0,0 +1,197 @@
+import socket
+import threading
+import time
+import unittest
+
+from sunix_ledstrip_controller_client import SelectorEngine, CircuitBreaker
+from sunix_ledstrip_controller_client.exceptions import DeviceConnectionRefusedError, DeviceTimeoutError
+from sunix_ledstrip_controller_client.packets.constants import STATUS_REQUEST, GET_TIME_REQUEST, TURN_ON_REQUEST
+from sunix_ledstrip_controller_client.packets.requests import UpdateColorRequest
+from sunix_ledstrip_controller_client.retry import CircuitOpenError
+from tests.fake_controller import FakeController, unused_port
+
+
+class SlowResponder:
+    """
+    Answers every status request with a response that is sent in two parts
+    """
+
+    def __init__(self, response: bytes):
+        self._response = response
+        self._server = socket.socket()
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen(1)
+        self.host, self.port = self._server.getsockname()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.close()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            connection, _ = self._server.accept()
+        except OSError:
+            return
+        with connection:
+            connection.recv(4)
+            connection.sendall(self._response[:5])
+            time.sleep(0.05)
+            connection.sendall(self._response[5:])
+            connection.recv(1)
+
+
+class TestSelectorEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = SelectorEngine(timeout=0.5)
+
+    def tearDown(self):
+        self.engine.close()
+
+    def test_batch(self):
+        """
+        Checks that requests are sent to all devices in order and that responses are returned per request
+        """
+
+        with FakeController() as first, FakeController() as second:
+            color = UpdateColorRequest().get_rgb_data(1, 2, 3)
+            results = self.engine.run([
+                ((first.host, first.port), TURN_ON_REQUEST, False),
+                ((second.host, second.port), GET_TIME_REQUEST, True),
+                ((first.host, first.port), color, False),
+                ((first.host, first.port), STATUS_REQUEST, True),
+            ])
+
+            self.assertTrue(all(result.is_ok() for result in results))
+            self.assertIsNone(results[0].value)
+            self.assertEqual(len(results[1].value), 12)
+            status = results[3].value
+            self.assertEqual(status[0], 0x81)
+            self.assertEqual(status[2], 0x23)
+            self.assertEqual(tuple(status[6:9]), (1, 2, 3))
+
+            self.assertEqual([packet[0] for packet in first.get_packets()], [0x71, 0x31, 0x81])
+            self.assertEqual(first.connections, 1)
+
+            # connections are reused by the next batch
+            states = self.engine.get_states([(first.host, first.port), (second.host, second.port)])
+            self.assertEqual(states[(first.host, first.port)]["red"], 1)
+            self.assertEqual(states[(second.host, second.port)]["power_status"], 0x24)
+            self.assertEqual((first.connections, second.connections), (1, 1))
+            self.assertEqual(len(self.engine), 2)
+
+    def test_framed_response(self):
+        """
+        Checks that a response received in multiple parts is reassembled
+        """
+
+        with FakeController() as device:
+            response = device.get_status_response()
+
+        with SlowResponder(response) as device:
+            result = self.engine.run([((device.host, device.port), STATUS_REQUEST, True)])[0]
+            self.assertEqual(result.get(), response)
+            self.engine.close()
+
+    def test_errors(self):
+        """
+        Checks that unreachable and hanging devices fail without affecting other devices
+        """
+
+        port = unused_port()
+        with FakeController() as device, FakeController(respond=False) as first_hanging, \
+                FakeController(respond=False) as second_hanging:
+            start = time.monotonic()
+            results = self.engine.run([
+                (("127.0.0.1", port), STATUS_REQUEST, True),
+                (("127.0.0.1", port), TURN_ON_REQUEST, False),
+                ((first_hanging.host, first_hanging.port), STATUS_REQUEST, True),
+                ((second_hanging.host, second_hanging.port), STATUS_REQUEST, True),
+                ((device.host, device.port), STATUS_REQUEST, True),
+            ])
+
+            # hanging devices are waited for concurrently
+            self.assertLess(time.monotonic() - start, 0.9)
+            self.assertIsInstance(results[0].error, DeviceConnectionRefusedError)
+            self.assertIsInstance(results[1].error, DeviceConnectionRefusedError)
+            self.assertIsInstance(results[2].error, DeviceTimeoutError)
+            self.assertIsInstance(results[3].error, DeviceTimeoutError)
+            self.assertTrue(results[4].is_ok())
+
+    def test_reconnect(self):
+        """
+        Checks that a connection closed by the device is replaced transparently
+        """
+
+        with FakeController() as device:
+            self.engine.run([((device.host, device.port), STATUS_REQUEST, True)])
+            # simulate a connection that was closed by the device
+            self.engine._connections[(device.host, device.port)][0].shutdown(socket.SHUT_RDWR)
+
+            result = self.engine.run([((device.host, device.port), STATUS_REQUEST, True)])[0]
+            self.assertTrue(result.is_ok())
+            self.assertEqual(device.connections, 2)
+
+    def test_unread_replies_are_discarded(self):
+        """
+        Checks that replies to commands that were not waited for are discarded before the next request
+        """
+
+        with FakeController(confirm=True) as device:
+            address = (device.host, device.port)
+            self.assertTrue(self.engine.run([(address, TURN_ON_REQUEST, False)])[0].is_ok())
+            device.wait_for_packets(1)
+            # give the reply time to arrive
+            time.sleep(0.05)
+
+            state = self.engine.get_states([address])[address]
+            self.assertEqual(state["power_status"], 0x23)
+            self.assertEqual(device.connections, 1)
+
+    def test_connection_limit(self):
+        """
+        Checks that devices wait for a free connection slot
+        """
+
+        engine = SelectorEngine(max_connections=1)
+        with FakeController() as first, FakeController() as second, FakeController() as third:
+            devices = (first, second, third)
+            results = engine.run([((device.host, device.port), STATUS_REQUEST, True) for device in devices] * 2)
+
+            self.assertTrue(all(result.is_ok() for result in results))
+            self.assertEqual([device.connections for device in devices], [1, 1, 1])
+            engine.close()
+
+    def test_circuit_breaker(self):
+        """
+        Checks that requests to devices considered offline fail without touching the network
+        """
+
+        breaker = CircuitBreaker(failure_threshold=1, probe_interval=10)
+        engine = SelectorEngine(circuit_breaker=breaker)
+        port = unused_port()
+
+        engine.run([(("127.0.0.1", port), STATUS_REQUEST, True)])
+        self.assertTrue(breaker.is_open("127.0.0.1", port))
+
+        result = engine.run([(("127.0.0.1", port), STATUS_REQUEST, True)])[0]
+        self.assertIsInstance(result.error, CircuitOpenError)
+
+    def test_invalid_requests(self):
+        """
+        Checks that invalid arguments are rejected
+        """
+
+        with self.assertRaises(ValueError):
+            self.engine.run([("127.0.0.1", b'', False)])
+        with self.assertRaises(ValueError):
+            self.engine.run([("127.0.0.1", [0x81], True)])
+        with self.assertRaises(ValueError):
+            SelectorEngine(timeout=0)
+        with self.assertRaises(ValueError):
+            SelectorEngine(max_connections=0)
@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import MagicMock
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient, Controller
+from sunix_ledstrip_controller_client.packets import TransitionType
+from sunix_ledstrip_controller_client.packets.cache import PacketCache
+from sunix_ledstrip_controller_client.packets.requests import SetCustomFunctionRequest
+
+HOST = "192.168.2.53"
+PORT = 5577
+
+
+class TestPacketCache(unittest.TestCase):
+
+    def test_lru(self):
+        """
+        Checks that the least recently used packet is evicted
+        """
+
+        cache = PacketCache(maxsize=2)
+
+        cache.get_or_create("a", lambda: b'\x01')
+        cache.get_or_create("b", lambda: b'\x02')
+        cache.get_or_create("a", lambda: b'\xff')
+        cache.get_or_create("c", lambda: b'\x03')
+
+        self.assertEqual(cache.get_or_create("a", lambda: b'\xff'), b'\x01')
+        self.assertEqual(cache.get_or_create("b", lambda: b'\xff'), b'\xff')
+        self.assertEqual(cache.get_stats(), dict(hits=2, misses=4, size=2, maxsize=2))
+
+    def test_errors_are_not_cached(self):
+        """
+        Checks that a failing encoder does not leave an entry in the cache
+        """
+
+        cache = PacketCache()
+
+        def fail():
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            cache.get_or_create("a", fail)
+        self.assertEqual(len(cache), 0)
+
+    def test_custom_function_cache(self):
+        """
+        Checks that repeated custom functions are encoded only once and shared with Controller objects
+        """
+
+        cache = PacketCache()
+        api = LEDStripControllerClient(custom_function_cache=cache)
+        api._send_data = MagicMock(return_value=None)
+        api.get_state = MagicMock(return_value={
+            "device_name": 0x25,
+            "power_status": 0x23,
+            "mode": 0x61,
+            "speed": 0,
+            "red": 0,
+            "green": 0,
+            "blue": 0,
+            "warm_white": 0,
+            "cold_white": 0,
+        })
+        controller = Controller(api, HOST, PORT)
+
+        colors = [(255, 0, 0), (0, 255, 0, 0)]
+        api.set_custom_function(HOST, PORT, colors, 100, TransitionType.Jumping)
+        controller.set_custom_function([list(color) for color in colors], 100, TransitionType.Jumping)
+        api.set_custom_function(HOST, PORT, colors, 100, TransitionType.Strobe)
+
+        self.assertEqual(api.get_custom_function_cache_stats()["hits"], 1)
+        self.assertEqual(api.get_custom_function_cache_stats()["misses"], 2)
+
+        expected = SetCustomFunctionRequest().get_data(colors, 100, TransitionType.Jumping)
+        self.assertEqual(api._send_data.call_args_list[0].args, (HOST, PORT, expected))
+        self.assertEqual(api._send_data.call_args_list[1].args, (HOST, PORT, expected))
+
+    def test_invalid_custom_function(self):
+        """
+        Checks that invalid colors are still rejected
+        """
+
+        api = LEDStripControllerClient(custom_function_cache=PacketCache())
+        api._send_data = MagicMock(return_value=None)
+
+        for i in range(2):
+            with self.assertRaises(ValueError):
+                api.set_custom_function(HOST, PORT, [(256, 0, 0)], 100)
+
+        api._send_data.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
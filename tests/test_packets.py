@@ -39,6 +39,87 @@ class TestPackets(unittest.TestCase):
 
         self.assertEqual(valid, True)
 
+    def test_parse_response_data_too_short(self):
+        """
+        Checks if truncated response data is rejected
+        """
+
+        from sunix_ledstrip_controller_client.packets.responses import StatusResponse
+
+        with self.assertRaises(ValueError):
+            StatusResponse(b'\x81%#a!').get_response()
+
+    def test_build_matches_construct(self):
+        """
+        Checks if the precomputed packet layouts produce the same bytes as construct
+        """
+
+        import datetime
+        from sunix_ledstrip_controller_client import FunctionId
+        from sunix_ledstrip_controller_client.packets import TransitionType
+        from sunix_ledstrip_controller_client.packets import compat
+        from sunix_ledstrip_controller_client.packets.requests import GetTimeRequest, SetTimeRequest, \
+            StatusRequest, SetPowerRequest, UpdateColorRequest, SetFunctionRequest, SetCustomFunctionRequest, \
+            GetTimerRequest
+
+        requests = [
+            (GetTimeRequest(), lambda r: r.get_data()),
+            (SetTimeRequest(), lambda r: r.get_data(datetime.datetime(2021, 3, 4, 5, 6, 7))),
+            (StatusRequest(), lambda r: r.get_data()),
+            (SetPowerRequest(), lambda r: r.get_data(True)),
+            (SetPowerRequest(), lambda r: r.get_data(False)),
+            (UpdateColorRequest(), lambda r: r.get_rgbww_data(1, 2, 3, 4, 5)),
+            (UpdateColorRequest(), lambda r: r.get_rgb_data(1, 2, 3)),
+            (UpdateColorRequest(), lambda r: r.get_ww_data(4, 5)),
+            (SetFunctionRequest(), lambda r: r.get_data(FunctionId.RED_GRADUAL_CHANGE, 100)),
+            (SetCustomFunctionRequest(), lambda r: r.get_data([(1, 2, 3), (4, 5, 6, 7)], 100, TransitionType.Strobe)),
+            (GetTimerRequest(), lambda r: r.get_data()),
+        ]
+
+        for request, get_data in requests:
+            data = get_data(request)
+            expected = compat.get_struct(request).build(request._params)
+
+            self.assertEqual(data, expected)
+            self.assertEqual(len(data), request.sizeof())
+
+    def test_constants_match_construct(self):
+        """
+        Checks if the precomputed constant packets are identical to the construct-built packets
+        """
+
+        from sunix_ledstrip_controller_client.packets import compat, constants
+        from sunix_ledstrip_controller_client.packets.requests import GetTimeRequest, StatusRequest, \
+            SetPowerRequest, GetTimerRequest
+
+        packets = [
+            (constants.STATUS_REQUEST, StatusRequest(), lambda r: r.get_data()),
+            (constants.GET_TIME_REQUEST, GetTimeRequest(), lambda r: r.get_data()),
+            (constants.GET_TIMER_REQUEST, GetTimerRequest(), lambda r: r.get_data()),
+            (constants.TURN_ON_REQUEST, SetPowerRequest(), lambda r: r.get_data(True)),
+            (constants.TURN_OFF_REQUEST, SetPowerRequest(), lambda r: r.get_data(False)),
+        ]
+
+        for constant, request, get_data in packets:
+            self.assertIsInstance(constant, bytes)
+            self.assertEqual(constant, get_data(request))
+            self.assertEqual(constant, compat.get_struct(request).build(request._params))
+
+    def test_parse_matches_construct(self):
+        """
+        Checks if the precomputed packet layouts parse data the same way as construct
+        """
+
+        from sunix_ledstrip_controller_client.packets import compat
+        from sunix_ledstrip_controller_client.packets.responses import StatusResponse
+
+        data = b'\x81%#a!\x0f\x00\x00\x00\xff\x01\xff\x0fh'
+        response = StatusResponse(data).get_response()
+        expected = compat.parse(StatusResponse, data)
+
+        for field in StatusResponse._layout:
+            self.assertEqual(response[field], expected[field])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient, Controller, ConnectionPool, profiling
+from tests.fake_controller import FakeController
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeController().__enter__()
+        self.api = LEDStripControllerClient(connection_pool=ConnectionPool())
+        self.profiler = profiling.enable()
+
+    def tearDown(self):
+        profiling.disable()
+        self.api.close()
+        self.device.__exit__(None, None, None)
+
+    def test_phases(self):
+        """
+        Checks that the time of an operation is attributed to its phases
+        """
+
+        for _ in range(3):
+            self.api.get_state(self.device.host, self.device.port)
+        self.api.set_rgb(self.device.host, self.device.port, 1, 2, 3)
+
+        stats = self.profiler.get_stats()
+        self.assertEqual(stats["get_state"]["count"], 3)
+        phases = stats["get_state"]["phases"]
+        self.assertEqual(list(phases), ["encode", "queue", "connect", "send", "wait", "decode"])
+        # the pooled connection is only opened once
+        self.assertEqual(phases["connect"]["count"], 1)
+        self.assertEqual(phases["wait"]["count"], 3)
+        self.assertLessEqual(sum(phase["wall"] for phase in phases.values()), stats["get_state"]["wall"])
+
+        self.assertEqual(set(stats["set_rgb"]["phases"]), {"encode", "queue", "send"})
+
+    def test_nested_operations(self):
+        """
+        Checks that nested operations are recorded separately
+        """
+
+        controller = Controller(self.api, self.device.host, self.device.port)
+        self.api.set_kelvin(self.device.host, self.device.port, 3000)
+
+        stats = self.profiler.get_stats()
+        self.assertIn("apply", stats["Controller.update_state"]["phases"])
+        self.assertNotIn("wait", stats["Controller.update_state"]["phases"])
+        self.assertEqual(stats["get_state"]["count"], 1)
+        self.assertEqual(set(stats["set_kelvin"]["phases"]), {"encode"})
+        self.assertEqual(stats["set_rgbww"]["count"], 1)
+        self.assertIsNotNone(controller.get_rgbww())
+
+        report = self.profiler.format_report()
+        for name in ("Controller.update_state", "get_state", "set_kelvin", "set_rgbww"):
+            self.assertIn(name, report)
+
+    def test_disable(self):
+        """
+        Checks that nothing is recorded while profiling is disabled
+        """
+
+        self.assertIs(profiling.disable(), self.profiler)
+        self.assertIsNone(profiling.get_profiler())
+
+        self.api.get_state(self.device.host, self.device.port)
+        self.assertEqual(self.profiler.get_stats(), {})
+
+    def test_allocations(self):
+        """
+        Checks that allocations are only reported if they are tracked
+        """
+
+        self.api.get_state(self.device.host, self.device.port)
+        self.assertNotIn("KiB", self.profiler.format_report().splitlines()[1])
+
+        profiler = profiling.enable(track_allocations=True)
+        self.api.get_state(self.device.host, self.device.port)
+        self.assertTrue(profiler.track_allocations)
+        self.assertIn("decode", profiler.get_stats()["get_state"]["phases"])
+
+    def test_environment_variable(self):
+        """
+        Checks that the environment variable enables profiling and prints the report on exit
+        """
+
+        code = ("from sunix_ledstrip_controller_client import profiling\n"
+                "profiling.get_profiler().begin('operation')\n"
+                "profiling.mark('send')\n"
+                "profiling.get_profiler().end()\n")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                env=dict(os.environ, **{profiling.ENV_VARIABLE: "1"}))
+
+        self.assertIn("operation", result.stderr)
+        self.assertIn("send", result.stderr)
@@ -0,0 +1,168 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient
+from sunix_ledstrip_controller_client.packets.requests import UpdateColorRequest
+from sunix_ledstrip_controller_client.ratelimit import RateLimiter, RateLimitPolicy, RateLimitExceeded, TokenBucket
+
+HOST = "192.168.2.53"
+PORT = 5577
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_token_bucket(self):
+        """
+        Checks that a token bucket allows a burst and then reports the time until the next token
+        """
+
+        bucket = TokenBucket(rate=10, capacity=2)
+        now = time.monotonic()
+
+        self.assertEqual(bucket.try_consume(now), 0)
+        self.assertEqual(bucket.try_consume(now), 0)
+        self.assertAlmostEqual(bucket.try_consume(now), 0.1, places=3)
+        self.assertEqual(bucket.try_consume(now + 0.11), 0)
+
+    def test_block(self):
+        """
+        Checks that the block policy delays packets that exceed the budget
+        """
+
+        limiter = RateLimiter(rate=50, burst=1, policy=RateLimitPolicy.Block)
+        sent = []
+
+        start = time.monotonic()
+        for i in range(3):
+            limiter.submit(HOST, PORT, bytes([i]), sent.append)
+        duration = time.monotonic() - start
+
+        self.assertEqual(sent, [b'\x00', b'\x01', b'\x02'])
+        self.assertGreaterEqual(duration, 0.035)
+
+        metrics = limiter.get_metrics(HOST, PORT)
+        self.assertEqual(metrics["sent"], 3)
+        self.assertGreater(metrics["throttle_time"], 0)
+
+    def test_raise(self):
+        """
+        Checks that the raise policy rejects packets that exceed the budget
+        """
+
+        limiter = RateLimiter(rate=1, burst=1, policy=RateLimitPolicy.Raise)
+        sent = []
+
+        limiter.submit(HOST, PORT, b'\x31', sent.append)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.submit(HOST, PORT, b'\x31', sent.append)
+
+        # other devices have their own budget
+        limiter.submit("192.168.2.54", PORT, b'\x31', sent.append)
+        self.assertEqual(len(sent), 2)
+
+    def test_drop_oldest(self):
+        """
+        Checks that the drop oldest policy queues packets and drops the oldest ones if the queue is full
+        """
+
+        limiter = RateLimiter(rate=1000, burst=1, policy=RateLimitPolicy.DropOldest, max_queue_size=2)
+        sent = []
+        lock = limiter._condition
+
+        with lock:
+            limiter.submit(HOST, PORT, b'\x01', sent.append)
+            for i in range(2, 6):
+                self.assertIsNone(limiter.submit(HOST, PORT, bytes([i]), sent.append))
+
+            metrics = limiter.get_metrics(HOST, PORT)
+            self.assertEqual(metrics["queue_depth"], 2)
+
+        self.assertTrue(limiter.flush(timeout=1))
+        self.assertEqual(sent, [b'\x01', b'\x04', b'\x05'])
+
+        metrics = limiter.get_metrics(HOST, PORT)
+        self.assertEqual(metrics["dropped"], 2)
+        self.assertEqual(metrics["queue_depth"], 0)
+        self.assertEqual(metrics["max_queue_depth"], 2)
+
+    def test_coalesce(self):
+        """
+        Checks that the coalesce policy replaces queued packets of the same type
+        """
+
+        limiter = RateLimiter(rate=1000, burst=1, policy=RateLimitPolicy.Coalesce)
+        sent = []
+
+        with limiter._condition:
+            limiter.submit(HOST, PORT, b'\x31\x01', sent.append)
+            limiter.submit(HOST, PORT, b'\x31\x02', sent.append)
+            limiter.submit(HOST, PORT, b'\x71\x23', sent.append)
+            limiter.submit(HOST, PORT, b'\x31\x03', sent.append)
+
+        self.assertTrue(limiter.flush(timeout=1))
+        # the newer packet is queued behind the packets that were queued after the superseded one
+        self.assertEqual(sent, [b'\x31\x01', b'\x71\x23', b'\x31\x03'])
+        self.assertEqual(limiter.get_metrics(HOST, PORT)["coalesced"], 1)
+
+    def test_coalesce_color_selection(self):
+        """
+        Checks that the coalesce policy keeps RGB and warm white updates that share the color packet id
+        """
+
+        limiter = RateLimiter(rate=1000, burst=1, policy=RateLimitPolicy.Coalesce)
+        request = UpdateColorRequest()
+        sent = []
+
+        with limiter._condition:
+            limiter.submit(HOST, PORT, request.get_rgb_data(1, 2, 3), sent.append)
+            limiter.submit(HOST, PORT, request.get_rgb_data(4, 5, 6), sent.append)
+            limiter.submit(HOST, PORT, request.get_rgb_data(7, 8, 9), sent.append)
+            limiter.submit(HOST, PORT, request.get_ww_data(10, 11), sent.append)
+
+        self.assertTrue(limiter.flush(timeout=1))
+        self.assertEqual(sent, [request.get_rgb_data(1, 2, 3), request.get_rgb_data(7, 8, 9),
+                                request.get_ww_data(10, 11)])
+        self.assertEqual(limiter.get_metrics(HOST, PORT)["coalesced"], 1)
+
+    def test_coalesce_keeps_order_of_types(self):
+        """
+        Checks that a coalesced packet is not overtaken by older packets of other types
+        """
+
+        limiter = RateLimiter(rate=1000, burst=1, policy=RateLimitPolicy.Coalesce)
+        request = UpdateColorRequest()
+        sent = []
+
+        with limiter._condition:
+            limiter.submit(HOST, PORT, request.get_rgb_data(1, 1, 1), sent.append)
+            limiter.submit(HOST, PORT, request.get_rgbww_data(2, 2, 2, 2, 2), sent.append)
+            limiter.submit(HOST, PORT, request.get_rgb_data(3, 3, 3), sent.append)
+            limiter.submit(HOST, PORT, request.get_rgbww_data(9, 9, 9, 9, 9), sent.append)
+
+        self.assertTrue(limiter.flush(timeout=1))
+        # the last packet determines the final color of the device
+        self.assertEqual(sent, [request.get_rgb_data(1, 1, 1), request.get_rgb_data(3, 3, 3),
+                                request.get_rgbww_data(9, 9, 9, 9, 9)])
+        self.assertEqual(limiter.get_metrics(HOST, PORT)["coalesced"], 1)
+
+    def test_client_send_path(self):
+        """
+        Checks that the client sends its packets through the rate limiter
+        """
+
+        limiter = RateLimiter(rate=1, burst=1, policy=RateLimitPolicy.Raise)
+        api = LEDStripControllerClient(rate_limiter=limiter)
+        api._transmit = MagicMock(return_value=None)
+
+        api.set_rgb(HOST, PORT, 255, 0, 0)
+        with self.assertRaises(RateLimitExceeded):
+            api.set_rgb(HOST, PORT, 0, 255, 0)
+
+        api._transmit.assert_called_once()
+        self.assertEqual(api.get_rate_limit_metrics(HOST, PORT)["sent"], 1)
+        self.assertIsNone(LEDStripControllerClient().get_rate_limit_metrics())
+
+
+if __name__ == '__main__':
+    unittest.main()
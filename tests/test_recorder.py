@@ -0,0 +1,137 @@
+import os
+import tempfile
+import unittest
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient
+from sunix_ledstrip_controller_client.connection import ConnectionPool
+from sunix_ledstrip_controller_client.packets import constants
+from sunix_ledstrip_controller_client.recorder import TrafficRecorder, read_recording, replay, main, \
+    DIRECTION_SENT, DIRECTION_RECEIVED
+from tests.fake_controller import FakeController, unused_port
+
+HOST = "192.168.2.53"
+PORT = 5577
+
+
+class TestTrafficRecorder(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".bin")
+        os.close(handle)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_round_trip(self):
+        """
+        Checks that recorded packets are read back in order
+        """
+
+        with TrafficRecorder(self.path) as recorder:
+            recorder.record(HOST, PORT, DIRECTION_SENT, b'\x81\x8a\x8b\x96', timestamp=10.0)
+            recorder.record(HOST, PORT, DIRECTION_RECEIVED, b'\x81\x25', timestamp=10.5)
+            recorder.record("192.168.2.54", PORT, DIRECTION_SENT, b'\x71\x23\x0f\xa3', timestamp=11.0)
+
+        # appending to an existing recording reuses the host ids of the file
+        with TrafficRecorder(self.path) as recorder:
+            recorder.record(HOST, PORT, DIRECTION_SENT, b'\x71\x24\x0f\xa4', timestamp=12.0)
+
+        packets = list(read_recording(self.path))
+        self.assertEqual([(p.timestamp, p.direction, p.host, p.data) for p in packets], [
+            (10.0, DIRECTION_SENT, HOST, b'\x81\x8a\x8b\x96'),
+            (10.5, DIRECTION_RECEIVED, HOST, b'\x81\x25'),
+            (11.0, DIRECTION_SENT, "192.168.2.54", b'\x71\x23\x0f\xa3'),
+            (12.0, DIRECTION_SENT, HOST, b'\x71\x24\x0f\xa4'),
+        ])
+
+    def test_invalid_file(self):
+        """
+        Checks that files that are not a recording are rejected
+        """
+
+        with open(self.path, "wb") as file:
+            file.write(b'something else')
+
+        with self.assertRaises(ValueError):
+            list(read_recording(self.path))
+
+    def test_truncated_record(self):
+        """
+        Checks that an incomplete last record is skipped and dropped when the recording is continued
+        """
+
+        with TrafficRecorder(self.path) as recorder:
+            recorder.record(HOST, PORT, DIRECTION_SENT, b'\x81\x8a\x8b\x96', timestamp=10.0)
+            recorder.record("192.168.2.54", PORT, DIRECTION_SENT, b'\x71\x23\x0f\xa3', timestamp=11.0)
+        complete_size = os.path.getsize(self.path)
+
+        for size in range(complete_size - 1, complete_size - 30, -1):
+            os.truncate(self.path, size)
+            self.assertEqual([p.timestamp for p in read_recording(self.path)], [10.0])
+
+        with TrafficRecorder(self.path) as recorder:
+            recorder.record("192.168.2.54", PORT, DIRECTION_SENT, b'\x71\x24\x0f\xa4', timestamp=12.0)
+
+        self.assertEqual([(p.timestamp, p.host) for p in read_recording(self.path)],
+                         [(10.0, HOST), (12.0, "192.168.2.54")])
+
+    def test_failed_requests_are_not_recorded(self):
+        """
+        Checks that packets are only recorded once they were sent
+        """
+
+        with TrafficRecorder(self.path) as recorder:
+            api = LEDStripControllerClient(recorder=recorder)
+            with self.assertRaises(ConnectionError):
+                api.turn_on("127.0.0.1", unused_port())
+
+        self.assertEqual(list(read_recording(self.path)), [])
+
+    def test_record_and_replay(self):
+        """
+        Records a session of a client and replays it against another device
+        """
+
+        with FakeController() as device, TrafficRecorder(self.path) as recorder:
+            api = LEDStripControllerClient(recorder=recorder)
+            api.turn_on(device.host, device.port)
+            api.set_rgb(device.host, device.port, 1, 2, 3)
+            api.get_state(device.host, device.port)
+
+        packets = list(read_recording(self.path))
+        self.assertEqual([p.direction for p in packets],
+                         [DIRECTION_SENT, DIRECTION_SENT, DIRECTION_SENT, DIRECTION_RECEIVED])
+        self.assertEqual(packets[2].data, constants.STATUS_REQUEST)
+
+        with FakeController() as target:
+            api = LEDStripControllerClient(connection_pool=ConnectionPool())
+            report = replay(self.path, api, speed=None, target=lambda host, port: (target.host, target.port))
+            api.close()
+
+            self.assertEqual(target.get_packets(), [p.data for p in packets if p.is_sent()])
+            self.assertEqual(target.rgbww, (1, 2, 3, 0, 0))
+
+        self.assertEqual(report["packets"], 3)
+        self.assertEqual(report["errors"], 0)
+        self.assertGreater(report["throughput"], 0)
+        self.assertIsNotNone(report["latency_max"])
+
+    def test_replay_speed(self):
+        """
+        Checks that the original timing is scaled by the replay speed
+        """
+
+        with FakeController() as target:
+            with TrafficRecorder(self.path) as recorder:
+                recorder.record(HOST, PORT, DIRECTION_SENT, constants.TURN_ON_REQUEST, timestamp=100.0)
+                recorder.record(HOST, PORT, DIRECTION_SENT, constants.TURN_OFF_REQUEST, timestamp=100.4)
+
+            report = main([self.path, "--speed", "2", "--target", "%s:%d" % (target.host, target.port)])
+
+            self.assertEqual(target.wait_for_packets(2), [constants.TURN_ON_REQUEST, constants.TURN_OFF_REQUEST])
+
+        self.assertEqual(report["packets"], 2)
+        self.assertGreaterEqual(report["duration"], 0.2)
+        self.assertIsNone(report["latency_avg"])
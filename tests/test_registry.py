@@ -0,0 +1,113 @@
+import unittest
+from unittest.mock import MagicMock
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient, Controller, ControllerRegistry
+from sunix_ledstrip_controller_client.connection import ConnectionPool
+from tests.fake_controller import FakeController
+
+STATE = dict(device_name=0x25, power_status=0x23, mode=0x61, speed=0x10,
+             red=1, green=2, blue=3, warm_white=4, cold_white=5)
+
+
+class TestControllerRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.api = LEDStripControllerClient()
+        self.api.get_state = MagicMock(return_value=dict(STATE))
+        self.api.move_controller = MagicMock()
+        self.registry = ControllerRegistry(self.api)
+
+    def test_lookup(self):
+        """
+        Checks that controllers can be found by hardware id, name and address
+        """
+
+        controller = self.registry.register(Controller(self.api, "192.168.2.10", hardware_id="F0FE6B2333C6"))
+
+        self.assertIs(self.registry.get("F0FE6B2333C6"), controller)
+        self.assertEqual(self.registry.get_by_name(0x25), [controller])
+        self.assertIs(self.registry.get_by_address("192.168.2.10"), controller)
+        self.assertIsNone(self.registry.get_by_address("192.168.2.10", 1234))
+        self.assertIn("F0FE6B2333C6", self.registry)
+        self.assertEqual(len(self.registry), 1)
+
+        with self.assertRaises(ValueError):
+            self.registry.register(Controller(self.api, "192.168.2.11"))
+
+        self.assertIs(self.registry.remove("F0FE6B2333C6"), controller)
+        self.assertIsNone(self.registry.get_by_address("192.168.2.10"))
+        self.assertEqual(len(self.registry), 0)
+
+    def test_lookup_by_shared_name(self):
+        """
+        Checks that all devices of the same model are found by their shared device name
+        """
+
+        first = self.registry.register(Controller(self.api, "192.168.2.10", hardware_id="F0FE6B2333C6"))
+        second = self.registry.register(Controller(self.api, "192.168.2.11", hardware_id="F0FE6B2333C7"))
+
+        self.assertEqual(self.registry.get_by_name(0x25), [first, second])
+        self.assertEqual(self.registry.get_by_name(0x33), [])
+
+        # moving a device keeps it in the name index exactly once
+        self.registry.register(Controller(self.api, "192.168.2.12", hardware_id="F0FE6B2333C6"))
+        self.assertEqual(self.registry.get_by_name(0x25), [second, first])
+
+        self.registry.remove("F0FE6B2333C7")
+        self.registry.remove("F0FE6B2333C6")
+        self.assertEqual(self.registry.get_by_name(0x25), [])
+
+    def test_address_change(self):
+        """
+        Checks that a device with a new address keeps its controller object and state
+        """
+
+        controller = self.registry.register(Controller(self.api, "192.168.2.10", hardware_id="F0FE6B2333C6"))
+        controller._rgbww = (9, 9, 9, 9, 9)
+
+        moved = self.registry.update([Controller(self.api, "192.168.2.20", hardware_id="F0FE6B2333C6", model="AK001")])
+
+        self.assertEqual(moved, [controller])
+        self.assertEqual(controller.get_host(), "192.168.2.20")
+        self.assertEqual(controller.get_model(), "AK001")
+        self.assertEqual(controller.get_rgbww(), (9, 9, 9, 9, 9))
+        self.assertIsNone(self.registry.get_by_address("192.168.2.10"))
+        self.assertIs(self.registry.get_by_address("192.168.2.20"), controller)
+        self.api.move_controller.assert_called_once_with("192.168.2.10", 5577, "192.168.2.20", 5577)
+
+        # an unchanged address doesn't touch the connections
+        self.registry.register(Controller(self.api, "192.168.2.20", hardware_id="F0FE6B2333C6"))
+        self.assertEqual(self.api.move_controller.call_count, 1)
+
+    def test_address_swap(self):
+        """
+        Checks that two devices can swap their addresses
+        """
+
+        first = self.registry.register(Controller(self.api, "192.168.2.10", hardware_id="A"))
+        second = self.registry.register(Controller(self.api, "192.168.2.11", hardware_id="B"))
+
+        self.registry.update([Controller(self.api, "192.168.2.11", hardware_id="A"),
+                              Controller(self.api, "192.168.2.10", hardware_id="B")])
+
+        self.assertIs(self.registry.get_by_address("192.168.2.11"), first)
+        self.assertIs(self.registry.get_by_address("192.168.2.10"), second)
+
+    def test_pooled_connection_is_moved(self):
+        """
+        Checks that the persistent connection follows the device to its new address
+        """
+
+        with FakeController() as old_device, FakeController() as new_device:
+            pool = ConnectionPool()
+            api = LEDStripControllerClient(connection_pool=pool)
+            registry = ControllerRegistry(api)
+
+            controller = registry.register(Controller(api, old_device.host, old_device.port, "F0FE6B2333C6"))
+            registry.register(Controller(api, new_device.host, new_device.port, "F0FE6B2333C6"))
+            controller.turn_on()
+
+            self.assertEqual(len(old_device.get_packets()), 1)
+            self.assertEqual(new_device.get_packets(0x71), [b'\x71\x23\x0f\xa3'])
+            self.assertEqual(len(pool), 1)
+            api.close()
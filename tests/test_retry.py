@@ -0,0 +1,137 @@
+import socket
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient
+from sunix_ledstrip_controller_client.retry import RetryPolicy, CircuitBreaker, CircuitOpenError
+
+HOST = "192.168.2.53"
+PORT = 5577
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_retry_until_success(self):
+        """
+        Checks that failed attempts are retried
+        """
+
+        policy = RetryPolicy(attempts=3, timeout=0.5, backoff=0.001)
+        operation = MagicMock(side_effect=[socket.timeout(), ConnectionRefusedError(), b'ok'])
+
+        self.assertEqual(policy.execute(operation), b'ok')
+        self.assertEqual(operation.call_count, 3)
+        operation.assert_called_with(0.5)
+
+    def test_attempts_exhausted(self):
+        """
+        Checks that the last error is raised when all attempts failed
+        """
+
+        policy = RetryPolicy(attempts=2, backoff=0.001)
+        operation = MagicMock(side_effect=socket.timeout())
+
+        with self.assertRaises(socket.timeout):
+            policy.execute(operation)
+        self.assertEqual(operation.call_count, 2)
+
+    def test_other_errors_are_not_retried(self):
+        """
+        Checks that only network errors are retried
+        """
+
+        policy = RetryPolicy(attempts=3, backoff=0.001)
+        operation = MagicMock(side_effect=ValueError())
+
+        with self.assertRaises(ValueError):
+            policy.execute(operation)
+        self.assertEqual(operation.call_count, 1)
+
+    def test_deadline(self):
+        """
+        Checks that the deadline limits the total time of all attempts
+        """
+
+        policy = RetryPolicy(attempts=100, timeout=1, deadline=0.1, backoff=0.02, jitter=0)
+
+        def operation(timeout):
+            self.assertLessEqual(timeout, 0.1)
+            raise socket.timeout()
+
+        start = time.monotonic()
+        with self.assertRaises(socket.timeout):
+            policy.execute(operation)
+        self.assertLess(time.monotonic() - start, 0.2)
+
+    def test_backoff(self):
+        """
+        Checks that the backoff grows exponentially, is jittered and capped
+        """
+
+        policy = RetryPolicy(backoff=0.1, max_backoff=0.5, jitter=0.5)
+
+        for retry, maximum in [(0, 0.1), (1, 0.2), (2, 0.4), (3, 0.5), (10, 0.5)]:
+            for i in range(100):
+                delay = policy.get_delay(retry)
+                self.assertLessEqual(delay, maximum)
+                self.assertGreaterEqual(delay, maximum / 2)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_circuit_opens_and_fails_fast(self):
+        """
+        Checks that commands to a device fail immediately after repeated timeouts
+        """
+
+        breaker = CircuitBreaker(failure_threshold=2, probe_interval=60, probe=MagicMock(return_value=False))
+        api = LEDStripControllerClient(circuit_breaker=breaker)
+        api._transmit = MagicMock(side_effect=socket.timeout())
+
+        for i in range(2):
+            with self.assertRaises(socket.timeout):
+                api.turn_on(HOST, PORT)
+
+        with self.assertRaises(CircuitOpenError):
+            api.turn_on(HOST, PORT)
+
+        self.assertEqual(api._transmit.call_count, 2)
+        self.assertTrue(breaker.is_open(HOST, PORT))
+        self.assertFalse(breaker.is_open("192.168.2.54", PORT))
+
+    def test_success_resets_failures(self):
+        """
+        Checks that only consecutive failures open the circuit
+        """
+
+        breaker = CircuitBreaker(failure_threshold=2)
+
+        breaker.record_failure(HOST, PORT)
+        breaker.record_success(HOST, PORT)
+        breaker.record_failure(HOST, PORT)
+
+        self.assertFalse(breaker.is_open(HOST, PORT))
+
+    def test_probe_closes_circuit(self):
+        """
+        Checks that the background probe closes the circuit once the device is reachable again
+        """
+
+        probe = MagicMock(return_value=True)
+        breaker = CircuitBreaker(failure_threshold=1, probe_interval=0.01, probe=probe)
+
+        breaker.record_failure(HOST, PORT)
+        self.assertTrue(breaker.is_open(HOST, PORT))
+
+        for i in range(100):
+            if not breaker.is_open(HOST, PORT):
+                break
+            time.sleep(0.01)
+
+        self.assertFalse(breaker.is_open(HOST, PORT))
+        probe.assert_called_with(HOST, PORT, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import socket
+import unittest
+from unittest.mock import MagicMock
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient, FunctionId
+from sunix_ledstrip_controller_client.controller import Controller
+from sunix_ledstrip_controller_client.packets.requests import SetPowerRequest, UpdateColorRequest, SetFunctionRequest
+from sunix_ledstrip_controller_client.scene import Scene, DeviceSnapshot
+
+
+def create_state(power_status: int = Controller.POWER_STATE_ON, mode: int = 0x61, speed: int = 0,
+                 rgbww: (int, int, int, int, int) = (255, 0, 0, 0, 0)) -> dict:
+    red, green, blue, warm_white, cold_white = rgbww
+    return {
+        "device_name": 0x25,
+        "power_status": power_status,
+        "mode": mode,
+        "speed": speed,
+        "red": red,
+        "green": green,
+        "blue": blue,
+        "warm_white": warm_white,
+        "cold_white": cold_white,
+    }
+
+
+class TestScene(unittest.TestCase):
+
+    def setUp(self):
+        self.states = {
+            ("192.168.2.10", 5577): create_state(),
+            ("192.168.2.11", 5577): create_state(Controller.POWER_STATE_OFF, rgbww=(1, 2, 3, 4, 5)),
+            ("192.168.2.12", 1234): create_state(mode=FunctionId.RED_STROBE_FLASH.value, speed=55),
+        }
+
+        def get_state(host, port):
+            state = self.states[(host, port)]
+            if isinstance(state, Exception):
+                raise state
+            return state
+
+        self.api = LEDStripControllerClient()
+        self.api.get_state = MagicMock(side_effect=get_state)
+        self.api._send_data = MagicMock(return_value=None)
+
+    def test_capture(self):
+        """
+        Checks that the state of all reachable controllers is captured
+        """
+
+        self.states[("192.168.2.13", 5577)] = socket.timeout()
+        scene = Scene.capture(self.api, list(self.states))
+
+        self.assertEqual(len(scene), 3)
+        self.assertIsNone(scene.get_snapshot("192.168.2.13"))
+        self.assertEqual(scene.get_snapshot("192.168.2.11"),
+                         DeviceSnapshot(Controller.POWER_STATE_OFF, 0x61, 255, (1, 2, 3, 4, 5)))
+        self.assertEqual(scene.get_snapshot("192.168.2.12", 1234).get_function(), FunctionId.RED_STROBE_FLASH)
+        self.assertEqual(scene.get_snapshot("192.168.2.12", 1234).speed, 200)
+
+    def test_serialization(self):
+        """
+        Checks that a scene survives a serialization round trip
+        """
+
+        scene = Scene.capture(self.api, list(self.states))
+        data = scene.to_bytes()
+
+        self.assertEqual(Scene.from_bytes(data), scene)
+        self.assertLess(len(data), 25 * len(scene))
+
+    def test_restore(self):
+        """
+        Checks that restoring a scene sends pre-encoded packets to all changed controllers
+        """
+
+        scene = Scene.capture(self.api, list(self.states))
+
+        # change two of the controllers
+        self.states[("192.168.2.10", 5577)] = create_state(rgbww=(0, 0, 255, 0, 0))
+        self.states[("192.168.2.12", 1234)] = create_state(Controller.POWER_STATE_OFF,
+                                                           mode=FunctionId.RED_STROBE_FLASH.value, speed=55)
+
+        updated = scene.restore(self.api)
+
+        self.assertTrue(updated.is_ok())
+        self.assertCountEqual([result.get_address() for result in updated],
+                              [("192.168.2.10", 5577), ("192.168.2.12", 1234)])
+
+        sent = [call.args for call in self.api._send_data.call_args_list]
+        self.assertEqual(len(sent), 4)
+        self.assertIn(("192.168.2.10", 5577, UpdateColorRequest().get_rgbww_data(255, 0, 0, 0, 0)), sent)
+        self.assertIn(("192.168.2.10", 5577, SetPowerRequest().get_data(True)), sent)
+        self.assertIn(("192.168.2.12", 1234, SetFunctionRequest().get_data(FunctionId.RED_STROBE_FLASH, 200)), sent)
+        self.assertIn(("192.168.2.12", 1234, SetPowerRequest().get_data(True)), sent)
+
+    def test_restore_without_skipping(self):
+        """
+        Checks that all controllers are restored if unchanged ones should not be skipped
+        """
+
+        scene = Scene.capture(self.api, list(self.states))
+        self.api.get_state.reset_mock()
+
+        updated = scene.restore(self.api, skip_unchanged=False)
+
+        self.assertEqual(len(updated), 3)
+        self.api.get_state.assert_not_called()
+        self.assertEqual(self.api._send_data.call_count, 6)
+
+    def test_restore_reports_every_controller(self):
+        """
+        Checks that a failing controller does not hide the outcome of the others
+        """
+
+        scene = Scene.capture(self.api, list(self.states))
+        error = ConnectionRefusedError("refused")
+
+        def send_data(host, port, data):
+            if port == 1234:
+                raise error
+
+        self.api._send_data.side_effect = send_data
+
+        results = scene.restore(self.api, skip_unchanged=False)
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results.get_errors(), {("192.168.2.12", 1234): error})
+        self.assertEqual(len(results.get_succeeded()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient, ConnectionPool
+from sunix_ledstrip_controller_client.commands import encode_command, validate_command
+from sunix_ledstrip_controller_client.packets.constants import TURN_ON_REQUEST, TURN_OFF_REQUEST
+from sunix_ledstrip_controller_client.packets.requests import UpdateColorRequest
+from sunix_ledstrip_controller_client.scheduler import CommandScheduler
+from tests.fake_controller import FakeController, unused_port
+
+SET_COLOR_REQUEST_ID = 0x31
+SET_POWER_REQUEST_ID = 0x71
+
+
+class TestCommandScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeController().__enter__()
+        self.api = LEDStripControllerClient(connection_pool=ConnectionPool())
+        self.scheduler = CommandScheduler(self.api, lookahead=0.1, resolution=0.05)
+
+    def tearDown(self):
+        self.scheduler.close()
+        self.api.close()
+        self.device.__exit__(None, None, None)
+
+    def test_encode_command(self):
+        """
+        Checks that commands are encoded into the packets execute_command() sends
+        """
+
+        packets = encode_command(validate_command({"on": True, "rgb": [1, 2, 3]}))
+        self.assertEqual(packets, (UpdateColorRequest().get_rgb_data(1, 2, 3), TURN_ON_REQUEST))
+
+    def test_commands_fire_in_order(self):
+        """
+        Checks that commands are sent at their deadline in the order of their deadlines
+        """
+
+        start = time.monotonic()
+        self.scheduler.schedule(start + 0.15, self.device.host, self.device.port, {"on": False})
+        self.scheduler.schedule_in(0.05, self.device.host, self.device.port, {"on": True, "rgb": [1, 2, 3]})
+        self.scheduler.schedule_at(datetime.now() + timedelta(seconds=0.1), self.device.host, self.device.port,
+                                   TURN_ON_REQUEST)
+        self.assertEqual(len(self.scheduler), 3)
+
+        packets = self.device.wait_for_packets(4)
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        self.assertEqual([packet[0] for packet in packets],
+                         [SET_COLOR_REQUEST_ID, SET_POWER_REQUEST_ID, SET_POWER_REQUEST_ID, SET_POWER_REQUEST_ID])
+        self.assertEqual(packets[-1], TURN_OFF_REQUEST)
+
+        stats = self.scheduler.get_stats()
+        self.assertEqual((stats["pending"], stats["fired"], stats["errors"]), (0, 3, 0))
+        self.assertLess(stats["max_lateness"], 0.05)
+        # the connection was opened ahead of time and reused by all commands
+        self.assertEqual(self.device.connections, 1)
+
+    def test_connection_is_opened_ahead(self):
+        """
+        Checks that the connection is opened within the lookahead before the deadline
+        """
+
+        self.scheduler.schedule_in(0.3, self.device.host, self.device.port, {"on": True})
+
+        deadline = time.monotonic() + 0.3
+        while self.device.connections == 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(self.device.connections, 1)
+        self.assertEqual(self.device.get_packets(), [])
+
+        self.device.wait_for_packets(1)
+        self.assertEqual(self.device.get_packets(), [TURN_ON_REQUEST])
+
+    def test_cancel_and_repeat(self):
+        """
+        Checks that repeated commands are sent until they are cancelled
+        """
+
+        cancelled = self.scheduler.schedule_in(0.05, self.device.host, self.device.port, {"on": False})
+        repeated = self.scheduler.schedule_in(0.01, self.device.host, self.device.port, {"on": True},
+                                              interval=0.02)
+        self.scheduler.cancel(cancelled)
+
+        self.assertGreaterEqual(len(self.device.wait_for_packets(4)), 4)
+        self.scheduler.cancel(repeated)
+        time.sleep(0.05)
+
+        count = len(self.device.get_packets())
+        time.sleep(0.05)
+        self.assertEqual(len(self.device.get_packets()), count)
+        self.assertNotIn(TURN_OFF_REQUEST, self.device.get_packets())
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_many_commands(self):
+        """
+        Checks that many far away commands are stored without duplicating their packets
+        """
+
+        deadline = time.monotonic() + 3600
+        ids = self.scheduler.schedule_many(
+            [(deadline + idx, self.device.host, self.device.port, {"rgb": [idx % 2, 0, 0]}) for idx in range(10000)])
+
+        self.assertEqual(len(ids), 10000)
+        self.assertEqual(len(self.scheduler), 10000)
+        self.assertEqual(len(self.scheduler._packets), 2)
+        self.assertEqual(self.device.get_packets(), [])
+
+    def test_errors(self):
+        """
+        Checks that failed commands are reported and invalid commands are rejected
+        """
+
+        on_error = MagicMock()
+        scheduler = CommandScheduler(self.api, on_error=on_error)
+        port = unused_port()
+        try:
+            scheduler.schedule_in(0, "127.0.0.1", port, {"on": True})
+            for _ in range(100):
+                if on_error.called:
+                    break
+                time.sleep(0.01)
+
+            on_error.assert_called_once()
+            self.assertEqual(on_error.call_args[0][:2], ("127.0.0.1", port))
+            self.assertIsInstance(on_error.call_args[0][2], ConnectionRefusedError)
+            self.assertEqual(scheduler.get_stats()["errors"], 1)
+
+            for command in ({"on": 1}, {"rgb": [256, 0, 0]}, {"brightness": 3}, b''):
+                with self.assertRaises(ValueError):
+                    scheduler.schedule_in(1, "127.0.0.1", port, command)
+            with self.assertRaises(ValueError):
+                scheduler.schedule_in(1, "127.0.0.1", port, {"on": True}, interval=0)
+        finally:
+            scheduler.close()
+
+        with self.assertRaises(RuntimeError):
+            scheduler.schedule_in(1, "127.0.0.1", port, {"on": True})
+
+    def test_failing_error_callback(self):
+        """
+        Checks that a failing error callback does not stop later commands to the same controller
+        """
+
+        on_error = MagicMock(side_effect=RuntimeError("broken callback"))
+        scheduler = CommandScheduler(self.api, on_error=on_error)
+        port = unused_port()
+        try:
+            for count in range(1, 3):
+                scheduler.schedule_in(0, "127.0.0.1", port, {"on": True})
+                for _ in range(100):
+                    if on_error.call_count == count:
+                        break
+                    time.sleep(0.01)
+                self.assertEqual(on_error.call_count, count)
+            time.sleep(0.01)
+            self.assertEqual(scheduler._queues, {})
+        finally:
+            scheduler.close()
+
+    def test_cancel_sent_commands(self):
+        """
+        Checks that cancelling commands that were already sent or never existed does not keep their ids
+        """
+
+        command_id = self.scheduler.schedule_in(0, self.device.host, self.device.port, {"on": True})
+        self.device.wait_for_packets(1)
+        for _ in range(1000):
+            self.scheduler.cancel(command_id)
+            command_id += 1
+
+        self.assertLessEqual(len(self.scheduler._cancelled), 64)
+
+    def test_close_while_spinning(self):
+        """
+        Checks that closing the scheduler stops busy waiting for the next deadline
+        """
+
+        scheduler = CommandScheduler(self.api, lookahead=10, spin=10)
+        scheduler.schedule_in(5, self.device.host, self.device.port, {"on": True})
+        time.sleep(0.05)
+
+        start = time.monotonic()
+        scheduler.close()
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(self.device.get_packets(), [])
@@ -0,0 +1,147 @@
+import os
+import pickle
+import time
+import unittest
+
+from sunix_ledstrip_controller_client import Controller
+from sunix_ledstrip_controller_client.effects import SolidEffect
+from sunix_ledstrip_controller_client.exceptions import DeviceConnectionRefusedError
+from sunix_ledstrip_controller_client.ratelimit import RateLimitExceeded
+from sunix_ledstrip_controller_client.retry import CircuitOpenError
+from sunix_ledstrip_controller_client.sharding import ShardedClient, ShardError, _get_partition
+from tests.fake_controller import FakeController, unused_port
+
+SET_COLOR_REQUEST_ID = 0x31
+
+
+class TestShardedClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.api = ShardedClient(shards=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.close()
+
+    def setUp(self):
+        self.devices = [FakeController().__enter__() for _ in range(4)]
+        self.addresses = [(device.host, device.port) for device in self.devices]
+
+    def tearDown(self):
+        for device in self.devices:
+            device.__exit__(None, None, None)
+
+    def test_routing(self):
+        """
+        Checks that registered controllers stay on the shard of their hardware id when their address changes
+        """
+
+        host, port = self.addresses[0]
+        shard = self.api.register("F0FE6B2333C6", host, port)
+        self.assertEqual(shard, _get_partition("F0FE6B2333C6", 2))
+        self.assertEqual(self.api.get_shard_index(host, port), shard)
+
+        self.api.register("F0FE6B2333C6", "192.168.2.99", 5577)
+        self.assertEqual(self.api.get_shard_index("192.168.2.99", 5577), shard)
+        self.assertEqual(self.api.get_shard_index(host, port), _get_partition("%s:%d" % (host, port), 2))
+
+    def test_commands(self):
+        """
+        Checks that commands are executed by the workers and that the Controller API works on top of them
+        """
+
+        device = self.devices[0]
+        self.api.turn_on(device.host, device.port)
+        self.api.set_rgb(device.host, device.port, 1, 2, 3)
+        state = self.api.get_state(device.host, device.port)
+        self.assertEqual((state["power_status"], state["red"], state["green"], state["blue"]), (0x23, 1, 2, 3))
+
+        controller = Controller(self.api, device.host, device.port)
+        controller.set_brightness(128)
+        self.assertEqual(max(controller.get_rgbww()), 128)
+        device.wait_for_packets(2, SET_COLOR_REQUEST_ID)
+        self.assertEqual(device.rgbww, controller.get_rgbww())
+
+        with self.assertRaises(ValueError):
+            self.api.set_rgb(device.host, device.port, 256, 0, 0)
+        with self.assertRaises(DeviceConnectionRefusedError):
+            self.api.get_state("127.0.0.1", unused_port())
+
+    def test_merged_results(self):
+        """
+        Checks that states and group results of all workers are merged in the order of the addresses
+        """
+
+        port = unused_port()
+        addresses = self.addresses + [("127.0.0.1", port)]
+        self.assertEqual(len({self.api.get_shard_index(*address) for address in addresses}), 2)
+
+        states = self.api.get_states(addresses)
+        self.assertEqual(list(states), addresses)
+        self.assertTrue(all(isinstance(states[address], dict) for address in self.addresses))
+        self.assertIsInstance(states[("127.0.0.1", port)], DeviceConnectionRefusedError)
+
+        result = self.api.set_hsv_group(self.addresses, 0, 255, 255)
+        self.assertTrue(result.is_ok())
+        self.assertEqual([result.get_address() for result in result], self.addresses)
+
+        colors = {address: (idx, 0, 0, 0, 0) for idx, address in enumerate(self.addresses)}
+        result = self.api.set_rgbww_many(colors)
+        self.assertTrue(result.is_ok())
+        for idx, device in enumerate(self.devices):
+            device.wait_for_packets(2, SET_COLOR_REQUEST_ID)
+            self.assertEqual(device.rgbww, (idx, 0, 0, 0, 0))
+
+        stats = self.api.get_stats()
+        self.assertEqual([shard["shard"] for shard in stats["shards"]], [0, 1])
+        self.assertNotIn(os.getpid(), [shard["pid"] for shard in stats["shards"]])
+        self.assertEqual(stats["requests"], sum(shard["requests"] for shard in stats["shards"]))
+        self.assertGreaterEqual(stats["errors"], 1)
+
+    def test_effect(self):
+        """
+        Checks that an effect is run by the workers of all controllers of the group
+        """
+
+        effect_id = self.api.start_effect(SolidEffect((10, 20, 30)), self.addresses, fps=50)
+        for device in self.devices:
+            device.wait_for_packets(1, SET_COLOR_REQUEST_ID)
+            self.assertEqual(device.rgbww, (10, 20, 30, 0, 0))
+
+        stats = self.api.get_stats()["effects"][effect_id]
+        self.assertEqual(stats["controllers"], 4)
+        self.assertEqual(stats["packets"], 4)
+
+        self.api.stop_effect(effect_id)
+        self.assertNotIn(effect_id, self.api.get_stats()["effects"])
+
+
+class TestShardErrors(unittest.TestCase):
+
+    def test_errors_are_picklable(self):
+        """
+        Checks that errors with custom constructors survive the way from a worker to the coordinator
+        """
+
+        error = pickle.loads(pickle.dumps(CircuitOpenError("192.168.2.53", 5577)))
+        self.assertEqual((error.host, error.port), ("192.168.2.53", 5577))
+
+        error = pickle.loads(pickle.dumps(RateLimitExceeded("192.168.2.53", 5577, 0.5)))
+        self.assertEqual(error.retry_after, 0.5)
+
+    def test_closed(self):
+        """
+        Checks that requests fail once the workers are stopped
+        """
+
+        api = ShardedClient(shards=1)
+        api.close()
+
+        start = time.monotonic()
+        with self.assertRaises(ShardError):
+            api.turn_on("192.168.2.53", 5577)
+        self.assertLess(time.monotonic() - start, 1)
+
+        with self.assertRaises(ValueError):
+            ShardedClient(shards=0)
@@ -0,0 +1,95 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient
+from sunix_ledstrip_controller_client.exceptions import DeviceConnectionRefusedError
+from tests.fake_controller import FakeDiscoveryResponder
+
+
+class TestSweepDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        self.api = LEDStripControllerClient()
+        self.api.get_state = MagicMock(return_value=dict(
+            device_name=0x25, power_status=0x23, mode=0x61, speed=0x10,
+            red=0, green=0, blue=0, warm_white=0, cold_white=0))
+
+    def test_sweep(self):
+        """
+        Checks that a controller in a swept network is found
+        """
+
+        with FakeDiscoveryResponder("F0FE6B2333C6") as responder:
+            self.api._discovery_port = responder.port
+            controllers = self.api.sweep_controllers(["127.0.0.0/30", "127.0.0.1/32"], timeout=0.2)
+
+        self.assertEqual([controller.get_hardware_id() for controller in controllers], ["F0FE6B2333C6"])
+        self.assertEqual(controllers[0].get_host(), "127.0.0.1")
+        self.assertEqual(controllers[0].get_model(), "AK001-ZJ200")
+        # every address is only probed once
+        self.assertEqual(len(responder.messages), 1)
+
+    def test_unreachable_controller(self):
+        """
+        Checks that controllers that reply to the discovery but are not reachable are logged and skipped
+        """
+
+        self.api.get_state = MagicMock(side_effect=DeviceConnectionRefusedError("refused", "127.0.0.1", 5577))
+        with FakeDiscoveryResponder("F0FE6B2333C6") as responder, \
+                self.assertLogs("sunix_ledstrip_controller_client.client", "WARNING") as logs:
+            self.api._discovery_port = responder.port
+            controllers = self.api.sweep_controllers("127.0.0.1/32", timeout=0.2)
+
+        self.assertEqual(controllers, [])
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("F0FE6B2333C6", logs.output[0])
+
+    def test_states_are_queried_in_parallel(self):
+        """
+        Checks that the states of discovered controllers are queried in parallel and not by every new Controller
+        """
+
+        get_state = self.api.get_state
+
+        def slow_get_state(host, port):
+            time.sleep(0.2)
+            return get_state(host, port)
+
+        self.api.get_state = MagicMock(side_effect=slow_get_state)
+        messages = ["192.168.2.%d,F0FE6B2333%02d,AK001-ZJ200" % (idx, idx) for idx in range(10)]
+
+        start = time.monotonic()
+        controllers = self.api._create_discovered_controllers(messages + ["invalid"])
+        duration = time.monotonic() - start
+
+        self.assertEqual([controller.get_host() for controller in controllers],
+                         ["192.168.2.%d" % idx for idx in range(10)])
+        self.assertEqual(self.api.get_state.call_count, 10)
+        self.assertEqual(controllers[0].get_device_name(), 0x25)
+        self.assertLess(duration, 1)
+
+    def test_rate(self):
+        """
+        Checks that messages are sent at the configured rate
+        """
+
+        self.api._discovery_port = 9
+        start = time.monotonic()
+        controllers = self.api.sweep_controllers("127.0.0.0/26", rate=200, timeout=0)
+        duration = time.monotonic() - start
+
+        self.assertEqual(controllers, [])
+        # 62 hosts at 200 messages per second
+        self.assertGreaterEqual(duration, 0.3)
+        self.assertLess(duration, 1)
+
+    def test_invalid_arguments(self):
+        """
+        Checks that invalid networks and rates are rejected
+        """
+
+        with self.assertRaises(ValueError):
+            self.api.sweep_controllers("not a network")
+        with self.assertRaises(ValueError):
+            self.api.sweep_controllers("127.0.0.0/30", rate=0)
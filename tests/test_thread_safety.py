@@ -0,0 +1,90 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from sunix_ledstrip_controller_client import LEDStripControllerClient, Controller, ConnectionPool
+from sunix_ledstrip_controller_client.packets import TransitionType
+from sunix_ledstrip_controller_client.packets.buffers import to_program_bytes
+from sunix_ledstrip_controller_client.packets.requests import UpdateColorRequest, SetCustomFunctionRequest, \
+    encode_rgbww, encode_custom_function
+from tests.fake_controller import FakeController
+
+THREADS = 8
+
+
+class TestThreadSafety(unittest.TestCase):
+
+    def test_shared_requests(self):
+        """
+        Checks that a single request object can encode packets in many threads at the same time
+        """
+
+        color_request = UpdateColorRequest()
+        function_request = SetCustomFunctionRequest()
+
+        def encode(worker: int) -> int:
+            errors = 0
+            for i in range(500):
+                color = (worker, i % 256, 255 - worker, 0, 7)
+                if color_request.get_rgbww_data(*color) != encode_rgbww(*color):
+                    errors += 1
+
+                colors = [(worker, i % 256, 0), (1, 2, 3, 4)]
+                expected = encode_custom_function(to_program_bytes(bytes(
+                    [worker, i % 256, 0, 0, 1, 2, 3, 4])), worker, TransitionType.Strobe)
+                if function_request.get_data(colors, worker, TransitionType.Strobe) != expected:
+                    errors += 1
+            return errors
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            self.assertEqual(sum(executor.map(encode, range(THREADS))), 0)
+
+    def test_shared_controller(self):
+        """
+        Hammers a single controller object that is shared by many threads
+        """
+
+        with FakeController() as device:
+            api = LEDStripControllerClient()
+            controller = Controller(api, device.host, device.port)
+
+            def work(worker: int) -> None:
+                for i in range(10):
+                    controller.set_rgb(worker, i, 0)
+                    rgbww = controller.get_rgbww()
+                    assert len(rgbww) == 5
+                    controller.get_brightness()
+
+            with ThreadPoolExecutor(THREADS) as executor:
+                list(executor.map(work, range(THREADS)))
+
+            controller.update_state()
+            self.assertEqual(len(device.get_packets(0x31)), THREADS * 10)
+            self.assertEqual(controller.get_rgbww(), device.rgbww)
+
+    def test_shared_client(self):
+        """
+        Checks that a pooled client shared by many threads keeps responses of different devices apart
+        """
+
+        with FakeController() as first, FakeController() as second, FakeController() as third:
+            devices = [first, second, third]
+            for idx, device in enumerate(devices):
+                device.rgbww = (idx, idx, idx, 0, 0)
+
+            api = LEDStripControllerClient(connection_pool=ConnectionPool())
+
+            def work(worker: int) -> int:
+                errors = 0
+                for i in range(30):
+                    idx = (worker + i) % len(devices)
+                    state = api.get_state(devices[idx].host, devices[idx].port)
+                    if state["red"] != idx:
+                        errors += 1
+                return errors
+
+            with ThreadPoolExecutor(THREADS) as executor:
+                self.assertEqual(sum(executor.map(work, range(THREADS))), 0)
+
+            api.close()
+            for device in devices:
+                self.assertEqual(device.connections, 1)